@@ -6,25 +6,30 @@ from PIL import Image
 from io import BytesIO
 from openai import OpenAI
 from dotenv import load_dotenv
-import time
-import re
 
+# Before the local imports below: they read their settings when imported
 load_dotenv()
 
+from places_cache import places_request
+from address import normalize_place
+import time
+import re
+
 GOOGLE_API_KEY = os.getenv('GOOGLE_PLACES_API_KEY')
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 BACKEND_URL = os.getenv('BACKEND_URL')
 ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
 
+# Only for parts Places leaves out (Prishtina has one city-wide postal code)
+ADDRESS_DEFAULTS = {'city': 'Prishtina', 'state': 'XK', 'zip_code': '10000'}
+
 client = OpenAI(api_key=OPENAI_API_KEY)
 
 def search_specific_place(query):
     """Search for the specific clinic"""
     print(f"🔍 Searching: {query}")
-    url = "https://maps.googleapis.com/maps/api/place/textsearch/json"
     params = {'query': query, 'key': GOOGLE_API_KEY}
-    response = requests.get(url, params=params)
-    results = response.json()
+    results = places_request('textsearch', params)
     
     if results.get('status') != 'OK':
         print(f"  ❌ Search failed: {results.get('status')}")
@@ -45,14 +50,12 @@ def search_specific_place(query):
 def get_place_details(place_id):
     """Get detailed information"""
     print(f"\n📋 Getting details...")
-    url = "https://maps.googleapis.com/maps/api/place/details/json"
     params = {
         'place_id': place_id,
-        'fields': 'name,formatted_address,formatted_phone_number,international_phone_number,website,rating,user_ratings_total,photos,opening_hours,types',
+        'fields': 'name,formatted_address,address_component,formatted_phone_number,international_phone_number,website,rating,user_ratings_total,photos,opening_hours,types',
         'key': GOOGLE_API_KEY
     }
-    response = requests.get(url, params=params)
-    result = response.json().get('result', {})
+    result = places_request('details', params).get('result', {})
     
     print(f"  Name: {result.get('name')}")
     print(f"  Phone: {result.get('formatted_phone_number')}")
@@ -61,23 +64,6 @@ def get_place_details(place_id):
     
     return result
 
-def parse_address(formatted_address):
-    """Parse address into components"""
-    parts = [p.strip() for p in formatted_address.split(',')]
-    
-    # For Albania
-    street = parts[0] if len(parts) > 0 else "Unknown"
-    city = "Prishtina"
-    state = "XK"  # Kosovo code
-    zip_code = "10000"
-    
-    # Try to extract city from address
-    for part in parts:
-        if 'Prishtina' in part or 'Pristina' in part:
-            city = 'Prishtina'
-    
-    return street, city, state, zip_code
-
 def download_photo(ref):
     """Download photo from Google"""
     url = "https://maps.googleapis.com/maps/api/place/photo"
@@ -180,8 +166,7 @@ def create_provider(place_data, details):
     print(f"\n💾 Creating provider...")
     
     name = place_data.get('name', 'Unknown')[:255]
-    formatted_address = place_data.get('formatted_address', '')
-    street, city, state, zip_code = parse_address(formatted_address)
+    address = normalize_place({**place_data, **details}, ADDRESS_DEFAULTS)
     
     email_name = re.sub(r'[^a-z0-9]', '', name.lower())[:30]
     email = f"{email_name}@example.com"
@@ -202,10 +187,10 @@ def create_provider(place_data, details):
         'email': email,
         'phone': details.get('formatted_phone_number') or details.get('international_phone_number') or '+383 XX XXX XXX',
         'providerTypes': ['Dental'],
-        'streetAddress': street[:255],
-        'city': city,
-        'state': state,
-        'zipCode': zip_code,
+        'streetAddress': address['street_address'][:255],
+        'city': address['city'],
+        'state': address['state'],
+        'zipCode': address['zip_code'],
         'website': details.get('website', '')[:500] if details.get('website') else '',
         'status': 'approved',
         'source': 'agent'
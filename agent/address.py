@@ -0,0 +1,449 @@
+"""
+========================================
+ADDRESS NORMALIZER
+Structured addresses and canonical address keys for places and providers
+========================================
+
+Each agent script used to have its own parse_address that split
+formatted_address on commas and fell back to hard-coded city / state /
+ZIP ("10001", "10000"), so any address it could not read became a wrong
+ZIP that then defeated duplicate detection and geo search.
+
+One normalizer for every source now:
+
+    1. Places address_components when present (street_number, route,
+       subpremise, locality, administrative_area_level_1, postal_code)
+    2. otherwise the formatted address / street line, parsed against
+       compiled USPS tables (Publication 28 street suffixes,
+       directionals, unit designators, state names)
+    3. market defaults only for parts that are still missing
+
+Every address also gets a canonical key, street number | street | unit |
+ZIP5, with the street in USPS abbreviations ("West 57th Street" and
+"W 57th St" agree):
+
+    address = normalize_place(details, defaults={'city': 'New York', 'state': 'NY'})
+    address['key']          # '120|w 57th st|200|10019'
+
+normalize_batch() does the same over a list, memoising the street and
+last-line parsing that repeats across records, so a backfill of the
+whole provider table runs in seconds:
+
+    python address.py --backfill            # keys + collisions for every provider
+"""
+
+import re
+import time
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# USPS Publication 28, Appendix C1: standard suffix abbreviation -> accepted spellings
+_USPS_SUFFIXES = {
+    'aly': ('alley', 'allee', 'ally'), 'anx': ('annex', 'anex', 'annx'), 'arc': ('arcade',),
+    'ave': ('avenue', 'av', 'aven', 'avenu', 'avn', 'avnue'), 'byu': ('bayou', 'bayoo'),
+    'bch': ('beach',), 'bnd': ('bend',), 'blf': ('bluff', 'bluf'), 'btm': ('bottom', 'bot', 'bottm'),
+    'blvd': ('boulevard', 'boul', 'boulv'), 'br': ('branch', 'brnch'), 'brg': ('bridge', 'brdge'),
+    'brk': ('brook',), 'byp': ('bypass', 'bypa', 'bypas', 'byps'), 'cp': ('camp', 'cmp'),
+    'cyn': ('canyon', 'canyn', 'cnyn'), 'cpe': ('cape',), 'cswy': ('causeway', 'causwa'),
+    'ctr': ('center', 'cen', 'cent', 'centr', 'centre', 'cnter', 'cntr'), 'cir': ('circle', 'circ', 'circl', 'crcl', 'crcle'),
+    'clf': ('cliff',), 'clb': ('club',), 'cmn': ('common',), 'cor': ('corner',), 'crse': ('course',),
+    'ct': ('court',), 'cts': ('courts',), 'cv': ('cove',), 'crk': ('creek',), 'cres': ('crescent', 'crsent', 'crsnt'),
+    'xing': ('crossing', 'crssng'), 'dl': ('dale',), 'dm': ('dam',), 'dr': ('drive', 'driv', 'drv'),
+    'est': ('estate',), 'ests': ('estates',), 'expy': ('expressway', 'exp', 'expr', 'express', 'expw'),
+    'ext': ('extension', 'extn', 'extnsn'), 'fls': ('falls',), 'fry': ('ferry', 'frry'), 'fld': ('field',),
+    'flds': ('fields',), 'flt': ('flat',), 'frd': ('ford',), 'frst': ('forest', 'forests'), 'frg': ('forge', 'forg'),
+    'frk': ('fork',), 'ft': ('fort', 'frt'), 'fwy': ('freeway', 'freewy', 'frway', 'frwy'),
+    'gdn': ('garden', 'gardn', 'grden', 'grdn'), 'gdns': ('gardens', 'grdns'), 'gtwy': ('gateway', 'gatewy', 'gatway', 'gtway'),
+    'gln': ('glen',), 'grn': ('green',), 'grv': ('grove', 'grov'), 'hbr': ('harbor', 'harb', 'harbr', 'hrbor'),
+    'hvn': ('haven',), 'hts': ('heights', 'ht'), 'hwy': ('highway', 'highwy', 'hiway', 'hiwy', 'hway'),
+    'hl': ('hill',), 'hls': ('hills',), 'holw': ('hollow', 'hllw', 'hollows', 'holws'), 'is': ('island', 'islnd'),
+    'jct': ('junction', 'jction', 'jctn', 'junctn', 'juncton'), 'ky': ('key',), 'knl': ('knoll', 'knol'),
+    'lk': ('lake',), 'lks': ('lakes',), 'lndg': ('landing', 'lndng'), 'ln': ('lane',), 'lgt': ('light',),
+    'lck': ('lock',), 'ldg': ('lodge', 'ldge', 'lodg'), 'mnr': ('manor',), 'mdws': ('meadows', 'mdw', 'medows'),
+    'ml': ('mill',), 'mls': ('mills',), 'msn': ('mission', 'missn', 'mssn'), 'mt': ('mount', 'mnt'),
+    'mtn': ('mountain', 'mntain', 'mntn', 'mountin', 'mtin'), 'nck': ('neck',), 'orch': ('orchard', 'orchrd'),
+    'oval': ('ovl',), 'park': ('prk', 'parks'), 'pkwy': ('parkway', 'parkwy', 'pkway', 'pky', 'parkways', 'pkwys'),
+    'pass': (), 'psge': ('passage',), 'path': ('paths',), 'pike': ('pikes',), 'pne': ('pine',), 'pnes': ('pines',),
+    'pl': ('place',), 'pln': ('plain',), 'plns': ('plains',), 'plz': ('plaza', 'plza'), 'pt': ('point',),
+    'pts': ('points',), 'prt': ('port',), 'pr': ('prairie', 'prr'), 'radl': ('radial', 'rad', 'radiel'),
+    'rnch': ('ranch', 'ranches', 'rnchs'), 'rpd': ('rapid',), 'rpds': ('rapids',), 'rst': ('rest',),
+    'rdg': ('ridge', 'rdge'), 'riv': ('river', 'rvr', 'rivr'), 'rd': ('road',), 'rds': ('roads',),
+    'rte': ('route',), 'row': (), 'run': (), 'shl': ('shoal',), 'shr': ('shore', 'shoar'), 'shrs': ('shores', 'shoars'),
+    'spg': ('spring', 'spng', 'sprng'), 'spgs': ('springs', 'spngs', 'sprngs'), 'sq': ('square', 'sqr', 'sqre', 'squ'),
+    'sta': ('station', 'statn', 'stn'), 'stra': ('stravenue', 'strav', 'straven', 'stravn', 'strvn', 'strvnue'),
+    'strm': ('stream', 'streme'), 'st': ('street', 'str', 'strt'), 'sts': ('streets',), 'smt': ('summit', 'sumit', 'sumitt'),
+    'ter': ('terrace', 'terr'), 'trce': ('trace', 'traces'), 'trak': ('track', 'tracks', 'trk', 'trks'),
+    'trl': ('trail', 'trails', 'trls'), 'tunl': ('tunnel', 'tunel', 'tunls', 'tunnels', 'tunnl'),
+    'tpke': ('turnpike', 'trnpk', 'turnpk'), 'un': ('union',), 'vly': ('valley', 'vally', 'vlly'),
+    'via': ('viaduct', 'vdct', 'viadct'), 'vw': ('view',), 'vlg': ('village', 'vill', 'villag', 'villg', 'villiage'),
+    'vl': ('ville',), 'vis': ('vista', 'vist', 'vst', 'vsta'), 'walk': ('walks',), 'way': ('wy',),
+    'wl': ('well',), 'wls': ('wells',),
+}
+
+_DIRECTIONALS = {
+    'north': 'n', 'south': 's', 'east': 'e', 'west': 'w',
+    'northeast': 'ne', 'northwest': 'nw', 'southeast': 'se', 'southwest': 'sw',
+}
+
+_ORDINALS = {
+    'first': '1st', 'second': '2nd', 'third': '3rd', 'fourth': '4th', 'fifth': '5th',
+    'sixth': '6th', 'seventh': '7th', 'eighth': '8th', 'ninth': '9th', 'tenth': '10th',
+    'eleventh': '11th', 'twelfth': '12th',
+}
+
+# Publication 28, Appendix C2 (secondary unit designators)
+_UNIT_DESIGNATORS = {
+    'apartment': 'apt', 'apt': 'apt', 'suite': 'ste', 'ste': 'ste', 'floor': 'fl', 'fl': 'fl',
+    'unit': 'unit', 'room': 'rm', 'rm': 'rm', 'building': 'bldg', 'bldg': 'bldg', 'department': 'dept',
+    'dept': 'dept', 'office': 'ofc', 'ofc': 'ofc', 'space': 'spc', 'spc': 'spc', 'lobby': 'lbby',
+    'penthouse': 'ph', 'ph': 'ph', 'basement': 'bsmt', 'lower': 'lowr', 'upper': 'uppr', 'front': 'frnt',
+    'rear': 'rear', 'side': 'side', 'box': 'box',
+}
+
+US_STATES = {
+    'alabama': 'AL', 'alaska': 'AK', 'arizona': 'AZ', 'arkansas': 'AR', 'california': 'CA',
+    'colorado': 'CO', 'connecticut': 'CT', 'delaware': 'DE', 'district of columbia': 'DC',
+    'florida': 'FL', 'georgia': 'GA', 'hawaii': 'HI', 'idaho': 'ID', 'illinois': 'IL', 'indiana': 'IN',
+    'iowa': 'IA', 'kansas': 'KS', 'kentucky': 'KY', 'louisiana': 'LA', 'maine': 'ME', 'maryland': 'MD',
+    'massachusetts': 'MA', 'michigan': 'MI', 'minnesota': 'MN', 'mississippi': 'MS', 'missouri': 'MO',
+    'montana': 'MT', 'nebraska': 'NE', 'nevada': 'NV', 'new hampshire': 'NH', 'new jersey': 'NJ',
+    'new mexico': 'NM', 'new york': 'NY', 'north carolina': 'NC', 'north dakota': 'ND', 'ohio': 'OH',
+    'oklahoma': 'OK', 'oregon': 'OR', 'pennsylvania': 'PA', 'rhode island': 'RI', 'south carolina': 'SC',
+    'south dakota': 'SD', 'tennessee': 'TN', 'texas': 'TX', 'utah': 'UT', 'vermont': 'VT',
+    'virginia': 'VA', 'washington': 'WA', 'west virginia': 'WV', 'wisconsin': 'WI', 'wyoming': 'WY',
+    'puerto rico': 'PR', 'guam': 'GU', 'virgin islands': 'VI', 'american samoa': 'AS',
+    'northern mariana islands': 'MP',
+}
+_STATE_CODES = set(US_STATES.values())
+
+_COUNTRIES = {'usa', 'us', 'united states', 'united states of america'}
+
+_SUFFIX_WORDS = {variant for abbr, variants in _USPS_SUFFIXES.items() for variant in (abbr, *variants)}
+
+# Every spelling -> the word the key uses
+_STREET_WORDS = {
+    **{variant: abbr for abbr, variants in _USPS_SUFFIXES.items() for variant in (abbr, *variants)},
+    **_DIRECTIONALS,
+    **_ORDINALS,
+}
+
+_WORD_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_ZIP_RE = re.compile(r'\b(\d{5})(?:-\d{4})?\b')
+_STATE_ZIP_RE = re.compile(r'^(?P<state>[A-Za-z .]+?)\s+(?P<zip>\d{5}(?:-\d{4})?)$')
+# "123", "123A", "123-45" (Queens), "123 1/2"
+_NUMBER_RE = re.compile(r'^(?P<number>\d+[A-Za-z]?(?:-\d+[A-Za-z]?)?(?:\s+1/2)?)\s+(?P<rest>.+)$')
+# "Rruga Agim Ramadani 15": house number after the street outside the US
+_TRAILING_NUMBER_RE = re.compile(r'^(?P<rest>.+?)\s+(?P<number>\d+[A-Za-z]?(?:/\d+)?)$')
+# A unit id has a digit ("200", "4B", "C-2") or is one letter ("Apt B"), so
+# street words after a designator ("Front St", "Side Ave") are not units
+_UNIT_ID = r'(?=[a-z-]*\d)[a-z0-9-]+|[a-z]\b'
+_UNIT_RE = re.compile(
+    r'(?:^|\s|,)(?:(?P<designator>' + '|'.join(sorted(_UNIT_DESIGNATORS, key=len, reverse=True)) +
+    r')\.?\s*#?\s*|#\s*)(?P<unit>' + _UNIT_ID + r')?\s*$',
+    re.IGNORECASE
+)
+
+EMPTY_ADDRESS = {
+    'street_number': '', 'street': '', 'unit': '', 'city': '', 'state': '', 'zip_code': '', 'country': '',
+}
+
+
+# ========================================
+# NORMALIZATION
+# ========================================
+
+@lru_cache(maxsize=65536)
+def normalize_street(street: Optional[str]) -> str:
+    """Street name in key form: lowercase words, USPS suffixes / directionals, numeric ordinals"""
+    words = _WORD_RE.findall((street or '').lower().replace('.', ''))
+    suffix_at = max((i for i, word in enumerate(words) if word in _SUFFIX_WORDS), default=None)
+    key_words = []
+    for i, word in enumerate(words):
+        # "North St" is a street named North, not "N St": a directional right
+        # before the street type (or last) is the name, unless it trails the type
+        if (word in _DIRECTIONALS and (i + 1 == len(words) or i + 1 == suffix_at)
+                and (suffix_at is None or i < suffix_at)):
+            key_words.append(word)
+        else:
+            key_words.append(_STREET_WORDS.get(word, word))
+    return ' '.join(key_words)
+
+
+def normalize_unit(unit: Optional[str]) -> str:
+    """Unit identifier without its designator: "Suite 200", "Ste. 200" and "#200" are all "200\""""
+    unit = (unit or '').strip().lower()
+    if not unit:
+        return ''
+    match = _UNIT_RE.search(' ' + unit)
+    if match and match.group('unit'):
+        return match.group('unit')
+    return re.sub(r'[^a-z0-9-]', '', unit)
+
+
+def normalize_zip(zip_code: Optional[str]) -> str:
+    """ZIP5 for US ZIP / ZIP+4, otherwise the postal code as given"""
+    zip_code = (zip_code or '').strip()
+    match = _ZIP_RE.fullmatch(zip_code)
+    return match.group(1) if match else zip_code
+
+
+def normalize_state(state: Optional[str]) -> str:
+    """Two-letter code for a US state name or code; other regions pass through"""
+    state = (state or '').strip().rstrip('.')
+    if state.upper() in _STATE_CODES:
+        return state.upper()
+    return US_STATES.get(state.lower(), state)
+
+
+def address_key(address: Dict) -> Optional[str]:
+    """street number | street | unit | ZIP5, or None without a street and ZIP"""
+    street = normalize_street(address.get('street'))
+    zip_code = normalize_zip(address.get('zip_code'))
+    if not street or not zip_code:
+        return None
+    number = (address.get('street_number') or '').lower().replace(' ', '')
+    return f"{number}|{street}|{normalize_unit(address.get('unit'))}|{zip_code}"
+
+
+def _finish(address: Dict, defaults: Optional[Dict]) -> Dict:
+    for field in ('city', 'state', 'zip_code', 'country'):
+        if not address[field] and defaults and defaults.get(field):
+            address[field] = defaults[field]
+    address['state'] = normalize_state(address['state'])
+    address['zip_code'] = normalize_zip(address['zip_code'])
+
+    if address['country'] in ('', 'US'):
+        line = f"{address['street_number']} {address['street']}".strip()
+    else:
+        line = f"{address['street']} {address['street_number']}".strip()
+    if address['unit']:
+        unit = address['unit']
+        line = f"{line} {unit}" if not unit[:1].isdigit() else f"{line} #{unit}"
+    address['street_address'] = line
+    address['key'] = address_key(address)
+    return address
+
+
+# ========================================
+# PARSERS
+# ========================================
+
+def from_components(components: List[Dict], defaults: Dict = None) -> Dict:
+    """Structured address from Places address_components"""
+    address = dict(EMPTY_ADDRESS)
+    for component in components or []:
+        types = component.get('types', [])
+        if 'street_number' in types:
+            address['street_number'] = component['long_name']
+        elif 'route' in types:
+            address['street'] = component['long_name']
+        elif 'subpremise' in types:
+            address['unit'] = component['long_name']
+        elif 'locality' in types or ('postal_town' in types and not address['city']):
+            address['city'] = component['long_name']
+        elif 'sublocality_level_1' in types and not address['city']:
+            # New York boroughs have no locality
+            address['city'] = component['long_name']
+        elif 'administrative_area_level_1' in types:
+            address['state'] = component['short_name']
+        elif 'postal_code' in types:
+            address['zip_code'] = component['long_name']
+        elif 'country' in types:
+            address['country'] = component['short_name']
+    return _finish(address, defaults)
+
+
+@lru_cache(maxsize=65536)
+def _split_street_line(line: str) -> Tuple[str, str, str]:
+    """'123 W 57th St Ste 200' -> ('123', 'W 57th St', 'Ste 200')"""
+    line = line.strip().rstrip(',')
+    unit = ''
+    match = _UNIT_RE.search(line)
+    # A bare trailing designator word ("Park Row", "Rear") is not a unit
+    if match and match.group('unit') and match.start() > 0:
+        unit = line[match.start():].strip(' ,')
+        line = line[:match.start()].strip(' ,')
+
+    number_match = _NUMBER_RE.match(line)
+    if number_match:
+        return number_match.group('number'), number_match.group('rest').strip(), unit
+    return '', line, unit
+
+
+@lru_cache(maxsize=65536)
+def _parse_last_line(part: str) -> Tuple[str, str]:
+    """'NY 10019' / 'New York 10019-1234' / 'NY' -> (state, zip)"""
+    match = _STATE_ZIP_RE.match(part.strip())
+    if match:
+        return match.group('state'), match.group('zip')
+    zip_match = _ZIP_RE.search(part)
+    if zip_match:
+        return part[:zip_match.start()].strip(), zip_match.group(0)
+    return part.strip(), ''
+
+
+def from_formatted(formatted_address: str, defaults: Dict = None) -> Dict:
+    """Structured address from a one-line address ("123 Main St, Suite 4, Bozeman, MT 59715, USA")"""
+    address = dict(EMPTY_ADDRESS)
+    parts = [part.strip() for part in (formatted_address or '').split(',') if part.strip()]
+    if parts and parts[-1].lower() in _COUNTRIES:
+        address['country'] = 'US'
+        parts = parts[:-1]
+    elif (len(parts) >= 3 and not any(c.isdigit() for c in parts[-1])
+          and normalize_state(parts[-1]) not in _STATE_CODES):
+        # Places always ends with the country ("..., Prishtinë 10000, Kosovo")
+        address['country'] = parts.pop()
+    if not parts:
+        return _finish(address, defaults)
+
+    address['street_number'], address['street'], address['unit'] = _split_street_line(parts[0])
+    if not address['street_number'] and address['country'] not in ('', 'US'):
+        match = _TRAILING_NUMBER_RE.match(address['street'])
+        if match:
+            address['street_number'], address['street'] = match.group('number'), match.group('rest')
+    rest = parts[1:]
+    # "123 Main St, Suite 4, ..." / "123 Main St, #4, ..."
+    if rest and not address['unit'] and _UNIT_RE.fullmatch(' ' + rest[0]):
+        address['unit'] = rest.pop(0)
+
+    if rest:
+        state, zip_code = _parse_last_line(rest[-1])
+        if normalize_state(state) in _STATE_CODES or zip_code:
+            rest = rest[:-1]
+            address['zip_code'] = zip_code
+            if normalize_state(state) in _STATE_CODES:
+                address['state'] = state
+            elif state and not rest:
+                # "Prishtinë 10000": postal code after the city
+                address['city'] = state
+        if rest and not address['city']:
+            address['city'] = rest[-1]
+    if not address['city'] and not address['street_number'] and not address['unit']:
+        # "Brooklyn, NY 11211": no street line at all
+        address['city'], address['street'] = address['street'], ''
+    return _finish(address, defaults)
+
+
+def normalize_place(place: Dict, defaults: Dict = None) -> Dict:
+    """Places search / details result: address_components first, then formatted_address or vicinity"""
+    if place.get('address_components'):
+        address = from_components(place['address_components'])
+        if not (address['street'] and address['zip_code']) and place.get('formatted_address'):
+            # Components without a route / postal code: fill the gaps from the text
+            parsed = from_formatted(place['formatted_address'])
+            for field in EMPTY_ADDRESS:
+                address[field] = address[field] or parsed[field]
+        return _finish(address, defaults)
+    return from_formatted(place.get('formatted_address') or place.get('vicinity') or '', defaults)
+
+
+def normalize_provider(provider: Dict, defaults: Dict = None) -> Dict:
+    """A provider record in the agent shape (street_address, zip_code) or the
+    admin API shape (address.street / address.zip, streetAddress / zipCode)"""
+    nested = provider.get('address') if isinstance(provider.get('address'), dict) else {}
+    street = (nested.get('street') or provider.get('street_address') or provider.get('streetAddress') or '')
+    address = dict(EMPTY_ADDRESS)
+    address['street_number'], address['street'], address['unit'] = _split_street_line(street)
+    if nested.get('suite'):
+        address['unit'] = address['unit'] or nested['suite']
+    address['city'] = nested.get('city') or provider.get('city') or ''
+    address['state'] = nested.get('state') or provider.get('state') or ''
+    address['zip_code'] = nested.get('zip') or provider.get('zip_code') or provider.get('zipCode') or ''
+    return _finish(address, defaults)
+
+
+def provider_address_key(provider: Dict) -> Optional[str]:
+    return normalize_provider(provider)['key']
+
+
+def normalize_batch(records: Iterable[Dict], defaults: Dict = None) -> List[Dict]:
+    """
+    Normalize many places or provider records at once
+
+    Street lines, street names and last lines repeat heavily across a
+    market, so the memoised parsers turn most of a backfill into cache hits.
+    """
+    normalized = []
+    for record in records:
+        if 'address_components' in record or 'formatted_address' in record:
+            normalized.append(normalize_place(record, defaults))
+        else:
+            normalized.append(normalize_provider(record, defaults))
+    return normalized
+
+
+# ========================================
+# BACKFILL
+# ========================================
+
+def backfill(providers: List[Dict]) -> Dict:
+    """Canonical keys for existing providers, plus the records that share one"""
+    started = time.time()
+    addresses = normalize_batch(providers)
+
+    by_key: Dict[str, List[Dict]] = {}
+    rows = []
+    for provider, address in zip(providers, addresses):
+        row = {
+            'id': provider.get('_id') or provider.get('id'),
+            'practice_name': provider.get('practiceName') or provider.get('practice_name'),
+            'address_key': address['key'],
+            'street_address': address['street_address'],
+            'zip_code': address['zip_code'],
+        }
+        rows.append(row)
+        if address['key']:
+            by_key.setdefault(address['key'], []).append(row)
+
+    return {
+        'providers': len(rows),
+        'without_key': sum(row['address_key'] is None for row in rows),
+        'shared_keys': {key: group for key, group in by_key.items() if len(group) > 1},
+        'seconds': round(time.time() - started, 3),
+        'rows': rows,
+    }
+
+
+def main():
+    import argparse
+    import json
+    import os
+
+    parser = argparse.ArgumentParser(description='Canonical address keys for provider records')
+    parser.add_argument('--backfill', action='store_true',
+                       help='Compute keys for every provider in the admin API snapshot')
+    parser.add_argument('--input', metavar='JSON', default=None,
+                       help='Use a JSON list of provider records instead of the admin API')
+    parser.add_argument('address', nargs='*', help='One-line addresses to normalize')
+    args = parser.parse_args()
+
+    if args.address:
+        for line in args.address:
+            print(json.dumps(from_formatted(line)))
+        return
+    if not (args.backfill or args.input):
+        parser.error('give addresses, --backfill or --input')
+
+    if args.input:
+        with open(args.input) as f:
+            providers = json.load(f)
+    else:
+        from agent import APIClient, Config
+        api = APIClient(Config.API_BASE_URL, Config.API_ADMIN_EMAIL, Config.API_ADMIN_PASSWORD)
+        providers = list(api.iter_provider_snapshot())
+
+    result = backfill(providers)
+    print(f"🏠 {result['providers']} providers normalized in {result['seconds']:.2f}s")
+    print(f"   {result['without_key']} without a street + ZIP, "
+          f"{len(result['shared_keys'])} addresses shared by more than one provider")
+
+    from agent import Config
+    os.makedirs(Config.EXPORT_DIRECTORY, exist_ok=True)
+    filepath = os.path.join(Config.EXPORT_DIRECTORY, f"address_keys_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(filepath, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"📁 Keys exported to: {filepath}")
+
+
+if __name__ == '__main__':
+    main()
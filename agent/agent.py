@@ -20,22 +20,40 @@ import os
 import sys
 import json
 import time
-import requests
-from typing import Dict, List, Optional
+import threading
+from typing import Dict, Iterator, List, Optional
 from datetime import datetime
 from dotenv import load_dotenv
-import googlemaps
-from openai import OpenAI
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 
-# Load environment variables
+# Load environment variables first: the local modules below read their
+# settings (PLACES_*, HTTP_*, METRICS_*, ...) when imported
 load_dotenv()
 
+import googlemaps
+import googlemaps.exceptions
+import openai
+from openai import OpenAI
+from address import normalize_place
+from crawler import SiteCrawler
+from dedupe_index import DuplicateIndex
+from batch_extract import BatchJob, summarize as summarize_batch
+from bulk_ingest import BulkIngestClient
+from extraction import (
+    EXTRACTION_PROMPT_VERSION, RESPONSE_FORMAT, build_extraction_messages, parse_extraction,
+    provider_key
+)
+from fetcher import TieredFetcher
+from gazetteer import get_gazetteer
+from http_client import get_http
+from llm_cache import get_llm_cache
+from metrics import get_metrics
+from photo_pipeline import PhotoPipeline
+from pipeline import HostRateLimiter, Pipeline, Stage
+from run_journal import RunJournal
+from places_cache import CachedPlacesClient
+from refresh import REFRESH_MAX_AGE_DAYS, ProviderRefresher
+from sweep import BoundingBox, GridSweep, nearby_result_cap
+
 # ========================================
 # CONFIGURATION
 # ========================================
@@ -51,39 +69,68 @@ class Config:
     
     # OpenAI
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
-    OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-4-turbo-preview')
+    # Structured outputs (json_schema) need gpt-4o-mini / gpt-4o-2024-08-06 or newer
+    OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
+    OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL')  # e.g. fake_openai_server.py for offline runs
+    BATCH_POLL_SECONDS = int(os.getenv('BATCH_POLL_SECONDS', 60))
     
     # Agent Settings
     MAX_PROFILES_PER_RUN = int(os.getenv('AGENT_MAX_PROFILES_PER_RUN', 25))
     MIN_CONFIDENCE_SCORE = int(os.getenv('AGENT_MIN_CONFIDENCE_SCORE', 70))
+    # Seconds between agent_runs progress updates while a run is in flight
+    AGENT_RUN_SYNC_SECONDS = float(os.getenv('AGENT_RUN_SYNC_SECONDS', 15))
     
     # Duplicate Thresholds
     DUPLICATE_THRESHOLD_HIGH = int(os.getenv('AGENT_DUPLICATE_THRESHOLD_HIGH', 85))
     DUPLICATE_THRESHOLD_MEDIUM = int(os.getenv('AGENT_DUPLICATE_THRESHOLD_MEDIUM', 70))
     
+    # Places discovery (text search returns at most 3 pages of 20)
+    PLACES_MAX_PAGES = int(os.getenv('PLACES_MAX_PAGES', 3))
+    SWEEP_CELL_KM = float(os.getenv('SWEEP_CELL_KM', 2.0))
+    
     # Scraping
+    SCRAPER_USER_AGENT = os.getenv('SCRAPER_USER_AGENT', 'Mozilla/5.0 (compatible; CarrotlyBot/1.0; +https://carrotly.com/bot)')
     SCRAPER_TIMEOUT = int(os.getenv('SCRAPER_TIMEOUT_SECONDS', 30))
-    SCRAPER_RATE_LIMIT = int(os.getenv('SCRAPER_RATE_LIMIT_SECONDS', 2))
+    SCRAPER_RATE_LIMIT = float(os.getenv('SCRAPER_RATE_LIMIT_SECONDS', 2))
+    BROWSER_POOL_SIZE = int(os.getenv('BROWSER_POOL_SIZE', 2))
+    CRAWL_MAX_PAGES = int(os.getenv('CRAWL_MAX_PAGES', 5))
+    EXTRACTION_TOKEN_BUDGET = int(os.getenv('EXTRACTION_TOKEN_BUDGET', 3500))
+    
+    # Pipeline (workers per stage, bounded queue size between stages)
+    PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', 50))
+    PIPELINE_DEDUPE_WORKERS = int(os.getenv('PIPELINE_DEDUPE_WORKERS', 4))
+    PIPELINE_SCRAPE_WORKERS = int(os.getenv('PIPELINE_SCRAPE_WORKERS', 4))
+    PIPELINE_EXTRACT_WORKERS = int(os.getenv('PIPELINE_EXTRACT_WORKERS', 4))
+    PIPELINE_UPLOAD_WORKERS = int(os.getenv('PIPELINE_UPLOAD_WORKERS', 2))
     
     # Export
     EXPORT_DIRECTORY = os.getenv('EXPORT_DIRECTORY', './exports')
+    # Optional Prometheus textfile-collector / OpenMetrics dump of run metrics
+    METRICS_TEXTFILE = os.getenv('METRICS_TEXTFILE')
 
 
 # ========================================
 # API CLIENT (Portable - works with any REST API)
 # ========================================
 
+# Fields the duplicate index needs from GET /admin/providers
+SNAPSHOT_FIELDS = 'practiceName,address,phone,location,googlePlaceId'
+
+
 class APIClient:
     def __init__(self, base_url: str, email: str, password: str):
         self.base_url = base_url.rstrip('/')
         self.token = None
+        self.http = get_http()
         self.authenticate(email, password)
     
     def authenticate(self, email: str, password: str):
         """Login and get JWT token"""
-        response = requests.post(
+        response = self.http.post(
+            'backend',
             f"{self.base_url}/admin/login",
-            json={"email": email, "password": password}
+            json={"email": email, "password": password},
+            idempotent=True
         )
         response.raise_for_status()
         self.token = response.json()['token']
@@ -95,44 +142,48 @@ class APIClient:
             'Content-Type': 'application/json'
         }
     
-    def check_duplicate(self, name: str, address: str, zip_code: str, phone: Optional[str] = None) -> Dict:
-        """Check if provider already exists in database"""
-        response = requests.get(
-            f"{self.base_url}/admin/providers",
-            headers=self._headers(),
-            params={
-                'search': name,
-                'zip': zip_code
-            }
-        )
-        response.raise_for_status()
-        
-        providers = response.json()['providers']
-        
-        # Simple client-side duplicate checking
-        # (In production, this would use the SQL function)
-        for provider in providers:
-            if (provider['practice_name'].lower() == name.lower() and 
-                provider['zip_code'] == zip_code):
-                return {
-                    'is_duplicate': True,
-                    'match_type': 'exact',
-                    'confidence': 100,
-                    'existing_provider': provider
-                }
+    def iter_provider_snapshot(self, page_size: int = 1000) -> Iterator[Dict]:
+        """Compact records of every existing provider, for the local duplicate index"""
+        skip = 0
+        while True:
+            response = self.http.get(
+                'backend',
+                f"{self.base_url}/admin/providers",
+                headers=self._headers(),
+                params={'limit': page_size, 'skip': skip, 'fields': SNAPSHOT_FIELDS}
+            )
+            response.raise_for_status()
+            providers = response.json()['providers']
+            yield from providers
             
-            # Fuzzy match logic would go here
-            # For MVP, just check exact matches
-        
-        return {
-            'is_duplicate': False,
-            'match_type': 'none',
-            'confidence': 0
-        }
+            skip += len(providers)
+            if len(providers) < page_size:
+                return
+    
+    def iter_refresh_candidates(self, refreshed_before: str, fields: str,
+                                page_size: int = 1000) -> Iterator[Dict]:
+        """Agent-sourced providers not refreshed since the cutoff (or never), stalest first"""
+        skip = 0
+        while True:
+            response = self.http.get(
+                'backend',
+                f"{self.base_url}/admin/providers",
+                headers=self._headers(),
+                params={'source': 'agent', 'refreshedBefore': refreshed_before, 'fields': fields,
+                        'limit': page_size, 'skip': skip}
+            )
+            response.raise_for_status()
+            providers = response.json()['providers']
+            yield from providers
+            
+            skip += len(providers)
+            if len(providers) < page_size:
+                return
     
     def create_provider(self, provider_data: Dict) -> Dict:
         """Create a new provider profile"""
-        response = requests.post(
+        response = self.http.post(
+            'backend',
             f"{self.base_url}/admin/providers",
             headers=self._headers(),
             json=provider_data
@@ -140,9 +191,14 @@ class APIClient:
         response.raise_for_status()
         return response.json()['provider']
     
+    def bulk_client(self, on_result=None) -> BulkIngestClient:
+        """Batched upserts (provider + services + photos) over the shared HTTP client"""
+        return BulkIngestClient(self.base_url, self.token, on_result=on_result, http=self.http)
+    
     def create_agent_run(self, search_params: Dict) -> str:
         """Create agent run record and get run ID"""
-        response = requests.post(
+        response = self.http.post(
+            'backend',
             f"{self.base_url}/admin/agent/run",
             headers=self._headers(),
             json=search_params
@@ -151,10 +207,16 @@ class APIClient:
         return response.json()['runId']
     
     def update_agent_run(self, run_id: str, updates: Dict):
-        """Update agent run status"""
-        # Note: This endpoint would need to be added to the API
-        # For now, we'll skip this in MVP
-        pass
+        """Update agent run status / counters (columns of the agent_runs table)"""
+        # Counters are absolute, so a retried PATCH is harmless
+        response = self.http.patch(
+            'backend',
+            f"{self.base_url}/admin/agent/run/{run_id}",
+            headers=self._headers(),
+            json=updates,
+            idempotent=True
+        )
+        response.raise_for_status()
 
 
 # ========================================
@@ -162,8 +224,40 @@ class APIClient:
 # ========================================
 
 class GoogleMapsDiscovery:
+    # Map provider types to Google Places search queries
+    QUERY_MAP = {
+        'medical': ['doctor', 'medical clinic', 'primary care', 'family medicine'],
+        'dental': ['dentist', 'dental clinic', 'orthodontist'],
+        'cosmetic': ['medical spa', 'cosmetic surgery', 'aesthetic clinic'],
+        'fitness': ['personal trainer', 'gym', 'fitness center'],
+        'massage': ['massage therapy', 'spa', 'massage clinic'],
+        'mental_health': ['therapist', 'psychologist', 'counseling'],
+        'skincare': ['dermatology', 'skin clinic', 'esthetician']
+    }
+    
+    # Keys _extract_provider_data reads that text search already returns
+    SEARCH_FIELDS = ('name', 'place_id', 'geometry', 'rating', 'user_ratings_total')
+    
+    # Keys text search never returns, mapped to their Place Details field mask names
+    # (Basic + Contact SKUs only; rating data comes free with the search result)
+    DETAIL_FIELDS = {
+        'address_components': 'address_component',
+        'formatted_phone_number': 'formatted_phone_number',
+        'website': 'website',
+    }
+    
+    QUERY_TEMPLATE = '{query} in {location}'
+    
+    # Google needs a moment before a next_page_token becomes valid
+    PAGE_TOKEN_DELAY = 2
+    
     def __init__(self, api_key: str):
-        self.client = googlemaps.Client(key=api_key)
+        # Shares the pooled session; pacing comes from the 'places' token bucket
+        self.client = CachedPlacesClient(
+            googlemaps.Client(key=api_key, requests_session=get_http().session)
+        )
+        # Market fallbacks for address parts Places leaves out (e.g. no postal code)
+        self.address_defaults: Dict[str, str] = {}
     
     def find_providers(self, location: str, provider_type: str, max_results: int = 50) -> List[Dict]:
         """
@@ -177,83 +271,160 @@ class GoogleMapsDiscovery:
         Returns:
             List of provider dictionaries with basic info
         """
-        print(f"🔍 Searching Google Maps for {provider_type} providers in {location}...")
+        providers = list(self.iter_providers(location, provider_type, max_results))
+        print(f"✅ Found {len(providers)} providers from Google Maps")
+        return providers
+    
+    def iter_providers(self, location: str, provider_type: str, max_results: int = 50,
+                       max_pages: int = None, queries: List[str] = None,
+                       query_template: str = None) -> Iterator[Dict]:
+        """
+        Yield providers as they are discovered so later stages can start early
         
-        # Map provider types to Google Places search queries
-        query_map = {
-            'medical': ['doctor', 'medical clinic', 'primary care', 'family medicine'],
-            'dental': ['dentist', 'dental clinic', 'orthodontist'],
-            'cosmetic': ['medical spa', 'cosmetic surgery', 'aesthetic clinic'],
-            'fitness': ['personal trainer', 'gym', 'fitness center'],
-            'massage': ['massage therapy', 'spa', 'massage clinic'],
-            'mental_health': ['therapist', 'psychologist', 'counseling'],
-            'skincare': ['dermatology', 'skin clinic', 'esthetician']
-        }
+        Args:
+            queries: Search terms (default QUERY_MAP for the provider type)
+            query_template: Text search format with {query} and {location}
+        """
+        print(f"🔍 Searching Google Maps for {provider_type} providers in {location}...")
         
-        queries = query_map.get(provider_type, [provider_type])
-        providers = []
+        queries = queries or self.QUERY_MAP.get(provider_type, [provider_type])
+        query_template = query_template or self.QUERY_TEMPLATE
+        found = 0
         seen_place_ids = set()
         
         for query in queries:
-            search_query = f"{query} in {location}"
+            search_query = query_template.format(query=query, location=location)
             
             try:
-                # Text search
-                results = self.client.places(query=search_query)
-                
-                for place in results.get('results', [])[:max_results]:
+                for place in self.iter_text_search(search_query, max_pages):
                     place_id = place['place_id']
                     
                     if place_id in seen_place_ids:
                         continue
                     seen_place_ids.add(place_id)
                     
-                    # Get detailed place info
-                    details = self.client.place(place_id)['result']
-                    
-                    provider = self._extract_provider_data(details, provider_type)
+                    provider = self.place_to_provider(place, provider_type)
                     if provider:
-                        providers.append(provider)
+                        found += 1
+                        yield provider
                     
-                    if len(providers) >= max_results:
-                        break
+                    if found >= max_results:
+                        return
                 
             except Exception as e:
                 print(f"⚠️  Error searching for {query}: {e}")
                 continue
+    
+    def iter_text_search(self, query: str, max_pages: int = None) -> Iterator[Dict]:
+        """Yield text search results, following next_page_token up to max_pages pages"""
+        max_pages = max_pages or Config.PLACES_MAX_PAGES
+        response = self.client.places(query=query)
+        
+        for page in range(1, max_pages + 1):
+            yield from response.get('results', [])
             
-            if len(providers) >= max_results:
+            token = response.get('next_page_token')
+            if not token or page == max_pages:
+                return
+            response = self._next_page(self.client.places, 'textsearch', page_token=token)
+    
+    def iter_sweep_providers(self, boxes: List[BoundingBox], provider_type: str, max_results: int = 50,
+                             cell_km: float = None, queries: List[str] = None) -> Iterator[Dict]:
+        """Yield providers from a tiled Nearby Search sweep of the given areas"""
+        cell_km = cell_km or Config.SWEEP_CELL_KM
+        print(f"🗺️  Sweeping {len(boxes)} area(s) for {provider_type} providers ({cell_km} km cells)...")
+        
+        found = 0
+        seen_place_ids = set()
+        
+        for keyword in queries or self.QUERY_MAP.get(provider_type, [provider_type]):
+            grid = GridSweep(lambda center, radius: self.nearby_search(center, radius, keyword),
+                             result_cap=nearby_result_cap(Config.PLACES_MAX_PAGES))
+            
+            try:
+                for place in grid.sweep(boxes, cell_km):
+                    if place['place_id'] in seen_place_ids:
+                        continue
+                    seen_place_ids.add(place['place_id'])
+                    
+                    provider = self.place_to_provider(place, provider_type)
+                    if provider:
+                        found += 1
+                        yield provider
+                    
+                    if found >= max_results:
+                        return
+            except Exception as e:
+                print(f"⚠️  Error sweeping for {keyword}: {e}")
+            finally:
+                print(f"   {keyword}: {grid.stats['cells_searched']} cells, "
+                      f"{grid.stats['cells_split']} split, {grid.stats['places']} places")
+    
+    def nearby_search(self, center, radius: float, keyword: str, max_pages: int = None) -> List[Dict]:
+        """All Nearby Search results for one circle, following next_page_token"""
+        max_pages = max_pages or Config.PLACES_MAX_PAGES
+        response = self.client.places_nearby(location=center, radius=int(radius), keyword=keyword)
+        results = []
+        
+        for page in range(1, max_pages + 1):
+            results.extend(response.get('results', []))
+            
+            token = response.get('next_page_token')
+            if not token or page == max_pages:
                 break
+            response = self._next_page(self.client.places_nearby, 'nearbysearch', page_token=token)
         
-        print(f"✅ Found {len(providers)} providers from Google Maps")
-        return providers
+        return results
+    
+    def zip_bounds(self, zip_code: str) -> Optional[BoundingBox]:
+        """Bounding box of a US ZIP code: offline gazetteer first, then the Geocoding API"""
+        gazetteer = get_gazetteer()
+        box = gazetteer.bounds(zip_code) if gazetteer else None
+        if box:
+            return box
+        
+        results = self.client.geocode(components={'postal_code': zip_code, 'country': 'US'})
+        if not results:
+            print(f"⚠️  Could not geocode ZIP {zip_code}")
+            return None
+        geometry = results[0]['geometry']
+        return BoundingBox.from_viewport(geometry.get('bounds') or geometry['viewport'])
+    
+    def _next_page(self, search, endpoint: str, **params) -> Dict:
+        if self.client.has(endpoint, params):
+            return search(**params)
+        
+        # A fresh token can still answer INVALID_REQUEST for a few seconds;
+        # a token replayed from an old cached page never becomes valid
+        for attempt in range(3):
+            time.sleep(self.PAGE_TOKEN_DELAY)
+            try:
+                return search(**params)
+            except googlemaps.exceptions.ApiError as e:
+                if e.status != 'INVALID_REQUEST':
+                    raise
+        
+        print(f"⚠️  Stopped paging: next_page_token was not accepted")
+        return {}
+    
+    def place_to_provider(self, place: Dict, provider_type: str) -> Optional[Dict]:
+        """Build a provider from a search result, fetching only the details it lacks"""
+        if place.get('business_status') == 'CLOSED_PERMANENTLY':
+            return None
+        
+        missing = [mask for key, mask in self.DETAIL_FIELDS.items() if key not in place]
+        if missing:
+            details = self.client.place(place['place_id'], fields=missing)['result']
+            place = {**place, **details}
+        
+        return self._extract_provider_data(place, provider_type)
     
     def _extract_provider_data(self, place_details: Dict, provider_type: str) -> Optional[Dict]:
         """Extract relevant data from Google Places API response"""
         try:
-            address_components = place_details.get('address_components', [])
-            
-            # Parse address
-            street_number = ''
-            street_name = ''
-            city = ''
-            state = ''
-            zip_code = ''
-            
-            for component in address_components:
-                types = component['types']
-                if 'street_number' in types:
-                    street_number = component['long_name']
-                elif 'route' in types:
-                    street_name = component['long_name']
-                elif 'locality' in types:
-                    city = component['long_name']
-                elif 'administrative_area_level_1' in types:
-                    state = component['short_name']
-                elif 'postal_code' in types:
-                    zip_code = component['long_name']
-            
-            street_address = f"{street_number} {street_name}".strip()
+            address = normalize_place(place_details, self.address_defaults)
+            street_address = address['street_address']
+            city, state, zip_code = address['city'], address['state'], address['zip_code']
             
             if not all([street_address, city, state, zip_code]):
                 return None
@@ -265,6 +436,7 @@ class GoogleMapsDiscovery:
                 'city': city,
                 'state': state,
                 'zip_code': zip_code,
+                'address_key': address['key'],
                 'website': place_details.get('website'),
                 'latitude': place_details['geometry']['location']['lat'],
                 'longitude': place_details['geometry']['location']['lng'],
@@ -288,130 +460,108 @@ class GoogleMapsDiscovery:
 
 class ProviderEnricher:
     def __init__(self, openai_api_key: str):
-        self.openai_client = OpenAI(api_key=openai_api_key)
-        self.driver = None
-    
-    def _init_browser(self):
-        """Initialize headless Chrome browser"""
-        if self.driver:
-            return
-        
-        options = Options()
-        options.add_argument('--headless')
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
-        options.add_argument(f'user-agent={Config.SCRAPER_USER_AGENT}')
-        
-        self.driver = webdriver.Chrome(options=options)
+        self.openai_client = OpenAI(api_key=openai_api_key, base_url=Config.OPENAI_BASE_URL or None)
+        self.llm_cache = get_llm_cache()
+        # HTTP first; a shared pool of headless browsers for JS-rendered sites
+        self.fetcher = TieredFetcher(
+            Config.SCRAPER_USER_AGENT,
+            timeout=Config.SCRAPER_TIMEOUT,
+            browser_pool_size=Config.BROWSER_POOL_SIZE
+        )
+        # Follows services/pricing/insurance/about links and packs the best text
+        self.crawler = SiteCrawler(
+            self._scrape_website,
+            max_pages=Config.CRAWL_MAX_PAGES,
+            token_budget=Config.EXTRACTION_TOKEN_BUDGET
+        )
     
     def enrich_provider(self, provider: Dict) -> Dict:
         """
         Enrich provider data by scraping their website
         Uses AI to extract services, pricing, and other info
         """
+        return self.extract(provider, self.scrape(provider))
+    
+    def scrape(self, provider: Dict, before_fetch=None) -> Optional[str]:
+        """Pipeline scrape stage: crawl the provider website into budget-packed text"""
+        if not provider.get('website'):
+            return None
+        
+        print(f"🌐 Enriching: {provider['practice_name']}...")
+        return self.crawler.crawl(provider['website'], before_fetch=before_fetch)
+    
+    def extract(self, provider: Dict, site_text: Optional[str]) -> Dict:
+        """Pipeline extract stage: merge AI-extracted data and score confidence"""
+        extracted_data = None
+        if provider.get('website') and site_text:
+            try:
+                extracted_data = self._extract_with_ai(site_text, provider)
+            except Exception as e:
+                print(f"⚠️  Error enriching {provider['practice_name']}: {e}")
+        
+        return self.apply_extraction(provider, bool(site_text), extracted_data)
+    
+    def apply_extraction(self, provider: Dict, had_site_text: bool, extracted_data: Optional[Dict]) -> Dict:
+        """Merge an extraction result (live or from a batch) and score confidence"""
         if not provider.get('website'):
             provider['confidence_score'] = 60  # Low confidence without website
             return provider
         
-        print(f"🌐 Enriching: {provider['practice_name']}...")
+        if not had_site_text:
+            provider['confidence_score'] = 65
+            return provider
         
-        try:
-            # Scrape website
-            html_content = self._scrape_website(provider['website'])
-            
-            if not html_content:
-                provider['confidence_score'] = 65
-                return provider
-            
-            # Extract data with AI
-            extracted_data = self._extract_with_ai(html_content, provider)
-            
-            # Merge extracted data
-            provider.update(extracted_data)
-            
-            # Calculate confidence score
-            provider['confidence_score'] = self._calculate_confidence(provider)
-            
-            print(f"✅ Enriched with confidence: {provider['confidence_score']}%")
-            
-        except Exception as e:
-            print(f"⚠️  Error enriching {provider['practice_name']}: {e}")
+        if extracted_data is None:
             provider['confidence_score'] = 70
+            return provider
+        
+        # Merge extracted data
+        provider.update(extracted_data)
+        
+        # Calculate confidence score
+        provider['confidence_score'] = self._calculate_confidence(provider)
         
+        print(f"✅ Enriched {provider['practice_name']} with confidence: {provider['confidence_score']}%")
         return provider
     
     def _scrape_website(self, url: str) -> Optional[str]:
         """Scrape website HTML content"""
         try:
-            self._init_browser()
-            self.driver.get(url)
-            
-            # Wait for page to load
-            WebDriverWait(self.driver, Config.SCRAPER_TIMEOUT).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
-            
-            time.sleep(2)  # Let JavaScript render
-            
-            html_content = self.driver.page_source
-            return html_content
-            
+            return self.fetcher.fetch(url)
         except Exception as e:
             print(f"⚠️  Scraping failed for {url}: {e}")
             return None
     
-    def _extract_with_ai(self, html: str, provider: Dict) -> Dict:
-        """Use GPT-4 to extract structured data from HTML"""
-        # Clean HTML
-        soup = BeautifulSoup(html, 'html.parser')
-        text_content = soup.get_text(separator='\n', strip=True)
-        
-        # Truncate to fit in context (roughly 4000 tokens)
-        text_content = text_content[:15000]
-        
-        prompt = f"""
-Extract information about this healthcare provider from their website content.
-
-Provider Name: {provider['practice_name']}
-Location: {provider['city']}, {provider['state']}
-
-Website Content:
-{text_content}
-
-Please extract and return ONLY valid JSON with this exact structure:
-{{
-  "services": [
-    {{"name": "Service Name", "category": "preventive|acute|cosmetic|etc", "duration_minutes": 30, "price_cents": 15000}}
-  ],
-  "bio": "Brief practice description",
-  "specialties": ["specialty1", "specialty2"],
-  "insurance_accepted": ["insurance1", "insurance2"],
-  "years_experience": 10
-}}
-
-Rules:
-- Only include information explicitly stated on the website
-- Price should be in cents (e.g., $150 = 15000)
-- If something is not found, omit that field
-- Return valid JSON only, no other text
-"""
+    def _extract_with_ai(self, text_content: str, provider: Dict) -> Dict:
+        """Use GPT-4 to extract structured data from crawled website text"""
+        messages = build_extraction_messages(text_content, provider)
         
-        try:
-            response = self.openai_client.chat.completions.create(
-                model=Config.OPENAI_MODEL,
-                messages=[
-                    {"role": "system", "content": "You are a data extraction assistant. Always return valid JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1
+        def call_openai() -> Dict:
+            # Strict JSON-schema structured output: the reply always parses
+            response = get_http().call(
+                'openai', 'chat.completions',
+                # Retries and pacing come from the shared client's 'openai' bucket
+                lambda: self.openai_client.with_options(max_retries=0).chat.completions.create(
+                    model=Config.OPENAI_MODEL,
+                    messages=messages,
+                    temperature=0.1,
+                    response_format=RESPONSE_FORMAT
+                ),
+                retry_on=(openai.APIConnectionError,)
             )
             
-            extracted_text = response.choices[0].message.content
-            
-            # Parse JSON
-            extracted_data = json.loads(extracted_text)
+            get_metrics().add_usage(response.model or Config.OPENAI_MODEL, response.usage)
+            message = response.choices[0].message
+            if getattr(message, 'refusal', None):
+                raise ValueError(f"Model refused: {message.refusal}")
             
-            return extracted_data
+            return parse_extraction(message.content)
+        
+        try:
+            # Unchanged site text + prompt replays from disk at zero token cost
+            return self.llm_cache.get_or_call(
+                Config.OPENAI_MODEL, EXTRACTION_PROMPT_VERSION, json.dumps(messages), call_openai
+            )
             
         except Exception as e:
             print(f"⚠️  AI extraction failed: {e}")
@@ -449,9 +599,8 @@ Rules:
         return min(score, 100)
     
     def close(self):
-        """Close browser"""
-        if self.driver:
-            self.driver.quit()
+        """Close pooled browsers and HTTP connections"""
+        self.fetcher.close()
 
 
 # ========================================
@@ -459,14 +608,18 @@ Rules:
 # ========================================
 
 class ProviderAgent:
-    def __init__(self):
+    def __init__(self, enrich: bool = True, metrics_file: str = None):
         self.api_client = APIClient(
             Config.API_BASE_URL,
             Config.API_ADMIN_EMAIL,
             Config.API_ADMIN_PASSWORD
         )
+        self.bulk = self.api_client.bulk_client(on_result=self._record_upload)
         self.maps_discovery = GoogleMapsDiscovery(Config.GOOGLE_MAPS_API_KEY)
-        self.enricher = None
+        self.enricher = ProviderEnricher(Config.OPENAI_API_KEY) if enrich else None
+        
+        # Per-host politeness delay replaces the old global sleep per provider
+        self.rate_limiter = HostRateLimiter(Config.SCRAPER_RATE_LIMIT)
         
         self.results = {
             'providers_found': 0,
@@ -476,19 +629,68 @@ class ProviderAgent:
             'profiles_created': [],
             'errors': []
         }
+        self._results_lock = threading.Lock()
+        
+        self.duplicate_index: Optional[DuplicateIndex] = None
+        self.journal: Optional[RunJournal] = None
+        self.agent_run_id = None
+        self._max_profiles = 0
+        self._budget_usd = None
+        self._last_sync = 0.0
+        
+        self.metrics = get_metrics()
+        self.metrics_file = metrics_file or Config.METRICS_TEXTFILE
     
-    def run(self, city: str, state: str, provider_type: str, max_profiles: int = None):
+    def run(self, city: str, state: str, provider_type: str, max_profiles: int = None,
+            sweep_areas: List[BoundingBox] = None, cell_km: float = None,
+            batch_extract: bool = False, journal: RunJournal = None, queries: List[str] = None,
+            location: str = None, query_template: str = None, budget_usd: float = None,
+            address_defaults: Dict[str, str] = None):
         """
         Main agent execution
         
+        Runs discover → dedupe → scrape → extract → upload as a staged
+        pipeline with bounded queues and a worker pool per stage.
+        
         Args:
             city: City name
             state: State abbreviation (e.g., 'MT')
             provider_type: 'medical', 'dental', etc.
             max_profiles: Maximum profiles to create (default from config)
+            sweep_areas: Bounding boxes to tile with Nearby Search instead of
+                         a "<type> in <city>" text search
+            cell_km: Initial sweep cell size (default from config)
+            batch_extract: Collect crawled sites into an OpenAI Batch API job
+                           instead of extracting and uploading now
+            journal: Existing run journal to resume (see resume())
+            queries: Search terms instead of the provider type's defaults
+            location: Text search location (default "<city>, <state>")
+            query_template: Text search format with {query} and {location}
+            budget_usd: Stop discovering once the estimated API spend reaches this
+            address_defaults: city / state / zip_code for places Google returns
+                              without them
         """
         max_profiles = max_profiles or Config.MAX_PROFILES_PER_RUN
-        location = f"{city}, {state}"
+        location = location or f"{city}, {state}"
+        
+        self._max_profiles = max_profiles
+        self._budget_usd = budget_usd
+        self.maps_discovery.address_defaults = address_defaults or {}
+        self.journal = journal or RunJournal.create({
+            'city': city,
+            'state': state,
+            'provider_type': provider_type,
+            'max_profiles': max_profiles,
+            'sweep_areas': [list(box) for box in sweep_areas or []],
+            'cell_km': cell_km,
+            'batch_extract': batch_extract,
+            'enrich': self.enricher is not None,
+            'queries': queries,
+            'location': location,
+            'query_template': query_template,
+            'budget_usd': budget_usd,
+            'address_defaults': address_defaults
+        })
         
         print(f"\n{'='*60}")
         print(f"🤖 CARROTLY PROVIDER AI AGENT")
@@ -496,99 +698,457 @@ class ProviderAgent:
         print(f"📍 Location: {location}")
         print(f"🏥 Category: {provider_type}")
         print(f"🎯 Max Profiles: {max_profiles}")
+        if budget_usd:
+            print(f"💵 Budget: ${budget_usd:.2f}")
+        print(f"🧾 Run ID: {self.journal.run_id} (resume with --resume {self.journal.run_id})")
         print(f"{'='*60}\n")
         
+        if journal:
+            self._restore_results()
+            self.journal.report()
+        
         start_time = time.time()
+        self._start_agent_run(city, state, provider_type, max_profiles)
+        self._load_duplicate_index()
+        
+        stages = [
+            Stage('dedupe', self._journaled('dedupe', self._dedupe_stage), Config.PIPELINE_DEDUPE_WORKERS),
+            Stage('scrape', self._journaled('scrape', self._scrape_stage), Config.PIPELINE_SCRAPE_WORKERS),
+        ]
+        
+        batch_job = None
+        if batch_extract and self.enricher:
+            batch_job = BatchJob.create(Config.EXPORT_DIRECTORY, {
+                'city': city,
+                'state': state,
+                'provider_type': provider_type,
+                'model': Config.OPENAI_MODEL,
+                'prompt_version': EXTRACTION_PROMPT_VERSION
+            })
+            stages.append(Stage('collect', lambda scraped: self._collect_stage(scraped, batch_job), 1))
+        else:
+            stages += [
+                Stage('extract', self._journaled('extract', self._extract_stage), Config.PIPELINE_EXTRACT_WORKERS),
+                Stage('upload', lambda provider: self._upload_stage(provider, provider_type),
+                      Config.PIPELINE_UPLOAD_WORKERS),
+            ]
+        
+        pipeline = Pipeline(stages, queue_size=Config.PIPELINE_QUEUE_SIZE, on_error=self._record_stage_error,
+                            metrics=self.metrics)
         
         try:
-            # Step 1: Discover providers via Google Maps
-            providers = self.maps_discovery.find_providers(location, provider_type, max_profiles * 2)
-            self.results['providers_found'] = len(providers)
-            
-            # Step 2: Check for duplicates and enrich data
-            for i, provider in enumerate(providers[:max_profiles], 1):
-                print(f"\n[{i}/{min(len(providers), max_profiles)}] Processing: {provider['practice_name']}")
-                
-                # Check duplicate
-                duplicate_check = self.api_client.check_duplicate(
-                    provider['practice_name'],
-                    provider['street_address'],
-                    provider['zip_code'],
-                    provider.get('phone')
+            # Step 1: Discover providers via Google Maps (streams into the pipeline)
+            if sweep_areas:
+                discovered = self.maps_discovery.iter_sweep_providers(
+                    sweep_areas, provider_type, max_profiles * 2, cell_km, queries
                 )
-                
-                if duplicate_check['is_duplicate']:
-                    if duplicate_check['match_type'] == 'exact':
-                        print(f"⏭️  Skipped: Exact duplicate found")
-                        self.results['exact_duplicates'].append({
-                            'name': provider['practice_name'],
-                            'reason': 'Exact match in database'
-                        })
-                        continue
-                    else:
-                        print(f"⚠️  Possible duplicate (flagged for review)")
-                        self.results['flagged_for_review'].append({
-                            'name': provider['practice_name'],
-                            'match_type': duplicate_check['match_type'],
-                            'confidence': duplicate_check['confidence']
-                        })
-                
-                # Enrich data
-                  if self.enricher:
-                   if self.enricher:
-                    try:
-                    enriched_provider = self.enricher.enrich_provider(provider)
-                    except AttributeError:
-                        enriched_provider = provider
-                else:
-                    enriched_provider = provider
-                  else:
-                   enriched_provider = provider  # Use basic Google Maps data
-                
-                # Check confidence threshold
-                if enriched_provider['confidence_score'] < Config.MIN_CONFIDENCE_SCORE:
-                    print(f"⚠️  Low confidence ({enriched_provider['confidence_score']}%), flagged for review")
-                    enriched_provider['needs_review'] = True
-                
-                # Create provider profile
-                try:
-                    provider_data = self._format_for_api(enriched_provider, provider_type)
-                    created_provider = self.api_client.create_provider(provider_data)
-                    
-                    self.results['profiles_created'].append({
-                        'id': created_provider['id'],
-                        'name': created_provider['practice_name'],
-                        'confidence': enriched_provider['confidence_score']
-                    })
-                    
-                    print(f"✅ Created profile ID: {created_provider['id']}")
-                    
-                except Exception as e:
-                    print(f"❌ Failed to create profile: {e}")
-                    self.results['errors'].append({
-                        'provider': provider['practice_name'],
-                        'error': str(e)
-                    })
-                
-                # Rate limiting
-                time.sleep(Config.SCRAPER_RATE_LIMIT)
+            else:
+                discovered = self.maps_discovery.iter_providers(
+                    location, provider_type, max_profiles * 2, queries=queries, query_template=query_template
+                )
+            
+            # Step 2: Dedupe, enrich and upload concurrently
+            pipeline.run(self._count_found(self._discover(discovered, max_profiles)))
+            self.bulk.flush()
+            
+            if batch_job:
+                batch_id = batch_job.submit(self.enricher.openai_client)
+                for line in summarize_batch(batch_job):
+                    print(line)
+                if batch_id:
+                    print(f"▶️  Resume when finished: python agent.py --resume-batch {batch_job.directory}")
             
             # Step 3: Summary
             duration = time.time() - start_time
+            self.journal.set_status('completed')
+            self._sync_agent_run('completed', duration, final=True)
             self._print_summary(duration)
             
             # Step 4: Export results
             self._export_results(city, state, provider_type)
-            
+        
+        except KeyboardInterrupt:
+            self._abort_run('cancelled', 'Interrupted', time.time() - start_time)
+            raise
+        except Exception as e:
+            self._abort_run('failed', str(e), time.time() - start_time)
+            raise
         finally:
-         if self.enricher:            
-             if self.enricher:
             if self.enricher:
+                self.enricher.close()
+            self.journal.close()
+    
+    def resume(self, run_id: str):
+        """Continue a crashed or interrupted run, skipping every stage already journaled"""
+        journal = RunJournal.resume(run_id)
+        params = journal.params
+        print(f"\n♻️  Resuming run {run_id}")
+        
+        self.run(
+            params['city'], params['state'], params['provider_type'], params['max_profiles'],
+            [BoundingBox(*box) for box in params.get('sweep_areas') or []],
+            params.get('cell_km'), params.get('batch_extract', False),
+            journal=journal,
+            queries=params.get('queries'),
+            location=params.get('location'),
+            query_template=params.get('query_template'),
+            budget_usd=params.get('budget_usd'),
+            address_defaults=params.get('address_defaults')
+        )
+    
+    def _abort_run(self, status: str, message: str, duration: float):
+        try:
+            self.bulk.flush()
+        except Exception:
+            pass
+        self.journal.set_status(status, error_message=message)
+        self._sync_agent_run(status, duration, final=True, error_message=message)
+        print(f"\n🛑 Run {status}: resume with python agent.py --resume {self.journal.run_id}")
+        self.journal.report()
+        params = self.journal.params
+        self._write_metrics_file(params['city'], params['state'], params['provider_type'])
+    
+    def resume_batch(self, job_dir: str):
+        """Wait for a submitted extraction batch, merge results and upload the providers"""
+        job = BatchJob(job_dir)
+        meta = job.load_meta()
+        provider_type = meta['provider_type']
+        
+        print(f"\n📦 Resuming batch job {job_dir}")
+        start_time = time.time()
+        
+        try:
+            if meta.get('status') == 'uploaded':
+                # Uploading again would repeat every PATCH and skew the run totals
+                print(f"✅ Batch job already uploaded at {meta.get('uploaded_at')}; nothing to do")
+                return
+            
+            client = self.enricher.openai_client
+            batch = job.wait(client, poll_interval=Config.BATCH_POLL_SECONDS)
+            if batch is not None and batch.status != 'completed':
+                print(f"⚠️  Batch ended as {batch.status}; providers without results get base confidence")
+            
+            results = job.download(client)
+            cached = job.cache_results(self.enricher.llm_cache, results)
+            print(f"🧠 Cached {cached} batch extraction(s) for later runs")
+            merged = (
+                self.enricher.apply_extraction(provider, had_text, extraction)
+                for provider, had_text, extraction in job.merged(results)
+            )
+            
+            pipeline = Pipeline(
+                [Stage('upload', lambda provider: self._upload_stage(provider, provider_type),
+                       Config.PIPELINE_UPLOAD_WORKERS)],
+                queue_size=Config.PIPELINE_QUEUE_SIZE,
+                on_error=self._record_stage_error,
+                metrics=self.metrics
+            )
+            pipeline.run(self._count_found(merged))
+            self.bulk.flush()
+            job.update_meta(status='uploaded', uploaded_at=datetime.now().isoformat())
+            
+            self._print_summary(time.time() - start_time)
+            self._export_results(meta['city'], meta['state'], provider_type)
+            
+        finally:
             self.enricher.close()
     
+    def refresh(self, max_age_days: float = None, max_providers: int = None, photos: bool = True,
+                dry_run: bool = False):
+        """
+        Incremental refresh of agent-sourced providers (see refresh.py)
+        
+        Args:
+            max_age_days: Re-check providers not refreshed for this long
+            max_providers: Stop after this many (stalest first)
+            photos: Re-fetch photos for providers whose Places photos changed
+            dry_run: Print the diffs instead of PATCHing them
+        """
+        max_age_days = REFRESH_MAX_AGE_DAYS if max_age_days is None else max_age_days
+        photo_pipeline = None
+        if photos and not dry_run:
+            photo_pipeline = PhotoPipeline(Config.GOOGLE_MAPS_API_KEY, Config.API_BASE_URL,
+                                           self.api_client.token, http=get_http())
+        refresher = ProviderRefresher(
+            self.api_client, self.maps_discovery.client, self.enricher, self.rate_limiter,
+            photos=photo_pipeline, dry_run=dry_run
+        )
+        
+        print(f"\n{'='*60}")
+        print(f"🔄 CARROTLY PROVIDER REFRESH{' (dry run)' if dry_run else ''}")
+        print(f"{'='*60}")
+        start_time = time.time()
+        
+        try:
+            stats = refresher.run(max_age_days, max_providers)
+            
+            print(f"\n{'='*60}")
+            print(f"📊 REFRESH SUMMARY")
+            print(f"{'='*60}")
+            print(f"⏱️  Duration: {time.time() - start_time:.1f} seconds")
+            refresher.report()
+            if photo_pipeline:
+                photo_pipeline.report()
+            self.metrics.report(stats['checked'])
+            get_http().report()
+            print(f"{'='*60}\n")
+            
+            os.makedirs(Config.EXPORT_DIRECTORY, exist_ok=True)
+            filepath = os.path.join(Config.EXPORT_DIRECTORY,
+                                    f"refresh_run_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+            with open(filepath, 'w') as f:
+                json.dump({
+                    'timestamp': datetime.now().isoformat(),
+                    'max_age_days': max_age_days,
+                    'dry_run': dry_run,
+                    'place_fields': refresher.fields,
+                    'stats': stats,
+                    'changed_fields': refresher.changed_fields,
+                    'patch': refresher.patches.stats,
+                    'metrics': self.metrics.snapshot(stats['checked'], http=get_http().stats())
+                }, f, indent=2)
+            print(f"📁 Results exported to: {filepath}")
+        finally:
+            if photo_pipeline:
+                photo_pipeline.close()
+            if self.enricher:
+                self.enricher.close()
+    
+    @staticmethod
+    def _place_key(item: Dict) -> str:
+        provider = item['provider'] if isinstance(item.get('provider'), dict) else item
+        return provider_key(provider)
+    
+    def _journaled(self, stage: str, handler):
+        """Wrap a stage handler so finished places replay their journaled output"""
+        def run(item):
+            key = self._place_key(item)
+            done, payload = self.journal.get(key, stage)
+            if done:
+                return payload
+            result = handler(item)
+            self.journal.record(key, stage, result)
+            return result
+        return run
+    
+    def _discover(self, discovered: Iterator[Dict], max_profiles: int) -> Iterator[Dict]:
+        """Replay journaled places first, then continue discovery where it stopped"""
+        seen = set()
+        for key, provider in self.journal.iter_stage('discover'):
+            seen.add(key)
+            yield provider
+        
+        if self.journal.meta.get('discovery_complete'):
+            return
+        
+        for provider in discovered:
+            if len(seen) >= max_profiles:
+                break
+            if self._budget_usd and self.metrics.cost_usd() >= self._budget_usd:
+                # Not marked complete, so a resume with a raised budget carries on
+                print(f"💵 Budget of ${self._budget_usd:.2f} reached; stopping discovery")
+                return
+            key = provider_key(provider)
+            if key in seen:
+                continue
+            seen.add(key)
+            self.journal.record(key, 'discover', provider)
+            yield provider
+        
+        self.journal.set_status('running', discovery_complete=True)
+    
+    def _restore_results(self):
+        # Errors are dropped: the stages that failed run again on resume
+        self.journal.clear_events('errors')
+        for kind, entries in self.journal.events().items():
+            self.results.setdefault(kind, []).extend(entries)
+    
+    def _start_agent_run(self, city: str, state: str, provider_type: str, max_profiles: int):
+        self.agent_run_id = self.journal.meta.get('agent_run_id')
+        if self.agent_run_id:
+            self._sync_agent_run('running')
+            return
+        try:
+            self.agent_run_id = self.api_client.create_agent_run({
+                'search_city': city,
+                'search_state': state,
+                'categories': [provider_type],
+                'max_profiles': max_profiles
+            })
+            self.journal.set_status('running', agent_run_id=self.agent_run_id)
+        except Exception as e:
+            print(f"⚠️  Agent run tracking unavailable ({e}); progress is kept in the local journal only")
+    
+    def _sync_agent_run(self, status: str = 'running', duration: float = None,
+                        final: bool = False, error_message: str = None):
+        """Push counters to agent_runs (throttled unless final)"""
+        if not self.agent_run_id:
+            return
+        now = time.time()
+        if not final and now - self._last_sync < Config.AGENT_RUN_SYNC_SECONDS:
+            return
+        self._last_sync = now
+        
+        with self._results_lock:
+            results = {key: list(value) if isinstance(value, list) else value
+                       for key, value in self.results.items()}
+        progress = self.journal.progress()
+        done = progress['upload'] + len(results['exact_duplicates'])
+        
+        updates = {
+            'status': status,
+            'providers_found': progress['discover'],
+            'exact_duplicates': len(results['exact_duplicates']),
+            'fuzzy_duplicates': len(results['fuzzy_duplicates']),
+            'similar_flagged': len(results['flagged_for_review']),
+            'profiles_created': len(results['profiles_created']),
+            'low_confidence_count': sum(1 for p in results['profiles_created']
+                                        if p['confidence'] < Config.MIN_CONFIDENCE_SCORE),
+            'websites_scraped': progress['scrape'],
+            'progress_percentage': min(100, done * 100 // max(self._max_profiles, 1))
+        }
+        metrics = self._metrics_snapshot()
+        updates['api_calls_made'] = metrics['api_calls']
+        if final:
+            updates.update({
+                'estimated_cost_usd': metrics['cost_usd']['total'],
+                'metrics': metrics,
+                'skipped_providers': results['exact_duplicates'],
+                'flagged_providers': results['flagged_for_review'],
+                'created_providers': results['profiles_created'],
+                'duration_seconds': int(duration or 0),
+                'completed_at': datetime.now().isoformat()
+            })
+            if status == 'completed':
+                updates['progress_percentage'] = 100
+        if error_message:
+            updates['error_message'] = error_message
+        
+        try:
+            self.api_client.update_agent_run(self.agent_run_id, updates)
+        except Exception as e:
+            print(f"⚠️  Could not update agent run {self.agent_run_id}: {e}")
+    
+    def _count_found(self, providers: Iterator[Dict]) -> Iterator[Dict]:
+        for provider in providers:
+            self.results['providers_found'] += 1
+            yield provider
+    
+    def _record(self, key: str, entry: Dict):
+        with self._results_lock:
+            self.results[key].append(entry)
+        if self.journal:
+            self.journal.add_event(key, entry)
+    
+    def _record_stage_error(self, stage: str, provider: Optional[Dict], error: Exception):
+        name = provider.get('practice_name') if isinstance(provider, dict) else None
+        print(f"❌ {stage} failed{f' for {name}' if name else ''}: {error}")
+        self._record('errors', {
+            'provider': name,
+            'stage': stage,
+            'error': str(error)
+        })
+    
+    def _load_duplicate_index(self):
+        """Snapshot existing providers once; dedupe is then a local lookup"""
+        started = time.time()
+        self.duplicate_index = DuplicateIndex.from_providers(self.api_client.iter_provider_snapshot())
+        print(f"🗂️  Duplicate index: {len(self.duplicate_index)} existing providers "
+              f"({time.time() - started:.1f}s)")
+    
+    def _dedupe_stage(self, provider: Dict) -> Optional[Dict]:
+        print(f"\n🔎 Processing: {provider['practice_name']}")
+        
+        # Also indexes the candidate, so later ones in this run are checked against it
+        duplicate_check = self.duplicate_index.check_and_add(provider)
+        
+        if duplicate_check['is_duplicate']:
+            existing = duplicate_check['existing_provider']
+            
+            if duplicate_check['match_type'] == 'exact':
+                print(f"⏭️  Skipped: Exact duplicate found ({provider['practice_name']})")
+                self._record('exact_duplicates', {
+                    'name': provider['practice_name'],
+                    'reason': 'Exact match in database',
+                    'existing_id': existing['id']
+                })
+                return None
+            
+            # Near-duplicates are still created, but marked for a human to merge
+            provider['needs_review'] = True
+            provider['possible_duplicate_of'] = existing['id']
+            kind = 'fuzzy_duplicates' if duplicate_check['match_type'] in ('phone', 'fuzzy_high') else 'flagged_for_review'
+            
+            print(f"⚠️  Possible duplicate of {existing['practice_name']} "
+                  f"({duplicate_check['match_type']}, flagged for review): {provider['practice_name']}")
+            self._record(kind, {
+                'name': provider['practice_name'],
+                'match_type': duplicate_check['match_type'],
+                'similarity': duplicate_check['similarity'],
+                'existing_id': existing['id'],
+                'existing_name': existing['practice_name'],
+                'confidence': duplicate_check['confidence']
+            })
+        
+        return provider
+    
+    def _scrape_stage(self, provider: Dict) -> Dict:
+        site_text = None
+        if self.enricher and provider.get('website'):
+            self.rate_limiter.wait(provider['website'])
+            site_text = self.enricher.scrape(provider, before_fetch=self.rate_limiter.wait)
+        return {'provider': provider, 'text': site_text}
+    
+    def _collect_stage(self, scraped: Dict, batch_job: BatchJob) -> None:
+        batch_job.add(scraped['provider'], scraped['text'], Config.OPENAI_MODEL)
+        return None
+    
+    def _extract_stage(self, scraped: Dict) -> Dict:
+        provider = scraped['provider']
+        if self.enricher:
+            return self.enricher.extract(provider, scraped['text'])
+        
+        # Basic Google Maps data only
+        provider.setdefault('confidence_score', 60)
+        return provider
+    
+    def _upload_stage(self, enriched_provider: Dict, provider_type: str) -> Optional[Dict]:
+        # Check confidence threshold
+        if enriched_provider['confidence_score'] < Config.MIN_CONFIDENCE_SCORE:
+            print(f"⚠️  Low confidence ({enriched_provider['confidence_score']}%), flagged for review")
+            enriched_provider['needs_review'] = True
+        
+        if self.journal and self.journal.is_done(self._place_key(enriched_provider), 'upload'):
+            return enriched_provider
+        
+        # Queue for the next bulk upsert; results arrive via _record_upload
+        self.bulk.add(self._format_for_api(enriched_provider, provider_type), context=enriched_provider)
+        return enriched_provider
+    
+    def _record_upload(self, provider: Dict, result: Dict):
+        if result['status'] in ('created', 'updated'):
+            self._record('profiles_created', {
+                'id': result['id'],
+                'name': provider['practice_name'],
+                'status': result['status'],
+                'confidence': provider['confidence_score']
+            })
+            print(f"✅ {result['status'].capitalize()} profile ID: {result['id']} ({provider['practice_name']})")
+            if self.journal:
+                self.journal.record(self._place_key(provider), 'upload', result)
+                self._sync_agent_run()
+            return
+        
+        print(f"❌ Failed to create profile for {provider['practice_name']}: {result.get('error')}")
+        self._record('errors', {
+            'provider': provider['practice_name'],
+            'stage': 'upload',
+            'error': result.get('error', result['status'])
+        })
+    
     def _format_for_api(self, provider: Dict, provider_type: str) -> Dict:
         """Format enriched provider data for API"""
-        return {
+        payload = {
             'practiceName': provider['practice_name'],
             'email': provider.get('email', f"contact@{provider['practice_name'].lower().replace(' ', '')}.com"),
             'phone': provider['phone'],
@@ -599,8 +1159,18 @@ class ProviderAgent:
             'zipCode': provider['zip_code'],
             'website': provider.get('website'),
             'status': 'draft',
-            'source': 'agent'
+            'source': 'agent',
+            'googlePlaceId': provider.get('google_place_id'),
+            'latitude': provider.get('latitude'),
+            'longitude': provider.get('longitude')
         }
+        # Only carry what extraction found, so re-ingesting an existing
+        # provider keeps its stored services and insurance
+        if provider.get('services'):
+            payload['services'] = provider['services']
+        if provider.get('insurance_accepted'):
+            payload['insuranceAccepted'] = provider['insurance_accepted']
+        return payload
     
     def _print_summary(self, duration: float):
         """Print execution summary"""
@@ -613,6 +1183,11 @@ class ProviderAgent:
         print(f"⚠️  Flagged for Review: {len(self.results['flagged_for_review'])}")
         print(f"✅ New Profiles Created: {len(self.results['profiles_created'])}")
         print(f"❌ Errors: {len(self.results['errors'])}")
+        self.bulk.report()
+        if self.enricher:
+            self.enricher.llm_cache.report()
+        self.metrics.report(self.results['providers_found'])
+        get_http().report()
         print(f"{'='*60}\n")
     
     def _export_results(self, city: str, state: str, provider_type: str):
@@ -630,13 +1205,33 @@ class ProviderAgent:
                 'state': state,
                 'provider_type': provider_type
             },
-            'results': self.results
+            'run_id': self.journal.run_id if self.journal else None,
+            'results': self.results,
+            'bulk_ingest': self.bulk.stats,
+            'llm_cache': self.enricher.llm_cache.stats() if self.enricher else None,
+            'metrics': self._metrics_snapshot()
         }
         
         with open(filepath, 'w') as f:
             json.dump(export_data, f, indent=2)
         
         print(f"📁 Results exported to: {filepath}")
+        self._write_metrics_file(city, state, provider_type)
+    
+    def _metrics_snapshot(self) -> Dict:
+        """Stage latencies, API calls and cost so far, with HTTP endpoint stats"""
+        return self.metrics.snapshot(self.results['providers_found'], http=get_http().stats())
+    
+    def _write_metrics_file(self, city: str, state: str, provider_type: str):
+        if not self.metrics_file:
+            return
+        labels = {'city': city, 'state': state, 'provider_type': provider_type}
+        if self.journal:
+            labels['run_id'] = self.journal.run_id
+        try:
+            self.metrics.write_openmetrics(self.metrics_file, labels, http=get_http().stats())
+        except OSError as e:
+            print(f"⚠️  Could not write metrics file {self.metrics_file}: {e}")
 
 
 # ========================================
@@ -648,15 +1243,51 @@ def main():
     import argparse
     
     parser = argparse.ArgumentParser(description='Carrotly Provider AI Agent')
-    parser.add_argument('--city', required=True, help='City name (e.g., "Bozeman")')
-    parser.add_argument('--state', required=True, help='State abbreviation (e.g., "MT")')
-    parser.add_argument('--type', required=True, 
+    parser.add_argument('--city', help='City name (e.g., "Bozeman")')
+    parser.add_argument('--state', help='State abbreviation (e.g., "MT")')
+    parser.add_argument('--type', 
                        choices=['medical', 'dental', 'cosmetic', 'fitness', 'massage', 'mental_health', 'skincare'],
                        help='Provider type')
     parser.add_argument('--max', type=int, default=None, help='Maximum profiles to create')
+    parser.add_argument('--no-enrich', action='store_true', help='Skip website scraping and AI extraction')
+    parser.add_argument('--bbox', action='append', default=[],
+                       help='Sweep mode: area to tile as "south,west,north,east" (repeatable)')
+    parser.add_argument('--zips', default=None, help='Sweep mode: comma-separated ZIP codes to tile')
+    parser.add_argument('--cell-km', type=float, default=None, help='Sweep mode: initial grid cell size in km')
+    parser.add_argument('--batch-extract', action='store_true',
+                       help='Submit AI extraction through the OpenAI Batch API (overnight backfills)')
+    parser.add_argument('--resume-batch', metavar='JOB_DIR', default=None,
+                       help='Merge a finished extraction batch and upload its providers')
+    parser.add_argument('--resume', metavar='RUN_ID', default=None,
+                       help='Resume a crashed or interrupted run from its journal')
+    parser.add_argument('--metrics-file', metavar='PATH', default=None,
+                       help='Also write run metrics in OpenMetrics text format (e.g. for node_exporter)')
+    parser.add_argument('--refresh', action='store_true',
+                       help='Incremental refresh: re-check stale agent providers and PATCH what changed')
+    parser.add_argument('--max-age-days', type=float, default=None,
+                       help=f'Refresh mode: providers not refreshed for this long (default {REFRESH_MAX_AGE_DAYS:g})')
+    parser.add_argument('--no-photos', action='store_true', help='Refresh mode: leave photos alone')
+    parser.add_argument('--dry-run', action='store_true', help='Refresh mode: print diffs without PATCHing')
+    parser.add_argument('--record', metavar='DIR', default=None,
+                       help='Save Places, website and OpenAI responses as replay fixtures (see replay.py)')
     
     args = parser.parse_args()
     
+    if not (args.resume_batch or args.resume or args.refresh) and not (args.city and args.state and args.type):
+        parser.error('--city, --state and --type are required (unless resuming or refreshing)')
+    
+    if args.resume:
+        # Resume with the enrichment setting the run started with
+        try:
+            journal = RunJournal.resume(args.resume)
+        except KeyError as e:
+            parser.error(str(e))
+        args.no_enrich = not journal.params.get('enrich', True)
+        journal.close()
+    
+    if args.resume_batch and args.no_enrich:
+        parser.error('--resume-batch needs the OpenAI client; drop --no-enrich')
+    
     # Validate configuration
     if not Config.API_ADMIN_EMAIL or not Config.API_ADMIN_PASSWORD:
         print("❌ Error: API credentials not configured. Check your .env file.")
@@ -666,13 +1297,44 @@ def main():
         print("❌ Error: Google Maps API key not configured. Check your .env file.")
         sys.exit(1)
     
-    if not Config.OPENAI_API_KEY:
+    if not args.no_enrich and not Config.OPENAI_API_KEY:
         print("❌ Error: OpenAI API key not configured. Check your .env file.")
         sys.exit(1)
     
     # Run agent
-    agent = ProviderAgent()
-    agent.run(args.city, args.state, args.type, args.max)
+    agent = ProviderAgent(enrich=not args.no_enrich, metrics_file=args.metrics_file)
+    
+    if args.resume_batch:
+        agent.resume_batch(args.resume_batch)
+        return
+    
+    if args.resume:
+        agent.resume(args.resume)
+        return
+    
+    if args.refresh:
+        agent.refresh(args.max_age_days, args.max, photos=not args.no_photos, dry_run=args.dry_run)
+        return
+    
+    sweep_areas = [BoundingBox.parse(box) for box in args.bbox]
+    if args.zips:
+        for zip_code in args.zips.split(','):
+            box = agent.maps_discovery.zip_bounds(zip_code.strip())
+            if box:
+                sweep_areas.append(box)
+    
+    if args.record:
+        from replay import record
+        record(agent, args.record, {
+            'city': args.city,
+            'state': args.state,
+            'provider_type': args.type,
+            'queries': GoogleMapsDiscovery.QUERY_MAP.get(args.type, [args.type]),
+            'location': f"{args.city}, {args.state}",
+            'providers': args.max or Config.MAX_PROFILES_PER_RUN,
+        })
+    
+    agent.run(args.city, args.state, args.type, args.max, sweep_areas, args.cell_km, args.batch_extract)
 
 
 if __name__ == '__main__':
@@ -3,60 +3,44 @@ import requests
 import json
 from openai import OpenAI
 from dotenv import load_dotenv
-import time
-import re
 
+# Before the local imports below: they read their settings when imported
 load_dotenv()
 
+from places_cache import places_request
+from address import normalize_place
+import time
+import re
+
 GOOGLE_API_KEY = os.getenv('GOOGLE_PLACES_API_KEY')
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 BACKEND_URL = os.getenv('BACKEND_URL')
 ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+# Only for parts Places leaves out; never a made-up ZIP
+ADDRESS_DEFAULTS = {'city': 'New York', 'state': 'NY'}
 
-def parse_address(formatted_address):
-    """Safely parse address"""
-    try:
-        parts = [p.strip() for p in formatted_address.split(',')]
-        street = parts[0] if len(parts) > 0 else "Unknown"
-        city = "New York"
-        state = "NY"
-        zip_code = "10001"
-        
-        for part in parts:
-            zip_match = re.search(r'\b\d{5}\b', part)
-            if zip_match:
-                zip_code = zip_match.group()
-                break
-        
-        return street, city, state, zip_code
-    except:
-        return "Unknown", "New York", "NY", "10001"
+client = OpenAI(api_key=OPENAI_API_KEY)
 
 def search_google_places():
     """Search for dental clinics in NYC"""
-    url = "https://maps.googleapis.com/maps/api/place/textsearch/json"
     params = {
         'query': 'dental clinic in Upper East Side Manhattan',
         'key': GOOGLE_API_KEY
     }
     
-    response = requests.get(url, params=params)
-    data = response.json()
+    data = places_request('textsearch', params)
     return data.get('results', [])[:3]  # Just 3 for testing
 
 def get_place_details(place_id):
     """Get detailed info"""
-    url = "https://maps.googleapis.com/maps/api/place/details/json"
     params = {
         'place_id': place_id,
-        'fields': 'name,formatted_address,formatted_phone_number,website,types',
+        'fields': 'name,formatted_address,address_component,formatted_phone_number,website,types',
         'key': GOOGLE_API_KEY
     }
     
-    response = requests.get(url, params=params)
-    return response.json().get('result', {})
+    return places_request('details', params).get('result', {})
 
 def generate_dental_services(provider_name):
     """Generate dental services with AI"""
@@ -102,8 +86,7 @@ def create_provider(place_data, details):
     print(f"\n[DEBUG] Processing: {name}")
     
     # Parse address
-    formatted_address = details.get('formatted_address', '')
-    street, city, state, zip_code = parse_address(formatted_address)
+    address = normalize_place(details, ADDRESS_DEFAULTS)
     
     # Clean email generation - SIMPLIFIED
     email_name = name.lower()
@@ -121,10 +104,10 @@ def create_provider(place_data, details):
         'email': email,
         'phone': details.get('formatted_phone_number', '(212) 555-0000'),
         'providerTypes': ['Dental'],
-        'streetAddress': street[:255],
-        'city': city,
-        'state': state,
-        'zipCode': zip_code,
+        'streetAddress': address['street_address'][:255],
+        'city': address['city'],
+        'state': address['state'],
+        'zipCode': address['zip_code'],
         'website': details.get('website', '')[:500] if details.get('website') else '',
         'status': 'approved',
         'source': 'agent'
@@ -8,11 +8,16 @@ import json
 import requests
 import time
 from dotenv import load_dotenv
+
+# Before the local imports below: they read their settings when imported
+load_dotenv()
+
 import googlemaps
 from bs4 import BeautifulSoup
 from openai import OpenAI
-
-load_dotenv()
+from fetcher import TieredFetcher
+from places_cache import CachedPlacesClient
+from address import normalize_place
 
 # Configuration
 API_BASE = os.getenv('API_BASE_URL')
@@ -21,6 +26,9 @@ API_PASSWORD = os.getenv('API_ADMIN_PASSWORD')
 GMAPS_KEY = os.getenv('GOOGLE_MAPS_API_KEY')
 OPENAI_KEY = os.getenv('OPENAI_API_KEY')
 
+# Only for parts Places leaves out; never a made-up ZIP
+ADDRESS_DEFAULTS = {'city': 'New York', 'state': 'NY'}
+
 # Initialize OpenAI client
 client = OpenAI(api_key=OPENAI_KEY)
 
@@ -74,16 +82,22 @@ class NYCProviderAgent:
         self.headers = {'Authorization': f'Bearer {self.token}'}
         
         # Initialize Google Maps
-        self.gmaps = googlemaps.Client(key=GMAPS_KEY)
+        self.gmaps = CachedPlacesClient(googlemaps.Client(key=GMAPS_KEY))
+        
+        # Plain HTTP first, headless browser only for JS-rendered sites
+        self.fetcher = TieredFetcher(
+            'Mozilla/5.0 (compatible; FindrHealthBot/1.0)',
+            timeout=10,
+            browser_pool_size=int(os.getenv('BROWSER_POOL_SIZE', 2))
+        )
         
     def scrape_website(self, url):
         """Scrape provider website"""
         try:
-            headers = {'User-Agent': 'Mozilla/5.0 (compatible; FindrHealthBot/1.0)'}
-            response = requests.get(url, headers=headers, timeout=10)
+            html = self.fetcher.fetch(url)
             
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
+            if html:
+                soup = BeautifulSoup(html, 'html.parser')
                 text_content = soup.get_text(separator=' ', strip=True)
                 return text_content[:3000]
             return None
@@ -178,9 +192,7 @@ Return ONLY valid JSON array:
         print(f"\n[Processing] {place['name']}")
         
         # Extract info
-        address_parts = place.get('formatted_address', '').split(',')
-        street = address_parts[0] if address_parts else ''
-        zip_code = address_parts[-2].strip().split()[-1] if len(address_parts) >= 2 else '10001'
+        address = normalize_place(place, ADDRESS_DEFAULTS)
         website = place.get('website', '')
         
         # Scrape website
@@ -200,10 +212,10 @@ Return ONLY valid JSON array:
         provider_data = {
             'practiceName': place['name'],
             'providerTypes': [provider_type.replace('_', ' ').title()],
-            'streetAddress': street,
-            'city': 'New York',
-            'state': 'NY',
-            'zipCode': zip_code,
+            'streetAddress': address['street_address'],
+            'city': address['city'],
+            'state': address['state'],
+            'zipCode': address['zip_code'],
             'phone': place.get('formatted_phone_number') or '(212) 555-0000',
             'email': f"contact@{place['name'].lower().replace(' ', '')[:30]}.com",
             'website': website,
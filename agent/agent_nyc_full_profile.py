@@ -1,19 +1,30 @@
 import os
-import requests
 import json
 from openai import OpenAI
 from dotenv import load_dotenv
-import time
 
+# Before the local imports below: they read their settings when imported
 load_dotenv()
 
+from http_client import get_http
+from metrics import get_metrics
+from places_cache import places_request
+from photo_pipeline import PhotoPipeline
+from address import normalize_place
+
 # Configuration
 GOOGLE_API_KEY = os.getenv('GOOGLE_PLACES_API_KEY')
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 BACKEND_URL = os.getenv('BACKEND_URL')
 ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+# Only for parts Places leaves out; never a made-up ZIP
+ADDRESS_DEFAULTS = {'city': 'New York', 'state': 'NY'}
+
+client = OpenAI(api_key=OPENAI_API_KEY, max_retries=0)
+
+# Created in main()
+photos = None
 
 # NYC Neighborhoods & Provider Types
 LOCATIONS = [
@@ -24,15 +35,13 @@ LOCATIONS = [
 
 def search_google_places(area, provider_type):
     """Search Google Places API"""
-    url = "https://maps.googleapis.com/maps/api/place/textsearch/json"
     params = {
         'query': f'{provider_type} in {area}',
         'key': GOOGLE_API_KEY
     }
     
     try:
-        response = requests.get(url, params=params)
-        data = response.json()
+        data = places_request('textsearch', params)
         return data.get('results', [])[:3]  # Get 3 per search
     except Exception as e:
         print(f"    ⚠️  Search error: {e}")
@@ -40,37 +49,18 @@ def search_google_places(area, provider_type):
 
 def get_place_details(place_id):
     """Get detailed info including photos, hours, email"""
-    url = "https://maps.googleapis.com/maps/api/place/details/json"
     params = {
         'place_id': place_id,
-        'fields': 'name,formatted_address,formatted_phone_number,website,rating,user_ratings_total,opening_hours,photos,email,types',
+        'fields': 'name,formatted_address,address_component,formatted_phone_number,website,rating,user_ratings_total,opening_hours,photos,email,types',
         'key': GOOGLE_API_KEY
     }
     
     try:
-        response = requests.get(url, params=params)
-        return response.json().get('result', {})
+        return places_request('details', params).get('result', {})
     except Exception as e:
         print(f"    ⚠️  Details error: {e}")
         return {}
 
-def download_photo(photo_reference, index):
-    """Download photo from Google Places"""
-    url = "https://maps.googleapis.com/maps/api/place/photo"
-    params = {
-        'photoreference': photo_reference,
-        'maxwidth': 1200,
-        'key': GOOGLE_API_KEY
-    }
-    
-    try:
-        response = requests.get(url, params=params)
-        if response.status_code == 200:
-            return response.content  # Return binary image data
-    except Exception as e:
-        print(f"    ⚠️  Photo download error: {e}")
-    return None
-
 def generate_services_with_ai(provider_name, provider_type, website):
     """Use GPT-4 to generate realistic services"""
     prompt = f"""Generate 6-8 realistic services for {provider_name}, a {provider_type} in NYC.
@@ -91,12 +81,14 @@ Cosmetic: Botox ($400-600), Fillers ($600-900), Laser ($300-500), etc.
 Dental: Cleaning ($150-200), Whitening ($400-600), Veneers ($1200-1500), etc."""
 
     try:
-        response = client.chat.completions.create(
+        # Paced and retried by the shared client (429 / 5xx backoff)
+        response = get_http().call('openai', 'chat.completions', lambda: client.chat.completions.create(
             model="gpt-4o-mini",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.7,
             max_tokens=1000
-        )
+        ))
+        get_metrics().add_usage(response.model, response.usage)
         
         content = response.choices[0].message.content.strip()
         if content.startswith('```json'):
@@ -114,12 +106,7 @@ Dental: Cleaning ($150-200), Whitening ($400-600), Veneers ($1200-1500), etc."""
 def create_provider_with_full_profile(place_data, details):
     """Create provider with photos, hours, services"""
     
-    # Parse address
-    address_parts = details.get('formatted_address', '').split(',')
-    street = address_parts[0].strip() if len(address_parts) > 0 else ""
-    city = "New York"
-    state = "NY"
-    zip_code = address_parts[-1].strip().split()[-1] if len(address_parts) > 0 else "10001"
+    address = normalize_place(details, ADDRESS_DEFAULTS)
     
     # Determine provider type
     types = details.get('types', [])
@@ -139,21 +126,17 @@ def create_provider_with_full_profile(place_data, details):
     )
     print(f"  ✅ {len(services)} services")
     
-    # Download photos (up to 5)
+    # Download, resize and upload photos (up to 5) in parallel
     photos_data = []
     if 'photos' in details:
-        print(f"  📸 Downloading {min(5, len(details['photos']))} photos...")
-        for i, photo in enumerate(details['photos'][:5]):
-            photo_content = download_photo(photo.get('photo_reference'), i)
-            if photo_content:
-                # Convert to base64 for now (in production, upload to S3)
-                import base64
-                photo_base64 = base64.b64encode(photo_content).decode('utf-8')
-                photos_data.append({
-                    'data': f'data:image/jpeg;base64,{photo_base64}',
-                    'is_primary': i == 0
-                })
-        print(f"  ✅ {len(photos_data)} photos downloaded")
+        print(f"  📸 Processing {min(5, len(details['photos']))} photos...")
+        try:
+            images = photos.prepare((photo.get('photo_reference') for photo in details['photos'][:5]),
+                                    owner=place_data.get('place_id'))
+            photos_data = PhotoPipeline.photo_records(photos.upload(images))
+        except Exception as e:
+            print(f"    ⚠️  Photo upload error: {e}")
+        print(f"  ✅ {len(photos_data)} photos uploaded")
     
     # Parse business hours
     hours = {}
@@ -173,10 +156,10 @@ def create_provider_with_full_profile(place_data, details):
         'email': details.get('email') or f"contact@{place_data.get('name', '').lower().replace(' ', '')}.com",
         'phone': details.get('formatted_phone_number', '(212) 555-0000'),
         'providerTypes': [provider_type.capitalize()],
-        'streetAddress': street,
-        'city': city,
-        'state': state,
-        'zipCode': zip_code,
+        'streetAddress': address['street_address'][:255],
+        'city': address['city'],
+        'state': address['state'],
+        'zipCode': address['zip_code'],
         'website': details.get('website', ''),
         'status': 'approved',
         'source': 'agent',
@@ -189,7 +172,8 @@ def create_provider_with_full_profile(place_data, details):
     
     # Create provider
     try:
-        response = requests.post(
+        response = get_http().post(
+            'backend',
             f'{BACKEND_URL}/api/admin/providers',
             headers={
                 'Authorization': f'Bearer {ADMIN_TOKEN}',
@@ -212,6 +196,9 @@ def create_provider_with_full_profile(place_data, details):
         return False
 
 def main():
+    global photos
+    photos = PhotoPipeline(GOOGLE_API_KEY, f'{BACKEND_URL}/api', ADMIN_TOKEN)
+
     print("="*60)
     print("🗽 NYC FULL PROFILE AGENT - Cosmetic & Dental")
     print("="*60)
@@ -238,11 +225,13 @@ def main():
                 
                 if create_provider_with_full_profile(place, details):
                     created += 1
-                
-                time.sleep(1)  # Rate limiting
     
+    photos.close()
     print("\n" + "="*60)
     print(f"✅ COMPLETE: {created}/{total} providers")
+    photos.report()
+    get_metrics().report()
+    get_http().report()
     print("="*60)
 
 if __name__ == "__main__":
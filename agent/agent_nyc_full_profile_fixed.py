@@ -1,20 +1,55 @@
+import argparse
 import os
-import requests
 import json
 from openai import OpenAI
 from dotenv import load_dotenv
-import time
-import re
 
+# Before the local imports below: they read their settings when imported
 load_dotenv()
 
+from bulk_ingest import BulkIngestClient
+from http_client import get_http
+from metrics import get_metrics
+from llm_cache import get_llm_cache
+from photo_pipeline import PhotoPipeline
+from run_journal import RunJournal
+from places_cache import places_request
+from address import normalize_place
+
 # Configuration
 GOOGLE_API_KEY = os.getenv('GOOGLE_PLACES_API_KEY')
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 BACKEND_URL = os.getenv('BACKEND_URL')
 ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+# Only for parts Places leaves out; never a made-up ZIP
+ADDRESS_DEFAULTS = {'city': 'New York', 'state': 'NY'}
+
+client = OpenAI(api_key=OPENAI_API_KEY, max_retries=0)
+llm_cache = get_llm_cache()
+
+ingest_counts = {'created': 0, 'updated': 0, 'failed': 0}
+
+# Per-place checkpoints so a crashed run can continue with --resume <run_id>
+journal = None
+
+# Created in main() so worker processes importing this module stay idle
+photos = None
+
+def report_ingest(context, result):
+    place_id, name = context
+    if result['status'] in ('created', 'updated'):
+        ingest_counts[result['status']] += 1
+        journal.record(place_id, 'upload', result)
+    else:
+        ingest_counts['failed'] += 1
+        print(f"  ❌ {name}: {result.get('error', result['status'])}")
+
+# Full profiles (services + photos) go out together in batched upserts
+bulk = BulkIngestClient(f'{BACKEND_URL}/api', ADMIN_TOKEN, on_result=report_ingest)
+
+# Bump when the services prompt changes so cached results are not reused
+SERVICES_PROMPT_VERSION = 'services-full-v1'
 
 # NYC Neighborhoods & Provider Types
 LOCATIONS = [
@@ -23,51 +58,15 @@ LOCATIONS = [
     {"area": "Midtown, Manhattan", "types": ["dental clinic", "cosmetic dentistry"]},
 ]
 
-def parse_address(formatted_address):
-    """Safely parse address components"""
-    try:
-        # Example: "123 Main St, New York, NY 10001, USA"
-        parts = [p.strip() for p in formatted_address.split(',')]
-        
-        street = parts[0] if len(parts) > 0 else "Unknown"
-        city = "New York"
-        state = "NY"
-        zip_code = "10001"
-        
-        # Try to extract ZIP code (5 digits)
-        for part in parts:
-            zip_match = re.search(r'\b\d{5}\b', part)
-            if zip_match:
-                zip_code = zip_match.group()
-                break
-        
-        # Try to extract state (2 letter code)
-        for part in parts:
-            state_match = re.search(r'\b[A-Z]{2}\b', part)
-            if state_match and state_match.group() != 'NY':
-                state = state_match.group()
-        
-        # City is usually second-to-last or in the middle
-        if len(parts) >= 2:
-            city = parts[-2].strip() if 'NY' in parts[-1] or 'USA' in parts[-1] else parts[1].strip()
-        
-        return street, city, state, zip_code
-        
-    except Exception as e:
-        print(f"    ⚠️ Address parsing error: {e}")
-        return "Unknown", "New York", "NY", "10001"
-
 def search_google_places(area, provider_type):
     """Search Google Places API"""
-    url = "https://maps.googleapis.com/maps/api/place/textsearch/json"
     params = {
         'query': f'{provider_type} in {area}',
         'key': GOOGLE_API_KEY
     }
     
     try:
-        response = requests.get(url, params=params)
-        data = response.json()
+        data = places_request('textsearch', params)
         return data.get('results', [])[:3]
     except Exception as e:
         print(f"    ⚠️ Search error: {e}")
@@ -75,37 +74,18 @@ def search_google_places(area, provider_type):
 
 def get_place_details(place_id):
     """Get detailed info including photos, hours, email"""
-    url = "https://maps.googleapis.com/maps/api/place/details/json"
     params = {
         'place_id': place_id,
-        'fields': 'name,formatted_address,formatted_phone_number,website,rating,user_ratings_total,opening_hours,photos,email,types',
+        'fields': 'name,formatted_address,address_component,formatted_phone_number,website,rating,user_ratings_total,opening_hours,photos,email,types',
         'key': GOOGLE_API_KEY
     }
     
     try:
-        response = requests.get(url, params=params)
-        return response.json().get('result', {})
+        return places_request('details', params).get('result', {})
     except Exception as e:
         print(f"    ⚠️ Details error: {e}")
         return {}
 
-def download_photo(photo_reference, index):
-    """Download photo from Google Places"""
-    url = "https://maps.googleapis.com/maps/api/place/photo"
-    params = {
-        'photoreference': photo_reference,
-        'maxwidth': 1200,
-        'key': GOOGLE_API_KEY
-    }
-    
-    try:
-        response = requests.get(url, params=params)
-        if response.status_code == 200:
-            return response.content
-    except Exception as e:
-        print(f"    ⚠️ Photo {index} error: {e}")
-    return None
-
 def generate_services_with_ai(provider_name, provider_type, website):
     """Use GPT-4 to generate realistic services"""
     prompt = f"""Generate 6-8 realistic services for {provider_name}, a {provider_type} in NYC.
@@ -125,21 +105,27 @@ For {provider_type}, include appropriate services with NYC pricing.
 Cosmetic: Botox ($400-600), Fillers ($600-900), Laser ($300-500), Consultation ($150-250)
 Dental: Cleaning ($150-200), Whitening ($400-600), Veneers ($1200-1500), Exam ($100-150)"""
 
-    try:
-        response = client.chat.completions.create(
+    def call_openai():
+        # Paced and retried by the shared client (429 / 5xx backoff)
+        response = get_http().call('openai', 'chat.completions', lambda: client.chat.completions.create(
             model="gpt-4o-mini",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.7,
             max_tokens=1000
-        )
+        ))
+        get_metrics().add_usage(response.model, response.usage)
         
         content = response.choices[0].message.content.strip()
         if content.startswith('```json'):
             content = content[7:-3].strip()
         elif content.startswith('```'):
             content = content[3:-3].strip()
-            
-        services = json.loads(content)
+        
+        return json.loads(content)
+    
+    try:
+        # Same provider name/type/prompt replays from disk instead of re-billing
+        services = llm_cache.get_or_call("gpt-4o-mini", SERVICES_PROMPT_VERSION, prompt, call_openai)
         return services if isinstance(services, list) else []
         
     except Exception as e:
@@ -152,8 +138,7 @@ def create_provider_with_full_profile(place_data, details):
     name = place_data.get('name', 'Unknown Provider')
     
     # Parse address safely
-    formatted_address = details.get('formatted_address', '')
-    street, city, state, zip_code = parse_address(formatted_address)
+    address = normalize_place(details, ADDRESS_DEFAULTS)
     
     # Determine provider type
     types = details.get('types', [])
@@ -169,21 +154,18 @@ def create_provider_with_full_profile(place_data, details):
     services = generate_services_with_ai(name, provider_type, details.get('website', ''))
     print(f"  ✅ {len(services)} services")
     
-    # Download photos (up to 5)
+    # Photos (up to 5): parallel download + resize, multipart upload, URLs in the profile
     photos_data = []
     if 'photos' in details and len(details['photos']) > 0:
         photo_count = min(5, len(details['photos']))
-        print(f"  📸 Downloading {photo_count} photos...")
-        for i, photo in enumerate(details['photos'][:5]):
-            photo_content = download_photo(photo.get('photo_reference'), i)
-            if photo_content:
-                import base64
-                photo_base64 = base64.b64encode(photo_content).decode('utf-8')
-                photos_data.append({
-                    'data': f'data:image/jpeg;base64,{photo_base64}',
-                    'is_primary': i == 0
-                })
-        print(f"  ✅ {len(photos_data)} photos downloaded")
+        print(f"  📸 Processing {photo_count} photos...")
+        try:
+            images = photos.prepare((photo.get('photo_reference') for photo in details['photos'][:5]),
+                                    owner=place_data.get('place_id'))
+            photos_data = PhotoPipeline.photo_records(photos.upload(images))
+        except Exception as e:
+            print(f"    ⚠️ Photo upload error: {e}")
+        print(f"  ✅ {len(photos_data)} photos uploaded")
     
     # Parse business hours
     hours = {}
@@ -203,91 +185,82 @@ def create_provider_with_full_profile(place_data, details):
         'email': details.get('email') or f"contact@{name.lower().replace(' ', '').replace(',', '')}@example.com",
         'phone': details.get('formatted_phone_number', '(212) 555-0000'),
         'providerTypes': [provider_type.capitalize()],
-        'streetAddress': street,
-        'city': city,
-        'state': state,
-        'zipCode': zip_code,
+        'streetAddress': address['street_address'][:255],
+        'city': address['city'],
+        'state': address['state'],
+        'zipCode': address['zip_code'],
         'website': details.get('website', ''),
         'status': 'approved',
         'source': 'agent',
+        'googlePlaceId': place_data.get('place_id'),
+        'services': services,
+        'photos': photos_data,
     }
     
-    # Create provider
-    try:
-        response = requests.post(
-            f'{BACKEND_URL}/api/admin/providers',
-            headers={
-                'Authorization': f'Bearer {ADMIN_TOKEN}',
-                'Content-Type': 'application/json'
-            },
-            json=provider_data
-        )
-        
-        if response.status_code in [200, 201]:
-            result = response.json()
-            provider_id = result.get('provider', {}).get('id')
-            
-            # Add services
-            if provider_id and services:
-                success_count = 0
-                for service in services:
-                    try:
-                        svc_response = requests.post(
-                            f'{BACKEND_URL}/api/admin/providers/{provider_id}/services',
-                            headers={
-                                'Authorization': f'Bearer {ADMIN_TOKEN}',
-                                'Content-Type': 'application/json'
-                            },
-                            json=service
-                        )
-                        if svc_response.status_code in [200, 201]:
-                            success_count += 1
-                    except:
-                        pass
-                print(f"  ✅ Provider created with {success_count}/{len(services)} services")
-            else:
-                print(f"  ✅ Provider created")
-            
-            return True
-        else:
-            print(f"  ❌ Error: {response.text[:100]}")
-            return False
-            
-    except Exception as e:
-        print(f"  ❌ Exception: {e}")
-        return False
+    bulk.add(provider_data, context=(place_data.get('place_id'), name))
+    return True
 
 def main():
+    global journal, photos
+    
+    parser = argparse.ArgumentParser(description='NYC FULL PROFILE AGENT - Cosmetic & Dental')
+    parser.add_argument('--resume', metavar='RUN_ID', help='Skip places already uploaded by this run')
+    args = parser.parse_args()
+    
+    journal = RunJournal.resume(args.resume) if args.resume else RunJournal.create({'script': 'agent_nyc_full_profile_fixed'})
+    photos = PhotoPipeline(GOOGLE_API_KEY, f'{BACKEND_URL}/api', ADMIN_TOKEN)
+    
     print("="*60)
     print("🗽 NYC FULL PROFILE AGENT - Cosmetic & Dental")
+    print(f"🧾 Run ID: {journal.run_id} (resume with --resume {journal.run_id})")
     print("="*60)
     
-    created = 0
+    queued = 0
     total = 0
     
-    for location in LOCATIONS:
-        print(f"\n�� {location['area']}")
+    try:
+        for location in LOCATIONS:
+            print(f"\n�� {location['area']}")
         
-        for provider_type in location['types']:
-            print(f"  🔍 {provider_type}")
-            places = search_google_places(location['area'], provider_type)
+            for provider_type in location['types']:
+                print(f"  🔍 {provider_type}")
+                places = search_google_places(location['area'], provider_type)
             
-            for place in places:
-                total += 1
-                name = place.get('name')
-                place_id = place.get('place_id')
+                for place in places:
+                    total += 1
+                    name = place.get('name')
+                    place_id = place.get('place_id')
                 
-                print(f"\n[Processing] {name}")
+                    if journal.is_done(place_id, 'upload'):
+                        print(f"\n[Done in earlier attempt] {name}")
+                        continue
                 
-                details = get_place_details(place_id)
+                    print(f"\n[Processing] {name}")
                 
-                if create_provider_with_full_profile(place, details):
-                    created += 1
+                    details = get_place_details(place_id)
                 
-                time.sleep(1)
+                    if create_provider_with_full_profile(place, details):
+                        queued += 1
+    except BaseException as e:
+        bulk.close()
+        photos.close()
+        journal.set_status('failed', error_message=str(e) or type(e).__name__)
+        print(f"\n🛑 Stopped: resume with python agent_nyc_full_profile_fixed.py --resume {journal.run_id}")
+        raise
+    
+    bulk.close()
+    photos.close()
+    journal.set_status('completed')
     
     print("\n" + "="*60)
-    print(f"✅ COMPLETE: {created}/{total} providers")
+    print(f"✅ COMPLETE: {ingest_counts['created']} created, {ingest_counts['updated']} updated "
+          f"of {queued}/{total} providers")
+    bulk.report()
+    photos.report()
+    llm_cache.report()
+    journal.report()
+    get_metrics().report()
+    get_http().report()
     print("="*60)
 
 if __name__ == "__main__":
@@ -1,19 +1,51 @@
+import argparse
 import os
-import requests
 import json
 from openai import OpenAI
 from dotenv import load_dotenv
-import time
-import re
 
+# Before the local imports below: they read their settings when imported
 load_dotenv()
 
+from bulk_ingest import BulkIngestClient
+from http_client import get_http
+from metrics import get_metrics
+from llm_cache import get_llm_cache
+from run_journal import RunJournal
+from places_cache import places_request
+from address import normalize_place
+import re
+
 GOOGLE_API_KEY = os.getenv('GOOGLE_PLACES_API_KEY')
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 BACKEND_URL = os.getenv('BACKEND_URL')
 ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+# Only for parts Places leaves out; never a made-up ZIP
+ADDRESS_DEFAULTS = {'city': 'New York', 'state': 'NY'}
+
+client = OpenAI(api_key=OPENAI_API_KEY, max_retries=0)
+llm_cache = get_llm_cache()
+
+ingest_counts = {'created': 0, 'updated': 0, 'failed': 0}
+
+# Per-place checkpoints so a crashed run can continue with --resume <run_id>
+journal = None
+
+def report_ingest(context, result):
+    place_id, name = context
+    if result['status'] in ('created', 'updated'):
+        ingest_counts[result['status']] += 1
+        journal.record(place_id, 'upload', result)
+    else:
+        ingest_counts['failed'] += 1
+        print(f"  ❌ {name}: {result.get('error', result['status'])}")
+
+# Providers and their services go out together in batched upserts
+bulk = BulkIngestClient(f'{BACKEND_URL}/api', ADMIN_TOKEN, on_result=report_ingest)
+
+# Bump when the services prompt changes so cached results are not reused
+SERVICES_PROMPT_VERSION = 'services-v2'
 
 SEARCHES = [
     {"query": "dental clinic Upper East Side Manhattan", "type": "Dental"},
@@ -24,39 +56,17 @@ SEARCHES = [
     {"query": "dermatology clinic Chelsea Manhattan", "type": "Cosmetic"},
 ]
 
-def parse_address(formatted_address):
-    try:
-        parts = [p.strip() for p in formatted_address.split(',')]
-        street = parts[0] if len(parts) > 0 else "Unknown"
-        city = "New York"
-        state = "NY"
-        zip_code = "10001"
-        
-        for part in parts:
-            zip_match = re.search(r'\b\d{5}\b', part)
-            if zip_match:
-                zip_code = zip_match.group()
-                break
-        
-        return street, city, state, zip_code
-    except:
-        return "Unknown", "New York", "NY", "10001"
-
 def search_google_places(query):
-    url = "https://maps.googleapis.com/maps/api/place/textsearch/json"
     params = {'query': query, 'key': GOOGLE_API_KEY}
-    response = requests.get(url, params=params)
-    return response.json().get('results', [])[:3]
+    return places_request('textsearch', params).get('results', [])[:3]
 
 def get_place_details(place_id):
-    url = "https://maps.googleapis.com/maps/api/place/details/json"
     params = {
         'place_id': place_id,
-        'fields': 'name,formatted_address,formatted_phone_number,website,rating,user_ratings_total,types',
+        'fields': 'name,formatted_address,address_component,formatted_phone_number,website,rating,user_ratings_total,types',
         'key': GOOGLE_API_KEY
     }
-    response = requests.get(url, params=params)
-    return response.json().get('result', {})
+    return places_request('details', params).get('result', {})
 
 def generate_services(provider_name, provider_type):
     """Generate services with EXPLICIT pricing"""
@@ -123,21 +133,27 @@ NYC Cosmetic Pricing Guide:
 - Facial: $200-400
 - Consultation: $150-250"""
 
-    try:
-        response = client.chat.completions.create(
+    def call_openai():
+        # Paced and retried by the shared client (429 / 5xx backoff)
+        response = get_http().call('openai', 'chat.completions', lambda: client.chat.completions.create(
             model="gpt-4o-mini",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.7,
             max_tokens=1200
-        )
+        ))
+        get_metrics().add_usage(response.model, response.usage)
         
         content = response.choices[0].message.content.strip()
         if content.startswith('```json'):
             content = content[7:-3].strip()
         elif content.startswith('```'):
             content = content[3:-3].strip()
-            
-        services = json.loads(content)
+        
+        return json.loads(content)
+    
+    try:
+        # Same provider name/type/prompt replays from disk instead of re-billing
+        services = llm_cache.get_or_call("gpt-4o-mini", SERVICES_PROMPT_VERSION, prompt, call_openai)
         
         # VALIDATE: Ensure all services have required fields including price
         validated = []
@@ -159,8 +175,7 @@ NYC Cosmetic Pricing Guide:
 
 def create_provider(place_data, details, provider_type):
     name = place_data.get('name', 'Unknown')[:255]
-    formatted_address = details.get('formatted_address', '')
-    street, city, state, zip_code = parse_address(formatted_address)
+    address = normalize_place(details, ADDRESS_DEFAULTS)
     
     email_name = re.sub(r'[^a-z0-9]', '', name.lower())[:30]
     email = f"{email_name}@example.com"
@@ -181,87 +196,73 @@ def create_provider(place_data, details, provider_type):
         'email': email,
         'phone': details.get('formatted_phone_number', '(212) 555-0000'),
         'providerTypes': [provider_type],
-        'streetAddress': street[:255],
-        'city': city,
-        'state': state,
-        'zipCode': zip_code,
+        'streetAddress': address['street_address'][:255],
+        'city': address['city'],
+        'state': address['state'],
+        'zipCode': address['zip_code'],
         'website': details.get('website', '')[:500] if details.get('website') else '',
         'status': 'approved',
-        'source': 'agent'
+        'source': 'agent',
+        'googlePlaceId': place_data.get('place_id'),
+        'services': services
     }
     
-    try:
-        response = requests.post(
-            f'{BACKEND_URL}/api/admin/providers',
-            headers={'Authorization': f'Bearer {ADMIN_TOKEN}', 'Content-Type': 'application/json'},
-            json=provider_data,
-            timeout=10
-        )
-        
-        if response.status_code in [200, 201]:
-            provider_id = response.json().get('provider', {}).get('id')
-            
-            if provider_id and services:
-                success = 0
-                failed = []
-                
-                for service in services:
-                    try:
-                        svc_resp = requests.post(
-                            f'{BACKEND_URL}/api/admin/providers/{provider_id}/services',
-                            headers={'Authorization': f'Bearer {ADMIN_TOKEN}', 'Content-Type': 'application/json'},
-                            json=service,
-                            timeout=10
-                        )
-                        
-                        if svc_resp.status_code in [200, 201]:
-                            success += 1
-                        else:
-                            failed.append(f"{service['serviceName']} ({svc_resp.status_code})")
-                    except Exception as e:
-                        failed.append(f"{service['serviceName']} (error)")
-                
-                if failed:
-                    print(f"  ⚠️  {success}/{len(services)} services added. Failed: {', '.join(failed)}")
-                else:
-                    print(f"  ✅ Provider created with {success}/{len(services)} services")
-                
-                return success > 0
-        
-        print(f"  ❌ Failed: {response.text[:100]}")
-        return False
-            
-    except Exception as e:
-        print(f"  ❌ Error: {e}")
-        return False
+    bulk.add(provider_data, context=(place_data.get('place_id'), name))
+    return True
 
 def main():
+    global journal
+    
+    parser = argparse.ArgumentParser(description='NYC PROVIDERS - DENTAL & COSMETIC (with prices)')
+    parser.add_argument('--resume', metavar='RUN_ID', help='Skip places already uploaded by this run')
+    args = parser.parse_args()
+    
+    journal = RunJournal.resume(args.resume) if args.resume else RunJournal.create({'script': 'agent_nyc_production_v2'})
+    
     print("="*60)
     print("🗽 NYC PROVIDERS - DENTAL & COSMETIC (with prices)")
+    print(f"🧾 Run ID: {journal.run_id} (resume with --resume {journal.run_id})")
     print("="*60)
     
-    created = 0
+    queued = 0
     total = 0
     
-    for search in SEARCHES:
-        print(f"\n🔍 {search['query']}")
-        places = search_google_places(search['query'])
+    try:
+        for search in SEARCHES:
+            print(f"\n🔍 {search['query']}")
+            places = search_google_places(search['query'])
         
-        for place in places:
-            total += 1
-            name = place.get('name')
-            place_id = place.get('place_id')
+            for place in places:
+                total += 1
+                name = place.get('name')
+                place_id = place.get('place_id')
             
-            print(f"\n[Processing] {name}")
-            details = get_place_details(place_id)
+                if journal.is_done(place_id, 'upload'):
+                    print(f"\n[Done in earlier attempt] {name}")
+                    continue
             
-            if create_provider(place, details, search['type']):
-                created += 1
+                print(f"\n[Processing] {name}")
+                details = get_place_details(place_id)
             
-            time.sleep(1)
+                if create_provider(place, details, search['type']):
+                    queued += 1
+    except BaseException as e:
+        bulk.close()
+        journal.set_status('failed', error_message=str(e) or type(e).__name__)
+        print(f"\n🛑 Stopped: resume with python agent_nyc_production_v2.py --resume {journal.run_id}")
+        raise
+    
+    bulk.close()
+    journal.set_status('completed')
     
     print("\n" + "="*60)
-    print(f"✅ COMPLETE: {created}/{total} providers with priced services")
+    print(f"✅ COMPLETE: {ingest_counts['created']} created, {ingest_counts['updated']} updated "
+          f"of {queued}/{total} providers with priced services")
+    bulk.report()
+    llm_cache.report()
+    journal.report()
+    get_metrics().report()
+    get_http().report()
     print("="*60)
 
 if __name__ == "__main__":
@@ -3,32 +3,24 @@ import requests
 import json
 from openai import OpenAI
 from dotenv import load_dotenv
+
+# Before the local imports below: they read their settings when imported
+load_dotenv()
+
 import time
 import re
 import base64
-
-load_dotenv()
+from address import normalize_place
 
 GOOGLE_API_KEY = os.getenv('GOOGLE_PLACES_API_KEY')
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 BACKEND_URL = os.getenv('BACKEND_URL')
 ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+# Only for parts Places leaves out; never a made-up ZIP
+ADDRESS_DEFAULTS = {'city': 'New York', 'state': 'NY'}
 
-def parse_address(formatted_address):
-    try:
-        parts = [p.strip() for p in formatted_address.split(',')]
-        street = parts[0] if len(parts) > 0 else "Unknown"
-        city, state, zip_code = "New York", "NY", "10001"
-        for part in parts:
-            zip_match = re.search(r'\d{5}', part)
-            if zip_match:
-                zip_code = zip_match.group()
-                break
-        return street, city, state, zip_code
-    except:
-        return "Unknown", "New York", "NY", "10001"
+client = OpenAI(api_key=OPENAI_API_KEY)
 
 def search_google_places(query):
     url = "https://maps.googleapis.com/maps/api/place/textsearch/json"
@@ -40,7 +32,7 @@ def get_place_details(place_id):
     url = "https://maps.googleapis.com/maps/api/place/details/json"
     params = {
         'place_id': place_id,
-        'fields': 'name,formatted_address,formatted_phone_number,website,photos,types',
+        'fields': 'name,formatted_address,address_component,formatted_phone_number,website,photos,types',
         'key': GOOGLE_API_KEY
     }
     response = requests.get(url, params=params)
@@ -102,7 +94,7 @@ def generate_services(provider_name, provider_type):
 
 def create_provider(place_data, details, provider_type):
     name = place_data.get('name', 'Unknown')[:255]
-    street, city, state, zip_code = parse_address(details.get('formatted_address', ''))
+    address = normalize_place(details, ADDRESS_DEFAULTS)
     email_name = re.sub(r'[^a-z0-9]', '', name.lower())[:30]
     
     photos = get_photos(details)
@@ -119,10 +111,10 @@ def create_provider(place_data, details, provider_type):
         'email': f"{email_name}@example.com",
         'phone': details.get('formatted_phone_number', '(212) 555-0000'),
         'providerTypes': [provider_type],
-        'streetAddress': street[:255],
-        'city': city,
-        'state': state,
-        'zipCode': zip_code,
+        'streetAddress': address['street_address'][:255],
+        'city': address['city'],
+        'state': address['state'],
+        'zipCode': address['zip_code'],
         'website': details.get('website', '')[:500] if details.get('website') else '',
         'status': 'approved',
         'source': 'agent'
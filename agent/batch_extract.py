@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+========================================
+BATCH EXTRACTION
+Overnight provider extraction through the OpenAI Batch API
+========================================
+
+A batch job is a directory under EXPORT_DIRECTORY:
+
+    batch_<timestamp>/
+        job.json          search parameters, model, batch id and status
+        providers.jsonl   one crawled provider per line (key + provider)
+        requests.jsonl    Batch API input, one chat completion per provider
+        results.jsonl     parsed extraction per provider key (after download)
+
+Downloaded extractions are also written to the LLM cache under the same
+key a synchronous call would use, so re-crawling those sites later
+replays them instead of paying for the tokens again.
+
+Batch requests cost half of synchronous calls and do not count against
+the per-minute rate limits, so large backfills never stall. Results are
+matched back to providers by custom_id (the provider key).
+
+Usage:
+    python agent.py --city ... --state ... --type ... --batch-extract
+    python batch_extract.py status exports/batch_20260101_010101
+    python agent.py --resume-batch exports/batch_20260101_010101
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+# metrics reads METRICS_* when imported
+load_dotenv()
+
+from extraction import (
+    EXTRACTION_PROMPT_VERSION, RESPONSE_FORMAT, build_extraction_messages, parse_extraction, provider_key
+)
+from metrics import get_metrics
+
+# Batch API input limit per file
+MAX_BATCH_REQUESTS = 50000
+
+TERMINAL_STATUSES = {'completed', 'failed', 'expired', 'cancelled'}
+
+
+class BatchJob:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._request_count = None
+
+    @classmethod
+    def create(cls, export_directory: str, metadata: Dict) -> 'BatchJob':
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        directory = os.path.join(export_directory, f"batch_{timestamp}")
+        os.makedirs(directory, exist_ok=True)
+
+        job = cls(directory)
+        job.save_meta(dict(metadata, created_at=datetime.now().isoformat(), status='collecting'))
+        return job
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    # ---- metadata -------------------------------------------------------
+
+    def load_meta(self) -> Dict:
+        with open(self._path('job.json')) as f:
+            return json.load(f)
+
+    def save_meta(self, meta: Dict):
+        tmp = self._path('job.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp, self._path('job.json'))
+
+    def update_meta(self, **updates) -> Dict:
+        with self._lock:
+            meta = self.load_meta()
+            meta.update(updates)
+            self.save_meta(meta)
+            return meta
+
+    # ---- collecting ------------------------------------------------------
+
+    def add(self, provider: Dict, text_content: Optional[str], model: str):
+        """Record a crawled provider; only providers with site text get a request"""
+        key = provider_key(provider)
+
+        with self._lock:
+            if self._request_count is None:
+                self._request_count = sum(1 for _ in self._read_jsonl('requests.jsonl'))
+
+            if text_content:
+                if self._request_count >= MAX_BATCH_REQUESTS:
+                    raise RuntimeError(f"Batch is full ({MAX_BATCH_REQUESTS} requests); start another job")
+
+                self._append('requests.jsonl', {
+                    'custom_id': key,
+                    'method': 'POST',
+                    'url': '/v1/chat/completions',
+                    'body': {
+                        'model': model,
+                        'messages': build_extraction_messages(text_content, provider),
+                        'temperature': 0.1,
+                        'response_format': RESPONSE_FORMAT,
+                    },
+                })
+                self._request_count += 1
+
+            self._append('providers.jsonl', {
+                'key': key,
+                'has_text': bool(text_content),
+                'provider': provider,
+            })
+
+    def _append(self, name: str, record: Dict):
+        with open(self._path(name), 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+    def _read_jsonl(self, name: str) -> Iterator[Dict]:
+        path = self._path(name)
+        if not os.path.exists(path):
+            return
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def request_count(self) -> int:
+        return sum(1 for _ in self._read_jsonl('requests.jsonl'))
+
+    # ---- Batch API -------------------------------------------------------
+
+    def submit(self, client) -> Optional[str]:
+        """Upload requests.jsonl and start the batch; returns the batch id"""
+        if not self.request_count():
+            self.update_meta(status='completed', batch_id=None)
+            return None
+
+        with open(self._path('requests.jsonl'), 'rb') as f:
+            input_file = client.files.create(file=f, purpose='batch')
+
+        batch = client.batches.create(
+            input_file_id=input_file.id,
+            endpoint='/v1/chat/completions',
+            completion_window='24h',
+            metadata={'job': os.path.basename(self.directory)},
+        )
+        self.update_meta(status=batch.status, batch_id=batch.id, input_file_id=input_file.id)
+        return batch.id
+
+    def refresh(self, client):
+        """Fetch the current batch state and record it in job.json"""
+        meta = self.load_meta()
+        if not meta.get('batch_id'):
+            return None
+
+        batch = client.batches.retrieve(meta['batch_id'])
+        counts = getattr(batch, 'request_counts', None)
+        self.update_meta(
+            status=batch.status,
+            output_file_id=batch.output_file_id,
+            error_file_id=batch.error_file_id,
+            request_counts=counts.model_dump() if hasattr(counts, 'model_dump') else None,
+        )
+        return batch
+
+    def wait(self, client, poll_interval: float = 60, timeout: float = None):
+        """Poll until the batch reaches a terminal status"""
+        started = time.time()
+        while True:
+            batch = self.refresh(client)
+            if batch is None or batch.status in TERMINAL_STATUSES:
+                return batch
+
+            if timeout and time.time() - started > timeout:
+                raise TimeoutError(f"Batch {batch.id} still {batch.status} after {timeout}s")
+
+            print(f"⏳ Batch {batch.id}: {batch.status}...")
+            time.sleep(poll_interval)
+
+    def download(self, client) -> Dict[str, Optional[Dict]]:
+        """Parse the batch output into results.jsonl; returns key -> extraction (None if failed)"""
+        meta = self.load_meta()
+        results: Dict[str, Optional[Dict]] = {}
+
+        if meta.get('output_file_id'):
+            content = client.files.content(meta['output_file_id']).text
+            for line in content.splitlines():
+                if line.strip():
+                    record = json.loads(line)
+                    key, data = self._parse_output_line(record)
+                    results[key] = data
+                    body = (record.get('response') or {}).get('body') or {}
+                    get_metrics().add_usage(body.get('model', meta.get('model', '')), body.get('usage'), batch=True)
+
+        with open(self._path('results.jsonl'), 'w') as f:
+            for key, data in results.items():
+                f.write(json.dumps({'key': key, 'extraction': data}) + '\n')
+
+        return results
+
+    @staticmethod
+    def _parse_output_line(record: Dict) -> Tuple[str, Optional[Dict]]:
+        key = record.get('custom_id')
+        response = record.get('response') or {}
+        if record.get('error') or response.get('status_code') != 200:
+            return key, None
+
+        try:
+            message = response['body']['choices'][0]['message']
+            if message.get('refusal'):
+                return key, None
+            return key, parse_extraction(message['content'])
+        except (KeyError, IndexError, TypeError, ValueError):
+            return key, None
+
+    def cache_results(self, llm_cache, results: Dict[str, Optional[Dict]]) -> int:
+        """Put every successful extraction into `llm_cache`; returns how many were stored"""
+        prompt_version = self.load_meta().get('prompt_version', EXTRACTION_PROMPT_VERSION)
+        stored = 0
+        for request in self._read_jsonl('requests.jsonl'):
+            extraction = results.get(request['custom_id'])
+            if extraction is None:
+                continue
+            body = request['body']
+            llm_cache.put(body['model'], prompt_version, json.dumps(body['messages']), extraction)
+            stored += 1
+        return stored
+
+    # ---- merging ---------------------------------------------------------
+
+    def load_results(self) -> Dict[str, Optional[Dict]]:
+        return {r['key']: r['extraction'] for r in self._read_jsonl('results.jsonl')}
+
+    def merged(self, results: Dict[str, Optional[Dict]]) -> Iterator[Tuple[Dict, bool, Optional[Dict]]]:
+        """Yield (provider, had_site_text, extraction or None) for every collected provider"""
+        for record in self._read_jsonl('providers.jsonl'):
+            yield record['provider'], record['has_text'], results.get(record['key'])
+
+
+def summarize(job: BatchJob) -> List[str]:
+    meta = job.load_meta()
+    lines = [
+        f"📦 Batch job: {job.directory}",
+        f"   Status: {meta.get('status')}  Batch ID: {meta.get('batch_id')}",
+        f"   Requests: {job.request_count()}",
+    ]
+    if meta.get('request_counts'):
+        lines.append(f"   Progress: {meta['request_counts']}")
+    return lines
+
+
+def main():
+    """Inspect a batch job: python batch_extract.py status <job_dir>"""
+    import argparse
+    from openai import OpenAI
+
+    parser = argparse.ArgumentParser(description='Carrotly batch extraction jobs')
+    parser.add_argument('command', choices=['status', 'wait'])
+    parser.add_argument('job_dir')
+    parser.add_argument('--poll', type=float, default=60, help='Seconds between status checks')
+    args = parser.parse_args()
+
+    if not os.path.exists(os.path.join(args.job_dir, 'job.json')):
+        print(f"❌ Not a batch job directory: {args.job_dir}")
+        sys.exit(1)
+
+    job = BatchJob(args.job_dir)
+    client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'), base_url=os.getenv('OPENAI_BASE_URL') or None)
+
+    if args.command == 'wait':
+        job.wait(client, poll_interval=args.poll)
+    else:
+        job.refresh(client)
+
+    for line in summarize(job):
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
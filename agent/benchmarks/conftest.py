@@ -0,0 +1,49 @@
+"""
+Pipeline benchmarks over the offline replay harness (see replay.py)
+
+    pip install pytest pytest-benchmark
+    cd agent && python -m pytest benchmarks --replay-providers 200 --replay-latency typical
+
+Fixtures are synthesized once per session unless --replay-fixtures points
+at a recorded directory (python agent.py ... --record DIR).
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from replay import Latency, ReplayEnvironment, synthesize  # noqa: E402
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('replay')
+    group.addoption('--replay-providers', type=int, default=100,
+                    help='Providers in the synthesized market (default 100)')
+    group.addoption('--replay-latency', default='none',
+                    help="Injected latency: 'none', 'typical' or 'places=0.1,site=0.3,llm=1.5,backend=0.03'")
+    group.addoption('--replay-fixtures', default=None,
+                    help='Recorded fixture directory to replay instead of synthesizing one')
+
+
+@pytest.fixture(scope='session')
+def fixture_dir(request, tmp_path_factory):
+    recorded = request.config.getoption('--replay-fixtures')
+    if recorded:
+        return recorded
+    directory = str(tmp_path_factory.mktemp('replay') / 'market')
+    synthesize(directory, providers=request.config.getoption('--replay-providers'))
+    return directory
+
+
+@pytest.fixture(scope='session')
+def latency(request):
+    return Latency.parse(request.config.getoption('--replay-latency'))
+
+
+@pytest.fixture
+def replay(fixture_dir, latency, tmp_path):
+    with ReplayEnvironment(fixture_dir, latency, workdir=str(tmp_path)) as env:
+        yield env
@@ -0,0 +1,66 @@
+"""
+End-to-end agent throughput on replayed fixtures
+
+Each benchmark runs the real pipeline once per round against a fresh fake
+admin API, then stores providers/sec per stage, request counts and the
+memory high-water mark in the benchmark's extra_info (shown with
+--benchmark-json / --benchmark-verbose).
+"""
+
+from replay import print_report
+
+
+def _record(benchmark, report):
+    benchmark.extra_info.update({
+        'providers': report['providers'],
+        'providers_per_second': report['providers_per_second'],
+        'stages': {name: {'count': s['count'], 'per_second': s['per_second'], 'p95_ms': s['p95_ms']}
+                   for name, s in report['stages'].items()},
+        'requests': {k: v for k, v in report['requests'].items() if k != 'http'},
+        'memory': report['memory'],
+        'latency': report['latency'],
+    })
+    print_report(report)
+
+
+def _bench(benchmark, replay, run):
+    reports = []
+    benchmark.pedantic(lambda: reports.append(run()), rounds=3, iterations=1, warmup_rounds=0)
+    # Extra untimed round with tracemalloc on: tracing slows allocation-heavy stages
+    report = run(trace_memory=True)
+    _record(benchmark, dict(reports[-1], memory=report['memory']))
+    return reports
+
+
+def _fresh(replay, **kwargs):
+    """Each round starts from an empty backend so every provider is created again"""
+    def run(trace_memory=False):
+        replay.admin.state.providers.clear()
+        return replay.run(trace_memory=trace_memory, **kwargs)
+    return run
+
+
+def test_discover_dedupe_upload(benchmark, replay):
+    reports = _bench(benchmark, replay, _fresh(replay, enrich=False))
+    report = reports[-1]
+    assert report['providers'] == replay.manifest['providers']
+    assert report['requests']['openai'] == 0
+    assert report['requests']['backend']['POST admin/providers/bulk'] >= 1
+
+
+def test_full_pipeline(benchmark, replay):
+    reports = _bench(benchmark, replay, _fresh(replay, enrich=True))
+    report = reports[-1]
+    assert report['providers'] == replay.manifest['providers']
+    assert report['requests']['openai'] == report['providers']
+    assert 'site miss' not in report['requests']['fixtures']
+    assert len(replay.admin.state.providers) == report['providers']
+
+
+def test_refresh(benchmark, replay):
+    replay.run(enrich=False)
+
+    reports = _bench(benchmark, replay, lambda trace_memory=False: replay.refresh(trace_memory=trace_memory))
+    report = reports[-1]
+    assert report['providers'] == replay.manifest['providers']
+    assert report['requests']['backend']['PATCH admin/providers'] >= 1
@@ -0,0 +1,150 @@
+"""
+========================================
+BULK PROVIDER INGEST CLIENT
+Batches provider + services + photos into POST /api/admin/providers/bulk
+========================================
+
+Creating a provider used to take one POST for the profile plus one per
+service (7-9 round trips each, no connection reuse). This client
+buffers complete providers with their services and photos nested, and
+sends them in batches through the shared rate-limited client
+(http_client.py), so 1,000 providers go out in a few dozen requests.
+
+The endpoint upserts (by Google place id, else name + ZIP), so a batch
+that is retried after a timeout cannot create duplicates.
+
+    with BulkIngestClient(f'{BACKEND_URL}/api', ADMIN_TOKEN,
+                          on_result=report) as bulk:
+        for place in places:
+            bulk.add(build_provider(place), context=place)
+"""
+
+import json
+import os
+import threading
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+
+from http_client import HttpClient, get_http
+
+BULK_BATCH_SIZE = int(os.getenv('BULK_BATCH_SIZE', 100))
+# Base64 photos make entries large; flush before a request gets this big
+BULK_MAX_BATCH_BYTES = int(os.getenv('BULK_MAX_BATCH_BYTES', 8 * 1024 * 1024))
+BULK_TIMEOUT = int(os.getenv('BULK_TIMEOUT', 120))
+
+# Server-side cap per request (BULK_MAX_PROVIDERS in backend/routes/admin.js)
+SERVER_MAX_PROVIDERS = 500
+
+
+class BulkIngestClient:
+    def __init__(self, api_base: str, token: Optional[str] = None,
+                 batch_size: int = BULK_BATCH_SIZE, max_batch_bytes: int = BULK_MAX_BATCH_BYTES,
+                 on_result: Callable[[object, Dict], None] = None,
+                 http: HttpClient = None, timeout: int = BULK_TIMEOUT):
+        """
+        Args:
+            api_base: API root including /api (e.g. https://host/api)
+            token: Admin bearer token
+            batch_size: Providers per request (capped at the server limit)
+            max_batch_bytes: Flush early when the serialized batch reaches this size
+            on_result: Called with (context, result) for every provider sent;
+                       result has status created|updated|skipped|error and id
+            http: Rate-limited client (defaults to the shared one)
+        """
+        self.url = f"{api_base.rstrip('/')}/admin/providers/bulk"
+        self.token = token
+        self.batch_size = max(1, min(batch_size, SERVER_MAX_PROVIDERS))
+        self.max_batch_bytes = max_batch_bytes
+        self.on_result = on_result
+        self.http = http or get_http()
+        self.timeout = timeout
+
+        self._buffer: List[Tuple[Dict, object]] = []
+        self._buffer_bytes = 0
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {'requests': 0, 'sent': 0, 'created': 0, 'updated': 0, 'skipped': 0, 'error': 0}
+
+    def _headers(self) -> Dict:
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        return headers
+
+    def add(self, provider: Dict, context: object = None) -> List[Dict]:
+        """Buffer one provider (services/photos nested); sends a batch when full"""
+        size = len(json.dumps(provider))
+        batch = None
+
+        with self._lock:
+            if self._buffer and self._buffer_bytes + size > self.max_batch_bytes:
+                batch = self._take()
+            self._buffer.append((provider, context))
+            self._buffer_bytes += size
+            if batch is None and len(self._buffer) >= self.batch_size:
+                batch = self._take()
+
+        return self._send(batch) if batch else []
+
+    def flush(self) -> List[Dict]:
+        """Send whatever is buffered"""
+        with self._lock:
+            batch = self._take()
+        return self._send(batch) if batch else []
+
+    def ingest(self, providers: Iterable[Dict]) -> Iterator[Dict]:
+        """Stream providers through in batches, yielding per-provider results"""
+        for provider in providers:
+            yield from self.add(provider)
+        yield from self.flush()
+
+    def _take(self) -> List[Tuple[Dict, object]]:
+        batch, self._buffer, self._buffer_bytes = self._buffer, [], 0
+        return batch
+
+    def _request(self, entries: List[Dict]) -> requests.Response:
+        # Safe to retry on 5xx: the endpoint upserts
+        return self.http.post(
+            'backend',
+            self.url,
+            headers=self._headers(),
+            json={'providers': entries},
+            timeout=self.timeout,
+            idempotent=True
+        )
+
+    def _send(self, batch: List[Tuple[Dict, object]]) -> List[Dict]:
+        try:
+            response = self._request([provider for provider, _ in batch])
+            response.raise_for_status()
+            results = response.json()['results']
+        except (requests.RequestException, ValueError, KeyError) as e:
+            results = [{'index': i, 'status': 'error', 'error': str(e)} for i in range(len(batch))]
+
+        with self._stats_lock:
+            self.stats['requests'] += 1
+            self.stats['sent'] += len(batch)
+            for result in results:
+                self.stats[result['status']] = self.stats.get(result['status'], 0) + 1
+
+        if self.on_result:
+            for result in results:
+                self.on_result(batch[result['index']][1], result)
+
+        return results
+
+    def report(self):
+        """Print the end-of-run ingest line"""
+        s = self.stats
+        print(f"📤 Bulk ingest: {s['sent']} providers in {s['requests']} requests "
+              f"({s['created']} created, {s['updated']} updated, {s['skipped']} skipped, {s['error']} failed)")
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self) -> 'BulkIngestClient':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,201 @@
+"""
+========================================
+PROVIDER SITE CRAWLER
+Bounded same-domain crawl packed into a token budget for AI extraction
+========================================
+
+Services, prices and accepted insurance rarely live on a practice's
+landing page. The crawler follows a handful of same-domain links that
+look like services / pricing / insurance / about pages, strips nav,
+footer and other boilerplate, then keeps only the most relevant
+paragraphs that fit the extraction budget.
+"""
+
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urldefrag, urlparse
+
+from bs4 import BeautifulSoup
+
+# Roughly 4 characters per token for English web copy
+CHARS_PER_TOKEN = 4
+
+# Link keywords and how much each page kind is worth to the extractor
+LINK_KEYWORDS = {
+    'pric': 5, 'fee': 4, 'cost': 4, 'rate': 3, 'menu': 3,
+    'service': 5, 'treatment': 5, 'procedure': 4, 'what-we-do': 3, 'offer': 3,
+    'insurance': 4, 'payment': 3, 'financ': 2, 'accept': 2,
+    'about': 2, 'team': 2, 'doctor': 2, 'provider': 2, 'staff': 1,
+}
+
+SKIP_LINK_RE = re.compile(
+    r'\.(pdf|jpe?g|png|gif|svg|webp|zip|docx?|xlsx?|mp4|mov)$|/(blog|news|careers?|privacy|terms|login|cart)\b',
+    re.I
+)
+
+BOILERPLATE_TAGS = ['script', 'style', 'noscript', 'template', 'svg', 'iframe',
+                    'nav', 'header', 'footer', 'aside', 'form', 'button']
+# Matched against whole class / id tokens by their leading or trailing part
+# ('site-header', 'cookie-banner'), so 'has-header-image' is left alone
+_BOILERPLATE_WORDS = r'(?:cookie|consent|navbar|nav|menu-toggle|footer|header|breadcrumbs?|social|popup|modal|newsletter)'
+BOILERPLATE_TOKEN_RE = re.compile(rf'^{_BOILERPLATE_WORDS}(?:[-_]|$)|[-_]{_BOILERPLATE_WORDS}$', re.I)
+# Page containers are never boilerplate, whatever their classes say
+KEEP_TAGS = {'html', 'body', 'main'}
+
+BLOCK_TAGS = ['h1', 'h2', 'h3', 'h4', 'p', 'li', 'td', 'dt', 'dd']
+
+PRICE_RE = re.compile(r'\$\s?\d[\d,]*(\.\d{2})?')
+RELEVANT_TERMS_RE = re.compile(
+    r'\b(service|treatment|procedure|exam|cleaning|consult\w*|therapy|session|visit|'
+    r'price|pricing|cost|fee|insurance|accept\w*|medicare|medicaid|ppo|hmo|'
+    r'minutes?|min|specialt\w+|board[- ]certified|years? of experience)\b',
+    re.I
+)
+
+
+def link_score(url: str, anchor_text: str) -> int:
+    haystack = f"{urlparse(url).path} {anchor_text}".lower()
+    return sum(weight for keyword, weight in LINK_KEYWORDS.items() if keyword in haystack)
+
+
+def clean_soup(html: str) -> BeautifulSoup:
+    """Parse with lxml and drop navigation, footers, forms and other boilerplate"""
+    soup = BeautifulSoup(html, 'lxml')
+
+    for tag in soup(BOILERPLATE_TAGS):
+        tag.decompose()
+
+    for tag in soup.find_all(is_boilerplate):
+        if not tag.decomposed:
+            tag.decompose()
+
+    return soup
+
+
+def is_boilerplate(tag) -> bool:
+    """True for elements whose class or id marks them as chrome (banners, menus, footers)"""
+    if tag.name in KEEP_TAGS:
+        return False
+    tokens = list(tag.get('class') or [])
+    if tag.get('id'):
+        tokens.append(tag['id'])
+    return any(BOILERPLATE_TOKEN_RE.search(token) for token in tokens)
+
+
+def block_score(text: str, page_weight: int) -> float:
+    """Relevance of one paragraph to services / pricing / insurance extraction"""
+    score = len(RELEVANT_TERMS_RE.findall(text)) + 3 * len(PRICE_RE.findall(text))
+    if score == 0:
+        return 0.0
+    # Favour blocks from high-value pages and penalise walls of text slightly
+    return (score + page_weight) / (1 + len(text) / 600)
+
+
+class SiteCrawler:
+    def __init__(self, fetch: Callable[[str], Optional[str]], max_pages: int = 5,
+                 token_budget: int = 3500, before_fetch: Callable[[str], None] = None):
+        """
+        Args:
+            fetch: url -> html (or None), e.g. TieredFetcher.fetch
+            max_pages: Pages to read per site, landing page included
+            token_budget: Approximate tokens of text to hand to the LLM
+            before_fetch: Hook called before each follow-up page (rate limiting)
+        """
+        self.fetch = fetch
+        self.max_pages = max(1, max_pages)
+        self.token_budget = token_budget
+        self.before_fetch = before_fetch
+
+    def crawl(self, url: str, landing_html: Optional[str] = None,
+              before_fetch: Callable[[str], None] = None) -> Optional[str]:
+        """Return budget-packed text for the site at `url`, or None if unreachable"""
+        before_fetch = before_fetch or self.before_fetch
+        landing_html = landing_html or self.fetch(url)
+        if not landing_html:
+            return None
+
+        pages = [(url, 0, landing_html)]
+        for link, weight in self._candidate_links(url, landing_html)[:self.max_pages - 1]:
+            if before_fetch:
+                before_fetch(link)
+            try:
+                html = self.fetch(link)
+            except Exception:
+                html = None
+            if html:
+                pages.append((link, weight, html))
+
+        return self.pack(pages)
+
+    def _candidate_links(self, base_url: str, html: str) -> List[Tuple[str, int]]:
+        soup = BeautifulSoup(html, 'lxml')
+        host = urlparse(base_url).netloc.lower().removeprefix('www.')
+        base_path = urlparse(base_url).path.rstrip('/')
+
+        scored: Dict[str, int] = {}
+        for anchor in soup.find_all('a', href=True):
+            link = urldefrag(urljoin(base_url, anchor['href']))[0]
+            parsed = urlparse(link)
+
+            if parsed.scheme not in ('http', 'https'):
+                continue
+            if parsed.netloc.lower().removeprefix('www.') != host:
+                continue
+            if parsed.path.rstrip('/') == base_path or SKIP_LINK_RE.search(parsed.path):
+                continue
+
+            score = link_score(link, anchor.get_text(' ', strip=True))
+            # Links with no services / pricing / insurance signal are not worth a fetch
+            if score <= 0:
+                continue
+            if score > scored.get(link, 0):
+                scored[link] = score
+
+        return sorted(scored.items(), key=lambda item: item[1], reverse=True)
+
+    def pack(self, pages: List[Tuple[str, int, str]]) -> str:
+        """Keep the highest scoring blocks that fit the budget, in page order"""
+        budget = self.token_budget * CHARS_PER_TOKEN
+        seen = set()
+        blocks = []  # (score, page_index, block_index, text, is_heading)
+
+        for page_index, (_, weight, html) in enumerate(pages):
+            soup = clean_soup(html)
+            for block_index, tag in enumerate(soup.find_all(BLOCK_TAGS)):
+                # Nested blocks (li > p) would be counted twice
+                if tag.find(BLOCK_TAGS):
+                    continue
+                text = tag.get_text(' ', strip=True)
+                key = text.lower()
+                if len(text) < 3 or key in seen:
+                    continue
+                seen.add(key)
+
+                # Headings carry no facts by themselves but label the blocks after them
+                is_heading = tag.name in ('h1', 'h2', 'h3', 'h4')
+                score = 0.5 if is_heading else block_score(text, weight)
+                if score > 0:
+                    blocks.append((score, page_index, block_index, text, is_heading))
+
+        kept, used = [], 0
+        for block in sorted(blocks, key=lambda b: b[0], reverse=True):
+            cost = len(block[3]) + 1
+            if used + cost > budget:
+                continue
+            kept.append(block)
+            used += cost
+
+        if all(block[4] for block in kept):
+            # Nothing matched the relevance terms; fall back to the cleaned landing page
+            return clean_soup(pages[0][2]).get_text('\n', strip=True)[:budget]
+
+        kept.sort(key=lambda b: (b[1], b[2]))
+
+        sections, current_page = [], None
+        for _, page_index, _, text, _ in kept:
+            if page_index != current_page:
+                current_page = page_index
+                sections.append(f"\n## {urlparse(pages[page_index][0]).path or '/'}")
+            sections.append(text)
+
+        return '\n'.join(sections).strip()
@@ -0,0 +1,245 @@
+"""
+========================================
+DUPLICATE INDEX
+In-memory fuzzy duplicate detection against a snapshot of existing providers
+========================================
+
+The agent pulls a compact snapshot of every provider once per run and
+answers duplicate checks locally instead of one API search per
+candidate. Scoring mirrors check_duplicate_provider() in schema.sql:
+
+    exact         same Google place id, or same name + address key
+    phone         same phone number
+    fuzzy_high    trigram similarity > 0.85 and same ZIP (or within 150 m)
+    fuzzy_medium  trigram similarity > 0.70 and same ZIP (or within 150 m)
+    address_only  same address key (street number, street, unit, ZIP5)
+
+Candidates are blocked by ZIP, geohash cell (with neighbours), phone and
+place id, so a lookup only scores the handful of providers nearby.
+Similarity is pg_trgm's: Jaccard overlap of padded word trigrams.
+"""
+
+import math
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Set
+
+from address import normalize_provider
+
+FUZZY_HIGH = 0.85
+FUZZY_MEDIUM = 0.70
+# Same-place radius used when ZIPs disagree or are missing
+NEARBY_METERS = 150
+# ~1.2 km x 0.6 km cells; a lookup checks the cell and its 8 neighbours
+GEOHASH_PRECISION = 6
+
+_GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+# Strongest first, as in the CASE order of check_duplicate_provider()
+MATCH_ORDER = ['exact', 'phone', 'fuzzy_high', 'fuzzy_medium', 'address_only']
+MATCH_CONFIDENCE = {'exact': 100, 'phone': 90, 'address_only': 60}
+
+
+def trigrams(text: str) -> Set[str]:
+    """pg_trgm trigrams: each lowercase word padded with two leading and one trailing space"""
+    grams = set()
+    for word in _WORD_RE.findall((text or '').lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    digits = re.sub(r'\D', '', phone or '')
+    return digits[-10:] if len(digits) >= 10 else None
+
+
+def geohash(lat: float, lng: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    code, bits, value, even = [], 0, 0, True
+    while len(code) < precision:
+        rng, coord = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            code.append(_GEOHASH_BASE32[value])
+            bits, value = 0, 0
+    return ''.join(code)
+
+
+def geohash_neighbourhood(lat: float, lng: float, precision: int = GEOHASH_PRECISION) -> Set[str]:
+    """The point's cell and the 8 around it"""
+    lat_step = 180.0 / 2 ** (5 * precision // 2)
+    lng_step = 360.0 / 2 ** (5 * precision - 5 * precision // 2)
+    return {
+        geohash(lat + dy * lat_step, lng + dx * lng_step, precision)
+        for dy in (-1, 0, 1) for dx in (-1, 0, 1)
+    }
+
+
+def _distance_m(a: Dict, b: Dict) -> float:
+    lat1, lng1, lat2, lng2 = map(math.radians, (a['lat'], a['lng'], b['lat'], b['lng']))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * 6371000 * math.asin(math.sqrt(h))
+
+
+def snapshot_entry(provider: Dict) -> Dict:
+    """Compact record from either the admin API shape (practiceName, address.zip,
+    location.coordinates) or the agent's own shape (practice_name, zip_code)"""
+    address = normalize_provider(provider)
+    coordinates = (provider.get('location') or {}).get('coordinates') or []
+    lat = provider.get('latitude')
+    lng = provider.get('longitude')
+    if lat is None and len(coordinates) == 2 and coordinates != [0, 0]:
+        lng, lat = coordinates
+
+    name = provider.get('practiceName') or provider.get('practice_name') or ''
+    return {
+        'id': provider.get('id') or provider.get('_id'),
+        'name': name,
+        'address_key': provider.get('address_key') or address['key'],
+        'zip': address['zip_code'],
+        'phone': normalize_phone(provider.get('phone')),
+        'place_id': provider.get('googlePlaceId') or provider.get('google_place_id'),
+        'lat': lat,
+        'lng': lng,
+        'grams': trigrams(name),
+    }
+
+
+class DuplicateIndex:
+    def __init__(self):
+        self._entries: List[Dict] = []
+        self._by_zip: Dict[str, List[int]] = {}
+        self._by_cell: Dict[str, List[int]] = {}
+        self._by_phone: Dict[str, List[int]] = {}
+        self._by_place: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_providers(cls, providers: Iterable[Dict]) -> 'DuplicateIndex':
+        index = cls()
+        for provider in providers:
+            index.add(provider)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, provider: Dict):
+        entry = snapshot_entry(provider)
+        with self._lock:
+            self._insert(entry)
+
+    def _insert(self, entry: Dict):
+        # Caller holds self._lock
+        position = len(self._entries)
+        self._entries.append(entry)
+        if entry['zip']:
+            self._by_zip.setdefault(entry['zip'], []).append(position)
+        if entry['lat'] is not None:
+            self._by_cell.setdefault(geohash(entry['lat'], entry['lng']), []).append(position)
+        if entry['phone']:
+            self._by_phone.setdefault(entry['phone'], []).append(position)
+        if entry['place_id']:
+            self._by_place[entry['place_id']] = position
+
+    def _candidates(self, probe: Dict) -> Set[int]:
+        candidates = set()
+        if probe['zip']:
+            candidates.update(self._by_zip.get(probe['zip'], ()))
+        if probe['lat'] is not None:
+            for cell in geohash_neighbourhood(probe['lat'], probe['lng']):
+                candidates.update(self._by_cell.get(cell, ()))
+        if probe['phone']:
+            candidates.update(self._by_phone.get(probe['phone'], ()))
+        return candidates
+
+    def _classify(self, probe: Dict, entry: Dict, score: float) -> Optional[str]:
+        same_zip = bool(probe['zip']) and probe['zip'] == entry['zip']
+        nearby = (probe['lat'] is not None and entry['lat'] is not None
+                  and _distance_m(probe, entry) <= NEARBY_METERS)
+        same_address = bool(probe['address_key']) and probe['address_key'] == entry['address_key']
+
+        if probe['name'].lower() == entry['name'].lower() and same_address:
+            return 'exact'
+        if probe['phone'] and probe['phone'] == entry['phone']:
+            return 'phone'
+        if score > FUZZY_HIGH and (same_zip or nearby):
+            return 'fuzzy_high'
+        if score > FUZZY_MEDIUM and (same_zip or nearby):
+            return 'fuzzy_medium'
+        if same_address:
+            return 'address_only'
+        return None
+
+    def check(self, provider: Dict) -> Dict:
+        """Best match for a candidate, in the shape check_duplicate used to return"""
+        probe = snapshot_entry(provider)
+
+        with self._lock:
+            if probe['place_id'] and probe['place_id'] in self._by_place:
+                entry = self._entries[self._by_place[probe['place_id']]]
+                return self._result('exact', 1.0, entry)
+            candidates = [self._entries[i] for i in self._candidates(probe)]
+
+        return self._best_match(probe, candidates)
+
+    def check_and_add(self, provider: Dict) -> Dict:
+        """
+        check() and, unless the candidate is an exact duplicate, add() as one step
+
+        Concurrent dedupe workers see each other's candidates: two copies of
+        the same place in one run cannot both pass as new.
+        """
+        probe = snapshot_entry(provider)
+
+        with self._lock:
+            if probe['place_id'] and probe['place_id'] in self._by_place:
+                entry = self._entries[self._by_place[probe['place_id']]]
+                return self._result('exact', 1.0, entry)
+            result = self._best_match(probe, [self._entries[i] for i in self._candidates(probe)])
+            if result['match_type'] != 'exact':
+                self._insert(probe)
+            return result
+
+    def _best_match(self, probe: Dict, candidates: List[Dict]) -> Dict:
+        best = None
+        for entry in candidates:
+            score = similarity(probe['grams'], entry['grams'])
+            match_type = self._classify(probe, entry, score)
+            if match_type is None:
+                continue
+            rank = (MATCH_ORDER.index(match_type), -score)
+            if best is None or rank < best[0]:
+                best = (rank, match_type, score, entry)
+
+        if best is None:
+            return {'is_duplicate': False, 'match_type': 'none', 'confidence': 0}
+        _, match_type, score, entry = best
+        return self._result(match_type, score, entry)
+
+    @staticmethod
+    def _result(match_type: str, score: float, entry: Dict) -> Dict:
+        return {
+            'is_duplicate': True,
+            'match_type': match_type,
+            'confidence': MATCH_CONFIDENCE.get(match_type, round(score * 100)),
+            'similarity': round(score, 3),
+            'existing_provider': {'id': entry['id'], 'practice_name': entry['name'], 'zip_code': entry['zip']}
+        }
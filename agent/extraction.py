@@ -0,0 +1,113 @@
+"""
+========================================
+PROVIDER EXTRACTION PROMPT & SCHEMA
+Shared by live extraction (agent.py) and overnight batches (batch_extract.py)
+========================================
+
+Extraction uses OpenAI structured outputs with a strict JSON schema, so
+the model can only answer with a document that parses. Fields the
+website does not mention come back as null / empty and are dropped by
+clean_extraction(), which keeps the old "omit what is not found"
+behaviour for provider.update().
+"""
+
+import json
+from typing import Dict, List
+
+from address import provider_address_key
+
+# Bump when the prompt or schema changes so cached results are not reused
+EXTRACTION_PROMPT_VERSION = 'extract-v2'
+
+SYSTEM_PROMPT = "You are a data extraction assistant. Always return valid JSON."
+
+_NULLABLE_INT = {'type': ['integer', 'null']}
+_NULLABLE_STR = {'type': ['string', 'null']}
+
+EXTRACTION_SCHEMA = {
+    'type': 'object',
+    'additionalProperties': False,
+    'required': ['services', 'bio', 'specialties', 'insurance_accepted', 'years_experience'],
+    'properties': {
+        'services': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'additionalProperties': False,
+                'required': ['name', 'category', 'duration_minutes', 'price_cents'],
+                'properties': {
+                    'name': {'type': 'string'},
+                    'category': _NULLABLE_STR,
+                    'duration_minutes': _NULLABLE_INT,
+                    'price_cents': _NULLABLE_INT,
+                },
+            },
+        },
+        'bio': _NULLABLE_STR,
+        'specialties': {'type': 'array', 'items': {'type': 'string'}},
+        'insurance_accepted': {'type': 'array', 'items': {'type': 'string'}},
+        'years_experience': _NULLABLE_INT,
+    },
+}
+
+RESPONSE_FORMAT = {
+    'type': 'json_schema',
+    'json_schema': {
+        'name': 'provider_extraction',
+        'strict': True,
+        'schema': EXTRACTION_SCHEMA,
+    },
+}
+
+
+def build_extraction_messages(text_content: str, provider: Dict) -> List[Dict]:
+    """Chat messages for one provider's crawled website text"""
+    prompt = f"""
+Extract information about this healthcare provider from their website content.
+
+Provider Name: {provider['practice_name']}
+Location: {provider['city']}, {provider['state']}
+
+Website Content:
+{text_content}
+
+Rules:
+- Only include information explicitly stated on the website
+- Service category is one of preventive|acute|cosmetic|etc
+- Price should be in cents (e.g., $150 = 15000)
+- If something is not found, use null or an empty list
+"""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def clean_extraction(data: Dict) -> Dict:
+    """Drop null / empty fields so provider.update() only sets what was found"""
+    cleaned = {}
+    for key, value in data.items():
+        if value in (None, '', []):
+            continue
+        if key == 'services':
+            value = [
+                {k: v for k, v in service.items() if v is not None}
+                for service in value
+                if service.get('name')
+            ]
+        cleaned[key] = value
+    return cleaned
+
+
+def parse_extraction(content: str) -> Dict:
+    """Parse a structured-output message body"""
+    return clean_extraction(json.loads(content))
+
+
+def provider_key(provider: Dict) -> str:
+    """Stable key used to match batch results back to providers"""
+    if provider.get('google_place_id'):
+        return provider['google_place_id']
+    # Same practice at another suite / street of the same ZIP is another provider
+    location = provider.get('address_key') or provider_address_key(provider) or provider.get('zip_code', '')
+    return f"{provider['practice_name']}|{location}".lower()
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+========================================
+FAKE ADMIN API SERVER
+Local stand-in for the backend endpoints the agent talks to
+========================================
+
+Keeps providers in memory so agent runs, refreshes and benchmarks work
+without MongoDB or a deployed backend:
+
+    POST  /api/admin/login                 any credentials, returns a token
+    GET   /api/admin/providers             limit/skip, source, refreshedBefore
+    POST  /api/admin/providers/bulk        upsert by googlePlaceId, else name + ZIP
+    PATCH /api/admin/providers             refresh diffs ({ updates: [{ id, set }] })
+    POST  /api/admin/agent/run             returns a runId
+    PATCH /api/admin/agent/run/:id         stores the counters
+
+Every request is counted per endpoint and can be delayed by a fixed
+latency, so benchmarks can model a slow backend.
+
+    server, api_base = start_fake_admin(latency=0.02)
+    ...
+    server.state.counts()      # {'POST admin/providers/bulk': 3, ...}
+    server.shutdown()
+
+Run directly to serve on a fixed port:
+    python fake_admin_server.py --port 8766
+"""
+
+import itertools
+import json
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+_ids = itertools.count(1)
+
+
+def _object_id() -> str:
+    return f"{int(time.time()):08x}{next(_ids):016x}"
+
+
+def _set_path(doc: Dict, path: str, value):
+    parts = path.split('.')
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+class FakeAdminState:
+    def __init__(self, providers: List[Dict] = None, latency: float = 0.0):
+        self.latency = latency
+        self.providers: Dict[str, Dict] = {}
+        self.agent_runs: Dict[str, Dict] = {}
+        self.requests = Counter()
+        self.lock = threading.Lock()
+        for provider in providers or []:
+            provider = dict(provider)
+            self.providers[str(provider.setdefault('_id', _object_id()))] = provider
+
+    def count(self, method: str, path: str):
+        segments = [':id' if len(s) == 24 or s.isdigit() else s for s in path.strip('/').split('/')]
+        if segments and segments[0] == 'api':
+            segments = segments[1:]
+        with self.lock:
+            self.requests[f"{method} {'/'.join(segments)}"] += 1
+
+    def counts(self) -> Dict[str, int]:
+        with self.lock:
+            return dict(self.requests)
+
+    # ---- providers ---------------------------------------------------------
+
+    def list_providers(self, query: Dict[str, str]) -> Dict:
+        with self.lock:
+            providers = list(self.providers.values())
+        if query.get('source'):
+            providers = [p for p in providers if p.get('source') == query['source']]
+        if query.get('refreshedBefore'):
+            cutoff = query['refreshedBefore']
+            providers = [p for p in providers
+                         if ((p.get('refresh') or {}).get('refreshedAt') or '') < cutoff]
+            providers.sort(key=lambda p: (p.get('refresh') or {}).get('refreshedAt') or '')
+        skip = int(query.get('skip', 0))
+        limit = int(query.get('limit', 1000))
+        return {'success': True, 'providers': providers[skip:skip + limit], 'total': len(providers),
+                'limit': limit, 'skip': skip}
+
+    # Like the real route's $setOnInsert: these only seed new providers
+    BULK_INSERT_ONLY = {
+        'status', 'source', 'email', 'phone', 'website', 'contactInfo', 'providerTypes',
+        'address', 'streetAddress', 'suite', 'city', 'state', 'zipCode',
+        'location', 'latitude', 'longitude',
+    }
+
+    @staticmethod
+    def _bulk_key(doc: Dict) -> Tuple:
+        if doc.get('googlePlaceId'):
+            return ('place', doc['googlePlaceId'])
+        return ('name', doc.get('practiceName'), doc.get('zipCode') or (doc.get('address') or {}).get('zip'))
+
+    def bulk_upsert(self, providers: List[Dict]) -> Dict:
+        results = []
+        with self.lock:
+            by_key = {self._bulk_key(p): p for p in self.providers.values()}
+            for index, input in enumerate(providers):
+                if not input.get('practiceName'):
+                    results.append({'index': index, 'status': 'error', 'error': 'practiceName is required'})
+                    continue
+                existing = by_key.get(self._bulk_key(input))
+                if existing:
+                    existing.update((k, v) for k, v in input.items() if k not in self.BULK_INSERT_ONLY)
+                    results.append({'index': index, 'id': existing['_id'], 'status': 'updated'})
+                    continue
+                provider = dict(input, _id=_object_id(), source=input.get('source', 'agent'),
+                                createdAt=datetime.utcnow().isoformat())
+                self.providers[provider['_id']] = provider
+                by_key[self._bulk_key(provider)] = provider
+                results.append({'index': index, 'id': provider['_id'], 'status': 'created'})
+        return self._with_stats(results, ('created', 'updated', 'skipped', 'error'))
+
+    def patch_providers(self, updates: List[Dict]) -> Dict:
+        results = []
+        with self.lock:
+            for index, entry in enumerate(updates):
+                provider = self.providers.get(str(entry.get('id')))
+                if provider is None:
+                    results.append({'index': index, 'id': entry.get('id'), 'status': 'not_found'})
+                    continue
+                for path, value in (entry.get('set') or {}).items():
+                    _set_path(provider, path, value)
+                changed = any(path.split('.')[0] != 'refresh' for path in entry.get('set') or {})
+                results.append({'index': index, 'id': provider['_id'],
+                                'status': 'updated' if changed else 'unchanged'})
+        return self._with_stats(results, ('updated', 'unchanged', 'not_found', 'error'))
+
+    @staticmethod
+    def _with_stats(results: List[Dict], statuses: Tuple[str, ...]) -> Dict:
+        stats = {status: 0 for status in statuses}
+        for result in results:
+            stats[result['status']] = stats.get(result['status'], 0) + 1
+        return {'success': stats.get('error', 0) == 0, 'results': results, 'stats': stats}
+
+
+def _make_handler(state: FakeAdminState):
+    class Handler(BaseHTTPRequestHandler):
+        # Keep-alive, like the real server behind the agent's pooled session
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _begin(self) -> Tuple[str, Dict, Optional[Dict]]:
+            url = urlparse(self.path)
+            state.count(self.command, url.path)
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length) or b'{}') if length else None
+            if state.latency:
+                time.sleep(state.latency)
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            return url.path.rstrip('/'), query, body
+
+        def do_GET(self):
+            path, query, _ = self._begin()
+            if path.endswith('/admin/providers'):
+                return self._send(200, state.list_providers(query))
+            self._send(404, {'success': False, 'message': f"unknown endpoint {path}"})
+
+        def do_POST(self):
+            path, _, body = self._begin()
+            body = body or {}
+            if path.endswith('/admin/login'):
+                return self._send(200, {'success': True, 'token': 'fake-admin-token'})
+            if path.endswith('/admin/providers/bulk'):
+                return self._send(200, state.bulk_upsert(body.get('providers') or []))
+            if path.endswith('/admin/agent/run'):
+                run_id = str(next(_ids))
+                with state.lock:
+                    state.agent_runs[run_id] = dict(body)
+                return self._send(200, {'success': True, 'runId': run_id})
+            self._send(404, {'success': False, 'message': f"unknown endpoint {path}"})
+
+        def do_PATCH(self):
+            path, _, body = self._begin()
+            body = body or {}
+            if path.endswith('/admin/providers'):
+                return self._send(200, state.patch_providers(body.get('updates') or []))
+            if '/admin/agent/run/' in path:
+                with state.lock:
+                    state.agent_runs.setdefault(path.rsplit('/', 1)[-1], {}).update(body)
+                return self._send(200, {'success': True})
+            self._send(404, {'success': False, 'message': f"unknown endpoint {path}"})
+
+    return Handler
+
+
+def start_fake_admin(providers: List[Dict] = None, latency: float = 0.0,
+                     port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the server on a background thread; returns (server, API base URL ending in /api)"""
+    state = FakeAdminState(providers, latency)
+    server = ThreadingHTTPServer(('127.0.0.1', port), _make_handler(state))
+    server.daemon_threads = True
+    server.state = state
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/api"
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Fake admin API for offline agent runs')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every request')
+    parser.add_argument('--providers', default=None, help='JSON file with providers to start with')
+    args = parser.parse_args()
+
+    seed = None
+    if args.providers:
+        with open(args.providers) as f:
+            seed = json.load(f)
+
+    server, api_base = start_fake_admin(seed, args.latency, args.port)
+    print(f"🧪 Fake admin API listening at {api_base} (set API_BASE_URL to use it)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
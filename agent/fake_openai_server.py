@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+========================================
+FAKE OPENAI SERVER
+Local stand-in for the Files, Batches and Chat Completions endpoints
+========================================
+
+Lets batch extraction be exercised end to end without an API key or
+network access. Batches complete as soon as they are created; every
+request is answered by a responder function that receives the request
+body and returns the JSON document the model "produced".
+
+    server, base_url = start_fake_openai()
+    client = OpenAI(api_key='test', base_url=base_url)
+    ...
+    server.shutdown()
+
+Run directly to serve on a fixed port:
+    python fake_openai_server.py --port 8765
+"""
+
+import email
+import email.policy
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Tuple
+
+_ids = itertools.count(1)
+
+
+def empty_extraction(body: Dict) -> Dict:
+    """Default responder: a schema-valid extraction that found nothing"""
+    return {
+        'services': [],
+        'bio': None,
+        'specialties': [],
+        'insurance_accepted': [],
+        'years_experience': None,
+    }
+
+
+def _completion(body: Dict, document: Dict) -> Dict:
+    return {
+        'id': f"chatcmpl-fake-{next(_ids)}",
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': body.get('model', 'fake'),
+        'choices': [{
+            'index': 0,
+            'finish_reason': 'stop',
+            'message': {'role': 'assistant', 'content': json.dumps(document), 'refusal': None},
+        }],
+        'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+    }
+
+
+class FakeOpenAIState:
+    def __init__(self, responder: Callable[[Dict], Dict]):
+        self.responder = responder
+        self.files: Dict[str, bytes] = {}
+        self.batches: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+
+    def new_file(self, content: bytes, purpose: str, filename: str) -> Dict:
+        file_id = f"file-fake-{next(_ids)}"
+        with self.lock:
+            self.files[file_id] = content
+        return {
+            'id': file_id, 'object': 'file', 'bytes': len(content), 'created_at': int(time.time()),
+            'filename': filename, 'purpose': purpose, 'status': 'processed',
+        }
+
+    def run_batch(self, input_file_id: str, endpoint: str, metadata: Dict) -> Dict:
+        lines = self.files[input_file_id].decode('utf-8').splitlines()
+        output = []
+        for line in filter(None, lines):
+            request = json.loads(line)
+            body = request['body']
+            output.append(json.dumps({
+                'id': f"batch_req_fake_{next(_ids)}",
+                'custom_id': request['custom_id'],
+                'response': {
+                    'status_code': 200,
+                    'request_id': f"req_fake_{next(_ids)}",
+                    'body': _completion(body, self.responder(body)),
+                },
+                'error': None,
+            }))
+
+        output_file = self.new_file(('\n'.join(output) + '\n').encode('utf-8'), 'batch_output', 'output.jsonl')
+        now = int(time.time())
+        batch = {
+            'id': f"batch_fake_{next(_ids)}",
+            'object': 'batch',
+            'endpoint': endpoint,
+            'errors': None,
+            'input_file_id': input_file_id,
+            'completion_window': '24h',
+            'status': 'completed',
+            'output_file_id': output_file['id'],
+            'error_file_id': None,
+            'created_at': now,
+            'completed_at': now,
+            'request_counts': {'total': len(output), 'completed': len(output), 'failed': 0},
+            'metadata': metadata,
+        }
+        with self.lock:
+            self.batches[batch['id']] = batch
+        return batch
+
+
+def _make_handler(state: FakeOpenAIState):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, payload, raw: bool = False):
+            body = payload if raw else json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/octet-stream' if raw else 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self) -> bytes:
+            return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+        def do_POST(self):
+            path = self.path.split('?')[0].rstrip('/')
+            body = self._body()
+
+            if path.endswith('/files'):
+                form = _parse_multipart(self.headers.get('Content-Type', ''), body)
+                content, filename = form.get('file', (b'', 'upload.jsonl'))
+                purpose = form.get('purpose', (b'batch', None))[0].decode('utf-8')
+                return self._send(200, state.new_file(content, purpose, filename))
+
+            payload = json.loads(body or b'{}')
+
+            if path.endswith('/batches'):
+                if payload.get('input_file_id') not in state.files:
+                    return self._send(404, {'error': {'message': 'input file not found'}})
+                return self._send(200, state.run_batch(
+                    payload['input_file_id'], payload.get('endpoint'), payload.get('metadata') or {}
+                ))
+
+            if path.endswith('/chat/completions'):
+                return self._send(200, _completion(payload, state.responder(payload)))
+
+            self._send(404, {'error': {'message': f"unknown endpoint {path}"}})
+
+        def do_GET(self):
+            parts = self.path.split('?')[0].strip('/').split('/')
+
+            if len(parts) >= 3 and parts[-3] == 'files' and parts[-1] == 'content':
+                content = state.files.get(parts[-2])
+                if content is None:
+                    return self._send(404, {'error': {'message': 'file not found'}})
+                return self._send(200, content, raw=True)
+
+            if len(parts) >= 2 and parts[-2] == 'batches':
+                batch = state.batches.get(parts[-1])
+                if batch is None:
+                    return self._send(404, {'error': {'message': 'batch not found'}})
+                return self._send(200, batch)
+
+            self._send(404, {'error': {'message': f"unknown endpoint {self.path}"}})
+
+    return Handler
+
+
+def _parse_multipart(content_type: str, body: bytes) -> Dict[str, Tuple[bytes, str]]:
+    """name -> (content, filename) for a multipart/form-data body"""
+    message = email.message_from_bytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode('utf-8') + body,
+        policy=email.policy.default
+    )
+    fields = {}
+    for part in message.iter_parts():
+        name = part.get_param('name', header='content-disposition')
+        fields[name] = (part.get_payload(decode=True) or b'', part.get_filename())
+    return fields
+
+
+def start_fake_openai(responder: Callable[[Dict], Dict] = empty_extraction,
+                      port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the server on a background thread; returns (server, base_url for OpenAI())"""
+    server = ThreadingHTTPServer(('127.0.0.1', port), _make_handler(FakeOpenAIState(responder)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Fake OpenAI server for offline batch tests')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    server, base_url = start_fake_openai(port=args.port)
+    print(f"🧪 Fake OpenAI listening at {base_url} (set OPENAI_BASE_URL to use it)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
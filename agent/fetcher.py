@@ -0,0 +1,277 @@
+"""
+========================================
+TIERED PAGE FETCHER
+Plain HTTP first, pooled headless Chrome only when a page needs JavaScript
+========================================
+
+Most practice websites are server-rendered, so a pooled requests.Session
+GET returns everything the extractor needs in a fraction of a second.
+Pages that come back as an empty JavaScript shell (or that block plain
+HTTP clients) are rendered by a small pool of reused headless browsers,
+which wait for the network to go quiet instead of sleeping a fixed time.
+"""
+
+import re
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import get_metrics
+
+# Visible text below this many characters usually means a client-rendered shell
+MIN_STATIC_TEXT_CHARS = 400
+
+# Statuses bot protection tends to send to non-browser clients
+ESCALATE_STATUSES = {403, 429, 503}
+
+_SCRIPT_STYLE_RE = re.compile(r'<(script|style|noscript|template)\b.*?</\1\s*>', re.I | re.S)
+_TAG_RE = re.compile(r'<[^>]+>')
+_WS_RE = re.compile(r'\s+')
+_JS_SHELL_MARKERS = (
+    re.compile(r'<noscript[^>]*>[^<]*(enable|requires?)\s+javascript', re.I),
+    re.compile(r'<div[^>]+id=["\'](root|app|__next|__nuxt)["\'][^>]*>\s*</div>', re.I),
+)
+
+# Resolves once no new network resources have started for `idleMs`
+_NETWORK_IDLE_JS = """
+const done = arguments[arguments.length - 1];
+const idleMs = arguments[0];
+let last = performance.getEntriesByType('resource').length;
+let quietSince = Date.now();
+const timer = setInterval(() => {
+  const count = performance.getEntriesByType('resource').length;
+  if (count !== last) { last = count; quietSince = Date.now(); }
+  if (document.readyState === 'complete' && Date.now() - quietSince >= idleMs) {
+    clearInterval(timer);
+    done(true);
+  }
+}, 100);
+"""
+
+
+def visible_text(html: str) -> str:
+    """Readable text of an HTML document, whitespace collapsed"""
+    text = _TAG_RE.sub(' ', _SCRIPT_STYLE_RE.sub(' ', html))
+    return _WS_RE.sub(' ', text).strip()
+
+
+def visible_text_length(html: str) -> int:
+    """Cheap estimate of how much readable text an HTML document holds"""
+    return len(visible_text(html))
+
+
+def looks_js_rendered(html: str) -> bool:
+    """True if the static HTML is probably a shell that JavaScript fills in"""
+    if visible_text_length(html) < MIN_STATIC_TEXT_CHARS:
+        return True
+    return any(marker.search(html) for marker in _JS_SHELL_MARKERS)
+
+
+class BrowserPool:
+    """Fixed-size pool of reused headless Chrome drivers, created lazily"""
+
+    def __init__(self, size: int, user_agent: str, timeout: int = 30, idle_ms: int = 500):
+        self.size = size
+        self.user_agent = user_agent
+        self.timeout = timeout
+        self.idle_ms = idle_ms
+        self._idle: List = []
+        self._drivers: List = []
+        # Live drivers plus ones being created; a discard frees a slot
+        self._slots = 0
+        self._available = threading.Condition()
+
+    def render(self, url: str) -> Optional[str]:
+        """Load `url` in a pooled browser and return the rendered HTML"""
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        with self._driver() as driver:
+            driver.get(url)
+
+            # DOM signal first, then wait for network idle
+            WebDriverWait(driver, self.timeout).until(
+                EC.presence_of_element_located((By.TAG_NAME, "body"))
+            )
+            try:
+                driver.execute_async_script(_NETWORK_IDLE_JS, self.idle_ms)
+            except Exception:
+                # Timed out waiting for idle (long-polling pages); take what rendered
+                pass
+
+            return driver.page_source
+
+    @contextmanager
+    def _driver(self):
+        driver = self._acquire()
+        try:
+            yield driver
+        except Exception:
+            # A driver that errored may be wedged; replace it
+            self._discard(driver)
+            raise
+        else:
+            with self._available:
+                self._idle.append(driver)
+                self._available.notify()
+
+    def _acquire(self):
+        with self._available:
+            while not self._idle and self._slots >= self.size:
+                self._available.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._slots += 1
+
+        # Start Chrome outside the lock so other threads can take idle drivers
+        try:
+            driver = self._create()
+        except Exception:
+            self._free_slot()
+            raise
+        with self._available:
+            self._drivers.append(driver)
+        return driver
+
+    def _free_slot(self):
+        with self._available:
+            self._slots -= 1
+            self._available.notify()
+
+    def _create(self):
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+
+        options = Options()
+        options.add_argument('--headless')
+        options.add_argument('--no-sandbox')
+        options.add_argument('--disable-dev-shm-usage')
+        options.add_argument(f'user-agent={self.user_agent}')
+
+        driver = webdriver.Chrome(options=options)
+        driver.set_page_load_timeout(self.timeout)
+        driver.set_script_timeout(self.timeout)
+        return driver
+
+    def _discard(self, driver):
+        # Freeing the slot wakes a waiter, which creates the replacement
+        with self._available:
+            if driver in self._drivers:
+                self._drivers.remove(driver)
+                self._slots -= 1
+                self._available.notify()
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def close(self):
+        with self._available:
+            drivers, self._drivers = self._drivers, []
+            self._idle = []
+            self._slots = 0
+            self._available.notify_all()
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+
+class TieredFetcher:
+    def __init__(self, user_agent: str, timeout: int = 30, browser_pool_size: int = 2):
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': user_agent,
+            'Accept': 'text/html,application/xhtml+xml;q=0.9,*/*;q=0.8',
+        })
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.browsers = BrowserPool(browser_pool_size, user_agent, timeout) if browser_pool_size > 0 else None
+        self.stats = {'http': 0, 'browser': 0, 'not_modified': 0, 'failed': 0}
+        self._stats_lock = threading.Lock()
+
+    def fetch(self, url: str) -> Optional[str]:
+        """Return page HTML, rendering in a browser only when plain HTTP is not enough"""
+        html = None
+        metrics = get_metrics()
+        try:
+            with metrics.timer('fetch_http'):
+                response = self.session.get(url, timeout=min(self.timeout, 15))
+            if response.status_code == 200:
+                html = response.text
+                if not looks_js_rendered(html):
+                    self._count('http')
+                    return html
+            elif response.status_code not in ESCALATE_STATUSES:
+                self._count('failed')
+                return None
+        except requests.RequestException as e:
+            print(f"⚠️  HTTP fetch failed for {url}: {e}")
+
+        if self.browsers is None:
+            self._count('http' if html else 'failed')
+            return html
+
+        try:
+            with metrics.timer('fetch_browser'):
+                rendered = self.browsers.render(url)
+            self._count('browser')
+            return rendered
+        except Exception as e:
+            print(f"⚠️  Browser render failed for {url}: {e}")
+            self._count('http' if html else 'failed')
+            return html
+
+    def fetch_conditional(self, url: str, etag: str = None, last_modified: str = None) -> Dict:
+        """
+        Plain-HTTP GET with If-None-Match / If-Modified-Since (no browser)
+
+        Returns:
+            {'status': 200 | 304 | <error status> | None, 'html', 'etag', 'last_modified'};
+            validators fall back to the ones sent when the server omits them
+        """
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+
+        result = {'status': None, 'html': None, 'etag': etag, 'last_modified': last_modified}
+        try:
+            with get_metrics().timer('fetch_http'):
+                response = self.session.get(url, headers=headers, timeout=min(self.timeout, 15))
+        except requests.RequestException as e:
+            print(f"⚠️  HTTP fetch failed for {url}: {e}")
+            self._count('failed')
+            return result
+
+        result['status'] = response.status_code
+        if response.status_code == 304:
+            self._count('not_modified')
+            return result
+        if response.status_code != 200:
+            self._count('failed')
+            return result
+
+        self._count('http')
+        result['html'] = response.text
+        result['etag'] = response.headers.get('ETag')
+        result['last_modified'] = response.headers.get('Last-Modified')
+        return result
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def close(self):
+        if self.browsers:
+            self.browsers.close()
+        self.session.close()
@@ -0,0 +1,388 @@
+"""
+========================================
+ZIP GAZETTEER
+Offline ZIP -> centroid, county, CBSA, city, state and pricing region
+========================================
+
+Geocoding a provider used to be one Nominatim call per address (with a
+1.1 s delay), and ZIP -> region only knew a few dozen 3-digit prefixes.
+Everything short of rooftop precision is now answered from a local
+file of fixed-size records sorted by ZIP, memory-mapped and binary
+searched, so a lookup is a few microseconds and nothing is loaded up
+front.
+
+The data is public but cannot be bundled, so it is built once from:
+
+    --zcta          Census ZCTA gazetteer (2020_Gaz_zcta_national.txt):
+                    internal point lat/lng and land area
+    --county-xwalk  HUD USPS ZIP -> county crosswalk (CSV): county FIPS,
+                    USPS preferred city and state
+    --cbsa-xwalk    HUD USPS ZIP -> CBSA crosswalk (CSV)
+    --counties      Census county gazetteer (optional): county names
+
+    python gazetteer.py build --zcta 2020_Gaz_zcta_national.txt \\
+        --county-xwalk ZIP_COUNTY_122023.csv --cbsa-xwalk ZIP_CBSA_122023.csv \\
+        --counties 2020_Gaz_counties_national.txt \\
+        --out ./data/zip_gazetteer.bin --backend-out ../backend/data/zipGazetteer.bin
+    python gazetteer.py lookup 10001 59715
+
+The same binary file is read by backend/services/zipGazetteer.js; a JSON
+export is available for anything else. Without a file, state and region
+still come from the ZIP prefix table below, which covers every US ZIP.
+
+File layout (little-endian):
+    header   magic 'ZGZ1', record count, records offset, strings offset
+    records  zip u32, lat f32, lng f32, land_km2 f32, county_fips u32,
+             cbsa u32, city u32, county_name u32, state 2s, region u8, pad
+    strings  NUL-terminated UTF-8; offset 0 is the empty string
+"""
+
+import csv
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+from typing import Dict, Iterator, Optional, Tuple
+
+ZIP_GAZETTEER_PATH = os.getenv('ZIP_GAZETTEER_PATH', './data/zip_gazetteer.bin')
+
+MAGIC = b'ZGZ1'
+HEADER = struct.Struct('<4sIII')
+RECORD = struct.Struct('<IfffIIII2sBx')
+
+# Pricing regions as in backend/services/geoPricingService.js (index = stored value)
+REGIONS = ['NATIONAL', 'NORTHEAST', 'SOUTHEAST', 'MIDWEST', 'SOUTHWEST', 'WEST', 'MOUNTAIN']
+
+REGION_BY_STATE = {
+    **dict.fromkeys(['CT', 'ME', 'MA', 'NH', 'RI', 'VT', 'NJ', 'NY', 'PA'], 'NORTHEAST'),
+    **dict.fromkeys(['DE', 'MD', 'DC', 'VA', 'WV', 'NC', 'SC', 'GA', 'FL', 'AL', 'MS', 'TN', 'KY',
+                     'AR', 'LA', 'PR', 'VI'], 'SOUTHEAST'),
+    **dict.fromkeys(['OH', 'MI', 'IN', 'IL', 'WI', 'MN', 'IA', 'MO', 'ND', 'SD', 'NE', 'KS'], 'MIDWEST'),
+    **dict.fromkeys(['TX', 'OK', 'NM', 'AZ'], 'SOUTHWEST'),
+    **dict.fromkeys(['CO', 'UT', 'WY', 'MT', 'ID', 'NV'], 'MOUNTAIN'),
+    **dict.fromkeys(['CA', 'OR', 'WA', 'AK', 'HI', 'GU', 'AS', 'MP'], 'WEST'),
+}
+
+# USPS 3-digit ZIP prefix ranges -> state (keep in sync with backend/services/zipGazetteer.js)
+ZIP3_RANGES = [
+    (5, 5, 'NY'), (6, 7, 'PR'), (8, 8, 'VI'), (9, 9, 'PR'), (10, 27, 'MA'), (28, 29, 'RI'),
+    (30, 38, 'NH'), (39, 49, 'ME'), (50, 54, 'VT'), (55, 55, 'MA'), (56, 59, 'VT'), (60, 69, 'CT'),
+    (70, 89, 'NJ'), (100, 149, 'NY'), (150, 196, 'PA'), (197, 199, 'DE'), (200, 200, 'DC'),
+    (201, 201, 'VA'), (202, 205, 'DC'), (206, 219, 'MD'), (220, 246, 'VA'), (247, 268, 'WV'),
+    (270, 289, 'NC'), (290, 299, 'SC'), (300, 319, 'GA'), (320, 339, 'FL'), (341, 349, 'FL'),
+    (350, 369, 'AL'), (370, 385, 'TN'), (386, 397, 'MS'), (398, 399, 'GA'), (400, 427, 'KY'),
+    (430, 459, 'OH'), (460, 479, 'IN'), (480, 499, 'MI'), (500, 528, 'IA'), (530, 549, 'WI'),
+    (550, 567, 'MN'), (569, 569, 'DC'), (570, 577, 'SD'), (580, 588, 'ND'), (590, 599, 'MT'),
+    (600, 629, 'IL'), (630, 658, 'MO'), (660, 679, 'KS'), (680, 693, 'NE'), (700, 714, 'LA'),
+    (716, 729, 'AR'), (730, 732, 'OK'), (733, 733, 'TX'), (734, 749, 'OK'), (750, 799, 'TX'),
+    (800, 816, 'CO'), (820, 831, 'WY'), (832, 838, 'ID'), (840, 847, 'UT'), (850, 865, 'AZ'),
+    (870, 884, 'NM'), (885, 885, 'TX'), (889, 898, 'NV'), (900, 961, 'CA'), (967, 968, 'HI'),
+    (969, 969, 'GU'), (970, 979, 'OR'), (980, 994, 'WA'), (995, 999, 'AK'),
+]
+
+KM_PER_DEGREE = 111.32
+SQ_KM_PER_SQ_METER = 1e-6
+
+
+def state_for_zip(zip_code: str) -> Optional[str]:
+    """State from the ZIP's 3-digit prefix (no data file needed)"""
+    digits = (zip_code or '').strip()[:3]
+    if len(digits) != 3 or not digits.isdigit():
+        return None
+    prefix = int(digits)
+    for low, high, state in ZIP3_RANGES:
+        if low <= prefix <= high:
+            return state
+    return None
+
+
+def region_for_state(state: Optional[str]) -> str:
+    return REGION_BY_STATE.get((state or '').upper(), 'NATIONAL')
+
+
+def _zip_int(zip_code: str) -> Optional[int]:
+    digits = (zip_code or '').strip()[:5]
+    return int(digits) if len(digits) == 5 and digits.isdigit() else None
+
+
+# ========================================
+# LOADER
+# ========================================
+
+class Gazetteer:
+    def __init__(self, path: str = ZIP_GAZETTEER_PATH):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count, self._records, self._strings = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not a ZIP gazetteer file")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _zip_at(self, index: int) -> int:
+        return struct.unpack_from('<I', self._map, self._records + index * RECORD.size)[0]
+
+    def _string(self, offset: int) -> str:
+        if not offset:
+            return ''
+        end = self._map.find(b'\0', self._strings + offset)
+        return self._map[self._strings + offset:end].decode('utf-8')
+
+    def _record(self, index: int) -> Dict:
+        (zip_int, lat, lng, land_km2, county_fips, cbsa, city, county_name, state,
+         region) = RECORD.unpack_from(self._map, self._records + index * RECORD.size)
+        has_centroid = not math.isnan(lat)
+        return {
+            'zip': f"{zip_int:05d}",
+            'lat': round(lat, 6) if has_centroid else None,
+            'lng': round(lng, 6) if has_centroid else None,
+            'land_km2': round(land_km2, 3) if has_centroid else None,
+            'county_fips': f"{county_fips:05d}" if county_fips else None,
+            'county': self._string(county_name) or None,
+            'cbsa': str(cbsa) if cbsa else None,
+            'city': self._string(city) or None,
+            'state': state.decode('ascii').strip() or None,
+            'region': REGIONS[region],
+        }
+
+    def lookup(self, zip_code: str) -> Optional[Dict]:
+        """Record for a 5-digit ZIP (ZIP+4 is fine), or None"""
+        target = _zip_int(zip_code)
+        if target is None:
+            return None
+        low, high = 0, self._count - 1
+        while low <= high:
+            mid = (low + high) // 2
+            value = self._zip_at(mid)
+            if value < target:
+                low = mid + 1
+            elif value > target:
+                high = mid - 1
+            else:
+                return self._record(mid)
+        return None
+
+    def centroid(self, zip_code: str) -> Optional[Tuple[float, float]]:
+        record = self.lookup(zip_code)
+        if record is None or record['lat'] is None:
+            return None
+        return record['lat'], record['lng']
+
+    def bounds(self, zip_code: str, margin: float = 1.5):
+        """
+        Square around the ZIP centroid sized from its land area
+
+        ZCTAs are not squares, so the box is padded by `margin`; a sweep
+        still dedupes by place id and splits saturated cells.
+        """
+        from sweep import BoundingBox
+
+        record = self.lookup(zip_code)
+        if record is None or record['lat'] is None or not record['land_km2']:
+            return None
+        half_km = math.sqrt(record['land_km2']) / 2 * margin
+        dlat = half_km / KM_PER_DEGREE
+        dlng = half_km / (KM_PER_DEGREE * max(math.cos(math.radians(record['lat'])), 0.01))
+        return BoundingBox(record['lat'] - dlat, record['lng'] - dlng, record['lat'] + dlat, record['lng'] + dlng)
+
+    def iter_records(self) -> Iterator[Dict]:
+        for index in range(self._count):
+            yield self._record(index)
+
+    def close(self):
+        self._map.close()
+
+
+_gazetteer = None
+_gazetteer_loaded = False
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer() -> Optional[Gazetteer]:
+    """Shared gazetteer for the process, or None when no file has been built"""
+    global _gazetteer, _gazetteer_loaded
+    with _gazetteer_lock:
+        if not _gazetteer_loaded:
+            _gazetteer_loaded = True
+            if os.path.exists(ZIP_GAZETTEER_PATH):
+                _gazetteer = Gazetteer(ZIP_GAZETTEER_PATH)
+        return _gazetteer
+
+
+def region_for_zip(zip_code: str) -> str:
+    """Pricing region for any US ZIP"""
+    gazetteer = get_gazetteer()
+    record = gazetteer.lookup(zip_code) if gazetteer else None
+    if record and record['state']:
+        return record['region']
+    return region_for_state(state_for_zip(zip_code))
+
+
+# ========================================
+# BUILDER
+# ========================================
+
+def _rows(path: str) -> Iterator[Dict[str, str]]:
+    """Census gazetteers are tab-separated, HUD exports comma-separated; headers in any case"""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        sample = f.readline()
+        f.seek(0)
+        reader = csv.DictReader(f, delimiter='\t' if '\t' in sample else ',')
+        for row in reader:
+            yield {(key or '').strip().upper(): (value or '').strip() for key, value in row.items()}
+
+
+def _ratio(row: Dict[str, str]) -> float:
+    for column in ('TOT_RATIO', 'RES_RATIO', 'BUS_RATIO'):
+        try:
+            return float(row[column])
+        except (KeyError, ValueError):
+            continue
+    return 0.0
+
+
+def _best_by_zip(path: str, value_column: str) -> Dict[int, Dict[str, str]]:
+    """ZIPs that straddle counties / CBSAs keep the row with the largest address share"""
+    best: Dict[int, Tuple[float, Dict[str, str]]] = {}
+    for row in _rows(path):
+        zip_int = _zip_int(row.get('ZIP', ''))
+        if zip_int is None or not row.get(value_column):
+            continue
+        ratio = _ratio(row)
+        if zip_int not in best or ratio > best[zip_int][0]:
+            best[zip_int] = (ratio, row)
+    return {zip_int: row for zip_int, (_, row) in best.items()}
+
+
+def build(zcta_path: str, county_xwalk: str = None, cbsa_xwalk: str = None,
+          counties_path: str = None, out_path: str = ZIP_GAZETTEER_PATH) -> int:
+    """Compile the source files into a gazetteer file; returns the record count"""
+    records: Dict[int, Dict] = {}
+    for row in _rows(zcta_path):
+        zip_int = _zip_int(row.get('GEOID', ''))
+        if zip_int is None:
+            continue
+        records[zip_int] = {
+            'lat': float(row['INTPTLAT']),
+            'lng': float(row['INTPTLONG']),
+            'land_km2': float(row.get('ALAND') or 0) * SQ_KM_PER_SQ_METER,
+        }
+
+    county_names = {}
+    if counties_path:
+        county_names = {row['GEOID']: row['NAME'] for row in _rows(counties_path) if row.get('GEOID')}
+
+    if county_xwalk:
+        for zip_int, row in _best_by_zip(county_xwalk, 'COUNTY').items():
+            # PO box / unique ZIPs have no ZCTA, but still get city, county and region
+            record = records.setdefault(zip_int, {'lat': math.nan, 'lng': math.nan, 'land_km2': 0.0})
+            record['county_fips'] = int(row['COUNTY'])
+            record['county'] = county_names.get(row['COUNTY'].zfill(5), '')
+            record['city'] = row.get('USPS_ZIP_PREF_CITY', '').title()
+            record['state'] = row.get('USPS_ZIP_PREF_STATE', '')
+
+    if cbsa_xwalk:
+        for zip_int, row in _best_by_zip(cbsa_xwalk, 'CBSA').items():
+            if zip_int in records and row['CBSA'] != '99999':
+                records[zip_int]['cbsa'] = int(row['CBSA'])
+
+    strings = bytearray(b'\0')
+    offsets: Dict[str, int] = {'': 0}
+
+    def intern(value: str) -> int:
+        if value not in offsets:
+            offsets[value] = len(strings)
+            strings.extend(value.encode('utf-8') + b'\0')
+        return offsets[value]
+
+    body = bytearray()
+    for zip_int in sorted(records):
+        record = records[zip_int]
+        state = record.get('state') or state_for_zip(f"{zip_int:05d}") or ''
+        body += RECORD.pack(
+            zip_int, record['lat'], record['lng'], record['land_km2'],
+            record.get('county_fips', 0), record.get('cbsa', 0),
+            intern(record.get('city', '')), intern(record.get('county', '')),
+            state.encode('ascii')[:2].ljust(2), REGIONS.index(region_for_state(state))
+        )
+
+    records_offset = HEADER.size
+    strings_offset = records_offset + len(body)
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    tmp = f"{out_path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(records), records_offset, strings_offset))
+        f.write(body)
+        f.write(strings)
+    os.replace(tmp, out_path)
+    return len(records)
+
+
+def export_json(gazetteer: Gazetteer, path: str) -> int:
+    """Compact JSON: {"fields": [...], "zips": {"10001": [lat, lng, ...]}}"""
+    fields = ['lat', 'lng', 'county_fips', 'county', 'cbsa', 'city', 'state', 'region']
+    zips = {record['zip']: [record[field] for field in fields] for record in gazetteer.iter_records()}
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({'fields': fields, 'zips': zips}, f, separators=(',', ':'))
+    return len(zips)
+
+
+# ========================================
+# CLI INTERFACE
+# ========================================
+
+def main():
+    import argparse
+    import shutil
+    import time
+
+    parser = argparse.ArgumentParser(description='Build or query the offline ZIP gazetteer')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build_cmd = commands.add_parser('build', help='Compile Census / HUD files into a gazetteer file')
+    build_cmd.add_argument('--zcta', required=True, help='Census ZCTA gazetteer (tab-separated)')
+    build_cmd.add_argument('--county-xwalk', help='HUD ZIP-COUNTY crosswalk (CSV)')
+    build_cmd.add_argument('--cbsa-xwalk', help='HUD ZIP-CBSA crosswalk (CSV)')
+    build_cmd.add_argument('--counties', help='Census county gazetteer, for county names')
+    build_cmd.add_argument('--out', default=ZIP_GAZETTEER_PATH, help='Gazetteer file to write')
+    build_cmd.add_argument('--backend-out', help='Also copy the file here (backend/data/zipGazetteer.bin)')
+    build_cmd.add_argument('--json', help='Also write a JSON export')
+
+    lookup_cmd = commands.add_parser('lookup', help='Look up ZIP codes')
+    lookup_cmd.add_argument('zips', nargs='+')
+    lookup_cmd.add_argument('--path', default=ZIP_GAZETTEER_PATH)
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        started = time.time()
+        count = build(args.zcta, args.county_xwalk, args.cbsa_xwalk, args.counties, args.out)
+        print(f"🗺️  {count} ZIPs written to {args.out} ({os.path.getsize(args.out) / 1e6:.1f} MB, "
+              f"{time.time() - started:.1f}s)")
+        if args.backend_out:
+            shutil.copyfile(args.out, args.backend_out)
+            print(f"📁 Copied to {args.backend_out}")
+        if args.json:
+            gazetteer = Gazetteer(args.out)
+            export_json(gazetteer, args.json)
+            gazetteer.close()
+            print(f"📁 JSON export written to {args.json}")
+        return
+
+    gazetteer = Gazetteer(args.path) if os.path.exists(args.path) else None
+    for zip_code in args.zips:
+        record = gazetteer.lookup(zip_code) if gazetteer else None
+        if record is None:
+            state = state_for_zip(zip_code)
+            record = {'zip': zip_code, 'state': state, 'region': region_for_state(state), 'source': 'prefix'}
+        print(json.dumps(record))
+
+
+if __name__ == '__main__':
+    main()
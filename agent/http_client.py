@@ -0,0 +1,341 @@
+"""
+========================================
+HTTP CLIENT
+Pooled session with per-API token buckets and jittered retries
+========================================
+
+Agent scripts used to pace themselves with fixed sleeps between calls,
+often without a timeout and with no handling of 429 / OVER_QUERY_LIMIT
+or 5xx. Every outbound call now goes through one shared client:
+
+    - one keep-alive Session (connection pool shared by all threads)
+    - a token bucket per API (Places, Places Photo, OpenAI, backend);
+      a throttled response halves that API's rate, successes win it
+      back gradually, so runs go as fast as the quota allows
+    - exponential backoff with full jitter on 429, 5xx and the Places
+      OVER_QUERY_LIMIT / UNKNOWN_ERROR statuses, honouring Retry-After;
+      5xx and connection errors are only retried for idempotent calls
+    - per-endpoint call, retry, error, wait and latency counters
+
+    http = get_http()
+    response = http.get('places', f"{PLACES_BASE_URL}/details/json", params=params)
+    response = http.post('backend', f"{api_base}/admin/providers/bulk", json=body, idempotent=True)
+    result = http.call('openai', 'chat.completions', lambda: client.chat.completions.create(...))
+    http.report()
+"""
+
+import os
+import random
+import re
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Tuple, Type
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Requests per second per API (0 = unlimited)
+API_RATES = {
+    'places': float(os.getenv('PLACES_QPS', 10)),
+    'places_photo': float(os.getenv('PLACES_PHOTO_QPS', 10)),
+    'openai': float(os.getenv('OPENAI_RPS', 5)),
+    'backend': float(os.getenv('BACKEND_RPS', 20)),
+}
+
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 16))
+HTTP_TIMEOUT = int(os.getenv('HTTP_TIMEOUT', 30))
+HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', 5))
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 30
+
+THROTTLE_STATUSES = {429}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Places answers 200 with these in the body
+PLACES_THROTTLE_STATUSES = {'OVER_QUERY_LIMIT'}
+PLACES_RETRY_STATUSES = {'OVER_QUERY_LIMIT', 'UNKNOWN_ERROR'}
+
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+# Path segments that are ids (Mongo ObjectId, UUID, numbers) collapse to :id
+_ID_SEGMENT = re.compile(r'^([0-9a-f]{24}|[0-9a-f-]{32,36}|\d+)$', re.IGNORECASE)
+
+
+def make_session(pool_size: int = HTTP_POOL_SIZE, retries: int = 0) -> requests.Session:
+    """Keep-alive session; retries are left to HttpClient unless asked for here"""
+    retry = Retry(
+        total=retries,
+        backoff_factor=1,
+        status_forcelist=[502, 503, 504],
+        allowed_methods=frozenset(['GET', 'POST']),
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Full-jitter exponential backoff, or the server's Retry-After when given"""
+    if retry_after is not None:
+        return min(retry_after, BACKOFF_MAX_SECONDS)
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+def _retry_after(response: requests.Response) -> Optional[float]:
+    try:
+        return float(response.headers['Retry-After'])
+    except (KeyError, ValueError):
+        return None
+
+
+def endpoint_label(api: str, method: str, url: str) -> str:
+    """'backend POST admin/providers/bulk', 'places GET place/details', ..."""
+    segments = [':id' if _ID_SEGMENT.match(s) else s for s in urlparse(url).path.split('/') if s]
+    if segments and segments[-1] == 'json':
+        segments.pop()
+    return f"{api} {method} {'/'.join(segments[-3:])}"
+
+
+class TokenBucket:
+    """Thread-safe token bucket whose rate backs off when the API pushes back"""
+
+    def __init__(self, rate: float, burst: float = None):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = rate / 16
+        self.burst = burst or max(1.0, rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Block until a request may go out; returns seconds waited"""
+        if self.max_rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def throttled(self):
+        """Multiplicative decrease after a 429 / OVER_QUERY_LIMIT"""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+
+    def succeeded(self):
+        """Additive increase back towards the configured rate"""
+        if self.rate < self.max_rate:
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+class HttpClient:
+    def __init__(self, rates: Dict[str, float] = None, max_retries: int = HTTP_MAX_RETRIES,
+                 pool_size: int = HTTP_POOL_SIZE, timeout: int = HTTP_TIMEOUT):
+        """
+        Args:
+            rates: Requests per second per API name (defaults to API_RATES)
+            max_retries: Retries after the first attempt
+            pool_size: Keep-alive connections per host
+            timeout: Default request timeout (seconds)
+        """
+        self.session = make_session(pool_size)
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self._buckets = {api: TokenBucket(rate) for api, rate in (rates or API_RATES).items()}
+        self._stats: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, api: str) -> TokenBucket:
+        with self._lock:
+            if api not in self._buckets:
+                self._buckets[api] = TokenBucket(0)
+            return self._buckets[api]
+
+    def _record(self, endpoint: str, seconds: float = 0.0, waited: float = 0.0, **increments):
+        with self._lock:
+            s = self._stats.setdefault(endpoint, {
+                'calls': 0, 'retries': 0, 'throttled': 0, 'errors': 0,
+                'total_ms': 0.0, 'max_ms': 0.0, 'wait_ms': 0.0,
+            })
+            for key, value in increments.items():
+                s[key] += value
+            s['total_ms'] += seconds * 1000
+            s['max_ms'] = max(s['max_ms'], seconds * 1000)
+            s['wait_ms'] += waited * 1000
+
+    # ---- requests ----------------------------------------------------------
+
+    def request(self, api: str, method: str, url: str, endpoint: str = None,
+                idempotent: bool = None, retries: int = None, **kwargs) -> requests.Response:
+        """
+        Rate-limited request with retries
+
+        Args:
+            api: Bucket name ('places', 'places_photo', 'openai', 'backend')
+            endpoint: Counter label (derived from the URL by default)
+            idempotent: Whether 5xx / connection errors may be retried
+                        (default: by HTTP method; 429 is always retried)
+            retries: Override max_retries; streamed bodies are never retried
+
+        Returns:
+            The final response (callers still check its status)
+        """
+        method = method.upper()
+        endpoint = endpoint or endpoint_label(api, method, url)
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        if retries is None:
+            retries = self.max_retries
+        data = kwargs.get('data')
+        if data is not None and not isinstance(data, (bytes, str, dict, list, tuple)):
+            retries = 0
+        kwargs.setdefault('timeout', self.timeout)
+
+        bucket = self.limiter(api)
+        attempt = 0
+        while True:
+            waited = bucket.acquire()
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self._record(endpoint, time.perf_counter() - start, waited, calls=1, errors=1)
+                if not idempotent or attempt >= retries:
+                    raise
+                attempt += 1
+                self._record(endpoint, retries=1)
+                time.sleep(backoff_delay(attempt))
+                continue
+            elapsed = time.perf_counter() - start
+
+            throttled, retryable = self._classify(api, response)
+            if throttled:
+                bucket.throttled()
+            else:
+                bucket.succeeded()
+
+            if retryable and (throttled or idempotent) and attempt < retries:
+                attempt += 1
+                self._record(endpoint, elapsed, waited, calls=1, retries=1, throttled=int(throttled))
+                time.sleep(backoff_delay(attempt, _retry_after(response)))
+                continue
+
+            self._record(endpoint, elapsed, waited, calls=1, throttled=int(throttled),
+                         errors=int(response.status_code >= 400 or retryable))
+            return response
+
+    @staticmethod
+    def _classify(api: str, response: requests.Response) -> Tuple[bool, bool]:
+        """(throttled, retryable) for a response"""
+        status = response.status_code
+        if status in RETRY_STATUSES:
+            return status in THROTTLE_STATUSES, True
+        if api == 'places' and status == 200 and 'json' in response.headers.get('Content-Type', ''):
+            try:
+                places_status = response.json().get('status')
+            except ValueError:
+                return False, False
+            return places_status in PLACES_THROTTLE_STATUSES, places_status in PLACES_RETRY_STATUSES
+        return False, False
+
+    def get(self, api: str, url: str, **kwargs) -> requests.Response:
+        return self.request(api, 'GET', url, **kwargs)
+
+    def post(self, api: str, url: str, **kwargs) -> requests.Response:
+        return self.request(api, 'POST', url, **kwargs)
+
+    def patch(self, api: str, url: str, **kwargs) -> requests.Response:
+        return self.request(api, 'PATCH', url, **kwargs)
+
+    def delete(self, api: str, url: str, **kwargs) -> requests.Response:
+        return self.request(api, 'DELETE', url, **kwargs)
+
+    # ---- SDK calls ---------------------------------------------------------
+
+    def call(self, api: str, endpoint: str, fn: Callable[[], object],
+             retry_on: Iterable[Type[BaseException]] = ()) -> object:
+        """
+        Run an SDK call (OpenAI, googlemaps) under the same limits and counters
+
+        Exceptions carrying a retryable `status_code` (e.g. openai.RateLimitError)
+        and those in retry_on are retried with backoff; SDK retries should be off.
+        """
+        retry_on = tuple(retry_on)
+        bucket = self.limiter(api)
+        label = f"{api} {endpoint}"
+        attempt = 0
+        while True:
+            waited = bucket.acquire()
+            start = time.perf_counter()
+            try:
+                result = fn()
+            except Exception as e:
+                elapsed = time.perf_counter() - start
+                status = getattr(e, 'status_code', None)
+                throttled = status in THROTTLE_STATUSES
+                if throttled:
+                    bucket.throttled()
+                if (status in RETRY_STATUSES or isinstance(e, retry_on)) and attempt < self.max_retries:
+                    attempt += 1
+                    self._record(label, elapsed, waited, calls=1, retries=1, throttled=int(throttled))
+                    time.sleep(backoff_delay(attempt))
+                    continue
+                self._record(label, elapsed, waited, calls=1, errors=1, throttled=int(throttled))
+                raise
+            bucket.succeeded()
+            self._record(label, time.perf_counter() - start, waited, calls=1)
+            return result
+
+    # ---- reporting ---------------------------------------------------------
+
+    def stats(self) -> Dict[str, Dict]:
+        """Per-endpoint counters with average latency"""
+        with self._lock:
+            snapshot = {endpoint: dict(s) for endpoint, s in self._stats.items()}
+        for s in snapshot.values():
+            s['avg_ms'] = round(s['total_ms'] / s['calls'], 1) if s['calls'] else 0.0
+            s['max_ms'] = round(s['max_ms'], 1)
+            s['wait_ms'] = round(s['wait_ms'], 1)
+            del s['total_ms']
+        return snapshot
+
+    def report(self):
+        """Print one line per endpoint"""
+        stats = self.stats()
+        if not stats:
+            return
+        print("🌐 HTTP:")
+        for endpoint, s in sorted(stats.items()):
+            print(f"   {endpoint}: {s['calls']} calls, avg {s['avg_ms']:.0f} ms, max {s['max_ms']:.0f} ms, "
+                  f"{s['retries']} retries, {s['throttled']} throttled, {s['errors']} errors, "
+                  f"{s['wait_ms'] / 1000:.1f}s waiting for quota")
+
+    def close(self):
+        self.session.close()
+
+
+_http = None
+_http_lock = threading.Lock()
+
+
+def get_http() -> HttpClient:
+    """Shared client for the whole process"""
+    global _http
+    with _http_lock:
+        if _http is None:
+            _http = HttpClient()
+        return _http
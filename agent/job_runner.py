@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+========================================
+MULTI-MARKET JOB RUNNER
+Runs every market / category in a job spec concurrently under global quotas
+========================================
+
+Each market used to get its own copy of the agent (agent_nyc_*.py,
+agent_dental_debug.py, add_albania_provider.py) with hard-coded
+queries, provider types and address defaults. A market is now an entry
+in a JSON (or YAML) job spec:
+
+    {
+      "name": "east-coast",
+      "workers": 3,
+      "budget_usd": 40,
+      "quotas": {"places_qps": 10, "openai_rps": 5, "backend_rps": 20},
+      "defaults": {"max_profiles": 25, "query_template": "{query} in {location}"},
+      "markets": [
+        {"name": "nyc", "city": "New York", "state": "NY",
+         "areas": ["SoHo, Manhattan", "Williamsburg, Brooklyn"],
+         "categories": ["dental", "cosmetic"],
+         "queries": {"cosmetic": ["medical spa", "botox"]},
+         "address_defaults": {"zip_code": "10001"},
+         "budget_usd": 15}
+      ]
+    }
+
+Every (market, category, area) becomes one job, run as a full
+ProviderAgent.run() in its own process. Quotas are split evenly across
+the worker processes so the combined rate stays inside the global one.
+No new job starts once the spend of finished jobs reaches the global
+budget, and each job is capped at what is left of it. All jobs end up
+in one consolidated report in EXPORT_DIRECTORY. Overlapping areas are
+safe: the bulk ingest endpoint upserts by Google place id.
+
+    python job_runner.py jobs/markets.example.json
+    python job_runner.py jobs/markets.example.json --only nyc --dry-run
+"""
+
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from typing import Dict, List
+
+from dotenv import load_dotenv
+
+# Before reading settings below (workers re-read .env when importing agent)
+load_dotenv()
+
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+JOB_LOG_DIRECTORY = os.getenv('JOB_LOG_DIRECTORY', './logs/jobs')
+
+# Spec quota keys and the http_client setting each one feeds
+QUOTA_ENV = {
+    'places_qps': 'PLACES_QPS',
+    'places_photo_qps': 'PLACES_PHOTO_QPS',
+    'openai_rps': 'OPENAI_RPS',
+    'backend_rps': 'BACKEND_RPS',
+}
+
+# Job settings a market (or the spec defaults) may set
+JOB_KEYS = ('max_profiles', 'enrich', 'batch_extract', 'query_template', 'budget_usd',
+            'cell_km', 'bbox', 'zips', 'address_defaults')
+
+
+class JobSpecError(ValueError):
+    pass
+
+
+# ========================================
+# SPEC
+# ========================================
+
+def load_spec(path: str) -> Dict:
+    """Read a job spec from .json, or .yaml / .yml when PyYAML is installed"""
+    with open(path) as f:
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise JobSpecError('YAML job specs need PyYAML (pip install pyyaml); or use JSON')
+            spec = yaml.safe_load(f)
+        else:
+            spec = json.load(f)
+
+    if not isinstance(spec, dict) or not spec.get('markets'):
+        raise JobSpecError(f"{path}: a job spec needs a non-empty 'markets' list")
+    spec.setdefault('name', os.path.splitext(os.path.basename(path))[0])
+    return spec
+
+
+def expand_jobs(spec: Dict, only: List[str] = None) -> List[Dict]:
+    """One job per market, category and area, with defaults applied"""
+    defaults = spec.get('defaults') or {}
+    jobs = []
+
+    for market in spec['markets']:
+        name = market.get('name')
+        if not name or not market.get('city') or not market.get('state'):
+            raise JobSpecError(f"market {market!r} needs 'name', 'city' and 'state'")
+        if only and name not in only:
+            continue
+
+        categories = market.get('categories') or defaults.get('categories')
+        if not categories:
+            raise JobSpecError(f"market {name!r} has no 'categories'")
+        queries = dict(spec.get('queries') or {}, **(market.get('queries') or {}))
+        areas = market.get('areas') or [market.get('location') or f"{market['city']}, {market['state']}"]
+
+        settings = {key: market.get(key, defaults.get(key)) for key in JOB_KEYS}
+        if settings['max_profiles'] is None:
+            settings['max_profiles'] = spec.get('max_profiles')
+        # A market budget is shared by its jobs
+        job_count = len(categories) * (1 if settings['bbox'] or settings['zips'] else len(areas))
+        if settings['budget_usd']:
+            settings['budget_usd'] = settings['budget_usd'] / job_count
+
+        for category in categories:
+            # Sweep jobs tile the market's boxes / ZIPs once instead of per area
+            for area in (areas[:1] if settings['bbox'] or settings['zips'] else areas):
+                label = f"{name}/{category}" + (f"/{area}" if len(areas) > 1 else '')
+                jobs.append(dict(
+                    settings,
+                    name=label,
+                    market=name,
+                    city=market['city'],
+                    state=market['state'],
+                    provider_type=category,
+                    location=area,
+                    queries=queries.get(category),
+                    enrich=settings['enrich'] if settings['enrich'] is not None else True,
+                ))
+    return jobs
+
+
+def worker_env(spec: Dict, workers: int) -> Dict[str, str]:
+    """Per-process http_client rates: the global quota split across the workers"""
+    env = {}
+    for key, setting in QUOTA_ENV.items():
+        rate = (spec.get('quotas') or {}).get(key)
+        if rate is not None:
+            env[setting] = str(float(rate) / workers)
+    return env
+
+
+# ========================================
+# WORKER PROCESS
+# ========================================
+
+def _init_worker(env: Dict[str, str]):
+    # Before agent / http_client are imported, which read their settings once
+    os.environ.update(env)
+
+
+def run_job(job: Dict, log_directory: str) -> Dict:
+    """Run one job in this process, logging to its own file; returns its report entry"""
+    os.makedirs(log_directory, exist_ok=True)
+    log_path = os.path.join(log_directory, job['name'].replace('/', '_').replace(' ', '_') + '.log')
+    started = time.time()
+    entry = {'name': job['name'], 'market': job['market'], 'provider_type': job['provider_type'],
+             'location': job['location'], 'log': log_path}
+
+    with open(log_path, 'a', buffering=1) as log:
+        sys.stdout = sys.stderr = log
+        agent = None
+        try:
+            from agent import ProviderAgent
+            from sweep import BoundingBox
+
+            agent = ProviderAgent(enrich=job['enrich'])
+            sweep_areas = [BoundingBox.parse(box) for box in job.get('bbox') or []]
+            for zip_code in job.get('zips') or []:
+                box = agent.maps_discovery.zip_bounds(str(zip_code))
+                if box:
+                    sweep_areas.append(box)
+
+            agent.run(
+                job['city'], job['state'], job['provider_type'], job.get('max_profiles'),
+                sweep_areas, job.get('cell_km'), job.get('batch_extract') or False,
+                queries=job.get('queries'),
+                location=job['location'],
+                query_template=job.get('query_template'),
+                budget_usd=job.get('budget_usd'),
+                address_defaults=job.get('address_defaults')
+            )
+            entry['status'] = 'completed'
+        except BaseException as e:
+            traceback.print_exc()
+            entry['status'] = 'failed'
+            entry['error'] = str(e) or type(e).__name__
+        finally:
+            sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+
+    if agent is not None:
+        results = agent.results
+        entry.update({
+            'run_id': agent.journal.run_id if agent.journal else None,
+            'providers_found': results['providers_found'],
+            'profiles_created': len(results['profiles_created']),
+            'exact_duplicates': len(results['exact_duplicates']),
+            'flagged_for_review': len(results['flagged_for_review']),
+            'errors': len(results['errors']),
+            'metrics': agent._metrics_snapshot(),
+        })
+    entry['duration_seconds'] = round(time.time() - started, 1)
+    return entry
+
+
+# ========================================
+# SCHEDULER
+# ========================================
+
+def _cost(entry: Dict) -> float:
+    return ((entry.get('metrics') or {}).get('cost_usd') or {}).get('total') or 0.0
+
+
+def run_spec(spec: Dict, jobs: List[Dict], workers: int = None, log_directory: str = None) -> Dict:
+    """Run the jobs across worker processes; returns the consolidated report"""
+    workers = max(1, min(workers or spec.get('workers') or JOB_WORKERS, len(jobs)))
+    log_directory = os.path.join(log_directory or JOB_LOG_DIRECTORY,
+                                 f"{spec['name']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    budget = spec.get('budget_usd')
+    started = time.time()
+
+    print(f"\n{'='*60}")
+    print(f"🗂️  JOB RUN: {spec['name']}")
+    print(f"{'='*60}")
+    print(f"📋 Jobs: {len(jobs)} across {len({job['market'] for job in jobs})} market(s)")
+    print(f"⚙️  Workers: {workers}")
+    if budget:
+        print(f"💵 Budget: ${budget:.2f}")
+    print(f"📝 Logs: {log_directory}")
+    print(f"{'='*60}\n")
+
+    pending = list(jobs)
+    entries: List[Dict] = []
+    running = {}
+    spent = 0.0
+
+    # A fresh interpreter per job: agent imports with the split quota, and the
+    # process-wide metrics / HTTP stats belong to that job alone. Each job gets
+    # its own single-process pool (max_tasks_per_child needs Python 3.11)
+    context = multiprocessing.get_context('spawn')
+    env = worker_env(spec, workers)
+    try:
+        while pending or running:
+            while pending and len(running) < workers:
+                if budget and spent >= budget:
+                    for job in pending:
+                        entries.append({'name': job['name'], 'market': job['market'],
+                                        'provider_type': job['provider_type'], 'location': job['location'],
+                                        'status': 'skipped', 'error': 'global budget reached'})
+                        print(f"⏭️  {job['name']}: skipped (global budget reached)")
+                    pending = []
+                    break
+                job = pending.pop(0)
+                if budget:
+                    # Running jobs may still spend; this only caps the new one
+                    job = dict(job, budget_usd=min(job.get('budget_usd') or budget, budget - spent))
+                pool = ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=_init_worker,
+                                           initargs=(env,))
+                running[pool.submit(run_job, job, log_directory)] = (job, pool)
+                print(f"▶️  {job['name']}: started")
+
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                job, pool = running.pop(future)
+                pool.shutdown()
+                try:
+                    entry = future.result()
+                except Exception as e:
+                    # The worker process itself died
+                    entry = {'name': job['name'], 'market': job['market'], 'provider_type': job['provider_type'],
+                             'location': job['location'], 'status': 'failed', 'error': str(e)}
+                entries.append(entry)
+                spent += _cost(entry)
+                icon = '✅' if entry['status'] == 'completed' else '❌'
+                print(f"{icon} {entry['name']}: {entry['status']}, "
+                      f"{entry.get('profiles_created', 0)} created, ${_cost(entry):.4f}"
+                      + (f" ({entry['error']})" if entry.get('error') else ''))
+    finally:
+        # Interrupted: wait for the jobs already running, as the shared pool did
+        for _, pool in running.values():
+            pool.shutdown()
+
+    order = {job['name']: i for i, job in enumerate(jobs)}
+    entries.sort(key=lambda entry: order[entry['name']])
+    return build_report(spec, entries, time.time() - started, log_directory)
+
+
+def build_report(spec: Dict, entries: List[Dict], duration: float, log_directory: str) -> Dict:
+    """Per-job entries plus totals per market and overall"""
+    def totals(rows: List[Dict]) -> Dict:
+        created = sum(row.get('profiles_created', 0) for row in rows)
+        cost = round(sum(_cost(row) for row in rows), 4)
+        return {
+            'jobs': len(rows),
+            'failed': sum(row['status'] == 'failed' for row in rows),
+            'skipped': sum(row['status'] == 'skipped' for row in rows),
+            'providers_found': sum(row.get('providers_found', 0) for row in rows),
+            'profiles_created': created,
+            'exact_duplicates': sum(row.get('exact_duplicates', 0) for row in rows),
+            'flagged_for_review': sum(row.get('flagged_for_review', 0) for row in rows),
+            'errors': sum(row.get('errors', 0) for row in rows),
+            'api_calls': sum((row.get('metrics') or {}).get('api_calls', 0) for row in rows),
+            'cost_usd': cost,
+            'cost_per_profile_usd': round(cost / created, 4) if created else None,
+        }
+
+    markets = {}
+    for entry in entries:
+        markets.setdefault(entry['market'], []).append(entry)
+
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'spec': spec['name'],
+        'duration_seconds': round(duration, 1),
+        'budget_usd': spec.get('budget_usd'),
+        'quotas': spec.get('quotas') or {},
+        'logs': log_directory,
+        'totals': totals(entries),
+        'markets': {market: totals(rows) for market, rows in markets.items()},
+        'jobs': entries,
+    }
+
+
+def print_report(report: Dict):
+    print(f"\n{'='*60}")
+    print(f"📊 JOB RUN SUMMARY: {report['spec']}")
+    print(f"{'='*60}")
+    print(f"⏱️  Duration: {report['duration_seconds']:.1f} seconds")
+    print(f"{'Market':<16} {'Jobs':>5} {'Found':>6} {'Created':>8} {'Review':>7} {'Failed':>7} {'Cost':>10}")
+    for market, t in list(report['markets'].items()) + [('TOTAL', report['totals'])]:
+        print(f"{market:<16} {t['jobs']:>5} {t['providers_found']:>6} {t['profiles_created']:>8} "
+              f"{t['flagged_for_review']:>7} {t['failed']:>7} {'$' + format(t['cost_usd'], '.4f'):>10}")
+    if report['totals']['skipped']:
+        print(f"⏭️  Skipped (budget): {report['totals']['skipped']}")
+    print(f"{'='*60}\n")
+
+
+def export_report(report: Dict, directory: str) -> str:
+    os.makedirs(directory, exist_ok=True)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    filepath = os.path.join(directory, f"job_run_{report['spec']}_{timestamp}.json")
+    with open(filepath, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"📁 Report exported to: {filepath}")
+    return filepath
+
+
+# ========================================
+# CLI INTERFACE
+# ========================================
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run the agent for every market in a job spec')
+    parser.add_argument('spec', help='Job spec (.json, or .yaml with PyYAML installed)')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Worker processes (default: spec "workers", then JOB_WORKERS)')
+    parser.add_argument('--only', action='append', default=[], metavar='MARKET',
+                       help='Run only this market (repeatable)')
+    parser.add_argument('--dry-run', action='store_true', help='List the jobs without running them')
+
+    args = parser.parse_args()
+
+    try:
+        spec = load_spec(args.spec)
+        jobs = expand_jobs(spec, args.only)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if not jobs:
+        parser.error('no jobs to run (check --only)')
+
+    if args.dry_run:
+        for job in jobs:
+            budget = f" ≤ ${job['budget_usd']:.2f}" if job.get('budget_usd') else ''
+            print(f"{job['name']:<48} {job.get('max_profiles') or 'default':>7} profiles{budget}")
+        return
+
+    # Same checks agent.py makes, once instead of in every worker
+    from agent import Config
+    if not Config.API_ADMIN_EMAIL or not Config.API_ADMIN_PASSWORD:
+        print("❌ Error: API credentials not configured. Check your .env file.")
+        sys.exit(1)
+    if not Config.GOOGLE_MAPS_API_KEY:
+        print("❌ Error: Google Maps API key not configured. Check your .env file.")
+        sys.exit(1)
+    if any(job['enrich'] for job in jobs) and not Config.OPENAI_API_KEY:
+        print("❌ Error: OpenAI API key not configured. Check your .env file.")
+        sys.exit(1)
+
+    report = run_spec(spec, jobs, args.workers)
+    print_report(report)
+    export_report(report, Config.EXPORT_DIRECTORY)
+
+    if report['totals']['failed']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+========================================
+LLM RESULT CACHE
+Content-hash memoization for OpenAI extraction and service generation
+========================================
+
+Results are keyed by a hash of (model, prompt template version, input
+text), so a re-run after a crash or partial failure replays finished
+work from disk instead of paying for the same tokens again. Bump the
+prompt version whenever a template changes to invalidate old entries.
+
+Only successful results are stored: if the wrapped call raises (API
+error, unparseable JSON), nothing is cached and the caller's existing
+error handling runs as before.
+"""
+
+import os
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from disk_cache import DiskCache, make_key
+
+LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', './cache/llm.sqlite')
+LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL_SECONDS', 30 * 86400))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', 100000))
+LLM_CACHE_DISABLED = os.getenv('LLM_CACHE_DISABLED', 'false').lower() == 'true'
+
+
+class LLMCache:
+    def __init__(self, cache: Optional[DiskCache] = None, ttl: int = LLM_CACHE_TTL):
+        self.cache = cache
+        self.ttl = ttl
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def get_or_call(self, model: str, prompt_version: str, input_text: str,
+                    call: Callable[[], Any], ttl: Optional[int] = None) -> Any:
+        """Return the cached result for this input, or run `call` and cache what it returns"""
+        if self.cache is None:
+            return self._call(call)
+
+        key = make_key('llm', model, prompt_version, input_text)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached['result']
+
+        result = self._call(call)
+        self.cache.set(key, {'result': result}, ttl=self.ttl if ttl is None else ttl)
+        return result
+
+    def put(self, model: str, prompt_version: str, input_text: str, result: Any,
+            ttl: Optional[int] = None):
+        """Store a result produced elsewhere (e.g. a Batch API job) under its input's key"""
+        if self.cache is None:
+            return
+        key = make_key('llm', model, prompt_version, input_text)
+        self.cache.set(key, {'result': result}, ttl=self.ttl if ttl is None else ttl)
+
+    def _call(self, call: Callable[[], Any]) -> Any:
+        with self._lock:
+            self.calls += 1
+        return call()
+
+    def stats(self) -> Dict:
+        stats = self.cache.stats() if self.cache is not None else {'hits': 0, 'misses': 0, 'hit_rate': 0.0}
+        return dict(stats, api_calls=self.calls)
+
+    def report(self):
+        """Print the end-of-run hit/miss line"""
+        stats = self.stats()
+        print(f"🧠 LLM cache: {stats['hits']} hits, {stats['misses']} misses "
+              f"({stats['hit_rate']:.0%} hit rate), {stats['api_calls']} OpenAI calls made")
+
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    """Shared instance; a pass-through when LLM_CACHE_DISABLED=true"""
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            store = None
+            if not LLM_CACHE_DISABLED:
+                store = DiskCache(LLM_CACHE_PATH, table='llm', max_entries=LLM_CACHE_MAX_ENTRIES)
+            _llm_cache = LLMCache(store)
+        return _llm_cache
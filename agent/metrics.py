@@ -0,0 +1,305 @@
+"""
+========================================
+RUN METRICS
+Per-stage latency histograms, API call counts and cost estimates
+========================================
+
+The run summary used to show only total duration and counts, so a slow
+run could not be blamed on Places, the browser pool, OpenAI or the
+backend. Every instrumented piece now reports into one process-wide
+RunMetrics:
+
+    stages     Pipeline workers time each handler call (p50 / p95 / max)
+    places     live (uncached) Places calls by billing SKU
+    openai     prompt / completion tokens per model (Batch API at half price)
+    http       per-endpoint latency and retries from http_client
+
+    metrics = get_metrics()
+    with metrics.timer('scrape'):
+        ...
+    metrics.snapshot(providers=25)        # into the export JSON / agent_runs
+    metrics.write_openmetrics('./metrics/agent.prom')
+
+Prices are list prices in USD and only meant for comparing runs.
+"""
+
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Places API (legacy web service) per-request list prices
+PLACES_SKU_PRICES = {
+    'text_search': 0.032,
+    'nearby_search': 0.032,
+    'details_basic': 0.017,
+    'details_contact': 0.003,
+    'details_atmosphere': 0.005,
+    'photo': 0.007,
+    'geocode': 0.005,
+}
+
+# Place Details fields billed on top of Basic
+_CONTACT_FIELDS = {'formatted_phone_number', 'international_phone_number', 'website', 'opening_hours',
+                   'current_opening_hours', 'secondary_opening_hours'}
+_ATMOSPHERE_FIELDS = {'rating', 'user_ratings_total', 'reviews', 'price_level', 'editorial_summary',
+                      'serves_beer', 'serves_breakfast', 'wheelchair_accessible_entrance'}
+
+# OpenAI USD per 1M tokens (input, output)
+OPENAI_TOKEN_PRICES = {
+    'gpt-4o-mini': (0.15, 0.60),
+    'gpt-4o': (2.50, 10.00),
+    'gpt-4': (30.00, 60.00),
+    'gpt-3.5-turbo': (0.50, 1.50),
+}
+BATCH_DISCOUNT = 0.5
+
+METRICS_TEXTFILE = os.getenv('METRICS_TEXTFILE')
+
+QUANTILES = (0.5, 0.95)
+
+
+def places_skus(endpoint: str, fields: Optional[Iterable[str]] = None) -> List[str]:
+    """Billing SKUs one live Places call is charged as"""
+    if endpoint == 'textsearch':
+        return ['text_search']
+    if endpoint == 'nearbysearch':
+        return ['nearby_search']
+    if endpoint == 'geocode':
+        return ['geocode']
+    if endpoint == 'photo':
+        return ['photo']
+    if endpoint != 'details':
+        return []
+
+    if isinstance(fields, str):
+        fields = fields.split(',')
+    fields = {f.strip() for f in fields or ()}
+    skus = ['details_basic']
+    # No field mask means every field, and every SKU
+    if not fields or fields & _CONTACT_FIELDS:
+        skus.append('details_contact')
+    if not fields or fields & _ATMOSPHERE_FIELDS:
+        skus.append('details_atmosphere')
+    return skus
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _token_price(model: str) -> Tuple[float, float]:
+    # Dated snapshots (gpt-4o-mini-2024-07-18) price like their family
+    for name in sorted(OPENAI_TOKEN_PRICES, key=len, reverse=True):
+        if model.startswith(name):
+            return OPENAI_TOKEN_PRICES[name]
+    return (0.0, 0.0)
+
+
+def quantile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank quantile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class RunMetrics:
+    def __init__(self):
+        self._durations: Dict[str, List[float]] = {}
+        self._places: Dict[str, int] = {}
+        self._places_calls = 0
+        self._tokens: Dict[str, Dict[str, int]] = {}
+        self._cost = {'places': 0.0, 'openai': 0.0}
+        self._lock = threading.Lock()
+        self.started = time.time()
+
+    # ---- recording ---------------------------------------------------------
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            self._durations.setdefault(stage, []).append(seconds)
+
+    @contextmanager
+    def timer(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def count_places(self, endpoint: str, fields: Optional[Iterable[str]] = None):
+        """A live (billed) Places call"""
+        skus = places_skus(endpoint, fields)
+        with self._lock:
+            self._places_calls += 1
+            for sku in skus:
+                self._places[sku] = self._places.get(sku, 0) + 1
+                self._cost['places'] += PLACES_SKU_PRICES[sku]
+
+    def add_tokens(self, model: str, prompt_tokens: int, completion_tokens: int, batch: bool = False):
+        input_price, output_price = _token_price(model)
+        cost = (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+        if batch:
+            cost *= BATCH_DISCOUNT
+        key = f"{model} (batch)" if batch else model
+        with self._lock:
+            usage = self._tokens.setdefault(key, {'calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0})
+            usage['calls'] += 1
+            usage['prompt_tokens'] += prompt_tokens or 0
+            usage['completion_tokens'] += completion_tokens or 0
+            self._cost['openai'] += cost
+
+    def add_usage(self, model: str, usage, batch: bool = False):
+        """Record an OpenAI `usage` object or dict (ignored when missing)"""
+        if usage is None:
+            return
+        if isinstance(usage, dict):
+            prompt, completion = usage.get('prompt_tokens', 0), usage.get('completion_tokens', 0)
+        else:
+            prompt, completion = getattr(usage, 'prompt_tokens', 0), getattr(usage, 'completion_tokens', 0)
+        self.add_tokens(model, prompt or 0, completion or 0, batch)
+
+    # ---- reading -----------------------------------------------------------
+
+    def cost_usd(self) -> float:
+        """Estimated spend so far"""
+        with self._lock:
+            return self._cost['places'] + self._cost['openai']
+
+    def stage_stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            durations = {stage: sorted(values) for stage, values in self._durations.items()}
+        return {
+            stage: {
+                'count': len(values),
+                'p50_ms': round(quantile(values, 0.5) * 1000, 1),
+                'p95_ms': round(quantile(values, 0.95) * 1000, 1),
+                'max_ms': round(values[-1] * 1000, 1) if values else 0.0,
+                'total_s': round(sum(values), 2),
+            }
+            for stage, values in durations.items()
+        }
+
+    def snapshot(self, providers: int = 0, http: Dict = None) -> Dict:
+        """
+        Everything as one JSON-able dict
+
+        Args:
+            providers: Providers the run processed, for the per-provider cost
+            http: http_client stats to include
+        """
+        with self._lock:
+            places = dict(self._places)
+            places_calls = self._places_calls
+            tokens = {model: dict(usage) for model, usage in self._tokens.items()}
+            cost = dict(self._cost)
+        total = cost['places'] + cost['openai']
+        return {
+            'wall_seconds': round(time.time() - self.started, 1),
+            'stages': self.stage_stats(),
+            'places_skus': places,
+            'openai_tokens': tokens,
+            'api_calls': places_calls + sum(usage['calls'] for usage in tokens.values()),
+            'cost_usd': {
+                'places': round(cost['places'], 4),
+                'openai': round(cost['openai'], 4),
+                'total': round(total, 4),
+                'per_provider': round(total / providers, 4) if providers else None,
+            },
+            'http': http or {},
+        }
+
+    def report(self, providers: int = 0):
+        """Print stage latencies and the cost estimate"""
+        snapshot = self.snapshot(providers)
+        if snapshot['stages']:
+            print("⏱️  Stages (p50 / p95 / max):")
+            for stage, s in snapshot['stages'].items():
+                print(f"   {stage:<10} {s['count']:>5}x  {s['p50_ms']:>8.0f} / {s['p95_ms']:>8.0f} / "
+                      f"{s['max_ms']:>8.0f} ms  ({s['total_s']:.1f}s total)")
+        cost = snapshot['cost_usd']
+        per_provider = f", ${cost['per_provider']:.4f}/provider" if cost['per_provider'] is not None else ''
+        print(f"💵 Estimated cost: ${cost['total']:.4f} (Places ${cost['places']:.4f}, "
+              f"OpenAI ${cost['openai']:.4f}){per_provider}")
+
+    # ---- OpenMetrics -------------------------------------------------------
+
+    def openmetrics(self, labels: Dict[str, str] = None, http: Dict = None) -> str:
+        """Prometheus / OpenMetrics text exposition of the current numbers"""
+        base = dict(labels or {})
+
+        def fmt(extra: Dict[str, str]) -> str:
+            merged = dict(base, **extra)
+            if not merged:
+                return ''
+            return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in merged.items()) + '}'
+
+        with self._lock:
+            durations = {stage: sorted(values) for stage, values in self._durations.items()}
+            places = dict(self._places)
+            tokens = {model: dict(usage) for model, usage in self._tokens.items()}
+            cost = dict(self._cost)
+
+        lines = [
+            '# HELP agent_stage_duration_seconds Time spent per item in each pipeline stage.',
+            '# TYPE agent_stage_duration_seconds summary',
+        ]
+        for stage, values in durations.items():
+            for q in QUANTILES:
+                lines.append(f"agent_stage_duration_seconds{fmt({'stage': stage, 'quantile': q})} "
+                             f"{quantile(values, q):.6f}")
+            lines.append(f"agent_stage_duration_seconds_sum{fmt({'stage': stage})} {sum(values):.6f}")
+            lines.append(f"agent_stage_duration_seconds_count{fmt({'stage': stage})} {len(values)}")
+
+        lines += ['# HELP agent_places_billed Live Places API charges by billing SKU.',
+                  '# TYPE agent_places_billed counter']
+        lines += [f"agent_places_billed_total{fmt({'sku': sku})} {count}" for sku, count in places.items()]
+
+        lines += ['# HELP agent_openai_tokens OpenAI tokens by model and direction.',
+                  '# TYPE agent_openai_tokens counter']
+        for model, usage in tokens.items():
+            lines.append(f"agent_openai_tokens_total{fmt({'model': model, 'direction': 'prompt'})} "
+                         f"{usage['prompt_tokens']}")
+            lines.append(f"agent_openai_tokens_total{fmt({'model': model, 'direction': 'completion'})} "
+                         f"{usage['completion_tokens']}")
+
+        lines += ['# HELP agent_cost_usd Estimated spend by API.', '# TYPE agent_cost_usd gauge']
+        lines += [f"agent_cost_usd{fmt({'api': api})} {value:.6f}" for api, value in cost.items()]
+
+        if http:
+            lines += ['# HELP agent_http_requests HTTP requests by endpoint.',
+                      '# TYPE agent_http_requests counter']
+            for endpoint, s in http.items():
+                lines.append(f"agent_http_requests_total{fmt({'endpoint': endpoint})} {s['calls']}")
+            lines += ['# HELP agent_http_retries HTTP retries by endpoint.',
+                      '# TYPE agent_http_retries counter']
+            for endpoint, s in http.items():
+                lines.append(f"agent_http_retries_total{fmt({'endpoint': endpoint})} {s['retries']}")
+
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    def write_openmetrics(self, path: str, labels: Dict[str, str] = None, http: Dict = None):
+        """Atomically write a textfile-collector file (node_exporter --collector.textfile)"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            f.write(self.openmetrics(labels, http))
+        os.replace(tmp, path)
+        print(f"📈 Metrics written to: {path}")
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> RunMetrics:
+    """Shared metrics for the whole process"""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = RunMetrics()
+        return _metrics
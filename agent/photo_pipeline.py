@@ -0,0 +1,363 @@
+"""
+========================================
+PHOTO PIPELINE
+Parallel Places photo download, resize and multipart upload
+========================================
+
+Photos used to be fetched one at a time, decoded and re-encoded on the
+main thread, base64-inflated (+33%) into a data: URL inside JSON and
+followed by a one second sleep. Now:
+
+    download   thread pool, pooled keep-alive session
+    resize     process pool; JPEGs are downscaled in the decoder with
+               Image.draft() before thumbnail(), then re-encoded once
+    hash       a perceptual hash of each resized image is looked up in
+               the local PhotoStore (photo_store.py); known pictures reuse
+               their hosted URL and are not uploaded again
+    upload     one streamed multipart/form-data POST per provider to
+               /api/upload/images (raw JPEG bytes, no base64)
+    attach     the returned URLs go to /api/admin/providers/:id/photos
+               with their hashes; photos the provider already has are
+               neither sent nor stored twice
+
+    photos = PhotoPipeline(GOOGLE_API_KEY, f'{BACKEND_URL}/api', ADMIN_TOKEN)
+    urls = photos.add_photos(provider_id, [p['photo_reference'] for p in details['photos'][:3]])
+    photos.close()
+"""
+
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from io import BytesIO
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from http_client import HttpClient, get_http
+from metrics import get_metrics
+from photo_store import PhotoStore, dhash, hash_distance
+from pipeline import Pipeline, Stage
+
+PLACES_PHOTO_URL = 'https://maps.googleapis.com/maps/api/place/photo'
+
+PHOTO_DOWNLOAD_WORKERS = int(os.getenv('PHOTO_DOWNLOAD_WORKERS', 8))
+PHOTO_PROCESS_WORKERS = int(os.getenv('PHOTO_PROCESS_WORKERS', os.cpu_count() or 2))
+PHOTO_MAX_SIZE = int(os.getenv('PHOTO_MAX_SIZE', 1200))
+PHOTO_JPEG_QUALITY = int(os.getenv('PHOTO_JPEG_QUALITY', 80))
+
+# /api/upload/images accepts at most this many files per request (multer limit)
+UPLOAD_MAX_FILES = 10
+_CHUNK = 64 * 1024
+
+
+def resize_jpeg(data: bytes, max_size: int = PHOTO_MAX_SIZE, quality: int = PHOTO_JPEG_QUALITY) -> Tuple[bytes, str]:
+    """
+    Downscale to fit max_size x max_size and encode as JPEG (runs in a worker process)
+
+    Returns:
+        (jpeg bytes, perceptual hash of the resized image)
+    """
+    from PIL import Image
+
+    img = Image.open(BytesIO(data))
+    if img.format == 'JPEG':
+        # Let the decoder skip to the nearest 1/2, 1/4 or 1/8 scale first
+        img.draft('RGB', (max_size, max_size))
+    img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+
+    output = BytesIO()
+    img.save(output, format='JPEG', quality=quality, optimize=True, progressive=True)
+    return output.getvalue(), dhash(img)
+
+
+def _multipart_stream(field: str, files: List[Tuple[str, bytes]], boundary: str) -> Iterator[bytes]:
+    """multipart/form-data body, yielded in chunks so it is sent as it is produced"""
+    for filename, content in files:
+        yield (
+            f'--{boundary}\r\n'
+            f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f'Content-Type: image/jpeg\r\n\r\n'
+        ).encode('utf-8')
+        for offset in range(0, len(content), _CHUNK):
+            yield content[offset:offset + _CHUNK]
+        yield b'\r\n'
+    yield f'--{boundary}--\r\n'.encode('utf-8')
+
+
+class PhotoPipeline:
+    def __init__(self, google_api_key: str, api_base: str, token: Optional[str] = None,
+                 max_size: int = PHOTO_MAX_SIZE, quality: int = PHOTO_JPEG_QUALITY,
+                 download_workers: int = PHOTO_DOWNLOAD_WORKERS,
+                 process_workers: int = PHOTO_PROCESS_WORKERS,
+                 store: PhotoStore = None, http: HttpClient = None):
+        """
+        Args:
+            google_api_key: Places API key for the photo endpoint
+            api_base: Backend API root including /api
+            token: Admin bearer token
+            max_size: Longest edge after resizing (pixels)
+            quality: JPEG quality for the re-encode
+            store: Local content-addressed store (defaults to PHOTO_STORE_PATH)
+            http: Rate-limited client (defaults to the shared one)
+        """
+        self.google_api_key = google_api_key
+        self.api_base = api_base.rstrip('/')
+        self.token = token
+        self.max_size = max_size
+        self.quality = quality
+        # Same picture at another size is a different upload
+        self.variant = f"{max_size}q{quality}"
+        self.store = store or PhotoStore()
+
+        self.http = http or get_http()
+        self._downloads = ThreadPoolExecutor(max_workers=download_workers, thread_name_prefix='photo-dl')
+        self._resizers = ProcessPoolExecutor(max_workers=process_workers)
+
+        self.stats = {'downloaded': 0, 'download_bytes': 0, 'uploaded': 0, 'upload_bytes': 0, 'failed': 0,
+                      'reused': 0, 'duplicates': 0, 'shared': 0, 'already_attached': 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, **increments):
+        with self._stats_lock:
+            for key, value in increments.items():
+                self.stats[key] += value
+
+    def _headers(self) -> Dict:
+        return {'Authorization': f'Bearer {self.token}'} if self.token else {}
+
+    # ---- download + resize -----------------------------------------------
+
+    def download(self, photo_reference: str) -> Optional[bytes]:
+        # Ask Google for roughly the final size so less is transferred and decoded
+        params = {'photoreference': photo_reference, 'maxwidth': self.max_size, 'key': self.google_api_key}
+        try:
+            response = self.http.get('places_photo', PLACES_PHOTO_URL, params=params, timeout=15)
+            if response.status_code == 200 and response.content:
+                get_metrics().count_places('photo')
+                self._count(downloaded=1, download_bytes=len(response.content))
+                return response.content
+        except Exception as e:
+            print(f"    ⚠️  Photo download failed: {e}")
+        self._count(failed=1)
+        return None
+
+    def _from_store(self, photo_reference: str) -> Optional[Dict]:
+        """Stored photo for a reference hashed on an earlier run"""
+        photo_hash = self.store.hash_for_ref(photo_reference)
+        entry = self.store.get(photo_hash, self.variant) if photo_hash else None
+        if entry is None:
+            return None
+        if entry['url']:
+            return {'hash': photo_hash, 'url': entry['url']}
+        data = self.store.read(entry)
+        return {'hash': photo_hash, 'data': data} if data else None
+
+    def _stored(self, photo_reference: str, data: bytes, photo_hash: str) -> Dict:
+        """Index a freshly resized photo, reusing a near-identical stored one"""
+        match = self.store.find(photo_hash, self.variant)
+        self.store.remember_ref(photo_reference, match['hash'] if match else photo_hash)
+        if match and match['url']:
+            self._count(reused=1)
+            return {'hash': match['hash'], 'url': match['url']}
+        if match:
+            return {'hash': match['hash'], 'data': data}
+        self.store.put(photo_hash, self.variant, data)
+        return {'hash': photo_hash, 'data': data}
+
+    def prepare(self, photo_references: Iterable[str], owner: Optional[str] = None) -> List[Dict]:
+        """
+        Download in parallel and resize each photo as soon as it arrives; keeps order
+
+        Args:
+            photo_references: Places photo references
+            owner: Provider (or place) id the photos belong to, for
+                   cross-provider duplicate detection
+
+        Returns:
+            [{'hash', 'url'}] for pictures already hosted, [{'hash', 'data'}]
+            for ones still to upload; near-identical repeats are dropped
+        """
+        items: List[Tuple[str, object]] = []
+        for ref in photo_references:
+            known = self._from_store(ref)
+            if known:
+                self._count(reused=1)
+                items.append((ref, known))
+            else:
+                items.append((ref, self._downloads.submit(self.download, ref)))
+
+        resized = []
+        for ref, item in items:
+            if isinstance(item, dict):
+                resized.append((ref, item))
+                continue
+            data = item.result()
+            resized.append((ref, self._resizers.submit(resize_jpeg, data, self.max_size, self.quality) if data else None))
+
+        images = []
+        for ref, item in resized:
+            if item is None:
+                continue
+            if not isinstance(item, dict):
+                try:
+                    item = self._stored(ref, *item.result())
+                except Exception as e:
+                    self._count(failed=1)
+                    print(f"    ⚠️  Photo could not be decoded: {e}")
+                    continue
+
+            if any(hash_distance(item['hash'], other['hash']) <= self.store.max_distance for other in images):
+                self._count(duplicates=1)
+                continue
+            others = self.store.other_owners(owner, item['hash'])
+            if others:
+                self._count(shared=1)
+                print(f"    🔁 Photo {item['hash']} also used by {', '.join(others[:3])}")
+            if owner:
+                self.store.add_owner(owner, item['hash'])
+            images.append(item)
+        return images
+
+    # ---- upload + attach -------------------------------------------------
+
+    def upload(self, images: List[Dict]) -> List[Dict]:
+        """
+        Stream photos that are not hosted yet to /api/upload/images
+
+        Returns:
+            [{'url', 'hash'}] for every image, in order
+        """
+        pending = [image for image in images if not image.get('url')]
+        for start in range(0, len(pending), UPLOAD_MAX_FILES):
+            chunk = pending[start:start + UPLOAD_MAX_FILES]
+            boundary = uuid.uuid4().hex
+            files = [(f"{image['hash']}.jpg", image['data']) for image in chunk]
+
+            # A streamed body is never retried (it cannot be replayed)
+            response = self.http.post(
+                'backend',
+                f"{self.api_base}/upload/images",
+                headers=dict(self._headers(), **{'Content-Type': f'multipart/form-data; boundary={boundary}'}),
+                data=_multipart_stream('images', files, boundary),
+                timeout=120
+            )
+            response.raise_for_status()
+
+            for image, hosted in zip(chunk, response.json()['images']):
+                image['url'] = hosted['url']
+                self.store.set_url(image['hash'], self.variant, hosted['url'])
+            self._count(uploaded=len(chunk), upload_bytes=sum(len(image['data']) for image in chunk))
+
+        return [{'url': image['url'], 'hash': image['hash']} for image in images]
+
+    def attach(self, provider_id: str, photos: List[Dict], replace: bool = False) -> bool:
+        """
+        Add hosted photos ({'url', 'hash'}) to a provider
+
+        Photos the store has already attached to this provider are not sent;
+        with replace the provider's photo set becomes exactly `photos`.
+        """
+        if not replace:
+            attached = self.store.attached(provider_id)
+            new = [photo for photo in photos if photo['hash'] not in attached]
+            self._count(already_attached=len(photos) - len(new))
+            photos = new
+        if not photos:
+            return True
+
+        # The endpoint skips photos it already has, so a retry cannot duplicate them
+        response = self.http.post(
+            'backend',
+            f"{self.api_base}/admin/providers/{provider_id}/photos",
+            headers=dict(self._headers(), **{'Content-Type': 'application/json'}),
+            json={'photos': self.photo_records(photos, primary_first=replace), 'replace': replace},
+            timeout=30,
+            idempotent=True
+        )
+        if response.status_code not in (200, 201):
+            return False
+        self.store.mark_attached(provider_id, [photo['hash'] for photo in photos], replace=replace)
+        return True
+
+    @staticmethod
+    def photo_records(photos: List[Dict], primary_first: bool = True) -> List[Dict]:
+        """API photo records; appends pass primary_first=False so the stored primary stays"""
+        return [
+            {'url': photo['url'], 'hash': photo['hash'], 'isPrimary': primary_first and i == 0}
+            for i, photo in enumerate(photos)
+        ]
+
+    def add_photos(self, provider_id: str, photo_references: List[str], replace: bool = False) -> List[str]:
+        """Download, resize, upload and attach one provider's photos"""
+        return self.add_prepared(provider_id, self.prepare(photo_references, owner=provider_id), replace)
+
+    def add_prepared(self, provider_id: str, images: List[Dict], replace: bool = False) -> List[str]:
+        photos = self.upload(images)
+        if photos and not self.attach(provider_id, photos, replace):
+            raise RuntimeError(f"Could not attach photos to provider {provider_id}")
+        return [photo['url'] for photo in photos]
+
+    # ---- many providers --------------------------------------------------
+
+    def run(self, jobs: Iterable[Dict], lookup: Callable[[Dict], List[str]],
+            before_upload: Callable[[Dict], None] = None, replace: bool = False,
+            workers: int = 4) -> List[Dict]:
+        """
+        Stream providers through lookup → prepare → upload/attach concurrently
+
+        Args:
+            jobs: Dicts with at least 'id' and 'name'
+            lookup: job -> photo references (e.g. Places details); [] skips the job
+            before_upload: Hook run just before a job's photos are attached
+            replace: Make each provider's photos exactly the new set instead
+                     of adding to it
+
+        Returns:
+            Finished jobs with 'urls' set
+        """
+        def lookup_stage(job: Dict) -> Optional[Dict]:
+            refs = lookup(job)
+            if not refs:
+                print(f"  ⚠️  {job['name']}: no photos available")
+                return None
+            return dict(job, refs=refs)
+
+        def prepare_stage(job: Dict) -> Optional[Dict]:
+            images = self.prepare(job['refs'], owner=job['id'])
+            return dict(job, images=images) if images else None
+
+        def upload_stage(job: Dict) -> Dict:
+            if before_upload:
+                before_upload(job)
+            urls = self.add_prepared(job['id'], job['images'], replace)
+            print(f"  ✅ {job['name']}: {len(urls)}/{len(job['refs'])} photos uploaded")
+            return {'id': job['id'], 'name': job['name'], 'urls': urls}
+
+        def report(stage: str, job: Dict, error: Exception):
+            name = job.get('name') if isinstance(job, dict) else job
+            print(f"  ❌ {name}: {stage} failed: {error}")
+
+        pipeline = Pipeline(
+            [
+                Stage('lookup', lookup_stage, workers),
+                Stage('prepare', prepare_stage, 2),
+                Stage('upload', upload_stage, workers),
+            ],
+            on_error=report
+        )
+        return pipeline.run(jobs)
+
+    def report(self):
+        """Print the end-of-run photo line"""
+        s = self.stats
+        print(f"📸 Photos: {s['downloaded']} downloaded ({s['download_bytes'] / 1024:.0f} KB), "
+              f"{s['uploaded']} uploaded ({s['upload_bytes'] / 1024:.0f} KB), {s['reused']} reused from store, "
+              f"{s['duplicates']} near-duplicates dropped, {s['shared']} shared with other providers, "
+              f"{s['already_attached']} already attached, {s['failed']} failed")
+
+    def close(self):
+        self._downloads.shutdown(wait=True)
+        self._resizers.shutdown(wait=True)
+        self.store.close()
@@ -0,0 +1,219 @@
+"""
+========================================
+PHOTO STORE
+Content-addressed local store of resized photos, keyed by perceptual hash
+========================================
+
+Every photo the pipeline resizes gets a 64-bit difference hash (dHash)
+of the resized image. The store remembers, per hash and size variant,
+the JPEG bytes on disk and the hosted URL once uploaded, plus which
+Places photo references and which providers it has been seen with.
+
+Re-running a photo script therefore:
+    - skips the download when a photo reference was hashed before
+    - skips the upload when the hash (or a near-identical one) already
+      has a hosted URL
+    - skips the attach when the provider already has that photo
+
+Hashes within PHOTO_HASH_DISTANCE bits are treated as the same picture,
+which also catches the same stock/storefront photo on several providers.
+
+    store = PhotoStore()
+    match = store.find(photo_hash, '1200q80')
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Set
+
+PHOTO_STORE_PATH = os.getenv('PHOTO_STORE_PATH', './cache/photos.sqlite')
+PHOTO_STORE_DIR = os.getenv('PHOTO_STORE_DIR', './cache/photos')
+# Keep in sync with PHOTO_HASH_DISTANCE in backend/routes/admin.js
+PHOTO_HASH_DISTANCE = int(os.getenv('PHOTO_HASH_DISTANCE', 6))
+
+DHASH_SIZE = 8
+
+
+def dhash(img, size: int = DHASH_SIZE) -> str:
+    """Difference hash of a PIL image: one bit per horizontally adjacent pixel pair, as hex"""
+    from PIL import Image
+
+    small = img.convert('L').resize((size + 1, size), Image.Resampling.LANCZOS)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return f"{value:0{size * size // 4}x}"
+
+
+def _popcount(value: int) -> int:
+    # int.bit_count() needs Python 3.10
+    return bin(value).count('1')
+
+
+def hash_distance(a: str, b: str) -> int:
+    """Number of differing bits between two hex hashes"""
+    return _popcount(int(a, 16) ^ int(b, 16))
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS photo_refs (
+            photo_reference TEXT PRIMARY KEY,
+            hash TEXT NOT NULL,
+            created_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS photos (
+            hash TEXT NOT NULL,
+            variant TEXT NOT NULL,
+            path TEXT NOT NULL,
+            bytes INTEGER NOT NULL,
+            url TEXT,
+            created_at REAL NOT NULL,
+            PRIMARY KEY (hash, variant)
+        );
+        CREATE TABLE IF NOT EXISTS photo_owners (
+            owner TEXT NOT NULL,
+            hash TEXT NOT NULL,
+            attached INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (owner, hash)
+        );
+        CREATE INDEX IF NOT EXISTS idx_photo_owners_hash ON photo_owners (hash);
+    """)
+    return conn
+
+
+class PhotoStore:
+    def __init__(self, path: str = PHOTO_STORE_PATH, directory: str = PHOTO_STORE_DIR,
+                 max_distance: int = PHOTO_HASH_DISTANCE):
+        self.path = path
+        self.directory = directory
+        self.max_distance = max_distance
+        self._lock = threading.Lock()
+        self._conn = _connect(path)
+        # Every stored hash as an int, for near-duplicate scans
+        self._hashes: Dict[str, int] = {
+            photo_hash: int(photo_hash, 16)
+            for (photo_hash,) in self._conn.execute("SELECT DISTINCT hash FROM photos")
+        }
+
+    # ---- photo references ------------------------------------------------
+
+    def hash_for_ref(self, photo_reference: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT hash FROM photo_refs WHERE photo_reference = ?", (photo_reference,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def remember_ref(self, photo_reference: str, photo_hash: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO photo_refs (photo_reference, hash, created_at) VALUES (?, ?, ?)",
+                (photo_reference, photo_hash, time.time())
+            )
+
+    # ---- content -----------------------------------------------------------
+
+    def nearest(self, photo_hash: str) -> Optional[str]:
+        """The stored hash closest to photo_hash, if within max_distance"""
+        if photo_hash in self._hashes:
+            return photo_hash
+        value = int(photo_hash, 16)
+        with self._lock:
+            candidates = list(self._hashes.items())
+        best, best_distance = None, self.max_distance + 1
+        for other, other_value in candidates:
+            distance = _popcount(value ^ other_value)
+            if distance < best_distance:
+                best, best_distance = other, distance
+        return best
+
+    def get(self, photo_hash: str, variant: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT path, bytes, url FROM photos WHERE hash = ? AND variant = ?", (photo_hash, variant)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'hash': photo_hash, 'variant': variant, 'path': row[0], 'bytes': row[1], 'url': row[2]}
+
+    def find(self, photo_hash: str, variant: str) -> Optional[Dict]:
+        """Stored entry for this picture (exact or near-identical hash) at this size variant"""
+        match = self.nearest(photo_hash)
+        return self.get(match, variant) if match else None
+
+    def put(self, photo_hash: str, variant: str, data: bytes) -> Dict:
+        """Write the JPEG to <dir>/<ab>/<hash>-<variant>.jpg and index it"""
+        folder = os.path.join(self.directory, photo_hash[:2])
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"{photo_hash}-{variant}.jpg")
+        with open(path, 'wb') as f:
+            f.write(data)
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO photos (hash, variant, path, bytes, created_at) VALUES (?, ?, ?, ?, ?)",
+                (photo_hash, variant, path, len(data), time.time())
+            )
+            self._hashes[photo_hash] = int(photo_hash, 16)
+        return self.get(photo_hash, variant)
+
+    def read(self, entry: Dict) -> Optional[bytes]:
+        try:
+            with open(entry['path'], 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def set_url(self, photo_hash: str, variant: str, url: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE photos SET url = ? WHERE hash = ? AND variant = ?", (url, photo_hash, variant)
+            )
+
+    # ---- owners (provider ids or place ids) -------------------------------
+
+    def add_owner(self, owner: str, photo_hash: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO photo_owners (owner, hash) VALUES (?, ?)", (owner, photo_hash)
+            )
+
+    def other_owners(self, owner: Optional[str], photo_hash: str) -> List[str]:
+        """Other providers this picture has been seen with"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT owner FROM photo_owners WHERE hash = ? AND owner != ?", (photo_hash, owner or '')
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def attached(self, owner: str) -> Set[str]:
+        """Hashes already attached to this provider"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT hash FROM photo_owners WHERE owner = ? AND attached = 1", (owner,)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def mark_attached(self, owner: str, hashes: List[str], replace: bool = False):
+        with self._lock:
+            if replace:
+                self._conn.execute("UPDATE photo_owners SET attached = 0 WHERE owner = ?", (owner,))
+            self._conn.executemany(
+                "INSERT INTO photo_owners (owner, hash, attached) VALUES (?, ?, 1) "
+                "ON CONFLICT (owner, hash) DO UPDATE SET attached = 1",
+                [(owner, photo_hash) for photo_hash in hashes]
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
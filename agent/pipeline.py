@@ -0,0 +1,179 @@
+"""
+========================================
+STAGED PROVIDER PIPELINE
+Bounded-queue worker stages for the AI agent
+========================================
+
+Each stage runs a configurable number of worker threads and hands items
+to the next stage through a bounded queue, so discovery, scraping, AI
+extraction and uploads overlap instead of running one provider at a time.
+
+Stage handlers receive an item and return the item to pass downstream,
+or None to drop it (e.g. an exact duplicate). Exceptions are reported
+through `on_error` and the item is dropped. With `metrics`, every
+handler call (and every item pulled from the source, as 'discover') is
+timed into the stage's latency histogram.
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urlparse
+
+from metrics import RunMetrics
+
+_STOP = object()
+
+
+class HostRateLimiter:
+    """Enforces a minimum interval between requests to the same host"""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = max(0.0, min_interval)
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url: str):
+        """Block until a request to the host of `url` is allowed"""
+        if not self.min_interval:
+            return
+
+        host = urlparse(url).netloc or url
+
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, 0.0))
+            self._next_slot[host] = slot + self.min_interval
+
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class Stage:
+    """A named pipeline step with its own worker pool"""
+
+    def __init__(self, name: str, handler: Callable[[Any], Optional[Any]], workers: int = 1):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+
+
+class Pipeline:
+    def __init__(self, stages: List[Stage], queue_size: int = 50,
+                 on_error: Optional[Callable[[str, Any, Exception], None]] = None,
+                 metrics: Optional[RunMetrics] = None):
+        if not stages:
+            raise ValueError('Pipeline needs at least one stage')
+
+        self.stages = stages
+        self.queue_size = max(1, queue_size)
+        self.on_error = on_error
+        self.metrics = metrics
+
+    def run(self, source: Iterable) -> List:
+        """
+        Feed items from `source` through every stage
+
+        Returns:
+            Items that made it through the last stage (order not guaranteed)
+        """
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        outputs = []
+        outputs_lock = threading.Lock()
+        threads = []
+
+        for index, stage in enumerate(self.stages):
+            inbox = queues[index]
+            outbox = queues[index + 1] if index + 1 < len(self.stages) else None
+
+            workers = [
+                threading.Thread(
+                    target=self._work,
+                    args=(stage, inbox, outbox, outputs, outputs_lock),
+                    name=f"{stage.name}-{n}",
+                    daemon=True
+                )
+                for n in range(stage.workers)
+            ]
+            for worker in workers:
+                worker.start()
+
+            # Once every worker of this stage has drained, stop the next stage
+            if outbox is not None:
+                closer = threading.Thread(
+                    target=self._close_stage,
+                    args=(workers, outbox, self.stages[index + 1].workers),
+                    daemon=True
+                )
+                closer.start()
+                threads.append(closer)
+
+            threads.extend(workers)
+
+        try:
+            for item in self._timed_source(source):
+                queues[0].put(item)
+        except Exception as e:
+            self._report('discover', None, e)
+        finally:
+            for _ in range(self.stages[0].workers):
+                queues[0].put(_STOP)
+
+        for thread in threads:
+            thread.join()
+
+        return outputs
+
+    def _work(self, stage: Stage, inbox: queue.Queue, outbox: Optional[queue.Queue],
+              outputs: List, outputs_lock: threading.Lock):
+        while True:
+            item = inbox.get()
+            if item is _STOP:
+                return
+
+            start = time.perf_counter()
+            try:
+                result = stage.handler(item)
+            except Exception as e:
+                self._report(stage.name, item, e)
+                continue
+            finally:
+                if self.metrics:
+                    self.metrics.observe(stage.name, time.perf_counter() - start)
+
+            if result is None:
+                continue
+
+            if outbox is not None:
+                outbox.put(result)
+            else:
+                with outputs_lock:
+                    outputs.append(result)
+
+    def _timed_source(self, source: Iterable) -> Iterator:
+        """Yield from source, timing how long each item takes to produce"""
+        iterator = iter(source)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            if self.metrics:
+                self.metrics.observe('discover', time.perf_counter() - start)
+            yield item
+
+    @staticmethod
+    def _close_stage(workers: List[threading.Thread], outbox: queue.Queue, next_workers: int):
+        for worker in workers:
+            worker.join()
+        for _ in range(next_workers):
+            outbox.put(_STOP)
+
+    def _report(self, stage_name: str, item: Any, error: Exception):
+        if self.on_error:
+            self.on_error(stage_name, item, error)
+        else:
+            print(f"⚠️  {stage_name} failed: {error}")
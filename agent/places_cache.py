@@ -0,0 +1,155 @@
+"""
+========================================
+GOOGLE PLACES CACHE
+Replays text search / nearby search / place details from disk
+========================================
+
+Responses are keyed by (endpoint, query or place_id, fields, other
+params) and stored in a local SQLite file, so reruns and overlapping
+neighbourhood sweeps only pay for Places calls they have not made yet.
+
+Two entry points:
+- places_request(): for scripts that call the Places web service with requests
+- CachedPlacesClient: drop-in wrapper around googlemaps.Client
+"""
+
+import os
+import threading
+from typing import Dict, Optional
+
+from disk_cache import DiskCache, make_key
+from http_client import get_http
+from metrics import get_metrics
+
+PLACES_BASE_URL = 'https://maps.googleapis.com/maps/api/place'
+
+PLACES_CACHE_PATH = os.getenv('PLACES_CACHE_PATH', './cache/places.sqlite')
+PLACES_CACHE_MAX_ENTRIES = int(os.getenv('PLACES_CACHE_MAX_ENTRIES', 200000))
+PLACES_CACHE_DISABLED = os.getenv('PLACES_CACHE_DISABLED', 'false').lower() == 'true'
+
+# Google allows place content to be cached for up to 30 days
+PLACES_CACHE_TTL = {
+    'textsearch': int(os.getenv('PLACES_CACHE_TTL_SEARCH_SECONDS', 7 * 86400)),
+    'nearbysearch': int(os.getenv('PLACES_CACHE_TTL_SEARCH_SECONDS', 7 * 86400)),
+    'details': int(os.getenv('PLACES_CACHE_TTL_DETAILS_SECONDS', 30 * 86400)),
+}
+
+# Only successful answers are worth replaying
+CACHEABLE_STATUSES = {'OK', 'ZERO_RESULTS'}
+
+# Uncached googlemaps.Client methods: method -> (rate-limit bucket, billing endpoint);
+# anything else is limited and counted as a 'places' call under its own name
+PASSTHROUGH_ENDPOINTS = {
+    'geocode': ('places', 'geocode'),
+    'reverse_geocode': ('places', 'geocode'),
+    'places_photo': ('places_photo', 'photo'),
+}
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_places_cache() -> Optional[DiskCache]:
+    """Shared cache instance (None when PLACES_CACHE_DISABLED=true)"""
+    global _cache
+    if PLACES_CACHE_DISABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = DiskCache(PLACES_CACHE_PATH, table='places', max_entries=PLACES_CACHE_MAX_ENTRIES)
+        return _cache
+
+
+def places_key(endpoint: str, params: Dict) -> str:
+    """Cache key for a Places call; the API key never takes part in it"""
+    params = {k: v for k, v in params.items() if k != 'key' and v is not None}
+    subject = params.pop('place_id', None) or params.pop('query', None)
+    fields = params.pop('fields', None)
+    if isinstance(fields, (list, tuple, set)):
+        fields = ','.join(sorted(fields))
+    elif isinstance(fields, str):
+        fields = ','.join(sorted(f.strip() for f in fields.split(',')))
+    return make_key('places', endpoint, subject, fields, params)
+
+
+def places_request(endpoint: str, params: Dict, timeout: int = 10) -> Dict:
+    """
+    GET a Places web service endpoint through the cache
+
+    Args:
+        endpoint: 'textsearch', 'nearbysearch' or 'details'
+        params: Query params, including 'key'
+
+    Returns:
+        Parsed JSON response (same shape as the live API)
+    """
+    cache = get_places_cache()
+    key = places_key(endpoint, params)
+
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    # Rate-limited; OVER_QUERY_LIMIT / 5xx are retried with backoff
+    response = get_http().get('places', f"{PLACES_BASE_URL}/{endpoint}/json", params=params, timeout=timeout)
+    data = response.json()
+    get_metrics().count_places(endpoint, params.get('fields'))
+
+    if cache is not None and data.get('status') in CACHEABLE_STATUSES:
+        cache.set(key, data, ttl=PLACES_CACHE_TTL.get(endpoint))
+
+    return data
+
+
+class CachedPlacesClient:
+    """googlemaps.Client wrapper that serves places/place/places_nearby from disk"""
+
+    def __init__(self, client, cache: Optional[DiskCache] = None):
+        self._client = client
+        self._cache = cache if cache is not None else get_places_cache()
+
+    def places(self, query: str = None, **kwargs) -> Dict:
+        return self._cached('textsearch', self._client.places, dict(kwargs, query=query))
+
+    def places_nearby(self, **kwargs) -> Dict:
+        return self._cached('nearbysearch', self._client.places_nearby, kwargs)
+
+    def place(self, place_id: str, refresh: bool = False, **kwargs) -> Dict:
+        """Place details; refresh=True skips the cached copy (and stores the new one)"""
+        return self._cached('details', self._client.place, dict(kwargs, place_id=place_id), refresh)
+
+    def has(self, endpoint: str, params: Dict) -> bool:
+        """True if a live, unexpired response for this call is already on disk"""
+        if self._cache is None:
+            return False
+        return self._cache.contains(places_key(endpoint, dict(params)))
+
+    def _cached(self, endpoint: str, call, params: Dict, refresh: bool = False) -> Dict:
+        key = places_key(endpoint, dict(params))
+        if self._cache is not None and not refresh:
+            cached = self._cache.get(key)
+            if cached is not None:
+                return cached
+
+        # googlemaps retries OVER_QUERY_LIMIT itself; share the Places quota and counters
+        data = get_http().call('places', endpoint, lambda: call(**params))
+        get_metrics().count_places(endpoint, params.get('fields'))
+        if self._cache is not None and data.get('status', 'OK') in CACHEABLE_STATUSES:
+            self._cache.set(key, data, ttl=PLACES_CACHE_TTL.get(endpoint))
+        return data
+
+    def __getattr__(self, name):
+        # Everything else (geocode, places_photo, ...) is not cached, but still
+        # runs under the shared quota and shows up in the cost report
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+        api, endpoint = PASSTHROUGH_ENDPOINTS.get(name, ('places', name))
+
+        def call(*args, **kwargs):
+            result = get_http().call(api, endpoint, lambda: attr(*args, **kwargs))
+            get_metrics().count_places(endpoint, kwargs.get('fields'))
+            return result
+
+        return call
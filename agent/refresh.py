@@ -0,0 +1,396 @@
+"""
+========================================
+INCREMENTAL PROVIDER REFRESH
+Re-checks stale agent providers and PATCHes only what changed
+========================================
+
+Keeping ratings, hours, websites and photos current used to mean a full
+discovery run (text search, details, crawl, AI extraction, photos) for
+every market. A refresh instead:
+
+    select   GET /admin/providers?source=agent&refreshedBefore=<cutoff>,
+             stalest first, with a compact field list
+    details  one live Place Details call per provider with a minimal field
+             mask (no address or geometry, which do not drift)
+    website  a conditional GET (If-None-Match / If-Modified-Since); only a
+             site whose text changed is re-crawled and re-extracted
+    diff     each source field is hashed and compared with the hash stored
+             on the provider (refresh.hashes), so admin edits are only
+             overwritten when the source itself changed
+    patch    batched PATCH /admin/providers with the changed paths plus
+             the new hashes / refreshedAt; photos are re-fetched only when
+             the Places photo list changed
+
+    refresher = ProviderRefresher(api_client, places_client, enricher, rate_limiter)
+    refresher.run(max_age_days=7)
+
+Runs are idempotent and stalest-first, so an interrupted refresh just
+carries on with whatever is still due the next time.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from typing import Dict, List, Optional
+
+import googlemaps.exceptions
+import requests
+
+from bulk_ingest import BulkIngestClient
+from fetcher import visible_text
+from metrics import get_metrics
+from pipeline import Pipeline, Stage
+
+REFRESH_MAX_AGE_DAYS = float(os.getenv('REFRESH_MAX_AGE_DAYS', 7))
+# Basic (business_status, photo) + Contact (phone, website, hours) + Atmosphere (rating)
+REFRESH_PLACE_FIELDS = [
+    field.strip() for field in os.getenv(
+        'REFRESH_PLACE_FIELDS',
+        'business_status,formatted_phone_number,website,opening_hours,rating,user_ratings_total,photo'
+    ).split(',') if field.strip()
+]
+REFRESH_DETAILS_WORKERS = int(os.getenv('REFRESH_DETAILS_WORKERS', 8))
+REFRESH_WEBSITE_WORKERS = int(os.getenv('REFRESH_WEBSITE_WORKERS', 8))
+REFRESH_PHOTO_COUNT = int(os.getenv('REFRESH_PHOTO_COUNT', 3))
+
+# What the diff needs from each stored provider
+REFRESH_SNAPSHOT_FIELDS = ('practiceName,address,googlePlaceId,phone,website,googleRating,googleReviewCount,'
+                           'googleBusinessStatus,calendar.businessHours,services,insuranceAccepted,photos.hash,'
+                           'refresh')
+
+DAYS = ('sunday', 'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday')
+
+
+def field_hash(value) -> str:
+    """Short stable hash of a JSON-able value"""
+    canonical = json.dumps(value, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()[:16]
+
+
+def _clock(hhmm: str) -> str:
+    return f"{hhmm[:2]}:{hhmm[2:]}"
+
+
+def business_hours(opening_hours: Optional[Dict]) -> Optional[Dict]:
+    """Places opening_hours.periods -> the provider calendar.businessHours shape"""
+    periods = (opening_hours or {}).get('periods')
+    if not periods:
+        return None
+
+    # Open 24/7 is a single period with no close
+    if len(periods) == 1 and 'close' not in periods[0]:
+        return {day: {'isOpen': True, 'open': '00:00', 'close': '23:59'} for day in DAYS}
+
+    hours = {day: {'isOpen': False} for day in DAYS}
+    for period in periods:
+        day = DAYS[period['open']['day']]
+        close = _clock(period.get('close', {}).get('time', '2359'))
+        if hours[day]['isOpen']:
+            # Split days (lunch break): first opening, last closing
+            hours[day]['close'] = close
+        else:
+            hours[day] = {'isOpen': True, 'open': _clock(period['open']['time']), 'close': close}
+    return hours
+
+
+def photo_fingerprint(photos: Optional[List[Dict]]) -> Optional[List]:
+    """Photo references rotate between calls; sizes and attributions do not"""
+    if not photos:
+        return None
+    return [[photo.get('width'), photo.get('height'), photo.get('html_attributions', [])]
+            for photo in photos[:REFRESH_PHOTO_COUNT]]
+
+
+# Refresh field -> (Place Details mask field, value from the details result)
+PLACE_SOURCES = {
+    'phone': ('formatted_phone_number',
+              lambda details: (details.get('formatted_phone_number') or '').replace(' ', '') or None),
+    'website': ('website', lambda details: details.get('website')),
+    'rating': ('rating', lambda details: details.get('rating')),
+    'reviews': ('user_ratings_total', lambda details: details.get('user_ratings_total')),
+    'hours': ('opening_hours', lambda details: business_hours(details.get('opening_hours'))),
+    'status': ('business_status', lambda details: details.get('business_status')),
+    'photos': ('photo', lambda details: photo_fingerprint(details.get('photos'))),
+}
+
+
+def backend_paths(field: str, value) -> Dict:
+    """$set paths a changed refresh field writes (photos are attached separately)"""
+    if field == 'phone':
+        return {'phone': value, 'contactInfo.phone': value}
+    if field == 'website':
+        return {'website': value, 'contactInfo.website': value}
+    return {
+        'rating': {'googleRating': value},
+        'reviews': {'googleReviewCount': value},
+        'hours': {'calendar.businessHours': value},
+        'status': {'googleBusinessStatus': value},
+        'services': {'services': value},
+        'insurance': {'insuranceAccepted': value},
+    }.get(field, {})
+
+
+def stored_value(provider: Dict, field: str):
+    """Current backend value of a refresh field (baseline before any hash is stored)"""
+    if field == 'hours':
+        return (provider.get('calendar') or {}).get('businessHours')
+    return {
+        'phone': provider.get('phone'),
+        'website': provider.get('website'),
+        'rating': provider.get('googleRating'),
+        'reviews': provider.get('googleReviewCount'),
+        'status': provider.get('googleBusinessStatus'),
+        'services': provider.get('services'),
+        'insurance': provider.get('insuranceAccepted'),
+    }.get(field)
+
+
+class ProviderPatchClient(BulkIngestClient):
+    """Batches refresh diffs into PATCH /api/admin/providers"""
+
+    def __init__(self, api_base: str, token: Optional[str] = None, **kwargs):
+        super().__init__(api_base, token, **kwargs)
+        self.url = f"{api_base.rstrip('/')}/admin/providers"
+        self.stats = {'requests': 0, 'sent': 0, 'updated': 0, 'unchanged': 0, 'not_found': 0, 'error': 0}
+
+    def _request(self, entries: List[Dict]) -> requests.Response:
+        # Absolute $set values, so a retried batch is harmless
+        return self.http.patch(
+            'backend',
+            self.url,
+            headers=self._headers(),
+            json={'updates': entries},
+            timeout=self.timeout,
+            idempotent=True
+        )
+
+    def report(self):
+        s = self.stats
+        print(f"📤 Refresh PATCH: {s['sent']} providers in {s['requests']} requests "
+              f"({s['updated']} changed, {s['unchanged']} unchanged, {s['not_found']} gone, {s['error']} failed)")
+
+
+class ProviderRefresher:
+    def __init__(self, api_client, places_client, enricher=None, rate_limiter=None, photos=None,
+                 fields: List[str] = None, dry_run: bool = False):
+        """
+        Args:
+            api_client: agent.APIClient (authenticated)
+            places_client: CachedPlacesClient (details are fetched live)
+            enricher: ProviderEnricher for re-extracting changed websites (None skips it)
+            rate_limiter: Per-host politeness limiter for website requests
+            photos: PhotoPipeline for providers whose Places photos changed (None skips them)
+            fields: Place Details field mask (default REFRESH_PLACE_FIELDS)
+            dry_run: Print the diffs instead of sending them
+        """
+        self.api_client = api_client
+        self.places = places_client
+        self.enricher = enricher
+        self.rate_limiter = rate_limiter
+        self.photos = photos
+        self.fields = list(fields or REFRESH_PLACE_FIELDS)
+        if photos is None and 'photo' in self.fields:
+            self.fields.remove('photo')
+        self.dry_run = dry_run
+
+        self.patches = ProviderPatchClient(api_client.base_url, api_client.token,
+                                           on_result=self._record_patch, http=api_client.http)
+        self.stats = {'selected': 0, 'checked': 0, 'changed': 0, 'unchanged': 0, 'gone': 0,
+                      'site_not_modified': 0, 'site_unchanged': 0, 'site_changed': 0, 'site_failed': 0,
+                      'photos_refreshed': 0, 'errors': 0}
+        self.changed_fields: Dict[str, int] = {}
+        self._stats_lock = threading.Lock()
+        self.metrics = get_metrics()
+
+    # ---- selection ---------------------------------------------------------
+
+    def select(self, max_age_days: float, limit: int = None) -> List[Dict]:
+        """Providers due for a refresh, listed up front (PATCHes move them out of the filter)"""
+        cutoff = datetime.now(timezone.utc) - timedelta(days=max_age_days)
+        candidates = self.api_client.iter_refresh_candidates(cutoff.isoformat(), REFRESH_SNAPSHOT_FIELDS)
+        return list(islice(candidates, limit) if limit else candidates)
+
+    # ---- stages ------------------------------------------------------------
+
+    def _details_stage(self, provider: Dict) -> Dict:
+        item = {'provider': provider, 'values': {}}
+        place_id = provider.get('googlePlaceId')
+        if not place_id:
+            return item
+
+        try:
+            details = self.places.place(place_id, fields=self.fields, refresh=True).get('result', {})
+        except googlemaps.exceptions.ApiError as e:
+            if e.status != 'NOT_FOUND':
+                raise
+            item['values']['status'] = 'NOT_FOUND'
+            return item
+
+        for field, (mask_field, read) in PLACE_SOURCES.items():
+            if mask_field in self.fields:
+                item['values'][field] = read(details)
+        item['photo_refs'] = [photo['photo_reference'] for photo in details.get('photos', [])][:REFRESH_PHOTO_COUNT]
+        return item
+
+    def _website_stage(self, item: Dict) -> Dict:
+        provider = item['provider']
+        website = item['values'].get('website') or provider.get('website')
+        if not website or not self.enricher:
+            return item
+
+        state = provider.get('refresh') or {}
+        # Validators belong to the old URL when the website moved
+        same_site = website == provider.get('website')
+        if self.rate_limiter:
+            self.rate_limiter.wait(website)
+        response = self.enricher.fetcher.fetch_conditional(
+            website,
+            state.get('etag') if same_site else None,
+            state.get('lastModified') if same_site else None
+        )
+
+        if response['status'] == 304:
+            self._count('site_not_modified')
+            return item
+        if response['html'] is None:
+            self._count('site_failed')
+            return item
+
+        site_hash = field_hash(visible_text(response['html']))
+        item['site'] = {'hash': site_hash, 'etag': response['etag'], 'last_modified': response['last_modified']}
+        stored_hash = (state.get('hashes') or {}).get('site')
+        if site_hash == stored_hash or (stored_hash is None and provider.get('services')):
+            # Unchanged, or a first refresh of a site extracted at discovery
+            self._count('site_unchanged')
+            return item
+
+        self._count('site_changed')
+        agent_provider = {
+            'practice_name': provider['practiceName'],
+            'website': website,
+            'city': (provider.get('address') or {}).get('city', ''),
+            'state': (provider.get('address') or {}).get('state', ''),
+        }
+        before_fetch = self.rate_limiter.wait if self.rate_limiter else None
+        site_text = self.enricher.scrape(agent_provider, before_fetch=before_fetch)
+        extracted = self.enricher.extract(agent_provider, site_text)
+        if 'services' in extracted:
+            item['values']['services'] = extracted['services']
+        if 'insurance_accepted' in extracted:
+            item['values']['insurance'] = extracted['insurance_accepted']
+        if 'services' not in extracted and 'insurance_accepted' not in extracted:
+            # Nothing extracted: leave the site hash alone so the next run retries
+            item.pop('site')
+        return item
+
+    def _diff_stage(self, item: Dict) -> Optional[Dict]:
+        provider = item['provider']
+        hashes = (provider.get('refresh') or {}).get('hashes') or {}
+        changes = {'refresh.refreshedAt': datetime.now(timezone.utc).isoformat()}
+        changed = []
+
+        for field, value in item['values'].items():
+            new_hash = field_hash(value)
+            old_hash = hashes.get(field)
+            if old_hash is None:
+                # First refresh: compare with what is stored; existing photos count as current
+                old_hash = new_hash if field == 'photos' and provider.get('photos') \
+                    else field_hash(stored_value(provider, field))
+            if new_hash == old_hash:
+                if field not in hashes:
+                    changes[f'refresh.hashes.{field}'] = new_hash
+                continue
+
+            changes[f'refresh.hashes.{field}'] = new_hash
+            # A value the source dropped is not a change worth writing
+            if value is not None:
+                changes.update(backend_paths(field, value))
+                changed.append(field)
+
+        site = item.get('site')
+        if site:
+            changes['refresh.hashes.site'] = site['hash']
+            if site['etag']:
+                changes['refresh.etag'] = site['etag']
+            if site['last_modified']:
+                changes['refresh.lastModified'] = site['last_modified']
+
+        self._count('checked')
+        self._count('changed' if changed else 'unchanged')
+        with self._stats_lock:
+            for field in changed:
+                self.changed_fields[field] = self.changed_fields.get(field, 0) + 1
+
+        if changed:
+            print(f"{'📝' if self.dry_run else '🔄'} {provider['practiceName']}: {', '.join(changed)} changed")
+        if not self.dry_run:
+            self.patches.add({'id': provider['_id'], 'set': changes}, context=provider)
+
+        # Photo list changed (or the provider has none yet): attach the current ones
+        if self.photos is not None and item.get('photo_refs') and 'photos' in changed:
+            return item
+        return None
+
+    def _photos_stage(self, item: Dict) -> Dict:
+        provider = item['provider']
+        if not self.dry_run:
+            self.photos.add_photos(provider['_id'], item['photo_refs'])
+        self._count('photos_refreshed')
+        return item
+
+    # ---- run ---------------------------------------------------------------
+
+    def run(self, max_age_days: float = REFRESH_MAX_AGE_DAYS, limit: int = None) -> Dict:
+        """Refresh every provider due; returns the run stats"""
+        providers = self.select(max_age_days, limit)
+        self.stats['selected'] = len(providers)
+        print(f"🗓️  {len(providers)} agent providers not refreshed in {max_age_days:g} days")
+        print(f"   Place Details mask: {','.join(self.fields)}")
+
+        stages = [
+            Stage('details', self._details_stage, REFRESH_DETAILS_WORKERS),
+            Stage('website', self._website_stage, REFRESH_WEBSITE_WORKERS),
+            Stage('diff', self._diff_stage, 1),
+        ]
+        if self.photos is not None:
+            stages.append(Stage('photos', self._photos_stage, 2))
+
+        Pipeline(stages, on_error=self._record_error, metrics=self.metrics).run(providers)
+        self.patches.flush()
+        return self.stats
+
+    def _record_patch(self, provider: Dict, result: Dict):
+        if result['status'] == 'not_found':
+            self._count('gone')
+        elif result['status'] == 'error':
+            self._count('errors')
+            print(f"❌ Refresh PATCH failed for {provider['practiceName']}: {result.get('error')}")
+
+    def _record_error(self, stage: str, item, error: Exception):
+        provider = item.get('provider', item) if isinstance(item, dict) else {}
+        self._count('errors')
+        print(f"❌ refresh {stage} failed for {provider.get('practiceName')}: {error}")
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def report(self):
+        """Print the end-of-run refresh lines"""
+        s = self.stats
+        cost = self.metrics.cost_usd()
+        print(f"🔄 Refresh: {s['checked']}/{s['selected']} checked, {s['changed']} changed, "
+              f"{s['unchanged']} unchanged, {s['gone']} gone, {s['errors']} errors")
+        if self.changed_fields:
+            print("   Fields changed: " + ', '.join(f"{field} {count}" for field, count
+                                                   in sorted(self.changed_fields.items())))
+        print(f"🌐 Websites: {s['site_not_modified']} not modified (304), {s['site_unchanged']} unchanged, "
+              f"{s['site_changed']} re-extracted, {s['site_failed']} unreachable")
+        if self.photos is not None:
+            print(f"📸 Photos refreshed for {s['photos_refreshed']} providers")
+        if not self.dry_run:
+            self.patches.report()
+        print(f"💵 Estimated cost: ${cost:.2f} (${cost / max(s['checked'], 1):.4f} per provider)")
@@ -0,0 +1,725 @@
+#!/usr/bin/env python3
+"""
+========================================
+OFFLINE REPLAY HARNESS
+Recorded Places / website / LLM fixtures and a local admin API
+========================================
+
+Measuring agent throughput used to need live Google, OpenAI and backend
+calls. A fixture directory holds everything a run reads from outside:
+
+    places.jsonl   Places web service responses (text / nearby search pages,
+                   details, geocode), keyed like the Places cache
+    sites.jsonl    website responses by URL (status, ETag / Last-Modified, HTML)
+    llm.jsonl      extraction documents keyed by a hash of the chat messages
+    manifest.json  the run the fixtures were made for (city, state, type, queries)
+
+ReplayEnvironment then runs the real ProviderAgent against them:
+
+    - Places and website requests are answered at the transport layer by
+      ReplayAdapter (mounted on the shared and fetcher sessions), so the
+      cache, quota and retry code paths still run
+    - OpenAI goes to fake_openai_server.py, the admin REST API to
+      fake_admin_server.py
+    - every kind of request can be slowed down by a fixed latency
+
+    with ReplayEnvironment('./fixtures/bozeman', Latency.parse('typical')) as env:
+        report = env.run(max_profiles=100)       # providers/sec per stage, requests, memory
+
+Fixtures come from a live run (python agent.py ... --record DIR) or are
+generated (python replay.py synth DIR --providers 500).
+"""
+
+import hashlib
+import json
+import os
+import random
+import resource
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional
+from urllib.parse import parse_qsl, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from fake_admin_server import start_fake_admin
+from fake_openai_server import start_fake_openai
+from places_cache import places_key
+
+PLACES_HOST = 'maps.googleapis.com'
+FIXTURE_FILES = {'places': 'places.jsonl', 'sites': 'sites.jsonl', 'llm': 'llm.jsonl'}
+MANIFEST_FILE = 'manifest.json'
+
+# googlemaps sends these on the wire; the Places cache keys use the SDK names
+_WIRE_RENAMES = {'placeid': 'place_id', 'pagetoken': 'page_token'}
+_WIRE_DEFAULTS = {'maxprice': 'None', 'minprice': 'None', 'reviews_sort': 'most_relevant'}
+# Place Details mask names whose result key differs
+_DETAIL_RESULT_KEYS = {'address_component': 'address_components', 'photo': 'photos', 'review': 'reviews',
+                       'type': 'types', 'adr_address': 'adr_address'}
+
+
+class Latency(NamedTuple):
+    """Seconds added to every request of each kind"""
+    places: float = 0.0
+    site: float = 0.0
+    llm: float = 0.0
+    backend: float = 0.0
+
+    @classmethod
+    def parse(cls, text: Optional[str]) -> 'Latency':
+        """'typical', 'none' or 'places=0.1,site=0.3,llm=1.5,backend=0.03'"""
+        if not text:
+            return cls()
+        if text in LATENCY_PROFILES:
+            return LATENCY_PROFILES[text]
+        values = {}
+        for part in text.split(','):
+            name, _, value = part.partition('=')
+            if name.strip() not in cls._fields:
+                raise ValueError(f"unknown latency '{name}' (expected {', '.join(cls._fields)})")
+            values[name.strip()] = float(value)
+        return cls(**values)
+
+
+LATENCY_PROFILES = {
+    'none': Latency(),
+    # Roughly what production runs see
+    'typical': Latency(places=0.15, site=0.3, llm=1.5, backend=0.03),
+}
+
+
+def llm_key(messages: List[Dict]) -> str:
+    """Fixture key for one extraction request"""
+    canonical = json.dumps(messages, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def wire_places_key(endpoint: str, query: Dict[str, str]) -> str:
+    """Places cache key for a request as googlemaps puts it on the wire"""
+    params = {}
+    for name, value in query.items():
+        if _WIRE_DEFAULTS.get(name) == value:
+            continue
+        params[_WIRE_RENAMES.get(name, name)] = value
+    return places_key(endpoint, params)
+
+
+def _places_endpoint(url: str) -> Optional[str]:
+    """'textsearch', 'details', 'geocode', ... for a Maps web service URL"""
+    parsed = urlparse(url)
+    if parsed.hostname != PLACES_HOST:
+        return None
+    segments = [s for s in parsed.path.split('/') if s]
+    if segments and segments[-1] == 'json':
+        segments.pop()
+    return segments[-1] if segments else None
+
+
+class FixtureStore:
+    """Fixture directory loaded into memory; appends when recording"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.places: Dict[str, Dict] = {}
+        self.details: Dict[str, Dict] = {}
+        self.sites: Dict[str, Dict] = {}
+        self.llm: Dict[str, Dict] = {}
+        self.requests = Counter()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        for record in self._read('places'):
+            self._index_place(record)
+        for record in self._read('sites'):
+            self.sites[record['url']] = record
+        for record in self._read('llm'):
+            self.llm[record['key']] = record['document']
+
+    def _read(self, kind: str):
+        path = os.path.join(self.directory, FIXTURE_FILES[kind])
+        if not os.path.exists(path):
+            return
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def _index_place(self, record: Dict):
+        self.places[record['key']] = record['response']
+        if record.get('endpoint') == 'details' and record.get('place_id'):
+            # Any field mask for a known place can be answered from the union
+            merged = self.details.setdefault(record['place_id'], {})
+            merged.update(record['response'].get('result') or {})
+
+    def append(self, kind: str, record: Dict):
+        with self._lock:
+            with open(os.path.join(self.directory, FIXTURE_FILES[kind]), 'a') as f:
+                f.write(json.dumps(record) + '\n')
+            if kind == 'places':
+                self._index_place(record)
+            elif kind == 'sites':
+                self.sites[record['url']] = record
+            else:
+                self.llm[record['key']] = record['document']
+
+    def count(self, label: str):
+        with self._lock:
+            self.requests[label] += 1
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.requests)
+
+    # ---- lookups -----------------------------------------------------------
+
+    def place_response(self, endpoint: str, query: Dict[str, str]) -> Optional[Dict]:
+        response = self.places.get(wire_places_key(endpoint, query))
+        if response is not None or endpoint != 'details':
+            return response
+
+        full = self.details.get(query.get('placeid') or query.get('place_id'))
+        if full is None:
+            return None
+        fields = [f for f in (query.get('fields') or '').split(',') if f]
+        if not fields:
+            return {'status': 'OK', 'result': full}
+        keys = {_DETAIL_RESULT_KEYS.get(f, f) for f in fields}
+        return {'status': 'OK', 'result': {k: v for k, v in full.items() if k in keys}}
+
+    def site(self, url: str) -> Optional[Dict]:
+        return self.sites.get(url) or self.sites.get(url.rstrip('/')) or self.sites.get(url.rstrip('/') + '/')
+
+    def write_manifest(self, manifest: Dict):
+        with open(os.path.join(self.directory, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+    def manifest(self) -> Dict:
+        path = os.path.join(self.directory, MANIFEST_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+
+def _response(request: requests.PreparedRequest, status: int, body: str = '',
+              headers: Dict[str, str] = None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response.reason = requests.status_codes._codes.get(status, ('',))[0].upper()
+    response._content = body.encode('utf-8')
+    response.headers = CaseInsensitiveDict(headers or {})
+    response.encoding = 'utf-8'
+    response.url = request.url
+    response.request = request
+    return response
+
+
+class ReplayAdapter(HTTPAdapter):
+    """Answers Places and website requests from fixtures; nothing leaves the process"""
+
+    def __init__(self, store: FixtureStore, latency: Latency = Latency()):
+        super().__init__()
+        self.store = store
+        self.latency = latency
+
+    def send(self, request, **kwargs):
+        endpoint = _places_endpoint(request.url)
+        if endpoint:
+            self.store.count(f"places {endpoint}")
+            if self.latency.places:
+                time.sleep(self.latency.places)
+            data = self.store.place_response(endpoint, dict(parse_qsl(urlparse(request.url).query)))
+            if data is None:
+                self.store.count('places miss')
+                data = {'status': 'NOT_FOUND', 'results': []}
+            return _response(request, 200, json.dumps(data), {'Content-Type': 'application/json'})
+
+        self.store.count('site')
+        if self.latency.site:
+            time.sleep(self.latency.site)
+        record = self.store.site(request.url)
+        if record is None:
+            self.store.count('site miss')
+            return _response(request, 404, 'Not Found', {'Content-Type': 'text/html'})
+
+        headers = record.get('headers') or {}
+        etag = headers.get('ETag')
+        if etag and request.headers.get('If-None-Match') == etag:
+            self.store.count('site not modified')
+            return _response(request, 304, '', headers)
+        return _response(request, record.get('status', 200), record.get('body', ''), headers)
+
+
+class RecordingAdapter(HTTPAdapter):
+    """Passes requests through and appends Places JSON / website HTML to the fixtures"""
+
+    RECORDED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+    def __init__(self, store: FixtureStore, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        if request.method != 'GET' or response.status_code != 200:
+            return response
+
+        endpoint = _places_endpoint(request.url)
+        try:
+            if endpoint and endpoint != 'photo':
+                query = dict(parse_qsl(urlparse(request.url).query))
+                self.store.append('places', {
+                    'endpoint': endpoint,
+                    'place_id': query.get('placeid'),
+                    'key': wire_places_key(endpoint, query),
+                    'response': response.json(),
+                })
+            elif not endpoint and 'html' in response.headers.get('Content-Type', ''):
+                self.store.append('sites', {
+                    'url': request.url,
+                    'status': 200,
+                    'headers': {h: response.headers[h] for h in self.RECORDED_HEADERS if h in response.headers},
+                    'body': response.text,
+                })
+        except ValueError:
+            pass
+        return response
+
+
+class RecordingLLMCache:
+    """Wraps the LLM cache so every extraction result is also written as a fixture"""
+
+    def __init__(self, inner, store: FixtureStore):
+        self._inner = inner
+        self.store = store
+
+    def get_or_call(self, model: str, prompt_version: str, input_text: str, call):
+        document = self._inner.get_or_call(model, prompt_version, input_text, call)
+        self.store.append('llm', {'key': llm_key(json.loads(input_text)), 'document': document})
+        return document
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+
+def record(agent, directory: str, manifest: Dict = None) -> FixtureStore:
+    """Record everything a live run reads from Places, websites and OpenAI into `directory`"""
+    from http_client import get_http
+
+    store = FixtureStore(directory)
+    if manifest:
+        store.write_manifest(manifest)
+
+    # Cached Places answers would never reach the wire, so go live for the recording
+    agent.maps_discovery.client._cache = None
+    get_http().session.mount(f'https://{PLACES_HOST}/', RecordingAdapter(store))
+    if agent.enricher:
+        for prefix in ('http://', 'https://'):
+            agent.enricher.fetcher.session.mount(prefix, RecordingAdapter(store, pool_connections=32,
+                                                                          pool_maxsize=32))
+        agent.enricher.llm_cache = RecordingLLMCache(agent.enricher.llm_cache, store)
+    print(f"🎙️  Recording fixtures to {directory}")
+    return store
+
+
+# ========================================
+# SYNTHETIC FIXTURES
+# ========================================
+
+_STREETS = ['Main St', 'Oak Ave', 'Mendenhall St', 'Babcock St', 'Willson Ave', 'College St',
+            'Durston Rd', 'Kagy Blvd', 'Huffine Ln', 'Story St']
+_SERVICES = [('Cleaning', 'preventive', 60, 12000), ('Exam', 'preventive', 30, 8500),
+             ('Whitening', 'cosmetic', 90, 35000), ('Filling', 'acute', 45, 18000),
+             ('Crown', 'acute', 120, 110000), ('X-Rays', 'preventive', 15, 6000)]
+_INSURERS = ['Aetna', 'Cigna', 'Delta Dental', 'MetLife', 'Blue Cross Blue Shield', 'Guardian']
+_FILLER = ('Our team has served the community for years with gentle, modern care. '
+           'We welcome new patients of all ages and offer flexible scheduling, '
+           'evening appointments and a comfortable office. ')
+
+
+def synthetic_extraction(body: Dict) -> Dict:
+    """Deterministic schema-valid extraction for prompts without a recorded answer"""
+    rng = random.Random(llm_key(body.get('messages') or []))
+    services = rng.sample(_SERVICES, 3)
+    return {
+        'services': [{'name': name, 'category': category, 'duration_minutes': minutes, 'price_cents': cents}
+                     for name, category, minutes, cents in services],
+        'bio': 'Family practice offering preventive and cosmetic care.',
+        'specialties': [services[0][1]],
+        'insurance_accepted': rng.sample(_INSURERS, 2),
+        'years_experience': rng.randint(3, 30),
+    }
+
+
+def _site_pages(name: str, rng: random.Random) -> Dict[str, str]:
+    services = ''.join(f"<li>{s} - ${c // 100}</li>" for s, _, _, c in rng.sample(_SERVICES, 4))
+    insurers = ''.join(f"<li>{i}</li>" for i in rng.sample(_INSURERS, 3))
+    nav = '<nav><a href="/services">Services &amp; Pricing</a> <a href="/insurance">Insurance</a></nav>'
+    return {
+        '/': f"<html><head><title>{name}</title></head><body>{nav}<main><h1>{name}</h1>"
+             f"<p>{_FILLER * 3}</p></main><footer>© {name}</footer></body></html>",
+        '/services': f"<html><body>{nav}<main><h1>Services</h1><ul>{services}</ul>"
+                     f"<p>{_FILLER}</p></main></body></html>",
+        '/insurance': f"<html><body>{nav}<main><h1>Insurance</h1><ul>{insurers}</ul>"
+                      f"<p>{_FILLER}</p></main></body></html>",
+    }
+
+
+def synthesize(directory: str, providers: int = 200, city: str = 'Bozeman', state: str = 'MT',
+               zip_code: str = '59715', provider_type: str = 'dental', seed: int = 7) -> Dict:
+    """
+    Write a deterministic fixture set for `providers` practices
+
+    Returns:
+        The manifest (queries are sized so every practice is discoverable)
+    """
+    rng = random.Random(seed)
+    per_query = 60  # 3 pages of 20
+    queries = [f"{provider_type} clinic {n + 1}" for n in range(max(1, -(-providers // per_query)))]
+    location = f"{city}, {state}"
+    manifest = {'city': city, 'state': state, 'provider_type': provider_type, 'queries': queries,
+                'location': location, 'providers': providers}
+
+    if os.path.exists(directory):
+        shutil.rmtree(directory)
+    store = FixtureStore(directory)
+    store.write_manifest(manifest)
+
+    places, sites, details = [], [], []
+    for i in range(providers):
+        place_id = f"replay-place-{i:05d}"
+        name = f"{city} {provider_type.title()} Studio {i + 1}"
+        number = str(100 + i * 7 % 4000)
+        street = _STREETS[i % len(_STREETS)]
+        lat, lng = 45.68 + rng.uniform(-0.05, 0.05), -111.04 + rng.uniform(-0.05, 0.05)
+        website = f"https://practice-{i:05d}.example/"
+        places.append({
+            'name': name,
+            'place_id': place_id,
+            'formatted_address': f"{number} {street}, {city}, {state} {zip_code}, USA",
+            'geometry': {'location': {'lat': lat, 'lng': lng}},
+            'rating': round(rng.uniform(3.5, 5.0), 1),
+            'user_ratings_total': rng.randint(5, 400),
+            'business_status': 'OPERATIONAL',
+        })
+        details.append({
+            'endpoint': 'details',
+            'place_id': place_id,
+            'key': places_key('details', {'place_id': place_id}),
+            'response': {'status': 'OK', 'result': {
+                'place_id': place_id,
+                'name': name,
+                'address_components': [
+                    {'long_name': number, 'short_name': number, 'types': ['street_number']},
+                    {'long_name': street, 'short_name': street, 'types': ['route']},
+                    {'long_name': city, 'short_name': city, 'types': ['locality', 'political']},
+                    {'long_name': state, 'short_name': state,
+                     'types': ['administrative_area_level_1', 'political']},
+                    {'long_name': zip_code, 'short_name': zip_code, 'types': ['postal_code']},
+                    {'long_name': 'United States', 'short_name': 'US', 'types': ['country', 'political']},
+                ],
+                'formatted_phone_number': f"(406) 555-{i % 10000:04d}",
+                'website': website,
+                'rating': places[-1]['rating'],
+                'user_ratings_total': places[-1]['user_ratings_total'],
+                'business_status': 'OPERATIONAL',
+                'opening_hours': {'periods': [
+                    {'open': {'day': day, 'time': '0800'}, 'close': {'day': day, 'time': '1700'}}
+                    for day in range(1, 6)
+                ]},
+                'photos': [{'photo_reference': f"{place_id}-photo-{n}", 'width': 1600, 'height': 1200,
+                            'html_attributions': [name]} for n in range(3)],
+            }},
+        })
+        for path, html in _site_pages(name, rng).items():
+            sites.append({
+                'url': website.rstrip('/') + path,
+                'status': 200,
+                'headers': {'Content-Type': 'text/html; charset=utf-8',
+                            'ETag': f'"{hashlib.sha1(html.encode()).hexdigest()[:16]}"',
+                            'Last-Modified': 'Mon, 05 Oct 2026 08:00:00 GMT'},
+                'body': html,
+            })
+
+    # Text search pages: 20 results each, chained by next_page_token
+    for q, query in enumerate(queries):
+        chunk = places[q * per_query:(q + 1) * per_query]
+        pages = [chunk[p:p + 20] for p in range(0, len(chunk), 20)] or [[]]
+        for p, results in enumerate(pages):
+            token = f"replay-token-{q}-{p + 1}" if p + 1 < len(pages) else None
+            params = {'query': query_text(query, location)} if p == 0 else {'page_token': f"replay-token-{q}-{p}"}
+            response = {'status': 'OK' if results else 'ZERO_RESULTS', 'results': results}
+            if token:
+                response['next_page_token'] = token
+            store.append('places', {'endpoint': 'textsearch', 'key': places_key('textsearch', params),
+                                    'response': response})
+
+    for record in details:
+        store.append('places', record)
+    for record in sites:
+        store.append('sites', record)
+
+    print(f"🧪 Synthesized {providers} providers ({len(queries)} queries, {len(sites)} pages) in {directory}")
+    return manifest
+
+
+def query_text(query: str, location: str) -> str:
+    # Must match GoogleMapsDiscovery.QUERY_TEMPLATE
+    return f"{query} in {location}"
+
+
+# ========================================
+# REPLAY ENVIRONMENT
+# ========================================
+
+class ReplayEnvironment:
+    def __init__(self, fixture_dir: str, latency: Latency = Latency(), seed_providers: List[Dict] = None,
+                 workdir: str = None, rates: Dict[str, float] = None, politeness: float = 0.0):
+        """
+        Args:
+            fixture_dir: Directory with places.jsonl / sites.jsonl / llm.jsonl / manifest.json
+            latency: Per-kind request latency to inject
+            seed_providers: Providers the fake admin API starts with (duplicate checks)
+            workdir: Journal and export directory (a temporary one by default)
+            rates: http_client requests/sec per API (default: unlimited)
+            politeness: Per-host delay between website requests (SCRAPER_RATE_LIMIT)
+        """
+        self.store = FixtureStore(fixture_dir)
+        self.manifest = self.store.manifest()
+        self.latency = latency
+        self.seed_providers = seed_providers
+        self.rates = rates
+        self.politeness = politeness
+        self._own_workdir = workdir is None
+        self.workdir = workdir or tempfile.mkdtemp(prefix='replay-')
+        self.llm_requests = 0
+        self._llm_lock = threading.Lock()
+        self._saved: List = []
+
+    # ---- lifecycle ---------------------------------------------------------
+
+    def __enter__(self) -> 'ReplayEnvironment':
+        import agent as agent_module
+        import llm_cache
+        import places_cache
+
+        self.admin, self.api_base = start_fake_admin(self.seed_providers, self.latency.backend)
+        self.openai, openai_base = start_fake_openai(self._respond)
+
+        config = agent_module.Config
+        self._override(config, 'API_BASE_URL', self.api_base)
+        self._override(config, 'API_ADMIN_EMAIL', 'replay@carrotly.test')
+        self._override(config, 'API_ADMIN_PASSWORD', 'replay')
+        self._override(config, 'GOOGLE_MAPS_API_KEY', 'AIzaReplayFixtures')
+        self._override(config, 'OPENAI_API_KEY', 'replay')
+        self._override(config, 'OPENAI_BASE_URL', openai_base)
+        self._override(config, 'BROWSER_POOL_SIZE', 0)
+        self._override(config, 'SCRAPER_RATE_LIMIT', self.politeness)
+        self._override(config, 'EXPORT_DIRECTORY', os.path.join(self.workdir, 'exports'))
+        self._override(config, 'METRICS_TEXTFILE', None)
+        # Fixtures are the only source: no disk caches in between
+        self._override(places_cache, 'PLACES_CACHE_DISABLED', True)
+        self._override(llm_cache, 'LLM_CACHE_DISABLED', True)
+        self._override(llm_cache, '_llm_cache', None)
+        return self
+
+    def __exit__(self, *exc):
+        self.admin.shutdown()
+        self.openai.shutdown()
+        for target, name, value in reversed(self._saved):
+            setattr(target, name, value)
+        self._saved = []
+        if self._own_workdir:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def _override(self, target, name: str, value):
+        self._saved.append((target, name, getattr(target, name)))
+        setattr(target, name, value)
+
+    def _respond(self, body: Dict) -> Dict:
+        with self._llm_lock:
+            self.llm_requests += 1
+        if self.latency.llm:
+            time.sleep(self.latency.llm)
+        return self.store.llm.get(llm_key(body.get('messages') or [])) or synthetic_extraction(body)
+
+    # ---- agents ------------------------------------------------------------
+
+    def new_agent(self, enrich: bool = True):
+        """A ProviderAgent wired to the fixtures, with fresh metrics and HTTP counters"""
+        import googlemaps
+        import agent as agent_module
+        import http_client
+        import metrics
+
+        self._override(http_client, '_http', http_client.HttpClient(
+            rates=self.rates or {api: 0 for api in http_client.API_RATES}
+        ))
+        self._override(metrics, '_metrics', metrics.RunMetrics())
+
+        agent = agent_module.ProviderAgent(enrich=enrich)
+        http = http_client.get_http()
+        adapter = ReplayAdapter(self.store, self.latency)
+        http.session.mount(f'https://{PLACES_HOST}/', adapter)
+        # The SDK's own 60 QPS pacing would cap replay throughput; the shared
+        # 'places' bucket (rates) is the limit that matters
+        agent.maps_discovery.client._client = googlemaps.Client(
+            key=agent_module.Config.GOOGLE_MAPS_API_KEY, requests_session=http.session,
+            queries_per_second=100000, queries_per_minute=6000000
+        )
+        agent.maps_discovery.PAGE_TOKEN_DELAY = 0
+        if agent.enricher:
+            for prefix in ('http://', 'https://'):
+                agent.enricher.fetcher.session.mount(prefix, adapter)
+        return agent
+
+    def run(self, max_profiles: int = None, enrich: bool = True, trace_memory: bool = False) -> Dict:
+        """One discovery run over the fixture market; returns the measurement report"""
+        from run_journal import RunJournal
+
+        manifest = self.manifest
+        max_profiles = max_profiles or manifest.get('providers') or 25
+        agent = self.new_agent(enrich)
+        journal = RunJournal.create({
+            'city': manifest.get('city', 'Replay'),
+            'state': manifest.get('state', 'XX'),
+            'provider_type': manifest.get('provider_type', 'medical'),
+            'max_profiles': max_profiles,
+            'enrich': enrich,
+        }, path=os.path.join(self.workdir, 'runs.sqlite'))
+
+        def go():
+            agent.run(
+                manifest.get('city', 'Replay'), manifest.get('state', 'XX'),
+                manifest.get('provider_type', 'medical'), max_profiles,
+                journal=journal, queries=manifest.get('queries'), location=manifest.get('location')
+            )
+        return self._measure(go, lambda: agent.results['providers_found'], trace_memory)
+
+    def refresh(self, enrich: bool = True, trace_memory: bool = False) -> Dict:
+        """Refresh every agent provider the fake admin API holds (run() first to fill it)"""
+        from refresh import ProviderRefresher
+
+        agent = self.new_agent(enrich)
+        refresher = ProviderRefresher(agent.api_client, agent.maps_discovery.client, agent.enricher,
+                                      agent.rate_limiter)
+
+        def go():
+            try:
+                refresher.run(max_age_days=0)
+            finally:
+                if agent.enricher:
+                    agent.enricher.close()
+        return self._measure(go, lambda: refresher.stats['checked'], trace_memory)
+
+    def _measure(self, go, providers, trace_memory: bool) -> Dict:
+        import http_client
+        import metrics
+
+        store_before = self.store.counts()
+        admin_before = self.admin.state.counts()
+        llm_before = self.llm_requests
+        if trace_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        try:
+            go()
+        finally:
+            wall = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+            if trace_memory:
+                tracemalloc.stop()
+
+        count = providers()
+        stages = metrics.get_metrics().stage_stats()
+        store_after = self.store.counts()
+        admin_after = self.admin.state.counts()
+        return {
+            'providers': count,
+            'wall_seconds': round(wall, 3),
+            'providers_per_second': round(count / wall, 2) if wall else None,
+            'stages': {
+                name: dict(s,
+                           per_second=round(s['count'] / wall, 2) if wall else None,
+                           per_worker_second=round(s['count'] / s['total_s'], 2) if s['total_s'] else None)
+                for name, s in stages.items()
+            },
+            'requests': {
+                'fixtures': {k: v - store_before.get(k, 0) for k, v in store_after.items()
+                             if v - store_before.get(k, 0)},
+                'openai': self.llm_requests - llm_before,
+                'backend': {k: v - admin_before.get(k, 0) for k, v in admin_after.items()
+                            if v - admin_before.get(k, 0)},
+                'http': http_client.get_http().stats(),
+            },
+            'memory': {
+                'traced_peak_mb': round(peak / 2 ** 20, 1) if peak is not None else None,
+                # Process high-water mark (KB on Linux)
+                'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            },
+            'latency': self.latency._asdict(),
+        }
+
+
+def print_report(report: Dict):
+    print(f"\n📊 {report['providers']} providers in {report['wall_seconds']:.2f}s "
+          f"({report['providers_per_second']} providers/s)")
+    for name, s in report['stages'].items():
+        print(f"   {name:<10} {s['count']:>5} items  {s['per_second']:>8} /s  "
+              f"p50 {s['p50_ms']:.1f} ms  p95 {s['p95_ms']:.1f} ms")
+    requests_ = report['requests']
+    print(f"   fixtures: {requests_['fixtures']}")
+    print(f"   openai: {requests_['openai']}  backend: {requests_['backend']}")
+    memory = report['memory']
+    print(f"   memory: peak {memory['traced_peak_mb']} MB traced, {memory['max_rss_mb']} MB max RSS")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Offline replay harness for the provider agent')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    synth = sub.add_parser('synth', help='Generate a synthetic fixture directory')
+    synth.add_argument('directory')
+    synth.add_argument('--providers', type=int, default=200)
+    synth.add_argument('--city', default='Bozeman')
+    synth.add_argument('--state', default='MT')
+    synth.add_argument('--zip', default='59715')
+    synth.add_argument('--type', default='dental')
+
+    run = sub.add_parser('run', help='Replay a fixture directory through the agent and print measurements')
+    run.add_argument('directory')
+    run.add_argument('--max', type=int, default=None, help='Providers to process (default: all in the manifest)')
+    run.add_argument('--latency', default='none', help="'none', 'typical' or 'places=0.1,site=0.3,llm=1.5,backend=0.03'")
+    run.add_argument('--no-enrich', action='store_true')
+    run.add_argument('--refresh', action='store_true', help='Also time a refresh pass over the ingested providers')
+    run.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    args = parser.parse_args()
+
+    if args.command == 'synth':
+        synthesize(args.directory, args.providers, args.city, args.state, args.zip, args.type)
+        return
+
+    with ReplayEnvironment(args.directory, Latency.parse(args.latency)) as env:
+        reports = {'run': env.run(args.max, enrich=not args.no_enrich, trace_memory=True)}
+        if args.refresh:
+            reports['refresh'] = env.refresh(enrich=not args.no_enrich, trace_memory=True)
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+        return
+    for name, report in reports.items():
+        print(f"\n===== {name} =====")
+        print_report(report)
+
+
+if __name__ == '__main__':
+    main()
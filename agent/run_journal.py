@@ -0,0 +1,259 @@
+"""
+========================================
+RUN JOURNAL
+Per-place stage checkpoints so a crashed run resumes where it stopped
+========================================
+
+Every stage a place finishes (discover, dedupe, scrape, extract,
+upload) is written to SQLite with its output. Re-running with
+`--resume <run_id>` replays finished stages from the journal instead of
+repeating Places queries, scrapes and LLM calls, and only does the work
+that is still missing.
+
+    journal = RunJournal.create({'city': 'Bozeman', ...})
+    found, payload = journal.get(place_id, 'scrape')
+    journal.record(place_id, 'scrape', payload)
+
+Inspect runs:
+    python run_journal.py list
+    python run_journal.py show <run_id>
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+RUN_JOURNAL_PATH = os.getenv('RUN_JOURNAL_PATH', './cache/runs.sqlite')
+
+# Stage names in pipeline order (used for progress reporting)
+STAGES = ['discover', 'dedupe', 'scrape', 'extract', 'upload']
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS runs (
+            run_id TEXT PRIMARY KEY,
+            params TEXT NOT NULL,
+            status TEXT NOT NULL,
+            meta TEXT NOT NULL DEFAULT '{}',
+            started_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS stages (
+            run_id TEXT NOT NULL,
+            place_key TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            payload TEXT,
+            dropped INTEGER NOT NULL DEFAULT 0,
+            completed_at REAL NOT NULL,
+            PRIMARY KEY (run_id, place_key, stage)
+        );
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            entry TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_events_run ON events (run_id);
+    """)
+    return conn
+
+
+class RunJournal:
+    def __init__(self, run_id: str, path: str = RUN_JOURNAL_PATH):
+        self.run_id = run_id
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = _connect(path)
+
+    @classmethod
+    def create(cls, params: Dict, path: str = RUN_JOURNAL_PATH) -> 'RunJournal':
+        run_id = datetime.now().strftime('%Y%m%d%H%M%S-') + uuid.uuid4().hex[:6]
+        journal = cls(run_id, path)
+        now = time.time()
+        with journal._lock:
+            journal._conn.execute(
+                "INSERT INTO runs (run_id, params, status, started_at, updated_at) VALUES (?, ?, 'running', ?, ?)",
+                (run_id, json.dumps(params), now, now)
+            )
+        return journal
+
+    @classmethod
+    def resume(cls, run_id: str, path: str = RUN_JOURNAL_PATH) -> 'RunJournal':
+        journal = cls(run_id, path)
+        if journal._run_row() is None:
+            journal.close()
+            raise KeyError(f"No run {run_id} in {path}")
+        journal.set_status('running')
+        return journal
+
+    # ---- run metadata ----------------------------------------------------
+
+    def _run_row(self) -> Optional[Tuple[str, str, str]]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT params, status, meta FROM runs WHERE run_id = ?", (self.run_id,)
+            ).fetchone()
+
+    @property
+    def params(self) -> Dict:
+        return json.loads(self._run_row()[0])
+
+    @property
+    def status(self) -> str:
+        return self._run_row()[1]
+
+    @property
+    def meta(self) -> Dict:
+        return json.loads(self._run_row()[2])
+
+    def set_status(self, status: str, **meta):
+        """Update run status and merge `meta` (e.g. api_run_id, discovery_complete)"""
+        merged = dict(self.meta, **meta)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE runs SET status = ?, meta = ?, updated_at = ? WHERE run_id = ?",
+                (status, json.dumps(merged), time.time(), self.run_id)
+            )
+
+    # ---- stage checkpoints -----------------------------------------------
+
+    def record(self, place_key: str, stage: str, payload: Any):
+        """Mark `stage` done for a place; a None payload means the stage dropped it"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO stages (run_id, place_key, stage, payload, dropped, completed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self.run_id, place_key, stage,
+                 None if payload is None else json.dumps(payload, default=str),
+                 int(payload is None), time.time())
+            )
+
+    def get(self, place_key: str, stage: str) -> Tuple[bool, Any]:
+        """(done, payload) for one place and stage"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM stages WHERE run_id = ? AND place_key = ? AND stage = ?",
+                (self.run_id, place_key, stage)
+            ).fetchone()
+        if row is None:
+            return False, None
+        return True, None if row[0] is None else json.loads(row[0])
+
+    def is_done(self, place_key: str, stage: str) -> bool:
+        return self.get(place_key, stage)[0]
+
+    def iter_stage(self, stage: str) -> Iterator[Tuple[str, Any]]:
+        """(place_key, payload) for every place that finished `stage`, in completion order"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT place_key, payload FROM stages WHERE run_id = ? AND stage = ? AND dropped = 0 "
+                "ORDER BY completed_at, rowid",
+                (self.run_id, stage)
+            ).fetchall()
+        for place_key, payload in rows:
+            yield place_key, json.loads(payload)
+
+    def progress(self) -> Dict[str, int]:
+        """Completed places per stage"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT stage, COUNT(*) FROM stages WHERE run_id = ? GROUP BY stage", (self.run_id,)
+            ).fetchall()
+        counts = dict(rows)
+        return {stage: counts.get(stage, 0) for stage in STAGES + sorted(set(counts) - set(STAGES))}
+
+    # ---- result events ---------------------------------------------------
+
+    def add_event(self, kind: str, entry: Dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO events (run_id, kind, entry) VALUES (?, ?, ?)",
+                (self.run_id, kind, json.dumps(entry, default=str))
+            )
+
+    def events(self, exclude: Tuple[str, ...] = ()) -> Dict[str, List[Dict]]:
+        """Recorded result entries grouped by kind (e.g. profiles_created)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT kind, entry FROM events WHERE run_id = ? ORDER BY id", (self.run_id,)
+            ).fetchall()
+        grouped: Dict[str, List[Dict]] = {}
+        for kind, entry in rows:
+            if kind not in exclude:
+                grouped.setdefault(kind, []).append(json.loads(entry))
+        return grouped
+
+    def clear_events(self, kind: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM events WHERE run_id = ? AND kind = ?", (self.run_id, kind))
+
+    def report(self):
+        """Print the per-stage progress line"""
+        progress = self.progress()
+        print(f"🧾 Run {self.run_id} ({self.status}): " +
+              ', '.join(f"{stage} {count}" for stage, count in progress.items()))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def list_runs(path: str = RUN_JOURNAL_PATH, limit: int = 20) -> List[Dict]:
+    conn = _connect(path)
+    try:
+        rows = conn.execute(
+            "SELECT run_id, params, status, started_at, updated_at FROM runs ORDER BY started_at DESC LIMIT ?",
+            (limit,)
+        ).fetchall()
+    finally:
+        conn.close()
+    return [
+        {'run_id': run_id, 'params': json.loads(params), 'status': status,
+         'started_at': datetime.fromtimestamp(started).isoformat(timespec='seconds'),
+         'updated_at': datetime.fromtimestamp(updated).isoformat(timespec='seconds')}
+        for run_id, params, status, started, updated in rows
+    ]
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Inspect agent run journals')
+    parser.add_argument('command', choices=['list', 'show'])
+    parser.add_argument('run_id', nargs='?')
+    parser.add_argument('--path', default=RUN_JOURNAL_PATH)
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        for run in list_runs(args.path):
+            print(f"{run['run_id']}  {run['status']:<10} {run['updated_at']}  {json.dumps(run['params'])}")
+        return
+
+    if not args.run_id:
+        parser.error('show needs a run_id')
+    try:
+        journal = RunJournal(args.run_id, args.path)
+        if journal._run_row() is None:
+            raise KeyError(args.run_id)
+    except KeyError:
+        print(f"❌ Unknown run: {args.run_id}")
+        sys.exit(1)
+
+    print(json.dumps({'params': journal.params, 'meta': journal.meta}, indent=2))
+    journal.report()
+    journal.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""
+========================================
+GEOGRAPHIC TILING SWEEP
+Metro-scale Places discovery without hand-maintained neighbourhood lists
+========================================
+
+A bounding box is tiled into a grid of cells, and each cell is queried
+with a Nearby Search circle that covers it. Nearby Search returns pages
+of 20, at most 3 of them, and only PLACES_MAX_PAGES are followed, so a
+cell that comes back full is split into four quadrants and searched
+again until results fit or the cell reaches the minimum size. Place IDs are deduplicated across every cell.
+"""
+
+import math
+import os
+from typing import Callable, Dict, Iterator, List, NamedTuple, Tuple
+
+EARTH_RADIUS_M = 6371008.8
+
+# Nearby Search limits; a cell is full once every followed page came back
+NEARBY_PAGE_SIZE = 20
+NEARBY_MAX_PAGES = 3
+PLACES_MAX_PAGES = int(os.getenv('PLACES_MAX_PAGES', 3))
+
+
+def nearby_result_cap(max_pages: int) -> int:
+    """Results a full cell returns when up to `max_pages` pages are followed"""
+    return NEARBY_PAGE_SIZE * min(max_pages, NEARBY_MAX_PAGES)
+
+
+NEARBY_RESULT_CAP = nearby_result_cap(PLACES_MAX_PAGES)
+NEARBY_MAX_RADIUS_M = 50000
+
+
+class BoundingBox(NamedTuple):
+    south: float
+    west: float
+    north: float
+    east: float
+
+    @classmethod
+    def parse(cls, value: str) -> 'BoundingBox':
+        """Parse 'south,west,north,east' (decimal degrees)"""
+        parts = [float(p) for p in value.split(',')]
+        if len(parts) != 4:
+            raise ValueError(f"Bounding box needs 4 numbers (south,west,north,east), got: {value}")
+        box = cls(*parts)
+        if box.south >= box.north or box.west >= box.east:
+            raise ValueError(f"Bounding box is empty or inverted: {value}")
+        return box
+
+    @classmethod
+    def from_viewport(cls, viewport: Dict) -> 'BoundingBox':
+        """Build from a Geocoding API viewport/bounds dict"""
+        return cls(
+            viewport['southwest']['lat'], viewport['southwest']['lng'],
+            viewport['northeast']['lat'], viewport['northeast']['lng']
+        )
+
+    @property
+    def center(self) -> Tuple[float, float]:
+        return (self.south + self.north) / 2, (self.west + self.east) / 2
+
+    def contains(self, lat: float, lng: float) -> bool:
+        return self.south <= lat < self.north and self.west <= lng < self.east
+
+    def covering_radius(self) -> float:
+        """Radius in meters of the circle around the center that covers every corner"""
+        lat, lng = self.center
+        return max(
+            haversine_m(lat, lng, corner_lat, corner_lng)
+            for corner_lat in (self.south, self.north)
+            for corner_lng in (self.west, self.east)
+        )
+
+    def width_m(self) -> float:
+        lat = self.center[0]
+        return haversine_m(lat, self.west, lat, self.east)
+
+    def split(self) -> List['BoundingBox']:
+        """Quadrants of this box"""
+        mid_lat, mid_lng = self.center
+        return [
+            BoundingBox(self.south, self.west, mid_lat, mid_lng),
+            BoundingBox(self.south, mid_lng, mid_lat, self.east),
+            BoundingBox(mid_lat, self.west, self.north, mid_lng),
+            BoundingBox(mid_lat, mid_lng, self.north, self.east),
+        ]
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance in meters"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def tile(box: BoundingBox, cell_km: float) -> List[BoundingBox]:
+    """Split a bounding box into a grid of roughly cell_km x cell_km cells"""
+    lat = box.center[0]
+    height_km = haversine_m(box.south, box.west, box.north, box.west) / 1000
+    width_km = haversine_m(lat, box.west, lat, box.east) / 1000
+
+    rows = max(1, math.ceil(height_km / cell_km))
+    cols = max(1, math.ceil(width_km / cell_km))
+    dlat = (box.north - box.south) / rows
+    dlng = (box.east - box.west) / cols
+
+    return [
+        BoundingBox(
+            box.south + r * dlat, box.west + c * dlng,
+            box.south + (r + 1) * dlat, box.west + (c + 1) * dlng
+        )
+        for r in range(rows)
+        for c in range(cols)
+    ]
+
+
+class GridSweep:
+    def __init__(self, search_cell: Callable[[Tuple[float, float], float], List[Dict]],
+                 result_cap: int = NEARBY_RESULT_CAP, min_cell_m: float = 200):
+        """
+        Args:
+            search_cell: (center (lat, lng), radius_m) -> all Nearby Search results
+                         for that circle, pages already followed
+            result_cap: Result count at which a cell is treated as saturated
+            min_cell_m: Cells narrower than this are never split further
+        """
+        self.search_cell = search_cell
+        self.result_cap = result_cap
+        self.min_cell_m = min_cell_m
+        self.stats = {'cells_searched': 0, 'cells_split': 0, 'places': 0}
+
+    def sweep(self, boxes: List[BoundingBox], cell_km: float = 2.0) -> Iterator[Dict]:
+        """Yield each place found inside `boxes` exactly once"""
+        seen_place_ids = set()
+        pending = [(box, cell) for box in boxes for cell in tile(box, cell_km)]
+        pending.reverse()
+
+        while pending:
+            box, cell = pending.pop()
+            radius = min(cell.covering_radius(), NEARBY_MAX_RADIUS_M)
+            results = self.search_cell(cell.center, radius)
+            self.stats['cells_searched'] += 1
+
+            saturated = len(results) >= self.result_cap
+            if saturated and cell.width_m() / 2 >= self.min_cell_m:
+                # Results past the cap are missing; search the quadrants instead
+                self.stats['cells_split'] += 1
+                pending.extend((box, quadrant) for quadrant in reversed(cell.split()))
+
+            for place in results:
+                place_id = place.get('place_id')
+                if not place_id or place_id in seen_place_ids:
+                    continue
+
+                # The covering circle spills past the box edges
+                location = place.get('geometry', {}).get('location')
+                if location and not box.contains(location['lat'], location['lng']):
+                    continue
+
+                seen_place_ids.add(place_id)
+                self.stats['places'] += 1
+                yield place
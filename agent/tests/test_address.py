@@ -0,0 +1,52 @@
+"""Regression cases for address.py street / unit splitting"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from address import address_key, from_formatted  # noqa: E402
+
+
+@pytest.mark.parametrize('formatted, street, unit, key', [
+    # Designator words that are really street names
+    ('123 Front St, Brooklyn, NY 11201', 'Front St', '', '123|front st||11201'),
+    ('123 Side St, Brooklyn, NY 11201', 'Side St', '', '123|side st||11201'),
+    ('45 Rear Ave, Brooklyn, NY 11201', 'Rear Ave', '', '45|rear ave||11201'),
+    ('10 Upper Main St, Brooklyn, NY 11201', 'Upper Main St', '', '10|upper main st||11201'),
+    ('9 Box Hill Rd, Brooklyn, NY 11201', 'Box Hill Rd', '', '9|box hl rd||11201'),
+    # Real units
+    ('123 Main St Ste 200, Brooklyn, NY 11201', 'Main St', 'Ste 200', '123|main st|200|11201'),
+    ('123 Main St, Suite 4B, Brooklyn, NY 11201', 'Main St', 'Suite 4B', '123|main st|4b|11201'),
+    ('123 Main St Apt B, Brooklyn, NY 11201', 'Main St', 'Apt B', '123|main st|b|11201'),
+    ('123 Main St #C-2, Brooklyn, NY 11201', 'Main St', '#C-2', '123|main st|c-2|11201'),
+    ('123 Main St Unit 5, Brooklyn, NY 11201', 'Main St', 'Unit 5', '123|main st|5|11201'),
+])
+def test_street_and_unit(formatted, street, unit, key):
+    address = from_formatted(formatted)
+    assert (address['street_number'], address['street'], address['unit']) == (key.split('|')[0], street, unit)
+    assert address_key(address) == key
+
+
+def test_suffix_spellings_share_a_key():
+    assert (address_key(from_formatted('123 Front St, Brooklyn, NY 11201')) ==
+            address_key(from_formatted('123 Front Street, Brooklyn, NY 11201')))
+
+
+def test_designator_streets_do_not_collide():
+    assert (address_key(from_formatted('123 Front St, Brooklyn, NY 11201')) !=
+            address_key(from_formatted('123 Side St, Brooklyn, NY 11201')))
+
+
+def test_directional_street_names_stay_distinct():
+    assert (address_key(from_formatted('12 North St, Washington, DC 20001')) !=
+            address_key(from_formatted('12 N St, Washington, DC 20001')))
+
+
+def test_directional_prefix_and_suffix_spellings_share_a_key():
+    assert (address_key(from_formatted('12 North Main St, Brooklyn, NY 11201')) ==
+            address_key(from_formatted('12 N Main St, Brooklyn, NY 11201')))
+    assert (address_key(from_formatted('12 Main St North, Brooklyn, NY 11201')) ==
+            address_key(from_formatted('12 Main St N, Brooklyn, NY 11201')))
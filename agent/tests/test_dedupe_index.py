@@ -0,0 +1,43 @@
+"""Regression cases for dedupe_index.py check_and_add under concurrent workers"""
+
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from dedupe_index import DuplicateIndex  # noqa: E402
+
+PROVIDER = {
+    'practice_name': 'Smile Dental',
+    'street_address': '123 Main St',
+    'city': 'Brooklyn',
+    'state': 'NY',
+    'zip_code': '11201',
+}
+
+
+def test_check_and_add_indexes_new_candidates():
+    index = DuplicateIndex()
+    assert not index.check_and_add(dict(PROVIDER))['is_duplicate']
+    assert index.check_and_add(dict(PROVIDER))['match_type'] == 'exact'
+    assert len(index) == 1
+
+
+def test_concurrent_copies_pass_as_new_only_once():
+    index = DuplicateIndex()
+    barrier = threading.Barrier(8)
+    results = []
+
+    def worker():
+        barrier.wait()
+        results.append(index.check_and_add(dict(PROVIDER)))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(not r['is_duplicate'] for r in results) == 1
+    assert len(index) == 1
@@ -0,0 +1,95 @@
+const mongoose = require('mongoose');
+
+// One provider agent run (agent/agent.py), created when the run starts and
+// PATCHed with absolute counters while it is in flight - mirrors the
+// agent_runs table in schema.sql
+const agentRunSchema = new mongoose.Schema({
+  // Search parameters
+  searchCity: String,
+  searchState: String,
+  searchZip: String,
+  categories: [String],
+  maxProfiles: { type: Number, default: 25 },
+
+  // Results summary
+  providersFound: { type: Number, default: 0 },
+  exactDuplicates: { type: Number, default: 0 },
+  fuzzyDuplicates: { type: Number, default: 0 },
+  similarFlagged: { type: Number, default: 0 },
+  profilesCreated: { type: Number, default: 0 },
+  lowConfidenceCount: { type: Number, default: 0 },
+
+  // Detailed results
+  skippedProviders: mongoose.Schema.Types.Mixed,
+  flaggedProviders: mongoose.Schema.Types.Mixed,
+  createdProviders: mongoose.Schema.Types.Mixed,
+
+  // Performance metrics
+  durationSeconds: Number,
+  apiCallsMade: Number,
+  websitesScraped: Number,
+  estimatedCostUsd: Number,
+  // {stages: {scrape: {p50_ms, p95_ms, max_ms}}, places_skus, openai_tokens, cost_usd, http}
+  metrics: mongoose.Schema.Types.Mixed,
+
+  // Status tracking
+  status: {
+    type: String,
+    enum: ['running', 'completed', 'failed', 'cancelled'],
+    default: 'running'
+  },
+  errorMessage: String,
+  progressPercentage: { type: Number, default: 0 },
+
+  // Audit
+  startedAt: { type: Date, default: Date.now },
+  completedAt: Date,
+  updatedAt: { type: Date, default: Date.now }
+});
+
+agentRunSchema.index({ startedAt: -1 });
+agentRunSchema.index({ status: 1 });
+agentRunSchema.index({ searchCity: 1, searchState: 1 });
+
+// Agent payload key (agent_runs column name) -> schema path
+const FIELDS = {
+  search_city: 'searchCity',
+  search_state: 'searchState',
+  search_zip: 'searchZip',
+  categories: 'categories',
+  max_profiles: 'maxProfiles',
+  providers_found: 'providersFound',
+  exact_duplicates: 'exactDuplicates',
+  fuzzy_duplicates: 'fuzzyDuplicates',
+  similar_flagged: 'similarFlagged',
+  profiles_created: 'profilesCreated',
+  low_confidence_count: 'lowConfidenceCount',
+  skipped_providers: 'skippedProviders',
+  flagged_providers: 'flaggedProviders',
+  created_providers: 'createdProviders',
+  duration_seconds: 'durationSeconds',
+  api_calls_made: 'apiCallsMade',
+  websites_scraped: 'websitesScraped',
+  estimated_cost_usd: 'estimatedCostUsd',
+  metrics: 'metrics',
+  status: 'status',
+  error_message: 'errorMessage',
+  progress_percentage: 'progressPercentage',
+  completed_at: 'completedAt'
+};
+
+/**
+ * Map an agent payload (snake_case or camelCase keys) to schema fields,
+ * dropping anything unknown
+ */
+agentRunSchema.statics.fromPayload = function(payload = {}) {
+  const fields = {};
+  const paths = new Set(Object.values(FIELDS));
+  Object.entries(payload).forEach(([key, value]) => {
+    const path = FIELDS[key] || (paths.has(key) ? key : null);
+    if (path && value !== undefined) fields[path] = value;
+  });
+  return fields;
+};
+
+module.exports = mongoose.model('AgentRun', agentRunSchema);
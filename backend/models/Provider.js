@@ -1,4 +1,6 @@
+const { EventEmitter } = require('events');
 const mongoose = require('mongoose');
+const { SEARCH_SOURCE_FIELDS, searchTermsFor } = require('../utils/searchTerms');
 
 const providerSchema = new mongoose.Schema({
   // Step 1: Basic Information
@@ -53,6 +55,13 @@ const providerSchema = new mongoose.Schema({
       default: [0, 0]
     }
   },
+  // How `location` was found: 'zip' = ZIP centroid from the offline
+  // gazetteer (geocode-providers.js; `--rooftop` upgrades these),
+  // 'rooftop' = geocoded street address
+  locationPrecision: {
+    type: String,
+    enum: ['zip', 'rooftop']
+  },
   name: String, // Provider display name
 
   // Step 3: Photos
@@ -60,6 +69,8 @@ const providerSchema = new mongoose.Schema({
     url: String,
     isPrimary: { type: Boolean, default: false },
     caption: String,
+    // 64-bit perceptual hash (dHash, hex) of the resized image
+    hash: String,
     uploadedAt: { type: Date, default: Date.now }
   }],
 
@@ -218,15 +229,149 @@ const providerSchema = new mongoose.Schema({
   },
 
   // Notes (for admin use)
-  adminNotes: String
+  adminNotes: String,
+
+  // Discovery metadata (set by the provider agent's bulk ingest)
+  googlePlaceId: {
+    type: String,
+    index: true,
+    sparse: true
+  },
+  source: String,
+  googleRating: Number,
+  googleReviewCount: Number,
+  googleBusinessStatus: String,
+
+  // Incremental refresh state (agent refresh mode): when the provider was
+  // last re-checked, a hash per source field so only changes are written,
+  // and the website's validators for conditional GETs
+  refresh: {
+    refreshedAt: Date,
+    hashes: {
+      type: Map,
+      of: String
+    },
+    etag: String,
+    lastModified: String
+  },
+
+  // Tagged edge-ngrams for ranked search (see utils/searchTerms.js);
+  // rebuilt whenever name, types, services or address change
+  searchTerms: {
+    type: [String],
+    select: false
+  }
 });
 
 // Update the updatedAt field on save
 providerSchema.pre('save', function(next) {
   this.updatedAt = new Date();
+  if (this.isNew || SEARCH_SOURCE_FIELDS.some(path => this.isModified(path))) {
+    this.searchTerms = searchTermsFor(this);
+  }
   next();
 });
 
+function touchesSearchFields(update) {
+  if (!update) return false;
+  const paths = [];
+  Object.entries(update).forEach(([key, value]) => {
+    if (key.startsWith('$')) paths.push(...Object.keys(value || {}));
+    else paths.push(key);
+  });
+  return paths.some(path => SEARCH_SOURCE_FIELDS.includes(path.split('.')[0]));
+}
+
+/**
+ * Recompute searchTerms for every provider matching `filter`
+ * (for writes that bypass save(): bulkWrite, raw collection updates)
+ */
+providerSchema.statics.rebuildSearchTerms = async function(filter = {}) {
+  const providers = await this.find(filter)
+    .select('practiceName providerTypes services.name services.category address.city')
+    .lean();
+  if (providers.length === 0) return 0;
+  // Straight to the driver: a searchTerms-only write shouldn't fire the
+  // change hooks below (the write that triggered it already did)
+  await this.collection.bulkWrite(providers.map(provider => ({
+    updateOne: { filter: { _id: provider._id }, update: { $set: { searchTerms: searchTermsFor(provider) } } }
+  })), { ordered: false });
+  return providers.length;
+};
+
+// Query updates skip the save hook
+providerSchema.post(['findOneAndUpdate', 'updateOne', 'updateMany'], async function() {
+  if (touchesSearchFields(this.getUpdate())) {
+    await this.model.rebuildSearchTerms(this.getFilter());
+  }
+});
+
+// Bumped on every write from this process so read-side caches (the geo
+// capability flag in services/providerSearch.js) know to re-check
+let writeVersion = 0;
+providerSchema.post(
+  ['save', 'findOneAndUpdate', 'updateOne', 'updateMany', 'findOneAndDelete', 'deleteOne', 'deleteMany',
+    'insertMany', 'bulkWrite'],
+  () => { writeVersion += 1; }
+);
+providerSchema.statics.writeVersion = () => writeVersion;
+
+// Which providers a write touched, for in-memory indexes that refresh
+// incrementally (services/autocompleteIndex.js): { ids } when known,
+// { filter } for query writes, {} when it can't tell (bulkWrite)
+const providerChanges = new EventEmitter();
+providerChanges.setMaxListeners(0);
+providerSchema.post('save', doc => {
+  providerChanges.emit('change', { ids: [doc._id] });
+});
+providerSchema.post(['findOneAndUpdate', 'findOneAndDelete'], function(doc) {
+  providerChanges.emit('change', doc ? { ids: [doc._id] } : { filter: this.getFilter() });
+});
+providerSchema.post(['updateOne', 'updateMany', 'deleteOne', 'deleteMany'], function() {
+  providerChanges.emit('change', { filter: this.getFilter() });
+});
+providerSchema.post('insertMany', docs => {
+  providerChanges.emit('change', { ids: docs.map(doc => doc._id) });
+});
+providerSchema.post('bulkWrite', () => {
+  providerChanges.emit('change', {});
+});
+providerSchema.statics.onChange = listener => providerChanges.on('change', listener);
+
+// Refresh selection: agent-sourced providers, stalest first
+providerSchema.index({ source: 1, 'refresh.refreshedAt': 1 });
+
+// $geoNear for nearby search (same index GET /api/providers/admin/rebuild-geo-index builds)
+providerSchema.index({ location: '2dsphere' });
+
+// Ranked search: edge-ngram lookups, plus whole words through the text
+// index (same spec as POST /api/admin/create-search-index)
+providerSchema.index({ searchTerms: 1 });
+providerSchema.index(
+  {
+    'services.name': 'text',
+    'services.category': 'text',
+    'providerTypes': 'text',
+    'practiceName': 'text',
+    'description': 'text',
+    'address.city': 'text',
+    'address.state': 'text'
+  },
+  {
+    name: 'text_search_idx',
+    weights: {
+      'services.name': 10,
+      'services.category': 8,
+      'providerTypes': 7,
+      'practiceName': 6,
+      'address.city': 5,
+      'address.state': 5,
+      'description': 2
+    },
+    default_language: 'english'
+  }
+);
+
 // Virtual for full address
 providerSchema.virtual('fullAddress').get(function() {
   if (!this.address) return '';
@@ -1,6 +1,9 @@
 const express = require('express');
+const mongoose = require('mongoose');
 const router = express.Router();
 const Provider = require('../models/Provider');
+const AgentRun = require('../models/AgentRun');
+const { projectionStages } = require('../utils/providerProjections');
 
 // POST /api/admin/migrate/add-badge-fields - Run migration
 router.post('/migrate/add-badge-fields', async (req, res) => {
@@ -60,7 +63,11 @@ router.get('/providers', async (req, res) => {
       status,
       type,
       verified,
-      featured
+      featured,
+      source,
+      refreshedBefore,
+      fields,
+      profile
     } = req.query;
 
     const query = {};
@@ -85,12 +92,51 @@ router.get('/providers', async (req, res) => {
       query.featured = featured === 'true';
     }
 
+    if (source) {
+      query.source = source;
+    }
+
+    // ?refreshedBefore=<ISO date> selects providers due for an agent
+    // refresh (never refreshed, or last refreshed before the date), stalest first
+    let sort = { createdAt: -1 };
+    if (refreshedBefore) {
+      const cutoff = new Date(refreshedBefore);
+      if (Number.isNaN(cutoff.getTime())) {
+        return res.status(400).json({
+          success: false,
+          message: 'refreshedBefore must be a date'
+        });
+      }
+      query.$or = [
+        { 'refresh.refreshedAt': { $lt: cutoff } },
+        { 'refresh.refreshedAt': { $exists: false } }
+      ];
+      sort = { 'refresh.refreshedAt': 1, _id: 1 };
+    }
+
     const total = await Provider.countDocuments(query);
 
-    const providers = await Provider.find(query)
-      .limit(parseInt(limit))
-      .skip(parseInt(skip))
-      .sort({ createdAt: -1 });
+    let providers;
+    if (fields) {
+      // ?fields=practiceName,address,phone returns compact lean documents
+      // (the provider agent pulls its duplicate-check snapshot this way)
+      providers = await Provider.find(query)
+        .limit(parseInt(limit))
+        .skip(parseInt(skip))
+        .sort(sort)
+        .select(fields.split(',').map(f => f.trim()).filter(Boolean).join(' '))
+        .lean();
+    } else {
+      // ?profile=detail for full documents; the table gets the slim
+      // admin-table profile (with thumbnailUrl) by default
+      providers = await Provider.aggregate([
+        { $match: query },
+        { $sort: sort },
+        { $skip: parseInt(skip) },
+        { $limit: parseInt(limit) },
+        ...projectionStages(profile === 'detail' ? 'detail' : 'admin-table')
+      ]);
+    }
 
     res.json({
       success: true,
@@ -109,6 +155,436 @@ router.get('/providers', async (req, res) => {
   }
 });
 
+// Bulk ingest limits - keep a request well under the 50mb body limit
+const BULK_MAX_PROVIDERS = 500;
+
+// Agent payloads use lowercase / snake_case types ("mental_health");
+// the agent's 'cosmetic' (med spas, aesthetic clinics) lists as Skincare
+const PROVIDER_TYPE_NAMES = {
+  'medical': 'Medical',
+  'urgent care': 'Urgent Care',
+  'dental': 'Dental',
+  'mental health': 'Mental Health',
+  'skincare': 'Skincare',
+  'cosmetic': 'Skincare',
+  'massage': 'Massage',
+  'fitness': 'Fitness',
+  'yoga': 'Yoga',
+  'nutrition': 'Nutrition',
+  'pharmacy': 'Pharmacy'
+};
+
+const normalizeProviderType = (type) => {
+  const key = String(type).toLowerCase().replace(/_/g, ' ').trim();
+  return PROVIDER_TYPE_NAMES[key] || type;
+};
+
+const toNumber = (value) => {
+  if (value === undefined || value === null || value === '') return undefined;
+  const number = Number(value);
+  return Number.isFinite(number) ? number : undefined;
+};
+
+// Agent services carry serviceName / duration_minutes / price_cents
+const normalizeServices = (services) => services
+  .map(service => ({
+    name: service.name || service.serviceName,
+    category: service.category,
+    duration: toNumber(service.duration !== undefined ? service.duration : service.duration_minutes),
+    price: service.price !== undefined
+      ? toNumber(service.price)
+      : (toNumber(service.price_cents) !== undefined ? service.price_cents / 100 : undefined),
+    description: service.description,
+    isActive: service.isActive !== false
+  }))
+  .filter(service => service.name);
+
+// Perceptual hashes (64-bit dHash, 16 hex chars) that differ in at most
+// this many bits are the same picture - keep in sync with
+// PHOTO_HASH_DISTANCE in agent/photo_store.py
+const PHOTO_HASH_DISTANCE = 6;
+const PHOTO_HASH_PATTERN = /^[0-9a-f]{16}$/;
+
+const hashDistance = (a, b) => {
+  let diff = BigInt(`0x${a}`) ^ BigInt(`0x${b}`);
+  let bits = 0;
+  while (diff) {
+    bits += Number(diff & 1n);
+    diff >>= 1n;
+  }
+  return bits;
+};
+
+// Without an explicit flag the first photo of a full set is primary;
+// appended photos never are (firstIsPrimary false)
+const normalizePhoto = (photo, i, firstIsPrimary = true) => {
+  const hash = typeof photo.hash === 'string' ? photo.hash.toLowerCase() : undefined;
+  return {
+    url: photo.url || photo.data,
+    isPrimary: Boolean(photo.isPrimary !== undefined ? photo.isPrimary : (photo.is_primary !== undefined ? photo.is_primary : firstIsPrimary && i === 0)),
+    caption: photo.caption,
+    hash: hash && PHOTO_HASH_PATTERN.test(hash) ? hash : undefined
+  };
+};
+
+const samePhoto = (a, b) => (
+  a.url === b.url || Boolean(a.hash && b.hash && hashDistance(a.hash, b.hash) <= PHOTO_HASH_DISTANCE)
+);
+
+/**
+ * Split incoming photos into ones to add and ones already present in
+ * `existing` (or earlier in the same request) by URL or perceptual hash.
+ */
+const dedupePhotos = (existing, incoming) => {
+  const kept = [...existing];
+  const added = [];
+  const skipped = [];
+  incoming.forEach((photo) => {
+    const match = kept.find(other => samePhoto(photo, other));
+    if (match) {
+      skipped.push({ url: photo.url, hash: photo.hash, matches: match.url });
+    } else {
+      kept.push(photo);
+      added.push(photo);
+    }
+  });
+  return { added, skipped };
+};
+
+/**
+ * Build the $set document for one bulk entry.
+ * Accepts the nested model shape or the flat agent shape
+ * (streetAddress/city/state/zipCode, serviceName, price_cents, is_primary).
+ */
+const normalizeBulkProvider = (input) => {
+  const address = input.address || {
+    street: input.streetAddress,
+    suite: input.suite,
+    city: input.city,
+    state: input.state,
+    zip: input.zipCode
+  };
+
+  const doc = {
+    practiceName: input.practiceName,
+    providerTypes: (input.providerTypes || []).map(normalizeProviderType),
+    email: input.email,
+    phone: input.phone,
+    website: input.website,
+    contactInfo: {
+      email: input.email,
+      phone: input.phone,
+      website: input.website
+    },
+    address,
+    status: input.status || 'pending',
+    source: input.source || 'agent',
+    updatedAt: new Date()
+  };
+
+  if (input.googlePlaceId) doc.googlePlaceId = input.googlePlaceId;
+  if (input.insuranceAccepted) doc.insuranceAccepted = input.insuranceAccepted;
+  if (input.languagesSpoken) doc.languagesSpoken = input.languagesSpoken;
+
+  const lat = toNumber(input.latitude);
+  const lng = toNumber(input.longitude);
+  if (input.location && input.location.coordinates) {
+    doc.location = { type: 'Point', coordinates: input.location.coordinates };
+  } else if (lat !== undefined && lng !== undefined) {
+    doc.location = { type: 'Point', coordinates: [lng, lat] };
+  }
+
+  // Only replace services / photos when the entry carries them, so a
+  // re-run without photos does not wipe the ones already stored
+  if (Array.isArray(input.services)) {
+    doc.services = normalizeServices(input.services);
+  }
+
+  if (Array.isArray(input.photos)) {
+    doc.photos = dedupePhotos([], input.photos.map((photo, i) => normalizePhoto(photo, i)).filter(photo => photo.url)).added;
+  }
+
+  return doc;
+};
+
+// Upsert key: Google place id when known, otherwise name + ZIP
+const bulkFilter = (doc) => (
+  doc.googlePlaceId
+    ? { googlePlaceId: doc.googlePlaceId }
+    : { practiceName: doc.practiceName, 'address.zip': doc.address && doc.address.zip }
+);
+
+const bulkKey = (doc) => JSON.stringify(bulkFilter(doc));
+
+/**
+ * POST /api/admin/providers/bulk - Upsert many providers in one request
+ * Body: { providers: [{ ...provider, services: [...], photos: [...] }] }
+ * Returns one result per input index: created | updated | skipped | error
+ */
+router.post('/providers/bulk', async (req, res) => {
+  try {
+    const { providers } = req.body;
+
+    if (!Array.isArray(providers) || providers.length === 0) {
+      return res.status(400).json({
+        success: false,
+        message: 'providers array is required'
+      });
+    }
+
+    if (providers.length > BULK_MAX_PROVIDERS) {
+      return res.status(413).json({
+        success: false,
+        message: `At most ${BULK_MAX_PROVIDERS} providers per request`
+      });
+    }
+
+    const results = providers.map((_, index) => ({ index, status: 'error' }));
+
+    // Validate each entry and keep the last occurrence of each key
+    const byKey = new Map();
+    providers.forEach((input, index) => {
+      try {
+        const doc = normalizeBulkProvider(input || {});
+        const validationError = new Provider(doc).validateSync();
+        if (validationError) {
+          results[index].error = validationError.message;
+          return;
+        }
+
+        const key = bulkKey(doc);
+        if (byKey.has(key)) {
+          const previous = byKey.get(key);
+          results[previous.index] = { index: previous.index, status: 'skipped', error: `Superseded by entry ${index}` };
+        }
+        byKey.set(key, { index, doc });
+      } catch (error) {
+        results[index].error = error.message;
+      }
+    });
+
+    const entries = Array.from(byKey.values());
+    // Status, source, contact details, address, types and location only
+    // seed new providers: re-ingesting must not demote an approved listing
+    // or revert an admin's corrections (the agent's refresh PATCH diffs
+    // those fields against what is stored)
+    const operations = entries.map(({ doc }) => {
+      const {
+        status, source, email, phone, website, contactInfo, address, providerTypes, location,
+        ...fields
+      } = doc;
+      return {
+        updateOne: {
+          filter: bulkFilter(doc),
+          update: {
+            $set: fields,
+            $setOnInsert: {
+              status, source, email, phone, website, contactInfo, address, providerTypes, location,
+              // Places geometry; never a ZIP centroid for geocode-providers.js to upgrade
+              locationPrecision: location ? 'rooftop' : undefined,
+              createdAt: new Date()
+            }
+          },
+          upsert: true
+        }
+      };
+    });
+
+    let upsertedIds = {};
+    const failedOps = new Set();
+
+    if (operations.length > 0) {
+      try {
+        const writeResult = await Provider.bulkWrite(operations, { ordered: false });
+        upsertedIds = writeResult.upsertedIds || {};
+      } catch (error) {
+        if (!error.writeErrors) throw error;
+        upsertedIds = (error.result && error.result.upsertedIds) || {};
+        error.writeErrors.forEach(writeError => {
+          failedOps.add(writeError.index);
+          results[entries[writeError.index].index].error = writeError.errmsg || writeError.message;
+        });
+      }
+    }
+
+    // Resolve ids for entries that matched an existing provider
+    const matched = entries.filter((_, opIndex) => !failedOps.has(opIndex) && !upsertedIds[opIndex]);
+    const existingIds = new Map();
+    if (matched.length > 0) {
+      const existing = await Provider.find({ $or: matched.map(({ doc }) => bulkFilter(doc)) })
+        .select('_id practiceName googlePlaceId address.zip')
+        .lean();
+      existing.forEach(provider => {
+        if (provider.googlePlaceId) {
+          existingIds.set(bulkKey({ googlePlaceId: provider.googlePlaceId }), provider._id);
+        }
+        existingIds.set(bulkKey({ practiceName: provider.practiceName, address: provider.address }), provider._id);
+      });
+    }
+
+    entries.forEach(({ index, doc }, opIndex) => {
+      if (failedOps.has(opIndex)) return;
+      const id = upsertedIds[opIndex] || existingIds.get(bulkKey(doc));
+      results[index] = {
+        index,
+        id: id ? String(id) : null,
+        status: upsertedIds[opIndex] ? 'created' : 'updated'
+      };
+    });
+
+    // Entries may omit services or parts of the address that stay stored,
+    // so search terms come from the merged documents, not the entries
+    const writtenIds = results.filter(result => result.id).map(result => result.id);
+    if (writtenIds.length > 0) {
+      await Provider.rebuildSearchTerms({ _id: { $in: writtenIds } });
+    }
+
+    const stats = results.reduce((counts, result) => {
+      counts[result.status] = (counts[result.status] || 0) + 1;
+      return counts;
+    }, { created: 0, updated: 0, skipped: 0, error: 0 });
+
+    res.json({
+      success: stats.error === 0,
+      results,
+      stats
+    });
+  } catch (error) {
+    console.error('Error bulk ingesting providers:', error);
+    res.status(500).json({
+      success: false,
+      message: 'Bulk ingest failed',
+      error: error.message
+    });
+  }
+});
+
+// Top-level fields an agent refresh may change; anything else in a
+// PATCH entry is rejected so a refresh can never touch admin-owned data
+const REFRESH_PATCH_FIELDS = new Set([
+  'phone',
+  'website',
+  'contactInfo',
+  'calendar',
+  'services',
+  'insuranceAccepted',
+  'languagesSpoken',
+  'googleRating',
+  'googleReviewCount',
+  'googleBusinessStatus',
+  'refresh'
+]);
+
+/**
+ * PATCH /api/admin/providers - Apply many partial updates in one request
+ * Body: { updates: [{ id, set: { 'phone': '...', 'refresh.hashes.phone': '...' } }] }
+ * Keys in `set` are $set paths (dotted paths allowed). Entries that only
+ * touch `refresh.*` record a check without bumping updatedAt.
+ * Returns one result per input index: updated | unchanged | not_found | error
+ */
+router.patch('/providers', async (req, res) => {
+  try {
+    const { updates } = req.body;
+
+    if (!Array.isArray(updates) || updates.length === 0) {
+      return res.status(400).json({
+        success: false,
+        message: 'updates array is required'
+      });
+    }
+
+    if (updates.length > BULK_MAX_PROVIDERS) {
+      return res.status(413).json({
+        success: false,
+        message: `At most ${BULK_MAX_PROVIDERS} updates per request`
+      });
+    }
+
+    const results = updates.map((entry, index) => ({ index, id: entry && entry.id, status: 'error' }));
+    const entries = [];
+
+    updates.forEach((entry, index) => {
+      const { id, set } = entry || {};
+      if (!mongoose.Types.ObjectId.isValid(id) || !set || typeof set !== 'object') {
+        results[index].error = 'id and set are required';
+        return;
+      }
+
+      const rejected = Object.keys(set).filter(path => !REFRESH_PATCH_FIELDS.has(path.split('.')[0]));
+      if (rejected.length > 0) {
+        results[index].error = `Fields not patchable: ${rejected.join(', ')}`;
+        return;
+      }
+
+      const update = { ...set };
+      if (Array.isArray(update.services)) {
+        update.services = normalizeServices(update.services);
+      }
+      const changed = Object.keys(update).some(path => path.split('.')[0] !== 'refresh');
+      if (changed) {
+        update.updatedAt = new Date();
+      }
+      entries.push({ index, id: String(id), update, changed });
+    });
+
+    const failedOps = new Set();
+    if (entries.length > 0) {
+      try {
+        await Provider.bulkWrite(
+          entries.map(({ id, update }) => ({
+            updateOne: { filter: { _id: id }, update: { $set: update } }
+          })),
+          { ordered: false }
+        );
+      } catch (error) {
+        if (!error.writeErrors) throw error;
+        error.writeErrors.forEach(writeError => {
+          failedOps.add(writeError.index);
+          results[entries[writeError.index].index].error = writeError.errmsg || writeError.message;
+        });
+      }
+    }
+
+    // bulkWrite skips the model hooks; services feed the search terms
+    const servicesChanged = entries
+      .filter(({ update }, opIndex) => !failedOps.has(opIndex) && update.services)
+      .map(({ id }) => id);
+    if (servicesChanged.length > 0) {
+      await Provider.rebuildSearchTerms({ _id: { $in: servicesChanged } });
+    }
+
+    const existing = new Set(
+      (await Provider.find({ _id: { $in: entries.map(({ id }) => id) } }).select('_id').lean())
+        .map(provider => String(provider._id))
+    );
+
+    entries.forEach(({ index, id, changed }, opIndex) => {
+      if (failedOps.has(opIndex)) return;
+      let status = changed ? 'updated' : 'unchanged';
+      if (!existing.has(id)) status = 'not_found';
+      results[index] = { index, id, status };
+    });
+
+    const stats = results.reduce((counts, result) => {
+      counts[result.status] = (counts[result.status] || 0) + 1;
+      return counts;
+    }, { updated: 0, unchanged: 0, not_found: 0, error: 0 });
+
+    res.json({
+      success: stats.error === 0,
+      results,
+      stats
+    });
+  } catch (error) {
+    console.error('Error patching providers:', error);
+    res.status(500).json({
+      success: false,
+      message: 'Failed to patch providers',
+      error: error.message
+    });
+  }
+});
+
 // GET /api/admin/providers/:id - Get single provider
 router.get('/providers/:id', async (req, res) => {
   try {
@@ -145,6 +621,10 @@ router.put('/providers/:id', async (req, res) => {
 
     delete updates._id;
     delete updates.createdAt;
+    // Coordinates set by hand are not a ZIP centroid unless the caller says so
+    if (updates.location && updates.locationPrecision === undefined) {
+      updates.locationPrecision = 'rooftop';
+    }
     
     const provider = await Provider.findByIdAndUpdate(
       id,
@@ -240,11 +720,19 @@ router.patch('/providers/:id/featured', async (req, res) => {
   }
 });
 
-// POST /api/admin/providers/:id/photos - Upload photos
+/**
+ * POST /api/admin/providers/:id/photos - Add photos
+ * Body: { photos: [{ url, hash?, isPrimary?, caption? }], replace?: boolean }
+ *
+ * Photos already on the provider (same URL, or a perceptual hash within
+ * PHOTO_HASH_DISTANCE bits) are skipped, so re-running a photo script does
+ * not grow the document. With replace, the incoming set replaces the
+ * current one and captions carry over from matching photos.
+ */
 router.post('/providers/:id/photos', async (req, res) => {
   try {
     const { id } = req.params;
-    const { photos } = req.body;
+    const { photos, replace } = req.body;
 
     if (!photos || !Array.isArray(photos)) {
       return res.status(400).json({
@@ -262,15 +750,45 @@ router.post('/providers/:id/photos', async (req, res) => {
       });
     }
 
-    provider.photos = provider.photos || [];
-    provider.photos.push(...photos);
+    const incoming = photos.map((photo, i) => normalizePhoto(photo, i, Boolean(replace))).filter(photo => photo.url);
+    const current = (provider.photos || []).map(photo => photo.toObject());
+    let added;
+    let skipped;
+    let changed;
 
-    await provider.save();
+    if (replace) {
+      ({ added, skipped } = dedupePhotos([], incoming));
+      added.forEach((photo) => {
+        const previous = current.find(other => samePhoto(photo, other));
+        if (previous && !photo.caption) photo.caption = previous.caption;
+      });
+      changed = added.length !== current.length ||
+        added.some((photo, i) => photo.url !== current[i].url || photo.hash !== current[i].hash);
+      if (changed) provider.photos = added;
+    } else {
+      ({ added, skipped } = dedupePhotos(current, incoming));
+      changed = added.length > 0;
+      if (changed) {
+        // Keep a single primary: appended photos only take it when there is none
+        if (current.some(photo => photo.isPrimary)) {
+          added.forEach((photo) => { photo.isPrimary = false; });
+        } else if (!added.some(photo => photo.isPrimary)) {
+          added[0].isPrimary = true;
+        }
+        provider.photos.push(...added);
+      }
+    }
+
+    if (changed) {
+      await provider.save();
+    }
 
     res.json({
       success: true,
       provider,
-      message: 'Photos uploaded successfully'
+      added: added.length,
+      skipped,
+      message: changed ? 'Photos uploaded successfully' : 'Photos already present'
     });
   } catch (error) {
     console.error('Error uploading photos:', error);
@@ -357,7 +875,63 @@ router.delete('/providers/:id', async (req, res) => {
   }
 });
 
-// POST /api/admin/create-search-index
+// POST /api/admin/agent/run - Start tracking a provider agent run
+// (body: search_city, search_state, categories, max_profiles)
+router.post('/agent/run', async (req, res) => {
+  try {
+    const run = await AgentRun.create({ ...AgentRun.fromPayload(req.body), status: 'running' });
+    res.json({ success: true, runId: String(run._id) });
+  } catch (error) {
+    if (error.name === 'ValidationError') {
+      return res.status(400).json({ success: false, message: error.message });
+    }
+    console.error('Agent run create error:', error);
+    res.status(500).json({ success: false, message: 'Failed to create agent run', error: error.message });
+  }
+});
+
+// PATCH /api/admin/agent/run/:id - Store run status and (absolute) counters
+router.patch('/agent/run/:id', async (req, res) => {
+  try {
+    if (!mongoose.Types.ObjectId.isValid(req.params.id)) {
+      return res.status(400).json({ success: false, message: 'Invalid run id' });
+    }
+    const run = await AgentRun.findByIdAndUpdate(
+      req.params.id,
+      { $set: { ...AgentRun.fromPayload(req.body), updatedAt: new Date() } },
+      { new: true, runValidators: true }
+    );
+    if (!run) {
+      return res.status(404).json({ success: false, message: 'Agent run not found' });
+    }
+    res.json({ success: true, run });
+  } catch (error) {
+    if (error.name === 'ValidationError' || error.name === 'CastError') {
+      return res.status(400).json({ success: false, message: error.message });
+    }
+    console.error('Agent run update error:', error);
+    res.status(500).json({ success: false, message: 'Failed to update agent run', error: error.message });
+  }
+});
+
+// GET /api/admin/agent/runs - Recent agent runs, newest first (?status=&limit=)
+router.get('/agent/runs', async (req, res) => {
+  try {
+    const { status, limit = 50 } = req.query;
+    const query = status ? { status } : {};
+    const runs = await AgentRun.find(query)
+      .select('-skippedProviders -flaggedProviders -createdProviders')
+      .sort({ startedAt: -1 })
+      .limit(Math.min(parseInt(limit) || 50, 500))
+      .lean();
+    res.json({ success: true, runs });
+  } catch (error) {
+    console.error('Agent runs fetch error:', error);
+    res.status(500).json({ success: false, message: 'Failed to fetch agent runs', error: error.message });
+  }
+});
+
+// POST /api/admin/create-search-index - Rebuild the text index and backfill searchTerms
 router.post('/create-search-index', async (req, res) => {
   try {
     const db = Provider.db;
@@ -398,9 +972,13 @@ router.post('/create-search-index', async (req, res) => {
       }
     );
     
+    // Backfill the prefix terms the ranked search matches on
+    const searchTermsBuilt = await Provider.rebuildSearchTerms();
+    
     res.json({ 
       success: true, 
       message: 'Search index created successfully',
+      searchTermsBuilt,
       weights: {
         'services.name': 10,
         'services.category': 8,
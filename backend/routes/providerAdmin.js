@@ -99,12 +99,16 @@ router.patch('/:providerId/featured', adminAuth, async (req, res) => {
 router.patch('/:providerId/coordinates', adminAuth, async (req, res) => {
   try {
     const { providerId } = req.params;
-    const { latitude, longitude } = req.body;
+    const { latitude, longitude, precision } = req.body;
     
     if (latitude === undefined || longitude === undefined) {
       return res.status(400).json({ error: 'Latitude and longitude required' });
     }
     
+    if (precision !== undefined && !['zip', 'rooftop'].includes(precision)) {
+      return res.status(400).json({ error: "precision must be 'zip' or 'rooftop'" });
+    }
+    
     const provider = await Provider.findById(providerId);
     
     if (!provider) {
@@ -115,6 +119,8 @@ router.patch('/:providerId/coordinates', adminAuth, async (req, res) => {
       type: 'Point',
       coordinates: [parseFloat(longitude), parseFloat(latitude)]
     };
+    // Only geocode-providers.js' centroid fixes are sent as 'zip'
+    provider.locationPrecision = precision || 'rooftop';
     
     await provider.save();
     
@@ -123,7 +129,8 @@ router.patch('/:providerId/coordinates', adminAuth, async (req, res) => {
       provider: {
         _id: provider._id,
         practiceName: provider.practiceName,
-        location: provider.location
+        location: provider.location,
+        locationPrecision: provider.locationPrecision
       }
     });
   } catch (error) {
@@ -1,93 +1,56 @@
 const express = require('express');
 const router = express.Router();
 const jwt = require('jsonwebtoken');
+const mongoose = require('mongoose');
 const Provider = require('../models/Provider');
 const emailService = require('../services/emailService');
+const {
+  DISTANCE,
+  METERS_PER_MILE,
+  InvalidCursorError,
+  hasGeoProviders,
+  searchProviders,
+  sortKey
+} = require('../services/providerSearch');
+const { selectFor } = require('../utils/providerProjections');
 
 const JWT_SECRET = process.env.JWT_SECRET || 'findr-health-secret-key-change-in-production';
 
 // Get all providers (for admin)
 
-// Search term normalization - map user queries to provider types
-const searchTermMap = {
-  // Dental variations
-  'dentist': 'Dental',
-  'dentistry': 'Dental',
-  'orthodontist': 'Dental',
-  'dental': 'Dental',
-  
-  // Medical variations  
-  'doctor': 'Medical',
-  'physician': 'Medical',
-  'clinic': 'Medical',
-  'medical': 'Medical',
-  
-  // Mental Health variations
-  'therapist': 'Mental Health',
-  'counselor': 'Mental Health',
-  'psychologist': 'Mental Health',
-  'psychiatrist': 'Mental Health',
-  'therapy': 'Mental Health',
-  
-  // Massage variations
-  'massage therapist': 'Massage',
-  'masseuse': 'Massage',
-  
-  // Fitness variations
-  'trainer': 'Fitness',
-  'personal trainer': 'Fitness',
-  'gym': 'Fitness',
-  
-  // Urgent Care variations
-  'urgent': 'Urgent Care',
-  'walk-in': 'Urgent Care',
-  'emergency': 'Urgent Care',
-  
-  // Skincare variations
-  'dermatologist': 'Skincare',
-  'aesthetician': 'Skincare',
-  'skin care': 'Skincare',
-  
-  // Yoga variations
-  'yoga instructor': 'Yoga',
-  
-  // Nutrition variations
-  'dietitian': 'Nutrition',
-  'nutritionist': 'Nutrition',
-  
-  // Pharmacy variations
-  'pharmacist': 'Pharmacy',
-  'drug store': 'Pharmacy',
-  'drugstore': 'Pharmacy'
+// Sort options for GET / (relevance is the default when searching)
+const LIST_SORTS = {
+  '-rating': [sortKey('reviews.averageRating', -1, 0), sortKey('reviewCount', -1, 0)],
+  '-bookingCount': [sortKey('bookingCount', -1, 0), sortKey('reviewCount', -1, 0)],
+  '-popular': [sortKey('bookingCount', -1, 0), sortKey('reviewCount', -1, 0)],
+  '-reviewCount': [sortKey('reviewCount', -1, 0)]
 };
+const NEWEST_FIRST = [sortKey('createdAt', -1, new Date(0))];
 
-function normalizeSearchTerm(query) {
-  if (!query) return query;
-  
-  const lowerQuery = query.toLowerCase().trim();
-  
-  // Check if query matches any mapped term
-  for (const [term, providerType] of Object.entries(searchTermMap)) {
-    if (lowerQuery === term || lowerQuery.includes(term)) {
-      return providerType;
-    }
-  }
-  
-  return query;
-}
-
+/**
+ * GET /api/providers - List and search providers
+ * Query: search, type, status, sort, limit, cursor, latitude, longitude, radius (miles),
+ *        profile (card - the default - or detail; see utils/providerProjections.js)
+ * With coordinates, rows come from the 2dsphere index nearest first (unless
+ * `sort` or `search` says otherwise) and carry `distance` in miles.
+ * The response stays a plain array of at most 100 rows (MAX_LIMIT in
+ * services/providerSearch.js; X-Page-Limit says what was applied). When
+ * there are more rows the X-Next-Cursor header holds the cursor for the
+ * next page: follow it until it is absent to read the whole list.
+ */
 router.get('/', async (req, res) => {
   try {
     const { 
       latitude, 
       longitude, 
+      radius,
       sort, 
       limit = 50,
       type,
       status,
       search,
-      verified,
-      featured
+      cursor,
+      profile
     } = req.query;
 
     let query = { status: status || 'approved' };
@@ -97,104 +60,47 @@ router.get('/', async (req, res) => {
       query.providerTypes = type;
     }
 
-    
-    // Text search with relevance scoring
-    let useTextSearch = false;
-    if (search) {
-      // Normalize search term (e.g., "dentist" -> "Dental")
-      const normalizedSearch = normalizeSearchTerm(search);
-      console.log(`[Search] Original: "${search}" -> Normalized: "${normalizedSearch}"`);
-      
-      // Try text search first (requires text index)
-      // If text index exists, use it for better relevance
-      try {
-        // Use MongoDB text search with scoring
-        query.$text = { $search: normalizedSearch };
-        useTextSearch = true;
-      } catch (e) {
-        // Fallback to regex search if no text index
-        // Use normalized search for provider type, original for everything else
-        const searchRegex = new RegExp(search, 'i');
-        const normalizedRegex = new RegExp(normalizedSearch, 'i');
-        
-        // Weighted search: prioritize service names and categories
-        // Use aggregation to calculate relevance scores
-        const serviceNameMatch = { 'services.name': searchRegex };
-        const serviceCategoryMatch = { 'services.category': searchRegex };
-        const providerTypeMatch = { providerTypes: normalizedRegex };
-        const practiceNameMatch = { practiceName: searchRegex };
-        const descriptionMatch = { description: searchRegex };
-        const locationMatch = {
-          $or: [
-            { 'address.city': searchRegex },
-            { 'address.state': searchRegex }
-          ]
-        };
-        
-        // Combine with OR (any match is valid)
-        query.$or = [
-          serviceNameMatch,
-          serviceCategoryMatch,
-          providerTypeMatch,
-          practiceNameMatch,
-          descriptionMatch,
-          locationMatch
-        ];
+    let near = null;
+    if (latitude && longitude) {
+      const lat = parseFloat(latitude);
+      const lng = parseFloat(longitude);
+      if (!(Math.abs(lat) <= 90 && Math.abs(lng) <= 180)) {
+        return res.status(400).json({ error: 'Invalid latitude/longitude' });
+      }
+      if (await hasGeoProviders(query)) {
+        near = { lat, lng, maxDistanceMeters: radius ? parseFloat(radius) * METERS_PER_MILE : null };
       }
-    }
-    
-    let sortOption = { createdAt: -1 };
-    
-    // Sort options
-    if (sort === '-rating') {
-      sortOption = { 'reviews.averageRating': -1, reviewCount: -1 };
-    } else if (sort === '-bookingCount' || sort === '-popular') {
-      sortOption = { bookingCount: -1, reviewCount: -1 };
-    } else if (sort === '-reviewCount') {
-      sortOption = { reviewCount: -1 };
     }
 
-    let providers;
-    
-    if (useTextSearch && !sort) {
-      // When using text search without explicit sort, sort by text score
-      providers = await Provider.find(query, { score: { $meta: "textScore" } })
-        .sort({ score: { $meta: "textScore" } })
-        .limit(parseInt(limit));
-    } else if (useTextSearch && sort) {
-      // Use explicit sort but include text score
-      providers = await Provider.find(query, { score: { $meta: "textScore" } })
-        .sort(sortOption)
-        .limit(parseInt(limit));
-    } else {
-      // Regular search without text index
-      providers = await Provider.find(query)
-        .sort(sortOption)
-        .limit(parseInt(limit));
+    let order = LIST_SORTS[sort];
+    if (!order && !search) {
+      order = near ? DISTANCE : NEWEST_FIRST;
+    } else if (sort === 'distance' && near) {
+      order = DISTANCE;
     }
 
-    // If coordinates provided, calculate distance
-    if (latitude && longitude) {
-      const lat = parseFloat(latitude);
-      const lng = parseFloat(longitude);
-      
-      providers = providers.map(p => {
-        const pLat = p.location?.coordinates?.[1] || 0;
-        const pLng = p.location?.coordinates?.[0] || 0;
-        const distance = Math.sqrt(
-          Math.pow(lat - pLat, 2) + Math.pow(lng - pLng, 2)
-        ) * 69; // Rough miles conversion
-        return { ...p.toObject(), distance };
-      });
-      
-      // Sort by distance if requested
-      if (sort === 'distance') {
-        providers.sort((a, b) => a.distance - b.distance);
-      }
+    // Text, prefix and synonym matching ("dentist" -> Dental) in one ranked query
+    const result = await searchProviders({
+      search,
+      filter: query,
+      near,
+      sort: order,
+      limit,
+      cursor,
+      project: profile === 'detail' ? 'detail' : 'card'
+    });
+    res.set('X-Page-Limit', String(result.limit));
+    if (result.nextCursor) {
+      res.set('X-Next-Cursor', result.nextCursor);
     }
 
-    res.json(providers);
+    // Plain rows; keep the `id` the hydrated documents used to serialize
+    result.providers.forEach(provider => { provider.id = String(provider._id); });
+    res.json(result.providers);
   } catch (error) {
+    if (error instanceof InvalidCursorError) {
+      return res.status(400).json({ error: error.message });
+    }
     console.error('Get providers error:', error);
     res.status(500).json({ error: 'Failed to fetch providers' });
   }
@@ -203,7 +109,7 @@ router.get('/', async (req, res) => {
 // Get single provider
 router.get('/:id', async (req, res) => {
   try {
-    const provider = await Provider.findById(req.params.id);
+    const provider = await Provider.findById(req.params.id).select(selectFor('detail'));
     if (!provider) {
       return res.status(404).json({ error: 'Provider not found' });
     }
@@ -214,6 +120,44 @@ router.get('/:id', async (req, res) => {
   }
 });
 
+const THUMBNAIL_TYPES = new Set(['image/jpeg', 'image/jpg', 'image/png', 'image/gif', 'image/webp']);
+
+/**
+ * GET /api/providers/:id/thumbnail - Primary photo for list thumbnails
+ * (the thumbnailUrl of photos stored inline as data: URLs)
+ */
+router.get('/:id/thumbnail', async (req, res) => {
+  try {
+    if (!mongoose.Types.ObjectId.isValid(req.params.id)) {
+      return res.status(404).json({ error: 'Provider not found' });
+    }
+    const provider = await Provider.findById(req.params.id).select('photos.url photos.isPrimary').lean();
+    const photos = (provider && provider.photos) || [];
+    const photo = photos.find(p => p.isPrimary) || photos[0];
+    if (!photo || !photo.url) {
+      return res.status(404).json({ error: 'No photo' });
+    }
+
+    const inline = /^data:([^;,]*)(;base64)?,/.exec(photo.url);
+    if (!inline) {
+      return res.redirect(302, photo.url);
+    }
+    // Raster images only: anything else stored inline is not served from our origin
+    if (!THUMBNAIL_TYPES.has(inline[1].toLowerCase())) {
+      return res.status(415).json({ error: 'Unsupported photo type' });
+    }
+    const data = photo.url.substring(inline[0].length);
+    const body = inline[2] ? Buffer.from(data, 'base64') : Buffer.from(decodeURIComponent(data));
+    res.set('Content-Type', inline[1].toLowerCase());
+    res.set('X-Content-Type-Options', 'nosniff');
+    res.set('Cache-Control', 'public, max-age=86400');
+    res.send(body);
+  } catch (error) {
+    console.error('Get thumbnail error:', error);
+    res.status(500).json({ error: 'Failed to fetch thumbnail' });
+  }
+});
+
 // Create new provider (onboarding submission)
 router.post('/', async (req, res) => {
   try {
@@ -378,6 +322,10 @@ router.put('/:id', async (req, res) => {
     const updateData = { ...req.body };
     delete updateData.password;
     delete updateData._id; // Never update _id
+    // Coordinates set by hand are not a ZIP centroid unless the caller says so
+    if (updateData.location && updateData.locationPrecision === undefined) {
+      updateData.locationPrecision = 'rooftop';
+    }
     
     const currentProvider = await Provider.findById(req.params.id);
     if (!currentProvider) {
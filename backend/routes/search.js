@@ -1,6 +1,17 @@
 const express = require('express');
 const router = express.Router();
 const Provider = require('../models/Provider');
+const {
+  DISTANCE,
+  NAME,
+  METERS_PER_MILE,
+  InvalidCursorError,
+  hasGeoProviders,
+  searchProviders,
+  sortKey
+} = require('../services/providerSearch');
+const { projectionStages } = require('../utils/providerProjections');
+const autocompleteIndex = require('../services/autocompleteIndex');
 
 // ============================================
 // GOOGLE PLACES BUSINESS SEARCH (for onboarding)
@@ -165,7 +176,15 @@ router.get('/place/:placeId', async (req, res) => {
 // PROVIDER DATABASE SEARCH (for consumer app)
 // ============================================
 
-// Search providers with geo support
+/**
+ * Search providers with geo support
+ * GET /api/search/providers?query=&lat=&lng=&radius=&types=&sort=&limit=&cursor=
+ *
+ * Ranked by relevance when there is a query (unless `sort` is given).
+ * Pass the returned `nextCursor` as `cursor` for the next page; `page`
+ * still works for older clients. The total is counted with the first page
+ * (one $facet query); cursor pages repeat it with totalEstimated: true.
+ */
 router.get('/providers', async (req, res) => {
   try {
     const {
@@ -179,22 +198,13 @@ router.get('/providers', async (req, res) => {
       featured,
       page = 1,
       limit = 20,
-      sort = 'name'
+      sort,
+      cursor
     } = req.query;
     
     // Base query - only approved providers
     const filter = { status: 'approved' };
     
-    // Text search
-    if (query) {
-      filter.$or = [
-        { practiceName: { $regex: query, $options: 'i' } },
-        { description: { $regex: query, $options: 'i' } },
-        { 'services.name': { $regex: query, $options: 'i' } },
-        { providerTypes: { $regex: query, $options: 'i' } }
-      ];
-    }
-    
     // Category filter
     if (types) {
       const typeArray = types.split(',').map(t => t.trim());
@@ -216,103 +226,50 @@ router.get('/providers', async (req, res) => {
       filter.isFeatured = true;
     }
     
-    let providers;
-    let total;
+    // Geo search if coordinates provided AND providers have coordinates (cached flag)
+    const near = lat && lng && await hasGeoProviders({ status: 'approved' })
+      ? { lat: parseFloat(lat), lng: parseFloat(lng), maxDistanceMeters: parseFloat(radius) * METERS_PER_MILE }
+      : null;
+    
+    let order;
+    if (sort === 'rating') {
+      order = [sortKey('rating', -1, 0), ...(near ? DISTANCE : [])];
+    } else if (sort === 'distance' && near) {
+      order = DISTANCE;
+    } else if (sort === 'name' || (!sort && !query)) {
+      order = featured === 'true' && !near ? [sortKey('featuredOrder', 1, Number.MAX_SAFE_INTEGER)] : NAME;
+    }
     
-    // Check if any providers have geo coordinates
-    const hasGeoProviders = await Provider.findOne({ 
-      'location.coordinates.0': { $exists: true },
-      status: 'approved'
+    const pageSize = parseInt(limit);
+    const result = await searchProviders({
+      search: query,
+      filter,
+      near,
+      sort: order,
+      limit: pageSize,
+      cursor,
+      skip: cursor ? 0 : (parseInt(page) - 1) * pageSize,
+      project: 'card',
+      count: true
     });
     
-    // Geo search if coordinates provided AND providers have coordinates
-    if (lat && lng && hasGeoProviders) {
-      const radiusInMeters = parseFloat(radius) * 1609.34;
-      
-      const pipeline = [
-        {
-          $geoNear: {
-            near: {
-              type: 'Point',
-              coordinates: [parseFloat(lng), parseFloat(lat)]
-            },
-            distanceField: 'distanceMeters',
-            maxDistance: radiusInMeters,
-            spherical: true,
-            query: filter
-          }
-        },
-        {
-          $addFields: {
-            distance: { $round: [{ $divide: ['$distanceMeters', 1609.34] }, 1] }
-          }
-        }
-      ];
-      
-      // Sort
-      if (sort === 'rating') {
-        pipeline.push({ $sort: { rating: -1, distance: 1 } });
-      } else if (sort === 'name') {
-        pipeline.push({ $sort: { practiceName: 1 } });
-      } else {
-        pipeline.push({ $sort: { distance: 1 } });
-      }
-      
-      // Count total
-      const countPipeline = [...pipeline, { $count: 'total' }];
-      const countResult = await Provider.aggregate(countPipeline);
-      total = countResult[0]?.total || 0;
-      
-      // Pagination
-      pipeline.push({ $skip: (parseInt(page) - 1) * parseInt(limit) });
-      pipeline.push({ $limit: parseInt(limit) });
-      
-      // Select fields
-      pipeline.push({
-        $project: {
-          practiceName: 1,
-          providerTypes: 1,
-          description: 1,
-          address: 1,
-          photos: 1,
-          rating: 1,
-          reviewCount: 1,
-          isVerified: 1,
-          isFeatured: 1,
-          services: 1,
-          distance: 1,
-          contactInfo: 1,
-          phone: 1
-        }
-      });
-      
-      providers = await Provider.aggregate(pipeline);
-      
-    } else {
-      // Non-geo search (fallback)
-      total = await Provider.countDocuments(filter);
-      
-      let sortOption = { practiceName: 1 };
-      if (sort === 'rating') sortOption = { rating: -1 };
-      if (featured === 'true') sortOption = { featuredOrder: 1 };
-      
-      providers = await Provider.find(filter)
-        .select('practiceName providerTypes description address photos rating reviewCount isVerified isFeatured services contactInfo phone')
-        .sort(sortOption)
-        .skip((parseInt(page) - 1) * parseInt(limit))
-        .limit(parseInt(limit));
-    }
+    const pagination = {
+      page: parseInt(page),
+      limit: pageSize,
+      total: result.total,
+      totalEstimated: result.totalEstimated,
+      pages: Math.ceil(result.total / pageSize),
+      nextCursor: result.nextCursor
+    };
     
     res.json({
-      providers,
-      pagination: {
-        page: parseInt(page),
-        limit: parseInt(limit),
-        total,
-        pages: Math.ceil(total / parseInt(limit))
-      }
+      providers: result.providers,
+      pagination
     });
   } catch (error) {
+    if (error instanceof InvalidCursorError) {
+      return res.status(400).json({ error: error.message });
+    }
     console.error('Search error:', error);
     res.status(500).json({ error: 'Search failed' });
   }
@@ -323,16 +280,9 @@ router.get('/featured', async (req, res) => {
   try {
     const { lat, lng, limit = 10 } = req.query;
     
-    // Check if geo data exists
-    const hasGeoProviders = await Provider.findOne({ 
-      'location.coordinates.0': { $exists: true },
-      status: 'approved',
-      isFeatured: true
-    });
-    
     let providers;
     
-    if (lat && lng && hasGeoProviders) {
+    if (lat && lng && await hasGeoProviders({ status: 'approved', isFeatured: true })) {
       providers = await Provider.aggregate([
         {
           $geoNear: {
@@ -353,24 +303,15 @@ router.get('/featured', async (req, res) => {
         },
         { $sort: { featuredOrder: 1, distance: 1 } },
         { $limit: parseInt(limit) },
-        {
-          $project: {
-            practiceName: 1,
-            providerTypes: 1,
-            address: 1,
-            photos: 1,
-            rating: 1,
-            reviewCount: 1,
-            isVerified: 1,
-            distance: 1
-          }
-        }
+        ...projectionStages('card', ['distance'])
       ]);
     } else {
-      providers = await Provider.find({ status: 'approved', isFeatured: true })
-        .select('practiceName providerTypes address photos rating reviewCount isVerified')
-        .sort({ featuredOrder: 1 })
-        .limit(parseInt(limit));
+      providers = await Provider.aggregate([
+        { $match: { status: 'approved', isFeatured: true } },
+        { $sort: { featuredOrder: 1 } },
+        { $limit: parseInt(limit) },
+        ...projectionStages('card')
+      ]);
     }
     
     res.json(providers);
@@ -395,7 +336,14 @@ router.get('/types', async (req, res) => {
   }
 });
 
-// Autocomplete search
+/**
+ * Autocomplete search
+ * GET /api/search/autocomplete?q=&limit=
+ *
+ * Answered from the in-memory index (services/autocompleteIndex.js);
+ * the Mongo queries below only serve requests that arrive before its
+ * first build finishes.
+ */
 router.get('/autocomplete', async (req, res) => {
   try {
     const { q, limit = 5 } = req.query;
@@ -404,6 +352,31 @@ router.get('/autocomplete', async (req, res) => {
       return res.json([]);
     }
     
+    const suggestions = autocompleteIndex.suggest(q, limit);
+    if (suggestions) {
+      return res.json({
+        providers: suggestions.provider.map(p => ({
+          type: 'provider',
+          id: p.providerId,
+          name: p.label,
+          city: p.city,
+          category: p.category
+        })),
+        services: suggestions.service.map(s => ({
+          type: 'service',
+          name: s.label
+        })),
+        categories: suggestions.category.map(c => ({
+          type: 'category',
+          name: c.label
+        })),
+        cities: suggestions.city.map(c => ({
+          type: 'city',
+          name: c.label
+        }))
+      });
+    }
+    
     const providers = await Provider.find({
       status: 'approved',
       practiceName: { $regex: q, $options: 'i' }
@@ -422,6 +395,7 @@ router.get('/autocomplete', async (req, res) => {
     res.json({
       providers: providers.map(p => ({
         type: 'provider',
+        id: String(p._id),
         name: p.practiceName,
         city: p.address?.city,
         category: p.providerTypes?.[0]
@@ -429,7 +403,9 @@ router.get('/autocomplete', async (req, res) => {
       services: services.map(s => ({
         type: 'service',
         name: s._id
-      }))
+      })),
+      categories: [],
+      cities: []
     });
   } catch (error) {
     res.status(500).json({ error: 'Autocomplete failed' });
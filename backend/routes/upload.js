@@ -24,6 +24,22 @@ const upload = multer({
   }
 });
 
+const UPLOAD_OPTIONS = {
+  folder: 'findr-health/providers',
+  transformation: [
+    { width: 1200, height: 800, crop: 'limit', quality: 'auto' }
+  ]
+};
+
+// Stream the multer buffer straight to Cloudinary (no base64 data URI copy)
+const uploadBuffer = (buffer) => new Promise((resolve, reject) => {
+  const stream = cloudinary.uploader.upload_stream(UPLOAD_OPTIONS, (error, result) => {
+    if (error) return reject(error);
+    resolve(result);
+  });
+  stream.end(buffer);
+});
+
 // Upload single image
 router.post('/image', upload.single('image'), async (req, res) => {
   try {
@@ -31,17 +47,7 @@ router.post('/image', upload.single('image'), async (req, res) => {
       return res.status(400).json({ error: 'No image file provided' });
     }
 
-    // Convert buffer to base64 for Cloudinary upload
-    const b64 = Buffer.from(req.file.buffer).toString('base64');
-    const dataURI = `data:${req.file.mimetype};base64,${b64}`;
-
-    // Upload to Cloudinary
-    const result = await cloudinary.uploader.upload(dataURI, {
-      folder: 'findr-health/providers',
-      transformation: [
-        { width: 1200, height: 800, crop: 'limit', quality: 'auto' }
-      ]
-    });
+    const result = await uploadBuffer(req.file.buffer);
 
     res.json({
       success: true,
@@ -64,15 +70,7 @@ router.post('/images', upload.array('images', 10), async (req, res) => {
     }
 
     const uploadPromises = req.files.map(async (file) => {
-      const b64 = Buffer.from(file.buffer).toString('base64');
-      const dataURI = `data:${file.mimetype};base64,${b64}`;
-      
-      const result = await cloudinary.uploader.upload(dataURI, {
-        folder: 'findr-health/providers',
-        transformation: [
-          { width: 1200, height: 800, crop: 'limit', quality: 'auto' }
-        ]
-      });
+      const result = await uploadBuffer(file.buffer);
 
       return {
         url: result.secure_url,
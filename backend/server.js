@@ -42,6 +42,9 @@ const app = express();
 // Connect to MongoDB
 connectDB();
 
+// Autocomplete suggestions are served from memory; builds once connected
+require('./services/autocompleteIndex').start();
+
 // Initialize payment policy cron jobs (after DB connection)
 setTimeout(() => {
   console.log('🔄 Initializing payment cron jobs...');
@@ -55,6 +58,8 @@ app.use(cors({
   origin: '*',
   methods: ['GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'],
   allowedHeaders: ['Content-Type', 'Authorization', 'X-Requested-With', 'x-provider-id', 'x-user-id', 'x-timezone'],
+  // GET /api/providers pages through these
+  exposedHeaders: ['X-Next-Cursor', 'X-Page-Limit'],
   credentials: false
 }));
 
@@ -0,0 +1,453 @@
+/**
+ * Autocomplete Index
+ * In-memory prefix index behind GET /api/search/autocomplete
+ *
+ * Every suggestion (an approved provider's name, a service name, a
+ * category, a city) is stored under one key per word it contains, so
+ * "smi" finds "Bright Smile Dental". Keys live in one sorted array: a
+ * keystroke is a binary search to the first key with the prefix and a
+ * scan to the last, with no database round trip.
+ *
+ * Built when the Mongo connection opens, kept current from Provider
+ * change events (only the touched providers are re-read), and rebuilt in
+ * full every AUTOCOMPLETE_REBUILD_MINUTES to pick up writes from other
+ * instances and fresh popularity.
+ *
+ * Ranking: popularity over the last AUTOCOMPLETE_POPULARITY_DAYS of
+ * AnalyticsEvent data (searches for the suggestion, views and clicks of
+ * the provider, selections of the service), then suggestions whose first
+ * word matches, then how many approved providers share the suggestion.
+ */
+
+const mongoose = require('mongoose');
+const Provider = require('../models/Provider');
+const AnalyticsEvent = require('../models/AnalyticsEvent');
+const { normalizeSearchTerm } = require('../utils/searchTerms');
+
+const KINDS = ['provider', 'service', 'category', 'city'];
+const SOURCE_FIELDS = 'practiceName providerTypes services.name services.category address.city status';
+// Words of a suggestion that get their own key ("dental" in "bright smile dental")
+const MAX_KEY_WORDS = 6;
+const MAX_LIMIT = 20;
+const MAX_CACHED_PREFIXES = 1000;
+// Prefix lengths whose results are kept precomputed (shortest = most matches)
+const MIN_WARM_PREFIX = 2;
+const MAX_WARM_PREFIX = 3;
+const REBUILD_MINUTES = parseFloat(process.env.AUTOCOMPLETE_REBUILD_MINUTES) || 15;
+const POPULARITY_DAYS = parseInt(process.env.AUTOCOMPLETE_POPULARITY_DAYS, 10) || 90;
+// Writes we can't map to providers (bulk imports) coalesce into one rebuild
+const REBUILD_DEBOUNCE_MS = 5000;
+
+const PROVIDER_EVENTS = ['provider.view', 'search.result_click', 'provider.call', 'provider.directions', 'booking.start'];
+const SERVICE_EVENTS = ['service.view', 'service.select', 'booking.service_select'];
+
+/**
+ * Lowercase ASCII words joined by single spaces ("Café  Olé!" -> 'cafe ole')
+ */
+function normalize(text) {
+  if (!text) return '';
+  return String(text)
+    .normalize('NFKD')
+    .replace(/[\u0300-\u036f]/g, '')
+    .toLowerCase()
+    .split(/[^a-z0-9]+/)
+    .filter(Boolean)
+    .join(' ');
+}
+
+function keysFor(norm) {
+  const words = norm.split(' ');
+  const keys = new Set();
+  for (let i = 0; i < Math.min(words.length, MAX_KEY_WORDS); i++) {
+    keys.add(words.slice(i).join(' '));
+  }
+  return [...keys];
+}
+
+// First index whose key is >= prefix
+function lowerBound(keys, prefix) {
+  let low = 0;
+  let high = keys.length;
+  while (low < high) {
+    const mid = (low + high) >>> 1;
+    if (keys[mid] < prefix) low = mid + 1;
+    else high = mid;
+  }
+  return low;
+}
+
+// Negative when `entry` (leading: its first word matched) ranks above `other`
+function compareEntries(entry, leading, other) {
+  const rival = other.entry;
+  return (rival.popularity - entry.popularity) ||
+    (other.leading - leading) ||
+    (rival.providers - entry.providers) ||
+    (entry.label.length - rival.label.length) ||
+    (entry.label < rival.label ? -1 : entry.label > rival.label ? 1 : 0);
+}
+
+// One suggestion; a class so every entry has the same shape on the scan path
+class Suggestion {
+  constructor(kind, label, norm, provider = null) {
+    this.id = provider ? `provider:${provider.providerId}` : `${kind}:${norm}`;
+    this.kind = kind;
+    this.label = label;
+    this.norm = norm;
+    this.providerId = provider ? provider.providerId : null;
+    this.city = provider ? provider.city : null;
+    this.category = provider ? provider.category : null;
+    this.keys = keysFor(norm);
+    this.providers = 0;
+    this.popularity = 0;
+    this.scanned = 0;
+  }
+}
+
+/**
+ * Suggestions one provider contributes
+ */
+function suggestionsFor(provider) {
+  const suggestions = [];
+  const add = (kind, label, details) => {
+    const norm = normalize(label);
+    if (norm) suggestions.push(new Suggestion(kind, String(label).trim(), norm, details));
+  };
+
+  add('provider', provider.practiceName, {
+    providerId: String(provider._id),
+    city: provider.address?.city || null,
+    category: provider.providerTypes?.[0] || null
+  });
+  (provider.providerTypes || []).forEach(type => add('category', type));
+  (provider.services || []).forEach(service => {
+    add('service', service?.name);
+    add('category', service?.category);
+  });
+  add('city', provider.address?.city);
+  return suggestions;
+}
+
+/**
+ * Search, view and selection counts, keyed the way suggestions look them up
+ */
+async function loadPopularity() {
+  const popularity = { queries: new Map(), providers: new Map(), services: new Map() };
+  const since = new Date(Date.now() - POPULARITY_DAYS * 24 * 60 * 60 * 1000);
+  const bump = (map, key, count) => {
+    if (key) map.set(key, (map.get(key) || 0) + count);
+  };
+
+  try {
+    const [queries, providers, services] = await Promise.all([
+      AnalyticsEvent.aggregate([
+        { $match: { eventType: 'search.query', timestamp: { $gte: since }, 'data.searchQuery': { $exists: true, $ne: '' } } },
+        { $group: { _id: { $toLower: '$data.searchQuery' }, count: { $sum: 1 } } }
+      ]),
+      AnalyticsEvent.aggregate([
+        { $match: { eventType: { $in: PROVIDER_EVENTS }, timestamp: { $gte: since }, 'data.providerId': { $ne: null } } },
+        { $group: { _id: '$data.providerId', count: { $sum: 1 } } }
+      ]),
+      AnalyticsEvent.aggregate([
+        { $match: { eventType: { $in: SERVICE_EVENTS }, timestamp: { $gte: since }, 'data.serviceName': { $exists: true, $ne: '' } } },
+        { $group: { _id: { $toLower: '$data.serviceName' }, count: { $sum: 1 } } }
+      ])
+    ]);
+
+    queries.forEach(({ _id, count }) => {
+      bump(popularity.queries, normalize(_id), count);
+      // "dentist" searches count towards the Dental category too
+      const mapped = normalizeSearchTerm(_id);
+      if (mapped !== _id) bump(popularity.queries, normalize(mapped), count);
+    });
+    providers.forEach(({ _id, count }) => bump(popularity.providers, String(_id), count));
+    services.forEach(({ _id, count }) => bump(popularity.services, normalize(_id), count));
+  } catch (error) {
+    // Rank by provider counts alone rather than not at all
+    console.error('Autocomplete popularity load failed:', error.message);
+  }
+  return popularity;
+}
+
+class PrefixIndex {
+  constructor(popularity) {
+    this.popularity = popularity;
+    this.keys = [];
+    this.refs = [];
+    this.entries = new Map();
+    this.byProvider = new Map();
+    // Short prefixes match thousands of keys, so their top suggestions are
+    // computed ahead of time and recomputed only when a write touches them
+    this.warm = new Map();
+    this.stale = new Set();
+    this.cache = new Map();
+    this.scans = 0;
+  }
+
+  static build(providers, popularity) {
+    const index = new PrefixIndex(popularity);
+    providers.forEach(provider => index.contribute(provider, false));
+
+    const pairs = [];
+    index.entries.forEach(entry => entry.keys.forEach(key => pairs.push([key, entry])));
+    pairs.sort((a, b) => (a[0] < b[0] ? -1 : a[0] > b[0] ? 1 : 0));
+    index.keys = pairs.map(pair => pair[0]);
+    index.refs = pairs.map(pair => pair[1]);
+
+    index.stale.clear();
+    index.keys.forEach(key => {
+      for (let length = MIN_WARM_PREFIX; length <= Math.min(key.length, MAX_WARM_PREFIX); length++) {
+        index.stale.add(key.substring(0, length));
+      }
+    });
+    index.rewarm();
+    return index;
+  }
+
+  popularityOf(suggestion) {
+    const { queries, providers, services } = this.popularity;
+    let score = queries.get(suggestion.norm) || 0;
+    if (suggestion.kind === 'provider') score += providers.get(suggestion.providerId) || 0;
+    if (suggestion.kind === 'service') score += services.get(suggestion.norm) || 0;
+    return score;
+  }
+
+  /**
+   * Add a provider's suggestions (insertKeys false while bulk building)
+   */
+  contribute(provider, insertKeys = true) {
+    const providerId = String(provider._id);
+    const ids = new Set();
+    suggestionsFor(provider).forEach(suggestion => {
+      if (ids.has(suggestion.id)) return;
+      ids.add(suggestion.id);
+
+      let entry = this.entries.get(suggestion.id);
+      if (entry) {
+        entry.providers += 1;
+      } else {
+        entry = suggestion;
+        entry.providers = 1;
+        entry.popularity = this.popularityOf(entry);
+        this.entries.set(entry.id, entry);
+        if (insertKeys) entry.keys.forEach(key => this.insertKey(key, entry));
+      }
+      this.invalidate(entry);
+    });
+    this.byProvider.set(providerId, ids);
+  }
+
+  /**
+   * Drop a provider's suggestions (shared ones only when no other provider has them)
+   */
+  withdraw(providerId) {
+    const ids = this.byProvider.get(providerId);
+    if (!ids) return;
+    ids.forEach(id => {
+      const entry = this.entries.get(id);
+      if (!entry) return;
+      entry.providers -= 1;
+      this.invalidate(entry);
+      if (entry.providers > 0) return;
+      this.entries.delete(id);
+      entry.keys.forEach(key => this.removeKey(key, entry));
+    });
+    this.byProvider.delete(providerId);
+  }
+
+  insertKey(key, entry) {
+    const at = lowerBound(this.keys, key);
+    this.keys.splice(at, 0, key);
+    this.refs.splice(at, 0, entry);
+  }
+
+  removeKey(key, entry) {
+    for (let i = lowerBound(this.keys, key); i < this.keys.length && this.keys[i] === key; i++) {
+      if (this.refs[i] === entry) {
+        this.keys.splice(i, 1);
+        this.refs.splice(i, 1);
+        return;
+      }
+    }
+  }
+
+  invalidate(entry) {
+    entry.keys.forEach(key => {
+      for (let length = MIN_WARM_PREFIX; length <= Math.min(key.length, MAX_WARM_PREFIX); length++) {
+        const prefix = key.substring(0, length);
+        this.warm.delete(prefix);
+        this.stale.add(prefix);
+      }
+    });
+    this.cache.clear();
+  }
+
+  /**
+   * Recompute short prefixes invalidated since the last call (off the keystroke path)
+   */
+  rewarm() {
+    this.stale.forEach(prefix => {
+      const result = this.scan(prefix);
+      if (KINDS.some(kind => result[kind].length > 0)) this.warm.set(prefix, result);
+    });
+    this.stale.clear();
+  }
+
+  /**
+   * Top MAX_LIMIT suggestions of each kind for a prefix, by walking its key range
+   */
+  scan(prefix) {
+    const best = {};
+    KINDS.forEach(kind => { best[kind] = []; });
+    // Entries matched through two of their words are ranked once
+    const pass = ++this.scans;
+    for (let i = lowerBound(this.keys, prefix); i < this.keys.length && this.keys[i].startsWith(prefix); i++) {
+      const entry = this.refs[i];
+      if (entry.scanned === pass) continue;
+      entry.scanned = pass;
+
+      const list = best[entry.kind];
+      const leading = entry.norm.startsWith(prefix) ? 1 : 0;
+      if (list.length === MAX_LIMIT && compareEntries(entry, leading, list[MAX_LIMIT - 1]) >= 0) continue;
+      let at = list.length;
+      while (at > 0 && compareEntries(entry, leading, list[at - 1]) < 0) at--;
+      list.splice(at, 0, { entry, leading });
+      if (list.length > MAX_LIMIT) list.pop();
+    }
+
+    const result = {};
+    KINDS.forEach(kind => { result[kind] = best[kind].map(candidate => candidate.entry); });
+    return result;
+  }
+
+  /**
+   * Best `limit` suggestions of each kind for a normalized prefix
+   */
+  lookup(prefix, limit) {
+    let result = this.warm.get(prefix) || this.cache.get(prefix);
+    if (!result) {
+      result = this.scan(prefix);
+      if (this.cache.size >= MAX_CACHED_PREFIXES) this.cache.clear();
+      this.cache.set(prefix, result);
+    }
+    const top = {};
+    KINDS.forEach(kind => { top[kind] = result[kind].slice(0, limit); });
+    return top;
+  }
+}
+
+let index = null;
+let started = false;
+let pending = Promise.resolve();
+let rebuildTimer = null;
+
+// Rebuilds and incremental refreshes run one at a time, in order
+function enqueue(task) {
+  pending = pending.then(task).catch(error => {
+    console.error('Autocomplete index refresh failed:', error);
+  });
+  return pending;
+}
+
+async function rebuild() {
+  const startedAt = Date.now();
+  const [providers, popularity] = await Promise.all([
+    Provider.find({ status: 'approved' }).select(SOURCE_FIELDS).lean(),
+    loadPopularity()
+  ]);
+  index = PrefixIndex.build(providers, popularity);
+  console.log(`🔤 Autocomplete index: ${index.entries.size} suggestions from ${providers.length} providers in ${Date.now() - startedAt}ms`);
+}
+
+function scheduleRebuild() {
+  if (rebuildTimer) return;
+  rebuildTimer = setTimeout(() => {
+    rebuildTimer = null;
+    enqueue(rebuild);
+  }, REBUILD_DEBOUNCE_MS);
+  rebuildTimer.unref();
+}
+
+async function refreshProviders(ids) {
+  if (!index) return;
+  const docs = await Provider.find({ _id: { $in: ids } }).select(SOURCE_FIELDS).lean();
+  const found = new Map(docs.map(doc => [String(doc._id), doc]));
+  ids.forEach(id => {
+    const providerId = String(id);
+    index.withdraw(providerId);
+    const doc = found.get(providerId);
+    if (doc && doc.status === 'approved') index.contribute(doc);
+  });
+  index.rewarm();
+}
+
+// Provider ids a query filter names directly, else null
+function idsFromFilter(filter) {
+  const id = filter?._id;
+  if (id === undefined || id === null) return null;
+  if (typeof id === 'string' || id instanceof mongoose.Types.ObjectId) return [id];
+  if (Array.isArray(id.$in)) return id.$in;
+  return null;
+}
+
+function onProviderChange(change) {
+  if (!index) return;
+  const ids = change.ids || idsFromFilter(change.filter);
+  if (ids) {
+    if (ids.length > 0) enqueue(() => refreshProviders(ids));
+  } else {
+    scheduleRebuild();
+  }
+}
+
+/**
+ * Build the index once Mongo is connected and keep it current
+ */
+function start() {
+  if (started) return;
+  started = true;
+
+  Provider.onChange(onProviderChange);
+  const build = () => enqueue(rebuild);
+  if (mongoose.connection.readyState === 1) build();
+  else mongoose.connection.once('open', build);
+
+  setInterval(build, REBUILD_MINUTES * 60 * 1000).unref();
+}
+
+function isReady() {
+  return index !== null;
+}
+
+/**
+ * Suggestions for what the user has typed so far
+ * @returns {{ provider: object[], service: object[], category: object[], city: object[] }|null}
+ *   null until the first build finishes
+ */
+function suggest(query, limit = 5) {
+  if (!index) return null;
+  const prefix = normalize(query);
+  const size = Math.min(Math.max(parseInt(limit, 10) || 5, 1), MAX_LIMIT);
+  if (!prefix) {
+    const empty = {};
+    KINDS.forEach(kind => { empty[kind] = []; });
+    return empty;
+  }
+  const result = index.lookup(prefix, size);
+
+  // "dentist" suggests the Dental category even though it isn't a prefix of it
+  const mapped = normalizeSearchTerm(query);
+  const synonym = mapped !== query && index.entries.get(`category:${normalize(mapped)}`);
+  if (synonym && !result.category.includes(synonym)) {
+    result.category.unshift(synonym);
+    if (result.category.length > size) result.category.pop();
+  }
+  return result;
+}
+
+module.exports = {
+  PrefixIndex,
+  normalize,
+  start,
+  isReady,
+  suggest
+};
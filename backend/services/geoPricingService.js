@@ -12,6 +12,7 @@
 // Regional pricing data structure
 // In production, this would come from Fair Health API or CMS data
 const REGIONAL_PRICING = require('../data/regionalPricing.json');
+const { regionForZip } = require('./zipGazetteer');
 
 /**
  * Get regional price context for a document's charges
@@ -92,44 +93,11 @@ function getRegionalPriceContext(extraction, zipCode) {
 
 /**
  * Get region from ZIP code
+ * Gazetteer record when the data file is built, otherwise the state from
+ * the ZIP prefix; covers every US ZIP either way.
  */
 function getRegionFromZip(zipCode) {
-  const prefix = zipCode.substring(0, 3);
-  
-  // Simplified ZIP to region mapping
-  // In production, use full ZIP code database
-  const regionMap = {
-    // Northeast
-    '010': 'NORTHEAST', '011': 'NORTHEAST', '012': 'NORTHEAST', // MA
-    '100': 'NORTHEAST', '101': 'NORTHEAST', '102': 'NORTHEAST', // NY
-    '190': 'NORTHEAST', '191': 'NORTHEAST', // PA
-    
-    // Southeast
-    '300': 'SOUTHEAST', '301': 'SOUTHEAST', '302': 'SOUTHEAST', // GA
-    '330': 'SOUTHEAST', '331': 'SOUTHEAST', '332': 'SOUTHEAST', // FL
-    '270': 'SOUTHEAST', '271': 'SOUTHEAST', // NC
-    
-    // Midwest
-    '430': 'MIDWEST', '431': 'MIDWEST', // OH
-    '480': 'MIDWEST', '481': 'MIDWEST', // MI
-    '606': 'MIDWEST', '607': 'MIDWEST', // IL (Chicago)
-    
-    // Southwest
-    '750': 'SOUTHWEST', '751': 'SOUTHWEST', '752': 'SOUTHWEST', // TX (Dallas)
-    '770': 'SOUTHWEST', '771': 'SOUTHWEST', // TX (Houston)
-    '850': 'SOUTHWEST', '851': 'SOUTHWEST', // AZ
-    
-    // West
-    '900': 'WEST', '901': 'WEST', '902': 'WEST', // CA (LA)
-    '941': 'WEST', '942': 'WEST', // CA (SF)
-    '980': 'WEST', '981': 'WEST', // WA (Seattle)
-    
-    // Mountain
-    '800': 'MOUNTAIN', '801': 'MOUNTAIN', '802': 'MOUNTAIN', // CO
-    '840': 'MOUNTAIN', '841': 'MOUNTAIN' // UT
-  };
-
-  return regionMap[prefix] || 'NATIONAL';
+  return regionForZip(zipCode);
 }
 
 /**
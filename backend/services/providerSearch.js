@@ -0,0 +1,345 @@
+/**
+ * Provider Search Service
+ * One ranked, index-backed query for every provider list
+ *
+ * Matching: a provider matches when a query word is a prefix of a word
+ * in its name, types, services or city (`searchTerms` edge-ngrams), or
+ * when the text index matches a whole (stemmed) word anywhere, including
+ * the description. Both branches are index scans, so cost follows the
+ * number of matches rather than the size of the catalogue.
+ *
+ * Ranking: per query word, the best field weight it hit (name 10,
+ * type 8, service 6, category 4, city 3), plus the text score, plus a
+ * boost when the provider has the synonym-mapped type ("dentist" ->
+ * Dental).
+ *
+ * Paging: opaque cursors encode the last row's sort keys and _id, so
+ * page N costs the same as page 1 and rows never repeat or go missing
+ * when providers are added between requests.
+ */
+
+const mongoose = require('mongoose');
+const Provider = require('../models/Provider');
+const { SEARCH_FIELDS, parseSearchQuery } = require('../utils/searchTerms');
+const { projectionStages } = require('../utils/providerProjections');
+
+const TEXT_SCORE_WEIGHT = 2;
+const TYPE_MATCH_BOOST = 12;
+const METERS_PER_MILE = 1609.34;
+const MAX_LIMIT = 100;
+// Totals above this are reported as an estimate instead of counted
+const COUNT_LIMIT = parseInt(process.env.SEARCH_COUNT_LIMIT, 10) || 10000;
+const GEO_CAPABILITY_TTL_MS = 5 * 60 * 1000;
+// Filters come from public query params, so only this many are remembered
+const GEO_CAPABILITY_MAX_ENTRIES = 200;
+
+class InvalidCursorError extends Error {
+  constructor(message = 'Invalid or expired cursor') {
+    super(message);
+    this.name = 'InvalidCursorError';
+  }
+}
+
+// MongoDB "text index required" - deployments that never created it
+const TEXT_INDEX_MISSING = 27;
+let textIndexAvailable = true;
+
+/**
+ * Sort key on a stored field; missing values sort as `fallback`
+ */
+function sortKey(field, direction = 1, fallback = null) {
+  return {
+    key: fallback === null ? `$${field}` : { $ifNull: [`$${field}`, fallback] },
+    direction
+  };
+}
+
+const RELEVANCE = [{ key: '$searchScore', direction: -1 }];
+const DISTANCE = [{ key: '$distanceMeters', direction: 1 }];
+const NAME = [{ key: { $toLower: { $ifNull: ['$practiceName', ''] } }, direction: 1 }];
+
+// ---- cursors ----------------------------------------------------------------
+
+function encodeValue(value) {
+  if (value instanceof Date) return { d: value.toISOString() };
+  if (value instanceof mongoose.Types.ObjectId) return { o: String(value) };
+  return value === undefined ? null : value;
+}
+
+function decodeValue(value) {
+  if (value && typeof value === 'object') {
+    if (value.d) return new Date(value.d);
+    if (value.o) return new mongoose.Types.ObjectId(value.o);
+  }
+  return value;
+}
+
+function encodeCursor(values, id, total) {
+  const payload = { v: values.map(encodeValue), id: String(id) };
+  if (total !== undefined) payload.t = total;
+  return Buffer.from(JSON.stringify(payload)).toString('base64url');
+}
+
+function decodeCursor(cursor, keyCount) {
+  let parsed;
+  try {
+    parsed = JSON.parse(Buffer.from(String(cursor), 'base64url').toString('utf8'));
+  } catch (error) {
+    throw new InvalidCursorError();
+  }
+  if (!parsed || !Array.isArray(parsed.v) || parsed.v.length !== keyCount ||
+      !mongoose.Types.ObjectId.isValid(parsed.id)) {
+    throw new InvalidCursorError();
+  }
+  return {
+    values: parsed.v.map(decodeValue),
+    id: new mongoose.Types.ObjectId(parsed.id),
+    total: Number.isInteger(parsed.t) ? parsed.t : undefined
+  };
+}
+
+/**
+ * Rows strictly after the cursor row in (k0, k1, ..., _id) order
+ */
+function afterCursor(keyNames, sort, cursor) {
+  const clauses = [];
+  for (let i = 0; i <= keyNames.length; i++) {
+    const clause = {};
+    for (let j = 0; j < i; j++) clause[keyNames[j]] = cursor.values[j];
+    if (i < keyNames.length) {
+      clause[keyNames[i]] = { [sort[i].direction < 0 ? '$lt' : '$gt']: cursor.values[i] };
+    } else {
+      clause._id = { $gt: cursor.id };
+    }
+    clauses.push(clause);
+  }
+  return { $or: clauses };
+}
+
+// ---- pipeline -----------------------------------------------------------------
+
+function matchStage(filter, parsed, { useText }) {
+  if (!parsed) return filter;
+
+  const prefixes = [];
+  parsed.words.forEach(word => {
+    Object.keys(SEARCH_FIELDS).forEach(tag => prefixes.push(`${tag}:${word}`));
+  });
+  if (parsed.providerType) {
+    prefixes.push(...parsed.providerType.toLowerCase().split(/\s+/).map(word => `t:${word}`));
+  }
+
+  const branches = [{ searchTerms: { $in: prefixes } }];
+  if (useText) branches.push({ $text: { $search: parsed.text } });
+
+  const clauses = Object.keys(filter).length > 0 ? [filter] : [];
+  clauses.push(branches.length === 1 ? branches[0] : { $or: branches });
+  return clauses.length === 1 ? clauses[0] : { $and: clauses };
+}
+
+function scoreExpression(parsed, { useText }) {
+  const terms = { $ifNull: ['$searchTerms', []] };
+  const parts = parsed.words.map(word => ({
+    $max: Object.entries(SEARCH_FIELDS).map(([tag, { weight }]) => ({
+      $cond: [{ $in: [`${tag}:${word}`, terms] }, weight, 0]
+    }))
+  }));
+  if (parsed.providerType) {
+    parts.push({ $cond: [{ $in: [parsed.providerType, { $ifNull: ['$providerTypes', []] }] }, TYPE_MATCH_BOOST, 0] });
+  }
+  if (useText) {
+    parts.push({ $multiply: [{ $ifNull: [{ $meta: 'textScore' }, 0] }, TEXT_SCORE_WEIGHT] });
+  }
+  return { $add: parts };
+}
+
+/**
+ * Aggregation pipeline for one page
+ *
+ * @param {Object} options - see searchProviders()
+ * @returns {{ pipeline: Object[], keyNames: string[], position: Object|null }}
+ *   pipeline[0] is the index-backed $match / $geoNear; the rest works on its output
+ */
+function buildPipeline({ search, filter = {}, sort, near, limit, cursor, skip, project, useText = true }) {
+  const parsed = parseSearchQuery(search);
+  // $text cannot sit inside $geoNear's query
+  const withText = useText && !near && textIndexAvailable;
+  const match = matchStage(filter, parsed, { useText: withText });
+
+  const pipeline = [];
+  if (near) {
+    const geoNear = {
+      near: { type: 'Point', coordinates: [near.lng, near.lat] },
+      distanceField: 'distanceMeters',
+      spherical: true,
+      query: match
+    };
+    if (near.maxDistanceMeters) geoNear.maxDistance = near.maxDistanceMeters;
+    pipeline.push({ $geoNear: geoNear });
+    pipeline.push({
+      $addFields: { distance: { $round: [{ $divide: ['$distanceMeters', METERS_PER_MILE] }, 1] } }
+    });
+  } else {
+    pipeline.push({ $match: match });
+  }
+
+  if (parsed) {
+    pipeline.push({ $addFields: { searchScore: scoreExpression(parsed, { useText: withText }) } });
+  }
+
+  const order = sort || (parsed ? RELEVANCE : near ? DISTANCE : NAME);
+  const keyNames = order.map((_, i) => `_sortKey${i}`);
+  const keys = {};
+  order.forEach((entry, i) => { keys[keyNames[i]] = entry.key; });
+  pipeline.push({ $addFields: keys });
+
+  let position = null;
+  if (cursor) {
+    position = decodeCursor(cursor, keyNames.length);
+    pipeline.push({ $match: afterCursor(keyNames, order, position) });
+  }
+
+  const sortSpec = {};
+  order.forEach((entry, i) => { sortSpec[keyNames[i]] = entry.direction; });
+  sortSpec._id = 1;
+  pipeline.push({ $sort: sortSpec });
+
+  if (!cursor && skip) pipeline.push({ $skip: skip });
+  // One extra row tells us whether there is a next page
+  pipeline.push({ $limit: limit + 1 });
+
+  if (project) {
+    const keep = [...keyNames];
+    if (near) keep.push('distance');
+    if (parsed) keep.push('searchScore');
+    pipeline.push(...projectionStages(project, keep));
+  } else {
+    pipeline.push({ $unset: ['searchTerms', 'distanceMeters'] });
+  }
+
+  return { pipeline, keyNames, position };
+}
+
+/**
+ * Search approved (or otherwise filtered) providers
+ *
+ * @param {Object} options
+ * @param {string} [options.search] - Free-text query ("dentist", "teeth clea")
+ * @param {Object} [options.filter] - Extra match conditions (status, type, flags)
+ * @param {Object[]} [options.sort] - sortKey() entries; default relevance when
+ *   searching, else distance when `near`, else name
+ * @param {{lat:number,lng:number,maxDistanceMeters:number}} [options.near] - Geo search
+ * @param {number} [options.limit=20] - Page size (max 100)
+ * @param {string} [options.cursor] - nextCursor from the previous page
+ * @param {number} [options.skip] - Offset paging for old clients (ignored with a cursor)
+ * @param {string} [options.project] - Projection profile (card, detail, admin-table;
+ *   see utils/providerProjections.js); default: whole document
+ * @param {boolean} [options.count] - Also return the number of matches. Counted
+ *   (up to COUNT_LIMIT) in the same query as the first page; cursor pages reuse
+ *   that figure from the cursor and flag it as an estimate
+ * @returns {Promise<{ providers: Object[], nextCursor: string|null, limit: number,
+ *   total?: number, totalEstimated?: boolean }>}
+ *   limit: the page size actually used (requested limit capped at MAX_LIMIT)
+ */
+async function searchProviders(options = {}) {
+  const limit = Math.min(Math.max(parseInt(options.limit, 10) || 20, 1), MAX_LIMIT);
+  const skip = Math.max(parseInt(options.skip, 10) || 0, 0);
+
+  const run = async () => {
+    const built = buildPipeline({ ...options, limit, skip });
+    const countHere = options.count && !(built.position && built.position.total !== undefined);
+    if (!countHere) {
+      return { built, rows: await Provider.aggregate(built.pipeline) };
+    }
+
+    // Page and total in one pass over the matches
+    const [head, ...body] = built.pipeline;
+    const [faceted] = await Provider.aggregate([
+      head,
+      {
+        $facet: {
+          rows: body,
+          total: [{ $limit: COUNT_LIMIT }, { $count: 'n' }]
+        }
+      }
+    ]);
+    const counted = faceted.total[0] ? faceted.total[0].n : 0;
+    return { built, rows: faceted.rows, total: counted, totalEstimated: counted >= COUNT_LIMIT };
+  };
+
+  let outcome;
+  try {
+    outcome = await run();
+  } catch (error) {
+    if (error.code !== TEXT_INDEX_MISSING || !textIndexAvailable) throw error;
+    console.warn('Provider search: no text index, using prefix matching only (POST /api/admin/create-search-index)');
+    textIndexAvailable = false;
+    outcome = await run();
+  }
+
+  const { built, rows } = outcome;
+  let { total, totalEstimated } = outcome;
+  if (options.count && total === undefined) {
+    total = built.position.total;
+    totalEstimated = true;
+  }
+
+  const { keyNames } = built;
+  const hasMore = rows.length > limit;
+  const page = hasMore ? rows.slice(0, limit) : rows;
+  const last = page[page.length - 1];
+  const nextCursor = hasMore ? encodeCursor(keyNames.map(name => last[name]), last._id, total) : null;
+
+  page.forEach(row => keyNames.forEach(name => { delete row[name]; }));
+
+  const result = { providers: page, nextCursor, limit };
+  if (options.count) {
+    result.total = total;
+    result.totalEstimated = Boolean(totalEstimated);
+  }
+  return result;
+}
+
+// ---- geo capability -----------------------------------------------------------
+
+const geoCapability = new Map();
+
+/**
+ * Whether any provider matching `filter` has coordinates, so callers can
+ * skip $geoNear (which fails without a 2dsphere-indexed match) when none do.
+ * Cached until the next provider write in this process, and at most
+ * GEO_CAPABILITY_TTL_MS to pick up writes from other instances; the
+ * least recently used filter is dropped past GEO_CAPABILITY_MAX_ENTRIES.
+ */
+async function hasGeoProviders(filter = {}) {
+  const key = JSON.stringify(filter);
+  const cached = geoCapability.get(key);
+  const version = Provider.writeVersion();
+  if (cached && cached.version === version && cached.expiresAt > Date.now()) {
+    // Re-insert so Map order stays least recently used first
+    geoCapability.delete(key);
+    geoCapability.set(key, cached);
+    return cached.value;
+  }
+
+  const value = Boolean(await Provider.exists({ ...filter, 'location.coordinates.0': { $exists: true } }));
+  geoCapability.delete(key);
+  geoCapability.set(key, { value, version, expiresAt: Date.now() + GEO_CAPABILITY_TTL_MS });
+  if (geoCapability.size > GEO_CAPABILITY_MAX_ENTRIES) {
+    geoCapability.delete(geoCapability.keys().next().value);
+  }
+  return value;
+}
+
+module.exports = {
+  InvalidCursorError,
+  MAX_LIMIT,
+  METERS_PER_MILE,
+  DISTANCE,
+  NAME,
+  RELEVANCE,
+  sortKey,
+  buildPipeline,
+  hasGeoProviders,
+  searchProviders
+};
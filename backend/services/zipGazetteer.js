@@ -0,0 +1,208 @@
+/**
+ * ZIP Gazetteer Service
+ * Offline ZIP -> centroid, county, CBSA, city, state and pricing region
+ *
+ * Reads the fixed-record file built by agent/gazetteer.py (or its JSON
+ * export) once, then answers lookups by binary search over the buffer.
+ * Without a data file, state and region still come from the USPS
+ * 3-digit prefix table, which covers every US ZIP.
+ *
+ * File layout (little-endian, see agent/gazetteer.py):
+ *   header   magic 'ZGZ1', record count, records offset, strings offset
+ *   records  zip u32, lat f32, lng f32, land_km2 f32, county_fips u32,
+ *            cbsa u32, city u32, county_name u32, state 2 bytes, region u8, pad
+ *   strings  NUL-terminated UTF-8; offset 0 is the empty string
+ */
+
+const fs = require('fs');
+const path = require('path');
+
+const GAZETTEER_PATH = process.env.ZIP_GAZETTEER_PATH ||
+  path.join(__dirname, '..', 'data', 'zipGazetteer.bin');
+
+const MAGIC = 'ZGZ1';
+const HEADER_SIZE = 16;
+const RECORD_SIZE = 36;
+
+// Index = stored region value (same order as REGIONS in agent/gazetteer.py)
+const REGIONS = ['NATIONAL', 'NORTHEAST', 'SOUTHEAST', 'MIDWEST', 'SOUTHWEST', 'WEST', 'MOUNTAIN'];
+
+const REGION_BY_STATE = {};
+[
+  ['NORTHEAST', ['CT', 'ME', 'MA', 'NH', 'RI', 'VT', 'NJ', 'NY', 'PA']],
+  ['SOUTHEAST', ['DE', 'MD', 'DC', 'VA', 'WV', 'NC', 'SC', 'GA', 'FL', 'AL', 'MS', 'TN', 'KY',
+    'AR', 'LA', 'PR', 'VI']],
+  ['MIDWEST', ['OH', 'MI', 'IN', 'IL', 'WI', 'MN', 'IA', 'MO', 'ND', 'SD', 'NE', 'KS']],
+  ['SOUTHWEST', ['TX', 'OK', 'NM', 'AZ']],
+  ['MOUNTAIN', ['CO', 'UT', 'WY', 'MT', 'ID', 'NV']],
+  ['WEST', ['CA', 'OR', 'WA', 'AK', 'HI', 'GU', 'AS', 'MP']]
+].forEach(([region, states]) => states.forEach(state => { REGION_BY_STATE[state] = region; }));
+
+// USPS 3-digit ZIP prefix ranges -> state (keep in sync with ZIP3_RANGES in agent/gazetteer.py)
+const ZIP3_RANGES = [
+  [5, 5, 'NY'], [6, 7, 'PR'], [8, 8, 'VI'], [9, 9, 'PR'], [10, 27, 'MA'], [28, 29, 'RI'],
+  [30, 38, 'NH'], [39, 49, 'ME'], [50, 54, 'VT'], [55, 55, 'MA'], [56, 59, 'VT'], [60, 69, 'CT'],
+  [70, 89, 'NJ'], [100, 149, 'NY'], [150, 196, 'PA'], [197, 199, 'DE'], [200, 200, 'DC'],
+  [201, 201, 'VA'], [202, 205, 'DC'], [206, 219, 'MD'], [220, 246, 'VA'], [247, 268, 'WV'],
+  [270, 289, 'NC'], [290, 299, 'SC'], [300, 319, 'GA'], [320, 339, 'FL'], [341, 349, 'FL'],
+  [350, 369, 'AL'], [370, 385, 'TN'], [386, 397, 'MS'], [398, 399, 'GA'], [400, 427, 'KY'],
+  [430, 459, 'OH'], [460, 479, 'IN'], [480, 499, 'MI'], [500, 528, 'IA'], [530, 549, 'WI'],
+  [550, 567, 'MN'], [569, 569, 'DC'], [570, 577, 'SD'], [580, 588, 'ND'], [590, 599, 'MT'],
+  [600, 629, 'IL'], [630, 658, 'MO'], [660, 679, 'KS'], [680, 693, 'NE'], [700, 714, 'LA'],
+  [716, 729, 'AR'], [730, 732, 'OK'], [733, 733, 'TX'], [734, 749, 'OK'], [750, 799, 'TX'],
+  [800, 816, 'CO'], [820, 831, 'WY'], [832, 838, 'ID'], [840, 847, 'UT'], [850, 865, 'AZ'],
+  [870, 884, 'NM'], [885, 885, 'TX'], [889, 898, 'NV'], [900, 961, 'CA'], [967, 968, 'HI'],
+  [969, 969, 'GU'], [970, 979, 'OR'], [980, 994, 'WA'], [995, 999, 'AK']
+];
+
+// Dense prefix -> state table, built once
+const STATE_BY_ZIP3 = new Array(1000).fill(null);
+ZIP3_RANGES.forEach(([low, high, state]) => {
+  for (let prefix = low; prefix <= high; prefix++) STATE_BY_ZIP3[prefix] = state;
+});
+
+let table = null;
+let loaded = false;
+
+function parseZip(zipCode) {
+  const digits = String(zipCode || '').trim().substring(0, 5);
+  return /^\d{5}$/.test(digits) ? parseInt(digits, 10) : null;
+}
+
+function readString(buffer, offset) {
+  if (!offset) return null;
+  const end = buffer.indexOf(0, offset);
+  return buffer.toString('utf8', offset, end) || null;
+}
+
+function loadBinary(buffer) {
+  if (buffer.toString('ascii', 0, 4) !== MAGIC) {
+    throw new Error('not a ZIP gazetteer file');
+  }
+  const count = buffer.readUInt32LE(4);
+  const recordsOffset = buffer.readUInt32LE(8);
+  const strings = buffer.subarray(buffer.readUInt32LE(12));
+
+  const recordAt = (index) => {
+    const at = recordsOffset + index * RECORD_SIZE;
+    const lat = buffer.readFloatLE(at + 4);
+    const hasCentroid = !Number.isNaN(lat);
+    const countyFips = buffer.readUInt32LE(at + 16);
+    const cbsa = buffer.readUInt32LE(at + 20);
+    return {
+      zip: String(buffer.readUInt32LE(at)).padStart(5, '0'),
+      lat: hasCentroid ? Math.round(lat * 1e6) / 1e6 : null,
+      lng: hasCentroid ? Math.round(buffer.readFloatLE(at + 8) * 1e6) / 1e6 : null,
+      countyFips: countyFips ? String(countyFips).padStart(5, '0') : null,
+      county: readString(strings, buffer.readUInt32LE(at + 28)),
+      cbsa: cbsa ? String(cbsa) : null,
+      city: readString(strings, buffer.readUInt32LE(at + 24)),
+      state: buffer.toString('ascii', at + 32, at + 34).trim() || null,
+      region: REGIONS[buffer.readUInt8(at + 34)] || 'NATIONAL'
+    };
+  };
+
+  return {
+    size: count,
+    get(target) {
+      let low = 0;
+      let high = count - 1;
+      while (low <= high) {
+        const mid = (low + high) >> 1;
+        const value = buffer.readUInt32LE(recordsOffset + mid * RECORD_SIZE);
+        if (value < target) low = mid + 1;
+        else if (value > target) high = mid - 1;
+        else return recordAt(mid);
+      }
+      return null;
+    }
+  };
+}
+
+function loadJson(data) {
+  const fields = data.fields;
+  const zips = data.zips || {};
+  return {
+    size: Object.keys(zips).length,
+    get(target) {
+      const zip = String(target).padStart(5, '0');
+      const row = zips[zip];
+      if (!row) return null;
+      const record = { zip };
+      fields.forEach((field, i) => {
+        record[field === 'county_fips' ? 'countyFips' : field] = row[i];
+      });
+      return record;
+    }
+  };
+}
+
+/**
+ * Load the data file on first use; null when there is none
+ */
+function getTable() {
+  if (loaded) return table;
+  loaded = true;
+  try {
+    if (fs.existsSync(GAZETTEER_PATH)) {
+      table = GAZETTEER_PATH.endsWith('.json')
+        ? loadJson(JSON.parse(fs.readFileSync(GAZETTEER_PATH, 'utf8')))
+        : loadBinary(fs.readFileSync(GAZETTEER_PATH));
+      console.log(`🗺️  ZIP gazetteer loaded: ${table.size} ZIPs`);
+    }
+  } catch (error) {
+    console.error(`ZIP gazetteer unavailable (${GAZETTEER_PATH}):`, error.message);
+    table = null;
+  }
+  return table;
+}
+
+/**
+ * State from the ZIP's 3-digit prefix (no data file needed)
+ */
+function stateForZip(zipCode) {
+  const digits = String(zipCode || '').trim().substring(0, 3);
+  if (!/^\d{3}$/.test(digits)) return null;
+  return STATE_BY_ZIP3[parseInt(digits, 10)];
+}
+
+function regionForState(state) {
+  return REGION_BY_STATE[String(state || '').toUpperCase()] || 'NATIONAL';
+}
+
+/**
+ * Full gazetteer record for a ZIP (ZIP+4 is fine), or null
+ */
+function lookupZip(zipCode) {
+  const target = parseZip(zipCode);
+  const data = getTable();
+  if (target === null || !data) return null;
+  return data.get(target);
+}
+
+/**
+ * ZIP centroid as { lat, lng }, or null (rooftop precision still needs a geocoder)
+ */
+function geocodeZip(zipCode) {
+  const record = lookupZip(zipCode);
+  if (!record || record.lat === null || record.lat === undefined) return null;
+  return { lat: record.lat, lng: record.lng, precision: 'zip_centroid' };
+}
+
+/**
+ * Pricing region for any US ZIP
+ */
+function regionForZip(zipCode) {
+  const record = lookupZip(zipCode);
+  if (record && record.state) return record.region;
+  return regionForState(stateForZip(zipCode));
+}
+
+module.exports = {
+  REGIONS,
+  lookupZip,
+  geocodeZip,
+  regionForZip,
+  regionForState,
+  stateForZip
+};
@@ -0,0 +1,158 @@
+/**
+ * Provider Projection Profiles
+ * What each kind of provider listing actually needs
+ *
+ *   card         search results, home screen and map lists
+ *   detail       a single provider page (everything except secrets)
+ *   admin-table  the admin dashboard's provider table
+ *
+ * List profiles never ship `photos`: onboarding stored some as multi-
+ * hundred-KB base64 data: URLs. They get `thumbnailUrl` instead, computed
+ * in the database from the primary photo: a resized Cloudinary URL, or
+ * GET /api/providers/:id/thumbnail for inline images.
+ */
+
+// Never leaves the server, whatever the profile
+const SECRET_FIELDS = [
+  'teamMembers.calendar.accessToken',
+  'teamMembers.calendar.refreshToken',
+  'payment.bankDetails',
+  'payment.taxInfo',
+  'agreement.ipAddress',
+  'searchTerms'
+];
+
+const THUMBNAIL_TRANSFORM = 'c_fill,w_400,h_300,q_auto,f_auto';
+
+const PROFILES = {
+  card: {
+    include: [
+      'practiceName',
+      'providerTypes',
+      'description',
+      'address',
+      'location',
+      'rating',
+      'reviewCount',
+      'googleRating',
+      'googleReviewCount',
+      'isVerified',
+      'isFeatured',
+      'verified',
+      'featured',
+      'services.name',
+      'services.category',
+      'services.price',
+      'services.duration',
+      'contactInfo.phone',
+      'phone'
+    ],
+    thumbnail: true
+  },
+  'admin-table': {
+    include: [
+      'practiceName',
+      'providerTypes',
+      'contactInfo.email',
+      'contactInfo.phone',
+      'email',
+      'phone',
+      'address.city',
+      'address.state',
+      'address.zip',
+      'status',
+      'verified',
+      'featured',
+      'isVerified',
+      'isFeatured',
+      'source',
+      'googlePlaceId',
+      'googleRating',
+      'createdAt',
+      'updatedAt'
+    ],
+    thumbnail: true
+  },
+  detail: {
+    exclude: [...SECRET_FIELDS, 'refresh']
+  }
+};
+
+function isProfile(name) {
+  return Object.prototype.hasOwnProperty.call(PROFILES, name);
+}
+
+/**
+ * Aggregation expression for the primary (else first) photo's thumbnail URL
+ */
+function thumbnailUrlExpression() {
+  const photos = { $ifNull: ['$photos', []] };
+  const primary = { $filter: { input: photos, cond: { $eq: ['$$this.isPrimary', true] } } };
+  return {
+    $let: {
+      vars: {
+        url: {
+          $let: {
+            vars: { photo: { $ifNull: [{ $arrayElemAt: [primary, 0] }, { $arrayElemAt: [photos, 0] }] } },
+            in: { $ifNull: ['$$photo.url', null] }
+          }
+        }
+      },
+      in: {
+        $switch: {
+          branches: [
+            { case: { $eq: ['$$url', null] }, then: null },
+            {
+              case: { $eq: [{ $substrCP: ['$$url', 0, 5] }, 'data:'] },
+              then: { $concat: ['/api/providers/', { $toString: '$_id' }, '/thumbnail'] }
+            },
+            {
+              case: { $regexMatch: { input: '$$url', regex: /^https:\/\/res\.cloudinary\.com\/.+\/image\/upload\// } },
+              then: {
+                $replaceOne: { input: '$$url', find: '/image/upload/', replacement: `/image/upload/${THUMBNAIL_TRANSFORM}/` }
+              }
+            }
+          ],
+          default: '$$url'
+        }
+      }
+    }
+  };
+}
+
+/**
+ * Aggregation stages that shape rows to a profile
+ * @param {string} name - Profile name
+ * @param {string[]} keep - Extra computed fields to keep (distance, sort keys)
+ */
+function projectionStages(name, keep = []) {
+  const profile = PROFILES[name];
+  if (profile.exclude) {
+    return [{ $unset: profile.exclude }];
+  }
+  const fields = {};
+  profile.include.forEach(path => { fields[path] = 1; });
+  keep.forEach(path => { fields[path] = 1; });
+  if (profile.thumbnail) fields.thumbnailUrl = thumbnailUrlExpression();
+  return [{ $project: fields }];
+}
+
+/**
+ * Query.select() argument for a profile (no computed thumbnail)
+ */
+function selectFor(name) {
+  const profile = PROFILES[name];
+  const paths = profile.exclude
+    ? profile.exclude.map(path => `-${path}`)
+    : profile.include;
+  return paths.join(' ');
+}
+
+module.exports = {
+  PROFILES,
+  SECRET_FIELDS,
+  isProfile,
+  thumbnailUrlExpression,
+  projectionStages,
+  selectFor
+};
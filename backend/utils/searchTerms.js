@@ -0,0 +1,185 @@
+/**
+ * Search Terms
+ * Query normalization and edge-ngram tokens for provider search
+ *
+ * Every provider stores `searchTerms`: each 2-15 character prefix of each
+ * word in the fields people search by, tagged with the field it came from
+ * ('n:smi' = a practice-name word starting with "smi"). One multikey index
+ * over them answers prefix and whole-word lookups alike, and the tag lets
+ * ranking weigh a practice-name hit above a city hit.
+ *
+ * Kept free of model imports so both the Provider schema hooks and the
+ * search service can use it.
+ */
+
+const MIN_PREFIX = 2;
+const MAX_PREFIX = 15;
+const MAX_QUERY_WORDS = 8;
+
+// Tag -> source field and ranking weight
+const SEARCH_FIELDS = {
+  n: { path: 'practiceName', weight: 10 },
+  t: { path: 'providerTypes', weight: 8 },
+  s: { path: 'services.name', weight: 6 },
+  c: { path: 'services.category', weight: 4 },
+  l: { path: 'address.city', weight: 3 }
+};
+
+// Fields whose change means searchTerms must be rebuilt
+const SEARCH_SOURCE_FIELDS = ['practiceName', 'providerTypes', 'services', 'address'];
+
+// Filler words that would match half the catalogue as prefixes
+const STOP_WORDS = new Set(['a', 'an', 'and', 'at', 'for', 'in', 'me', 'my', 'near', 'of', 'on', 'or', 'the', 'to', 'with']);
+
+// Search term normalization - map user queries to provider types
+const searchTermMap = {
+  // Dental variations
+  'dentist': 'Dental',
+  'dentistry': 'Dental',
+  'orthodontist': 'Dental',
+  'dental': 'Dental',
+
+  // Medical variations
+  'doctor': 'Medical',
+  'physician': 'Medical',
+  'clinic': 'Medical',
+  'medical': 'Medical',
+
+  // Mental Health variations
+  'therapist': 'Mental Health',
+  'counselor': 'Mental Health',
+  'psychologist': 'Mental Health',
+  'psychiatrist': 'Mental Health',
+  'therapy': 'Mental Health',
+
+  // Massage variations
+  'massage therapist': 'Massage',
+  'masseuse': 'Massage',
+
+  // Fitness variations
+  'trainer': 'Fitness',
+  'personal trainer': 'Fitness',
+  'gym': 'Fitness',
+
+  // Urgent Care variations
+  'urgent': 'Urgent Care',
+  'walk-in': 'Urgent Care',
+  'emergency': 'Urgent Care',
+
+  // Skincare variations
+  'dermatologist': 'Skincare',
+  'aesthetician': 'Skincare',
+  'skin care': 'Skincare',
+
+  // Yoga variations
+  'yoga instructor': 'Yoga',
+
+  // Nutrition variations
+  'dietitian': 'Nutrition',
+  'nutritionist': 'Nutrition',
+
+  // Pharmacy variations
+  'pharmacist': 'Pharmacy',
+  'drug store': 'Pharmacy',
+  'drugstore': 'Pharmacy'
+};
+
+const PROVIDER_TYPES = new Set(Object.values(searchTermMap));
+
+function normalizeSearchTerm(query) {
+  if (!query) return query;
+
+  const lowerQuery = query.toLowerCase().trim();
+
+  // Check if query matches any mapped term
+  for (const [term, providerType] of Object.entries(searchTermMap)) {
+    if (lowerQuery === term || lowerQuery.includes(term)) {
+      return providerType;
+    }
+  }
+
+  return query;
+}
+
+/**
+ * Lowercase ASCII words ("Café Olé" -> ['cafe', 'ole'])
+ */
+function tokenize(text) {
+  if (!text) return [];
+  return String(text)
+    .normalize('NFKD')
+    .replace(/[\u0300-\u036f]/g, '')
+    .toLowerCase()
+    .split(/[^a-z0-9]+/)
+    .filter(word => word.length >= MIN_PREFIX);
+}
+
+function edgeNgrams(word) {
+  const grams = [];
+  for (let length = MIN_PREFIX; length <= Math.min(word.length, MAX_PREFIX); length++) {
+    grams.push(word.substring(0, length));
+  }
+  return grams;
+}
+
+function valuesAt(doc, path) {
+  return path.split('.').reduce((values, key) => {
+    const next = [];
+    values.forEach(value => {
+      if (value === null || value === undefined) return;
+      const child = value[key];
+      if (Array.isArray(child)) next.push(...child);
+      else if (child !== null && child !== undefined) next.push(child);
+    });
+    return next;
+  }, [doc]);
+}
+
+/**
+ * Tagged edge-ngrams for a provider document (plain object or Mongoose doc)
+ */
+function searchTermsFor(provider) {
+  const terms = new Set();
+  Object.entries(SEARCH_FIELDS).forEach(([tag, { path }]) => {
+    valuesAt(provider, path).forEach(value => {
+      tokenize(value).forEach(word => {
+        edgeNgrams(word).forEach(gram => terms.add(`${tag}:${gram}`));
+      });
+    });
+  });
+  return [...terms];
+}
+
+/**
+ * Split a user query into what the search pipeline needs
+ * @returns {{ words: string[], providerType: string|null, text: string }|null}
+ *   words: prefix words to look up (stop words dropped, capped)
+ *   providerType: synonym-mapped type ("dentist" -> "Dental"), if any
+ *   text: $text search string (query words plus the mapped type)
+ */
+function parseSearchQuery(query) {
+  const raw = String(query || '').trim();
+  if (!raw) return null;
+
+  const mapped = normalizeSearchTerm(raw);
+  const providerType = PROVIDER_TYPES.has(mapped) ? mapped : null;
+
+  let words = [...new Set(tokenize(raw).filter(word => !STOP_WORDS.has(word)))];
+  if (words.length === 0) words = [...new Set(tokenize(raw))];
+  words = words.slice(0, MAX_QUERY_WORDS).map(word => word.substring(0, MAX_PREFIX));
+
+  if (words.length === 0 && !providerType) return null;
+
+  const text = [...new Set([...words, ...(providerType ? tokenize(providerType) : [])])].join(' ');
+  return { words, providerType, text };
+}
+
+module.exports = {
+  SEARCH_FIELDS,
+  SEARCH_SOURCE_FIELDS,
+  searchTermMap,
+  normalizeSearchTerm,
+  tokenize,
+  searchTermsFor,
+  parseSearchQuery
+};
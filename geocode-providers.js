@@ -1,11 +1,21 @@
 /**
  * Geocode Providers Script
- * Adds lat/lng coordinates to providers using OpenStreetMap Nominatim API
+ * Adds lat/lng coordinates to providers from the offline ZIP gazetteer
+ * (ZIP centroid), falling back to OpenStreetMap Nominatim when the ZIP is
+ * unknown or rooftop precision is requested
+ *
+ * Centroid fixes are stored with locationPrecision 'zip'; a later
+ * --rooftop run geocodes those street addresses and replaces them.
  * 
- * Usage: node geocode-providers.js
+ * Usage: node geocode-providers.js [--rooftop]
  */
 
+const { geocodeZip } = require('./backend/services/zipGazetteer');
+
+const ROOFTOP = process.argv.includes('--rooftop');
+
 const API_BASE = 'https://fearless-achievement-production.up.railway.app/api';
+const PAGE_SIZE = 500;
 
 // Get admin token first
 async function getAdminToken() {
@@ -44,24 +54,30 @@ async function geocodeAddress(address) {
   return null;
 }
 
-// Get all providers
+// Get all providers (just the fields geocoding needs), page by page
 async function getProviders(token) {
-  const response = await fetch(`${API_BASE}/admin/providers?limit=100`, {
-    headers: { 'Authorization': `Bearer ${token}` }
-  });
-  const data = await response.json();
-  return data.providers || data;
+  const providers = [];
+  for (let skip = 0; ; skip += PAGE_SIZE) {
+    const fields = 'practiceName,address,location,locationPrecision';
+    const response = await fetch(`${API_BASE}/admin/providers?limit=${PAGE_SIZE}&skip=${skip}&fields=${fields}`, {
+      headers: { 'Authorization': `Bearer ${token}` }
+    });
+    const data = await response.json();
+    const page = data.providers || data;
+    providers.push(...page);
+    if (page.length < PAGE_SIZE) return providers;
+  }
 }
 
 // Update provider coordinates
-async function updateProviderCoordinates(token, providerId, lat, lng) {
+async function updateProviderCoordinates(token, providerId, lat, lng, precision) {
   const response = await fetch(`${API_BASE}/admin/providers/${providerId}/coordinates`, {
     method: 'PATCH',
     headers: {
       'Authorization': `Bearer ${token}`,
       'Content-Type': 'application/json'
     },
-    body: JSON.stringify({ latitude: lat, longitude: lng })
+    body: JSON.stringify({ latitude: lat, longitude: lng, precision })
   });
   return response.json();
 }
@@ -97,8 +113,10 @@ async function main() {
   const providers = await getProviders(token);
   console.log(`✅ Found ${providers.length} providers\n`);
   
-  // Filter providers without coordinates
-  const needsGeocode = providers.filter(p => !hasCoordinates(p));
+  // Providers without coordinates; with --rooftop also the ZIP-centroid fixes
+  const needsGeocode = providers.filter(p => (
+    !hasCoordinates(p) || (ROOFTOP && p.locationPrecision === 'zip')
+  ));
   console.log(`📍 ${needsGeocode.length} providers need geocoding\n`);
   
   if (needsGeocode.length === 0) {
@@ -109,11 +127,13 @@ async function main() {
   // Geocode each provider
   let success = 0;
   let failed = 0;
+  let centroids = 0;
   
   for (const provider of needsGeocode) {
     const address = buildAddressString(provider);
+    const centroid = ROOFTOP ? null : geocodeZip(provider.address?.zip);
     
-    if (!address || address.length < 5) {
+    if (!centroid && (!address || address.length < 5)) {
       console.log(`⚠️  ${provider.practiceName}: No address to geocode`);
       failed++;
       continue;
@@ -123,16 +143,21 @@ async function main() {
     console.log(`   Address: ${address}`);
     
     try {
-      // Nominatim rate limit: 1 request per second
-      await new Promise(resolve => setTimeout(resolve, 1100));
+      let coords = centroid;
       
-      const coords = await geocodeAddress(address);
+      if (coords) {
+        centroids++;
+      } else {
+        // Nominatim rate limit: 1 request per second
+        await new Promise(resolve => setTimeout(resolve, 1100));
+        coords = await geocodeAddress(address);
+      }
       
       if (coords) {
-        console.log(`   Found: ${coords.lat}, ${coords.lng}`);
+        console.log(`   Found: ${coords.lat}, ${coords.lng}${centroid ? ' (ZIP centroid)' : ''}`);
         
         // Update provider
-        await updateProviderCoordinates(token, provider._id, coords.lat, coords.lng);
+        await updateProviderCoordinates(token, provider._id, coords.lat, coords.lng, centroid ? 'zip' : 'rooftop');
         console.log(`   ✅ Updated!\n`);
         success++;
       } else {
@@ -147,7 +172,7 @@ async function main() {
   
   // Summary
   console.log('\n========== SUMMARY ==========');
-  console.log(`✅ Successfully geocoded: ${success}`);
+  console.log(`✅ Successfully geocoded: ${success} (${centroids} from ZIP centroids)`);
   console.log(`❌ Failed: ${failed}`);
   console.log(`📊 Total processed: ${needsGeocode.length}`);
 }
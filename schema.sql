@@ -264,6 +264,8 @@ CREATE TABLE agent_runs (
   duration_seconds INTEGER,
   api_calls_made INTEGER,
   websites_scraped INTEGER,
+  estimated_cost_usd NUMERIC(10, 4),
+  metrics JSONB, -- {stages: {scrape: {p50_ms, p95_ms, max_ms}}, places_skus, openai_tokens, cost_usd, http}
   
   -- Status tracking
   status VARCHAR(50) DEFAULT 'running' CHECK (status IN ('running', 'completed', 'failed', 'cancelled')),